@@ -21,11 +21,16 @@ import six
 from toolz.dicttoolz import get_in
 from toolz.functoolz import identity
 
-from twisted.internet.task import deferLater
 
 from txeffect import deferred_performer, perform as twisted_perform
 
 from otter.auth import Authenticate, InvalidateToken, public_endpoint_url
+from otter.cloud_client.clb_coordinator import (
+    CLBMutationCoordinator,
+    CoordinatedCLBMutation,
+    clb_mutation_lb_id,
+    coordinated_clb_mutation,
+    perform_coordinated_clb_mutation)
 from otter.constants import ServiceType
 from otter.log.intents import msg as msg_effect
 from otter.util.config import config_value
@@ -41,7 +46,7 @@ from otter.util.pure_http import (
     has_code,
     request,
 )
-from otter.util.weaklocks import WeakLocks
+from otter.util.ratelimit import TokenBuckets
 
 
 def add_bind_service(catalog, service_name, region, log, request_func):
@@ -68,7 +73,8 @@ def service_request(
         params=None, log=None,
         reauth_codes=(401, 403),
         success_pred=has_code(200),
-        json_response=True):
+        json_response=True,
+        json_items=None):
     """
     Make an HTTP request to a Rackspace service, with a bunch of awesome
     behavior!
@@ -87,7 +93,12 @@ def service_request(
     :param sequence reauth_codes: HTTP codes upon which to invalidate the
         auth cache.
     :param bool json_response: Specifies whether the response should be
-        parsed as JSON.
+        parsed as JSON. A successful response is parsed while it is received.
+    :param dict json_items: Mapping of member name of the JSON response object
+        to function called with each item of the array in that member as it
+        is parsed, like ``items`` of
+        :obj:`otter.util.jsonstream.JSONStreamDecoder`. Useful to keep only
+        the needed parts of big listings.
     :param bool parse_errors: Whether to parse :class:`APIError`
 
     :raise APIError: Raised asynchronously when the response HTTP code is not
@@ -105,11 +116,14 @@ def service_request(
         log=log,
         reauth_codes=reauth_codes,
         success_pred=success_pred,
-        json_response=json_response))
+        json_response=json_response,
+        json_items=json_items))
 
 
 @attributes(["service_type", "method", "url", "headers", "data", "params",
-             "log", "reauth_codes", "success_pred", "json_response"])
+             "log", "reauth_codes", "success_pred", "json_response",
+             "json_items"],
+            defaults={"json_items": None})
 class ServiceRequest(object):
     """
     A request to a Rackspace/OpenStack service.
@@ -197,8 +211,10 @@ def concretize_service_request(
                 catalog, service_name, region, log, request_)
         request_ = add_error_handling(
             service_request.success_pred, request_)
+        json_items = None
         if service_request.json_response:
             request_ = add_json_response(request_)
+            json_items = service_request.json_items or {}
 
         return request_(
             service_request.method,
@@ -206,7 +222,8 @@ def concretize_service_request(
             headers=service_request.headers,
             data=service_request.data,
             params=service_request.params,
-            log=log)
+            log=log,
+            json_items=json_items)
 
     eff = auth_eff.on(got_auth)
     bracket = throttler(service_request.service_type,
@@ -268,30 +285,41 @@ _CFG_NAMES_PER_TENANT = {
 }
 
 
-def _default_throttler(locks, clock, stype, method, tenant_id):
+def _default_throttler(buckets, stype, method, tenant_id):
     """
     Get a throttler function with throttling policies based on configuration.
+
+    Each configured delay gives the initial rate (one request per delay) of a
+    token bucket shared by all requests of the service and method (and
+    tenant for per-tenant configs) made from this node. The rate adapts to
+    the rate limiting responses of the service and can grow up to
+    ``cloud_client.throttling.max_rate_factor`` (default 2) times the
+    initial rate. Only one request of a bucket is in progress at a time.
+
+    :param buckets: :obj:`TokenBuckets` to get the bucket from
     """
     cfg_name = _CFG_NAMES.get((stype, method))
     if cfg_name is not None:
-        delay = config_value('cloud_client.throttling.' + cfg_name)
-        if delay is not None:
-            lock = locks.get_lock((stype, method))
-            return partial(lock.run, deferLater, clock, delay)
-
-    # Could be a per-tenant lock
-    cfg_name = _CFG_NAMES_PER_TENANT.get((stype, method))
-    if cfg_name is not None:
-        delay = config_value('cloud_client.throttling.' + cfg_name)
-        if delay is not None:
-            lock = locks.get_lock((stype, method, tenant_id))
-            return partial(lock.run, deferLater, clock, delay)
+        key = (stype, method)
+    else:
+        # Could be a per-tenant limit
+        cfg_name = _CFG_NAMES_PER_TENANT.get((stype, method))
+        key = (stype, method, tenant_id)
+    if cfg_name is None:
+        return None
+    delay = config_value('cloud_client.throttling.' + cfg_name)
+    if not delay:
+        return None
+    base_rate = 1.0 / delay
+    factor = config_value('cloud_client.throttling.max_rate_factor') or 2
+    return buckets.get(key, base_rate, base_rate * factor,
+                       concurrency=1).run
 
 
 def perform_tenant_scope(
         authenticator, log, service_configs, throttler,
         dispatcher, tenant_scope, box,
-        _concretize=concretize_service_request):
+        _concretize=concretize_service_request, clb_coordinator=None):
     """
     Perform a :obj:`TenantScope` by performing its :attr:`TenantScope.effect`,
     with a dispatcher extended with a performer for :obj:`ServiceRequest`
@@ -301,12 +329,22 @@ def perform_tenant_scope(
     The first arguments before (dispatcher, tenant_scope, box) are intended
     to be partially applied, and the result is a performer that can be put into
     a dispatcher.
+
+    If ``clb_coordinator`` is given, requests changing CLB nodes are made
+    through it.
     """
     @sync_performer
     def scoped_performer(dispatcher, service_request):
-        return _concretize(
-            authenticator, log, service_configs, throttler,
-            tenant_scope.tenant_id, service_request)
+        concretize = partial(
+            _concretize, authenticator, log, service_configs, throttler,
+            tenant_scope.tenant_id)
+        lb_id = (clb_mutation_lb_id(service_request)
+                 if clb_coordinator is not None else None)
+        if lb_id is not None:
+            return coordinated_clb_mutation(
+                clb_coordinator, (tenant_scope.tenant_id, lb_id),
+                service_request, concretize)
+        return concretize(service_request)
     new_disp = ComposedDispatcher([
         TypeDispatcher({ServiceRequest: scoped_performer}),
         dispatcher])
@@ -320,14 +358,26 @@ def get_cloud_client_dispatcher(reactor, authenticator, log, service_configs):
     """
     # this throttler could be parameterized but for now it's basically a hack
     # that we want to keep private to this module
-    throttler = partial(_default_throttler, WeakLocks(), reactor)
+    throttler = partial(_default_throttler, TokenBuckets(reactor))
+    clb_coordinator = CLBMutationCoordinator(reactor, _clb_mutation_delay)
     return TypeDispatcher({
         TenantScope: partial(perform_tenant_scope, authenticator, log,
-                             service_configs, throttler),
+                             service_configs, throttler,
+                             clb_coordinator=clb_coordinator),
         _Throttle: _perform_throttle,
+        CoordinatedCLBMutation: perform_coordinated_clb_mutation,
     })
 
 
+def _clb_mutation_delay():
+    """
+    Return seconds to wait after changing CLB nodes before changing them
+    again
+    """
+    delay = config_value('cloud_client.clb_mutation_delay')
+    return 1 if delay is None else delay
+
+
 # ----- Logging responses -----
 
 
@@ -662,13 +712,17 @@ def list_servers_details_page(parameters=None):
     )
 
 
-def list_servers_details_all(parameters=None):
+def list_servers_details_all(parameters=None, server_filter=None):
     """
     List all pages of servers details, starting at the page specified by the
     given filtering and pagination parameters.
 
     :ivar dict parameters: A dictionary with pagination information,
         changes-since filters, and name filters.
+    :ivar server_filter: Function of server details `dict` -> bool. Only
+        servers it returns True for are kept as each page is received, so
+        that the others are not held till all the pages are fetched. All
+        servers are kept if it is None.
 
     Succeed on 200.
 
@@ -683,7 +737,10 @@ def list_servers_details_all(parameters=None):
             servers_so_far = []
 
         _response, body = result
-        servers = servers_so_far + body['servers']
+        page = body['servers']
+        if server_filter is not None:
+            page = [server for server in page if server_filter(server)]
+        servers = servers_so_far + page
 
         # Only continue if pagination is supported and there is another page
         continuation = [link['href'] for link in body.get('servers_links', [])
@@ -0,0 +1,289 @@
+"""
+Node-wide coordination of changes to cloud load balancer nodes.
+
+A CLB goes into PENDING_UPDATE after every change to its nodes and rejects
+further changes until it is ACTIVE again. Groups sharing a CLB would otherwise
+race each other and waste convergence iterations on
+:obj:`otter.cloud_client.clb.CLBImmutableError`. The
+:obj:`CLBMutationCoordinator` serializes requests changing the nodes of a CLB
+from all groups on this node, merges queued requests adding or removing
+nodes into one request and waits for the CLB to become ACTIVE again between
+requests.
+"""
+
+import re
+from collections import deque
+
+import attr
+
+from effect import Effect
+
+from toolz.itertoolz import concat
+
+from twisted.internet.defer import Deferred
+from twisted.internet.task import deferLater
+from twisted.python.failure import Failure
+
+from txeffect import deferred_performer, perform
+
+from otter.constants import ServiceType
+from otter.util.http import APIError
+
+
+# Number of nodes that can be deleted in one request. Same as
+# otter.cloud_client.clb.CLB_BATCH_DELETE_LIMIT
+_DELETE_LIMIT = 10
+
+_NODES_URL = re.compile(r'^loadbalancers/(?P<lb_id>[^/]+)/nodes(/[^/]+)?$')
+
+_PENDING_UPDATE = re.compile(
+    "has a status of 'PENDING_UPDATE' and is considered immutable", re.I)
+
+
+def clb_mutation_lb_id(service_request):
+    """
+    Return ID of the CLB whose nodes are changed by the given
+    :obj:`ServiceRequest` or None if it does not change any CLB nodes.
+    """
+    if (service_request.service_type != ServiceType.CLOUD_LOAD_BALANCERS or
+            service_request.method.lower() not in ('post', 'put', 'delete')):
+        return None
+    match = _NODES_URL.match(service_request.url)
+    return match.group('lb_id') if match else None
+
+
+def _is_pending_update(failure):
+    """
+    Is the failure caused by CLB being in PENDING_UPDATE?
+    """
+    return (failure.check(APIError) is not None and
+            failure.value.code == 422 and
+            _PENDING_UPDATE.search(failure.value.body or '') is not None)
+
+
+@attr.s
+class _Pending(object):
+    """
+    A request waiting to be made by :obj:`CLBMutationCoordinator`
+
+    :ivar request: The :obj:`ServiceRequest`
+    :ivar perform: Function of :obj:`ServiceRequest` returning Deferred of
+        the result of making the request
+    :ivar deferred: Fired with result of the request
+    :ivar bool mergeable: Can this be merged with other requests?
+    """
+    request = attr.ib()
+    perform = attr.ib()
+    deferred = attr.ib(default=attr.Factory(Deferred))
+    mergeable = attr.ib(default=True)
+
+    @property
+    def kind(self):
+        """
+        Kind of request w.r.t. merging: ``add`` and ``remove`` requests can
+        be merged with other requests of same kind. Otherwise None.
+        """
+        if not self.mergeable or self.request.url.count('/') != 2:
+            return None
+        return {'post': 'add',
+                'delete': 'remove'}.get(self.request.method.lower())
+
+
+def _take_batch(queue):
+    """
+    Remove and return requests from queue that should be made together
+    """
+    first = queue.popleft()
+    batch = [first]
+    if first.kind is None:
+        return batch
+    num_ids = len(first.request.params['id']) if first.kind == 'remove' else 0
+    for pending in list(queue):
+        if pending.kind != first.kind:
+            continue
+        if first.kind == 'remove':
+            num_ids += len(pending.request.params['id'])
+            if num_ids > _DELETE_LIMIT:
+                break
+        queue.remove(pending)
+        batch.append(pending)
+    return batch
+
+
+def _merge(batch):
+    """
+    Return :obj:`ServiceRequest` that does all the requests in the batch
+    """
+    request = batch[0].request
+    if len(batch) == 1:
+        return request
+    if batch[0].kind == 'add':
+        data = {'nodes': list(concat(p.request.data['nodes'] for p in batch))}
+        return _evolve(request, data=data)
+    ids = list(concat(p.request.params['id'] for p in batch))
+    return _evolve(request, params={'id': ids})
+
+
+def _evolve(request, **changes):
+    """
+    Return copy of :obj:`ServiceRequest` with given attributes changed
+    """
+    attrs = {name: getattr(request, name)
+             for name in ('service_type', 'method', 'url', 'headers', 'data',
+                          'params', 'log', 'reauth_codes', 'success_pred',
+                          'json_response')}
+    attrs.update(changes)
+    return type(request)(**attrs)
+
+
+def _result_for(pending, batch, result):
+    """
+    Return the part of the result of a merged request that is of the given
+    pending request. When nodes are added, the response contains all the
+    nodes added and this returns only the ones asked by the request.
+    """
+    if len(batch) == 1 or pending.kind != 'add':
+        return result
+    response, body = result
+    if not isinstance(body, dict) or not isinstance(body.get('nodes'), list):
+        return result
+    asked = set((node['address'], node['port'])
+                for node in pending.request.data['nodes'])
+    return response, dict(
+        body, nodes=[node for node in body['nodes']
+                     if (node.get('address'), node.get('port')) in asked])
+
+
+class CLBMutationCoordinator(object):
+    """
+    Serializes requests changing nodes of a CLB. See module docstring.
+
+    :ivar clock: Reactor used to wait between requests
+    :ivar callable get_delay: Function returning number of seconds to wait
+        after changing a CLB before changing it again, i.e. roughly how long
+        CLB stays in PENDING_UPDATE
+    :ivar int max_immutable_retries: Number of times a request rejected
+        because the CLB is in PENDING_UPDATE is retried before failing
+    """
+
+    def __init__(self, clock, get_delay, max_immutable_retries=5):
+        self.clock = clock
+        self.get_delay = get_delay
+        self.max_immutable_retries = max_immutable_retries
+        self._queues = {}
+        self._busy = set()
+
+    def submit(self, key, request, perform):
+        """
+        Make the request changing CLB nodes after other requests changing
+        the same CLB are done.
+
+        :param key: Identifies the CLB, like (tenant ID, CLB ID)
+        :param request: The :obj:`ServiceRequest`
+        :param perform: Function of :obj:`ServiceRequest` returning Deferred
+            of the result of making the request
+        :return: Deferred fired with result of making the request
+        """
+        pending = _Pending(request, perform)
+        self._queues.setdefault(key, deque()).append(pending)
+        self._next(key)
+        return pending.deferred
+
+    def _next(self, key):
+        """
+        Make next batch of requests of the CLB if it is not busy
+        """
+        if key in self._busy:
+            return
+        queue = self._queues.get(key)
+        if not queue:
+            self._queues.pop(key, None)
+            return
+        self._busy.add(key)
+        batch = _take_batch(queue)
+        d = self._perform(batch[0].perform, _merge(batch), 0)
+        d.addBoth(self._done, key, batch)
+
+    def _perform(self, perform, request, attempt):
+        """
+        Make request, retrying it if CLB is in PENDING_UPDATE
+        """
+        def pending_update(failure):
+            if (_is_pending_update(failure) and
+                    attempt < self.max_immutable_retries):
+                return deferLater(self.clock, self.get_delay(),
+                                  self._perform, perform, request,
+                                  attempt + 1)
+            return failure
+
+        return perform(request).addErrback(pending_update)
+
+    def _done(self, result, key, batch):
+        """
+        Give result to the requests in the batch and make next batch after
+        waiting for CLB to become ACTIVE again
+        """
+        if isinstance(result, Failure) and len(batch) > 1:
+            # Do not let one group's bad request fail others'. Make them
+            # again separately
+            queue = self._queues[key]
+            for pending in reversed(batch):
+                pending.mergeable = False
+                queue.appendleft(pending)
+        else:
+            for pending in batch:
+                if isinstance(result, Failure):
+                    pending.deferred.errback(result)
+                else:
+                    pending.deferred.callback(
+                        _result_for(pending, batch, result))
+
+        def next_batch():
+            self._busy.discard(key)
+            self._next(key)
+
+        deferLater(self.clock, self.get_delay(), next_batch)
+
+    def stats(self):
+        """
+        Return dict of number of CLBs being changed and number of requests
+        waiting to be made
+        """
+        return {'busy_clbs': len(self._busy),
+                'waiting': sum(map(len, self._queues.values()))}
+
+
+@attr.s
+class CoordinatedCLBMutation(object):
+    """
+    Intent to make a request changing CLB nodes via
+    :obj:`CLBMutationCoordinator`.
+
+    :ivar coordinator: The :obj:`CLBMutationCoordinator`
+    :ivar key: Identifies the CLB
+    :ivar request: The :obj:`ServiceRequest`
+    :ivar concretize: Function of :obj:`ServiceRequest` returning Effect of
+        making the request
+    """
+    coordinator = attr.ib()
+    key = attr.ib()
+    request = attr.ib()
+    concretize = attr.ib()
+
+
+def coordinated_clb_mutation(coordinator, key, request, concretize):
+    """
+    Return Effect of :obj:`CoordinatedCLBMutation`
+    """
+    return Effect(
+        CoordinatedCLBMutation(coordinator, key, request, concretize))
+
+
+@deferred_performer
+def perform_coordinated_clb_mutation(dispatcher, intent):
+    """
+    Perform :obj:`CoordinatedCLBMutation`
+    """
+    return intent.coordinator.submit(
+        intent.key, intent.request,
+        lambda request: perform(dispatcher, intent.concretize(request)))
@@ -4,7 +4,10 @@ from twisted.python.constants import NamedConstant, Names
 
 
 CONVERGENCE_DIRTY_DIR = '/groups/divergent'
+CONVERGENCE_DIRTY_BUCKETS_DIR = '/groups/divergent-buckets'
+CONVERGENCE_BUCKETS = 10
 CONVERGENCE_PARTITIONER_PATH = '/convergence-partitioner'
+SERVERS_PAGE_SIZE = 1000
 
 
 class ServiceType(Names):
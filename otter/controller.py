@@ -56,7 +56,8 @@ from otter.json_schema.group_schemas import MAX_ENTITIES
 from otter.log import audit
 from otter.log.intents import BoundFields, msg, with_log
 from otter.models.intents import GetScalingGroupInfo, ModifyGroupStatePaused
-from otter.models.interface import GroupNotEmptyError, ScalingGroupStatus
+from otter.models.interface import (
+    GroupNotEmptyError, STRONG_CONSISTENCY, ScalingGroupStatus)
 from otter.supervisor import (
     CannotDeleteServerBelowMinError,
     ServerNotFoundError,
@@ -447,8 +448,8 @@ def maybe_execute_scaling_policy(
 
     def _do_get_configs(policy):
         deferred = defer.gatherResults([
-            scaling_group.view_config(),
-            scaling_group.view_launch_config()
+            scaling_group.view_config(STRONG_CONSISTENCY),
+            scaling_group.view_launch_config(STRONG_CONSISTENCY)
         ])
         return deferred.addCallback(lambda results: results + [policy])
 
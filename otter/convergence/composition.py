@@ -16,6 +16,22 @@ from otter.convergence.model import (
 from otter.util.fp import set_in
 
 
+# The last "non-convergence-tenants" list seen and its set. Config values are
+# not changed in place, so the set can be reused while the list is the same
+_disabled_tenants = (None, frozenset())
+
+
+def _tenants_set(tenant_ids):
+    """
+    Return frozenset of the list of tenant IDs, reusing the last one if the
+    list is same
+    """
+    global _disabled_tenants
+    if _disabled_tenants[0] is not tenant_ids:
+        _disabled_tenants = (tenant_ids, frozenset(tenant_ids))
+    return _disabled_tenants[1]
+
+
 def tenant_is_enabled(tenant_id, get_config_value):
     """
     Feature-flag test: is the given tenant enabled for convergence?
@@ -28,7 +44,7 @@ def tenant_is_enabled(tenant_id, get_config_value):
     if disabled_tenant_ids == 'none':
         return True
     if disabled_tenant_ids is not None:
-        return (tenant_id not in disabled_tenant_ids)
+        return (tenant_id not in _tenants_set(disabled_tenant_ids))
     return True
 
 
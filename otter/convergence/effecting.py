@@ -3,12 +3,16 @@
 from effect import parallel
 
 from otter.convergence.model import ErrorReason, StepResult
+from otter.convergence.profiling import timed_phase
 
 
 def steps_to_effect(steps):
-    """Turns a collection of :class:`IStep` providers into an effect."""
+    """
+    Turns a collection of :class:`IStep` providers into an effect. Time taken
+    by each step is recorded as ``execute.<step class name>`` phase.
+    """
     # Treat unknown errors as RETRY.
     return parallel([
-        s.as_effect().on(error=lambda e: (StepResult.RETRY,
-                                          [ErrorReason.Exception(e)]))
+        timed_phase('execute.' + type(s).__name__, s.as_effect()).on(
+            error=lambda e: (StepResult.RETRY, [ErrorReason.Exception(e)]))
         for s in steps])
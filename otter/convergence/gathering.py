@@ -25,7 +25,7 @@ from otter.cloud_client.clb import (
     get_clb_nodes,
     get_clbs
 )
-from otter.constants import ServiceType
+from otter.constants import SERVERS_PAGE_SIZE, ServiceType
 from otter.convergence.model import (
     CLB,
     CLBNode,
@@ -37,8 +37,10 @@ from otter.convergence.model import (
     get_stack_tag_for_group,
     group_id_from_metadata
 )
+from otter.convergence.profiling import timed_phase
 from otter.indexer import atom
 from otter.models.cass import CassScalingGroupServersCache
+from otter.util.config import config_value
 from otter.util.http import append_segments
 from otter.util.retry import (
     exponential_backoff_interval, retry_effect, retry_times)
@@ -51,21 +53,40 @@ def _retry(eff):
         eff, retry_times(5), exponential_backoff_interval(2))
 
 
-def get_all_server_details(changes_since=None, batch_size=100):
+def get_all_server_details(changes_since=None, batch_size=None,
+                           server_filter=None):
     """
     Return all servers of a tenant.
 
     :param datetime changes_since: Get changes since this time. Must be UTC
-    :param int batch_size: number of servers to fetch *per batch*.
+    :param int batch_size: number of servers to fetch *per batch*. Defaults to
+        ``cloud_client.servers_page_size`` config or
+        :obj:`SERVERS_PAGE_SIZE`. Nova returns lesser servers per batch if
+        this is more than its maximum limit.
+    :param server_filter: function of server -> bool. Only servers it returns
+        True for are kept as each batch is received. All servers are kept if
+        it is None.
     :return: list of server objects as returned by Nova.
 
     NOTE: This really screams to be a independent fxcloud-type API
     """
+    if batch_size is None:
+        batch_size = (config_value('cloud_client.servers_page_size') or
+                      SERVERS_PAGE_SIZE)
     query = {'limit': [str(batch_size)]}
     if changes_since is not None:
         query['changes-since'] = ['{0}Z'.format(changes_since.isoformat())]
 
-    return list_servers_details_all(query)
+    return list_servers_details_all(query, server_filter)
+
+
+def has_group_metadata(server):
+    """
+    Does the server have autoscale group ID in its metadata?
+    """
+    metadata = server.get('metadata')
+    return (isinstance(metadata, dict) and
+            group_id_from_metadata(metadata) is not None)
 
 
 def get_all_scaling_group_servers(changes_since=None,
@@ -80,18 +101,13 @@ def get_all_scaling_group_servers(changes_since=None,
     :return: dict mapping group IDs to lists of Nova servers.
     """
 
-    def has_group_id(s):
-        return 'metadata' in s and isinstance(s['metadata'], dict)
-
     def group_id(s):
         return group_id_from_metadata(s['metadata'])
 
-    servers_apply = compose(keyfilter(lambda k: k is not None),
-                            groupby(group_id),
-                            filter(server_predicate),
-                            filter(has_group_id))
+    servers_apply = compose(groupby(group_id), filter(server_predicate))
 
-    return get_all_server_details(changes_since).on(servers_apply)
+    return get_all_server_details(
+        changes_since, server_filter=has_group_metadata).on(servers_apply)
 
 
 def mark_deleted_servers(old, new):
@@ -143,7 +159,13 @@ def get_scaling_group_servers(tenant_id, group_id, now,
     if last_update is None:
         servers = (yield all_as_servers()).get(group_id, [])
     else:
-        current = yield all_servers()
+        # Servers that are neither in any group nor cached can be dropped as
+        # they are received. Cached servers are kept even if they are not in
+        # group anymore so that they are not considered deleted.
+        cached_ids = set(server['id'] for server in cached_servers)
+        current = yield all_servers(
+            server_filter=lambda s: (s['id'] in cached_ids or
+                                     has_group_metadata(s)))
         servers = mark_deleted_servers(cached_servers, current)
         servers = list(filter(server_of_group(group_id), servers))
     yield do_return(servers)
@@ -199,11 +221,11 @@ def get_clb_contents():
         for lb_id, health_mon in zip(lb_ids, hms) if health_mon is not None}
     draining = [n for n in concat(lb_nodes.values())
                 if n.description.condition == CLBNodeCondition.DRAINING]
-    feeds = yield parallel(
+    feeds = yield timed_phase('gather.clb_feeds', parallel(
         [_retry(get_clb_node_feed(n.description.lb_id, n.node_id).on(
             error=gone(None)))
          for n in draining]
-    )
+    ))
     nodes_to_feeds = dict(zip(draining, feeds))
     deleted_lbs = set([
         node.description.lb_id
@@ -294,12 +316,17 @@ def get_all_launch_server_data(
 
     Returns an Effect of {'servers': [NovaServer], 'lb_nodes': [LBNode],
                           'lbs': pmap(LB_ID -> CLB)}.
+
+    Time taken to gather from each source is recorded as ``gather.nova``,
+    ``gather.clb`` (which includes ``gather.clb_feeds``) and ``gather.rcv3``
+    phases.
     """
     return parallel(
-        [get_scaling_group_servers(tenant_id, group_id, now)
+        [timed_phase('gather.nova',
+                     get_scaling_group_servers(tenant_id, group_id, now))
          .on(map(NovaServer.from_server_details_json)).on(list),
-         get_clb_contents(),
-         get_rcv3_contents()]
+         timed_phase('gather.clb', get_clb_contents()),
+         timed_phase('gather.rcv3', get_rcv3_contents())]
     ).on(lambda (servers, clb_nodes_and_clbs, rcv3_nodes): {
         'servers': servers,
         'lb_nodes': clb_nodes_and_clbs[0] + rcv3_nodes,
@@ -139,3 +139,31 @@ def log_steps(steps):
         if step_type in _loggers:
             effs.append(_loggers[step_type](typed_steps))
     return parallel(effs)
+
+
+def execute_convergence_fields(steps, now, desired, resources):
+    """
+    Return fields of the ``execute-convergence`` log event.
+
+    When there are no steps the group is in steady state and logging all its
+    resources on every iteration only adds volume proportional to group size.
+    In that case only the number of resources of each kind and the number of
+    servers in each state are logged.
+
+    :param steps: Steps being executed
+    :param datetime now: Time of convergence
+    :param desired: :obj:`DesiredServerGroupState` being converged to
+    :param dict resources: Resources gathered by the executor
+    """
+    if steps:
+        return dict(resources, steps=steps, now=now, desired=desired)
+    fields = {
+        'steps': steps, 'now': now, 'desired': desired, 'summary': True,
+        'resource_counts': {name: len(value)
+                            for name, value in resources.iteritems()}}
+    if 'servers' in resources:
+        states = defaultdict(int)
+        for server in resources['servers']:
+            states[server.state.name] += 1
+        fields['server_states'] = dict(states)
+    return fields
@@ -10,11 +10,11 @@ from attr.validators import instance_of, optional
 
 from characteristic import Attribute, attributes
 
-from pyrsistent import PMap, PSet, freeze, pmap, pset, pvector, thaw
+from pyrsistent import PMap, PSet, freeze, pset, pvector, thaw
 
 from six import string_types
 
-from sumtypes import constructor, sumtype
+from sumtypes import constructor, match, sumtype
 
 from toolz.dicttoolz import get_in
 from toolz.itertoolz import groupby
@@ -23,7 +23,6 @@ from twisted.python.constants import NamedConstant, Names
 
 from zope.interface import Attribute as IAttribute, Interface, implementer
 
-from otter.util.fp import set_in
 from otter.util.timestamp import timestamp_to_epoch
 
 
@@ -153,6 +152,22 @@ class ErrorReason(object):
     UserMessage = constructor('message')
 
 
+# Compiled patterns of metadata keys keyed on service name
+_service_key_patterns = {}
+
+
+def _service_key_pattern(service_name):
+    """
+    Return compiled pattern of metadata keys of the service
+    """
+    pattern = _service_key_patterns.get(service_name)
+    if pattern is None:
+        pattern = _service_key_patterns[service_name] = re.compile(
+            "^rax:{service}(?P<subkeys>(:[A-Za-z0-9\-_]+)+)$"
+            .format(service=re.escape(service_name)))
+    return pattern
+
+
 def get_service_metadata(service_name, metadata):
     """
     Obtain all the metadata associated with a particular service from Nova
@@ -161,21 +176,24 @@ def get_service_metadata(service_name, metadata):
     :return: the metadata values as a dictionary - in the example above, the
         dictionary would look like `{k1: {k2: {k3: val}}}`
     """
-    as_metadata = pmap()
+    as_metadata = {}
     if isinstance(metadata, dict):
-        key_pattern = re.compile(
-            "^rax:{service}(?P<subkeys>(:[A-Za-z0-9\-_]+)+)$"
-            .format(service=service_name))
+        key_pattern = _service_key_pattern(service_name)
+        prefix = 'rax:{}:'.format(service_name)
 
         for k, v in metadata.iteritems():
+            if not k.startswith(prefix):
+                continue
             m = key_pattern.match(k)
             if m:
-                subkeys = m.groupdict()['subkeys']
-                as_metadata = set_in(
-                    as_metadata,
-                    [sk for sk in subkeys.split(':') if sk],
-                    v)
-    return as_metadata
+                subkeys = [sk for sk in m.group('subkeys').split(':') if sk]
+                # Built mutably and frozen once since this is done for
+                # every server gathered
+                parent = as_metadata
+                for sk in subkeys[:-1]:
+                    parent = parent.setdefault(sk, {})
+                parent[subkeys[-1]] = v
+    return freeze(as_metadata)
 
 
 def _private_ipv4_addresses(server):
@@ -232,7 +250,15 @@ def _validate_state(_1, _2, state):
         raise AssertionError("{0} is not a ServerState".format(state))
 
 
-@attr.s(repr=False)
+def _json_dict(json):
+    """
+    Return the JSON of :obj:`NovaServer` as dict, thawing it if it was given
+    frozen.
+    """
+    return thaw(json) if isinstance(json, PMap) else json
+
+
+@attr.s(repr=False, slots=True)
 class NovaServer(object):
     """
     Information about a server that was retrieved from Nova.
@@ -250,7 +276,8 @@ class NovaServer(object):
     :ivar PSet desired_lbs: An immutable mapping of load balancer IDs to lists
         of :class:`CLBDescription` instances.
     :var dict json: JSON dict received from Nova from which this server
-        is created
+        is created. It is not copied or frozen since servers are created in
+        bulk and must not be modified.
     """
     id = attr.ib()
     state = attr.ib(validator=_validate_state)
@@ -264,7 +291,8 @@ class NovaServer(object):
                           validator=instance_of(PSet))
     servicenet_address = attr.ib(default='',
                                  validator=instance_of(string_types))
-    json = attr.ib(default=attr.Factory(pmap), validator=instance_of(PMap))
+    json = attr.ib(default=attr.Factory(dict), validator=instance_of(dict),
+                   convert=_json_dict, hash=False)
 
     @classmethod
     def from_server_details_json(cls, server_json):
@@ -296,7 +324,7 @@ class NovaServer(object):
             links=freeze(server_json['links']),
             desired_lbs=_lbs_from_metadata(metadata),
             servicenet_address=_servicenet_address(server_json),
-            json=freeze(server_json))
+            json=server_json)
 
     def __repr__(self):
         """
@@ -583,7 +611,7 @@ class DrainingUnavailable(Exception):
 
 
 @implementer(ILBNode, IDrainable)
-@attr.s
+@attr.s(slots=True)
 class CLBNode(object):
     """
     A Rackspace Cloud Load Balancer node.
@@ -721,3 +749,61 @@ class RCv3Node(object):
         """
         return (isinstance(server, NovaServer) and
                 server.id == self.cloud_server_id)
+
+
+@sumtype
+class LBNodeChange(object):
+    """
+    A change to load balancer nodes made by a successfully executed step.
+    Applying these to the gathered nodes with :func:`apply_lb_node_changes`
+    gives the nodes as they are after executing the steps without having to
+    gather them again.
+    """
+    Added = constructor('node')
+    Changed = constructor('lb_id', 'node_id', 'condition', 'weight', 'type')
+    CLBRemoved = constructor('lb_id', 'node_id')
+    RCv3Removed = constructor('lb_id', 'server_id')
+
+
+@match(LBNodeChange)
+class _lb_node_change_applier(object):
+    def Added(node):
+        return lambda nodes: nodes + [node]
+
+    def Changed(lb_id, node_id, condition, weight, type):
+        def change(node):
+            if not (isinstance(node, CLBNode) and node.node_id == node_id and
+                    node.description.lb_id == lb_id):
+                return node
+            return attr.assoc(
+                node,
+                description=CLBDescription(
+                    lb_id=lb_id, port=node.description.port, weight=weight,
+                    condition=condition, type=type))
+        return lambda nodes: map(change, nodes)
+
+    def CLBRemoved(lb_id, node_id):
+        def removed(node):
+            return (isinstance(node, CLBNode) and node.node_id == node_id and
+                    node.description.lb_id == lb_id)
+        return lambda nodes: [node for node in nodes if not removed(node)]
+
+    def RCv3Removed(lb_id, server_id):
+        def removed(node):
+            return (isinstance(node, RCv3Node) and
+                    node.cloud_server_id == server_id and
+                    node.description.lb_id.lower() == lb_id.lower())
+        return lambda nodes: [node for node in nodes if not removed(node)]
+
+
+def apply_lb_node_changes(lb_nodes, changes):
+    """
+    Return list of LB nodes as they are after applying given changes.
+
+    :param lb_nodes: sequence of :obj:`ILBNode` providers
+    :param changes: sequence of :obj:`LBNodeChange`
+    """
+    nodes = list(lb_nodes)
+    for change in changes:
+        nodes = _lb_node_change_applier(change)(nodes)
+    return nodes
@@ -0,0 +1,200 @@
+"""
+Per-phase timing of convergence iterations.
+
+Convergence code wraps the effects of each phase (gathering from a particular
+source, planning, executing a type of step, updating the servers cache) with
+:func:`timed_phase`. When performed, the time taken by the phase is recorded
+in a node-wide :obj:`ConvergenceProfiler`, both in aggregate and against the
+group being converged (found from the ``tenant_id`` and ``scaling_group_id``
+log fields bound in the effectful context). The profile can then be viewed
+through the admin API to see where convergence time goes.
+"""
+
+from collections import OrderedDict
+from functools import partial
+
+import attr
+
+from effect import (
+    Effect, NoPerformerFoundError, TypeDispatcher, sync_perform,
+    sync_performer)
+
+import six
+
+from otter.log.intents import get_fields
+
+
+# Name of the phase that covers a whole convergence iteration of a group
+ITERATION_PHASE = 'iteration'
+
+
+class PhaseStats(object):
+    """
+    Aggregated timing of a phase.
+
+    :ivar int count: Number of times the phase was recorded
+    :ivar float total: Sum of seconds taken
+    :ivar float max: Maximum seconds taken by a single recording
+    :ivar float last: Seconds taken by the latest recording
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        """Record a phase taking ``seconds`` to complete."""
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+    @property
+    def mean(self):
+        """Average seconds taken by the phase."""
+        return self.total / self.count if self.count else 0.0
+
+    def as_json(self):
+        """Return JSON-serializable dict of the stats."""
+        return {'count': self.count, 'total': self.total, 'mean': self.mean,
+                'max': self.max, 'last': self.last}
+
+
+class ConvergenceProfiler(object):
+    """
+    Aggregates time taken by convergence phases on this node, overall and per
+    group. Only the ``max_groups`` most recently converged groups are
+    remembered so that a long running converger does not keep growing.
+    """
+
+    def __init__(self, max_groups=1000):
+        self.max_groups = max_groups
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        self._phases = {}
+        self._groups = OrderedDict()
+
+    def record(self, phase, seconds, tenant_id=None, group_id=None):
+        """
+        Record time taken by a phase.
+
+        :param str phase: Name of the phase
+        :param float seconds: Seconds taken by the phase
+        :param str tenant_id: Tenant ID of the group being converged, if known
+        :param str group_id: ID of the group being converged, if known
+        """
+        self._phases.setdefault(phase, PhaseStats()).add(seconds)
+        if tenant_id is not None and group_id is not None:
+            # Re-insert to mark the group as most recently used
+            key = (tenant_id, group_id)
+            group_phases = self._groups.pop(key, {})
+            self._groups[key] = group_phases
+            group_phases.setdefault(phase, PhaseStats()).add(seconds)
+            while len(self._groups) > self.max_groups:
+                self._groups.popitem(last=False)
+
+    def top_phases(self, limit):
+        """
+        Return the ``limit`` phases that have taken the most total time as
+        list of dicts sorted descending on total time.
+        """
+        phases = sorted(six.iteritems(self._phases),
+                        key=lambda (_, stats): stats.total, reverse=True)
+        return [dict(stats.as_json(), phase=phase)
+                for phase, stats in phases[:limit]]
+
+    def slowest_groups(self, limit):
+        """
+        Return the ``limit`` groups whose convergence iterations took the
+        longest on average as list of dicts sorted descending on that time.
+        Each dict also contains mean time taken by every phase of the group.
+        """
+        def iteration_mean((_, phases)):
+            return phases.get(ITERATION_PHASE, PhaseStats()).mean
+
+        groups = sorted(six.iteritems(self._groups), key=iteration_mean,
+                        reverse=True)
+        return [
+            {'tenant_id': tenant_id,
+             'group_id': group_id,
+             'iteration': phases.get(ITERATION_PHASE, PhaseStats()).as_json(),
+             'phases': {phase: stats.mean
+                        for phase, stats in six.iteritems(phases)
+                        if phase != ITERATION_PHASE}}
+            for (tenant_id, group_id), phases in groups[:limit]]
+
+    def report(self, limit=10):
+        """
+        Return JSON-serializable report of slowest groups and top phases.
+        """
+        return {'groups': self.slowest_groups(limit),
+                'phases': self.top_phases(limit)}
+
+
+# The node-wide profiler that convergence phases are recorded in
+profiler = ConvergenceProfiler()
+
+
+@attr.s
+class TimedPhase(object):
+    """
+    Intent to record time taken to perform an effect as a convergence phase.
+    """
+    phase = attr.ib()
+    effect = attr.ib()
+
+
+def timed_phase(phase, eff):
+    """
+    Return Effect of :obj:`TimedPhase`
+    """
+    return Effect(TimedPhase(phase, eff))
+
+
+def _group_of_fields(disp):
+    """
+    Return (tenant_id, group_id) from log fields bound in effectful context
+    """
+    try:
+        fields = sync_perform(disp, get_fields())
+    except NoPerformerFoundError:
+        return None, None
+    return fields.get('tenant_id'), fields.get('scaling_group_id')
+
+
+@sync_performer
+def perform_timed_phase(reactor, profiler, disp, intent):
+    """
+    Perform :obj:`TimedPhase` intent. Time is recorded even if the phase's
+    effect fails.
+    """
+    tenant_id, group_id = _group_of_fields(disp)
+    start = reactor.seconds()
+
+    def record():
+        profiler.record(intent.phase, reactor.seconds() - start,
+                        tenant_id, group_id)
+
+    def succeeded(result):
+        record()
+        return result
+
+    def failed(exc_info):
+        record()
+        six.reraise(*exc_info)
+
+    return intent.effect.on(success=succeeded, error=failed)
+
+
+def get_profiling_dispatcher(reactor, profiler=profiler):
+    """
+    Return dispatcher with performer of :obj:`TimedPhase` in it that records
+    into given profiler
+    """
+    return TypeDispatcher({
+        TimedPhase: partial(perform_timed_phase, reactor, profiler)
+    })
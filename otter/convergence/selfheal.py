@@ -1,13 +1,17 @@
 """
 Self heal service. It continously triggers convergence on all groups by equally
 distributing the triggering over a period of time in effect "heal"ing the
-groups.
+groups. Every node heals the groups in the convergence buckets allocated to
+its converger, and reads only those groups.
 """
 
+import time
+from collections import deque
+
 import attr
 
-from effect import ComposedDispatcher, Effect, TypeDispatcher
-from effect.do import do
+from effect import ComposedDispatcher, Effect, Func, TypeDispatcher
+from effect.do import do, do_return
 
 from toolz.curried import filter
 
@@ -17,11 +21,19 @@ from twisted.internet.interfaces import IReactorTime
 from txeffect import perform
 
 from otter.convergence.composition import tenant_is_enabled
-from otter.convergence.service import trigger_convergence
+from otter.convergence.service import (
+    bucket_of_tenant, get_num_buckets, trigger_convergence)
 from otter.log import BoundLog
-from otter.log.intents import msg, with_log
-from otter.models.intents import GetAllValidGroups, GetScalingGroupInfo
-from otter.models.interface import NoSuchScalingGroupError, ScalingGroupStatus
+from otter.log.intents import with_log
+from otter.models.intents import GetAllValidGroups
+
+
+# Minimum seconds between two triggerings. Groups that become due within
+# this time are triggered together instead of each having its own timer.
+MIN_TRIGGER_INTERVAL = 1.0
+
+# Allowance for floating point errors when comparing times
+_EPSILON = 1e-6
 
 
 @attr.s
@@ -29,6 +41,10 @@ class SelfHeal(object):
     """
     A class that triggers convergence on all the groups over a time range.
 
+    Groups are triggered in the order they are got from the store, at a rate
+    that spreads them evenly over ``time_range``, with a single timer. Groups
+    that could not be triggered last time because of ``max_rate`` go first.
+
     :ivar clock: Reactor providing timing APIs
     :vartype: :obj:`IReactorTime`
     :ivar dispatcher: Effect dispatcher to perform all effects
@@ -40,8 +56,21 @@ class SelfHeal(object):
     :ivar float time_range: Seconds over which convergence triggerring will be
         spread evenly
     :ivar log: :obj:`BoundLog` object used to log messages
-    :ivar list _calls: List of :obj:`IDelayedCall` objects. Each object
-        represents scheduled call to trigger convergence on a group
+    :ivar recently_converged: ``Reference`` to pmap of group ID to time its
+        last convergence finished, like
+        :attr:`otter.convergence.service.Converger.recently_converged`.
+        Groups that converged within ``time_range`` are not triggered.
+    :ivar float max_rate: Maximum number of groups triggered per second. If
+        there are too many groups to trigger all of them within
+        ``time_range`` at this rate, the ones left are triggered first when
+        triggering starts again.
+    :ivar my_buckets: No-arg callable returning convergence buckets allocated
+        to this node or None if they are not known, like
+        :meth:`otter.convergence.service.Converger.my_buckets`. Only groups
+        in these buckets are triggered. All groups are triggered if this is
+        None.
+    :ivar deque _queue: Groups yet to be triggered
+    :ivar _call: :obj:`IDelayedCall` that triggers groups that are due
     """
 
     clock = attr.ib(validator=attr.validators.provides(IReactorTime))
@@ -55,7 +84,14 @@ class SelfHeal(object):
         validator=attr.validators.instance_of(BoundLog),
         convert=lambda l: l.bind(otter_service="selfheal"),
         cmp=False)
-    _calls = attr.ib(default=attr.Factory(list))
+    recently_converged = attr.ib(default=None)
+    max_rate = attr.ib(default=None)
+    my_buckets = attr.ib(default=None)
+    _queue = attr.ib(default=attr.Factory(deque))
+    _call = attr.ib(default=None)
+    _start = attr.ib(default=0)
+    _wait = attr.ib(default=0)
+    _triggered = attr.ib(default=0)
 
     def setup(self):
         """
@@ -66,68 +102,172 @@ class SelfHeal(object):
 
     def _cancel_scheduled_calls(self):
         """
-        Cancel any remaining scheduled calls.
+        Cancel triggering of remaining groups.
 
-        :return: Number of remaining active scheduled calls before cancelling
+        :return: ``deque`` of groups that were not triggered yet
         """
-        active = 0
-        for call in self._calls:
-            if call.active():
-                active += 1
-                call.cancel()
-        self._calls = []
-        return active
+        if self._call is not None and self._call.active():
+            self._call.cancel()
+        self._call = None
+        remaining = self._queue
+        self._queue = deque()
+        return remaining
 
     @inlineCallbacks
     def _setup_convergences(self):
         """
-        Get groups to converge and setup scheduled calls to trigger convergence
-        on each of them within time_range.
+        Get groups to converge in our buckets and start triggering
+        convergence on them within time_range.
         """
-        groups = yield perform(self.dispatcher,
-                               get_groups_to_converge(self.config_func))
-        active = self._cancel_scheduled_calls()
-        if active:
-            # This should never happen
-            self.log.err(RuntimeError("selfheal-calls-err"),
-                         "selfheal-calls-err", active=active)
+        buckets = self._buckets()
+        if buckets is None:
+            self._cancel_scheduled_calls()
+            self.log.msg("selfheal-buckets-unknown")
+            returnValue(None)
+        tenant_filter = None if buckets is True else TenantsInBuckets(buckets)
+        groups = yield perform(
+            self.dispatcher,
+            get_groups_to_converge(self.config_func, tenant_filter))
+        remaining = self._cancel_scheduled_calls()
+        groups = [group for group in groups
+                  if can_trigger(group) and self._is_ours(group, buckets)]
+        if remaining:
+            # Happens only if triggering is slowed down by max_rate. Groups
+            # not triggered yet go first so that the same groups are not left
+            # out every time
+            self.log.msg("selfheal-calls-carried", remaining=len(remaining))
+            groups = carry_over(remaining, groups)
         if not groups:
             returnValue(None)
-        wait_time = self.time_range / len(groups)
-        for i, group in enumerate(groups):
-            self._calls.append(
-                self.clock.callLater(
-                    i * wait_time, perform, self.dispatcher,
-                    check_and_trigger(group["tenantId"], group["groupId"]))
-            )
+        self._queue = deque(groups)
+        self._wait = self.time_range / len(groups)
+        if self.max_rate:
+            self._wait = max(self._wait, 1.0 / self.max_rate)
+        self._start = self.clock.seconds()
+        self._triggered = 0
+        self._trigger_due()
 
+    def _buckets(self):
+        """
+        Return set of buckets allocated to this node, None if they are not
+        known or True if all groups are to be triggered
+        """
+        if self.my_buckets is None:
+            return True
+        buckets = self.my_buckets()
+        return None if buckets is None else set(buckets)
 
-def get_groups_to_converge(config_func):
+    def _is_ours(self, group, buckets):
+        """
+        Is the group in one of the given buckets got from :meth:`_buckets`?
+        """
+        return buckets is True or TenantsInBuckets(buckets)(group["tenantId"])
+
+    def _trigger_due(self):
+        """
+        Trigger convergence on groups that are due and schedule the next
+        triggering. Groups whose bucket is no longer ours are skipped since
+        the node owning it now will trigger them.
+        """
+        self._call = None
+        now = self.clock.seconds()
+        buckets = self._buckets()
+        while self._queue and self._next_due() <= now + _EPSILON:
+            group = self._queue.popleft()
+            self._triggered += 1
+            if buckets is None or not self._is_ours(group, buckets):
+                continue
+            d = perform(
+                self.dispatcher,
+                check_and_trigger(group, self.recently_converged,
+                                  self.time_range))
+            # Failure is already logged by trigger_convergence
+            d.addErrback(lambda f: None)
+        if self._queue:
+            self._call = self.clock.callLater(
+                max(self._next_due() - now, MIN_TRIGGER_INTERVAL),
+                self._trigger_due)
+
+    def _next_due(self):
+        """
+        Return time when next group in the queue is due to be triggered
+        """
+        return self._start + self._triggered * self._wait
+
+
+def carry_over(remaining, groups):
+    """
+    Order groups to trigger so that the ones remaining from last time are
+    first, in the order they were in.
+
+    :param remaining: Groups not triggered last time
+    :param list groups: Groups to trigger now. Remaining groups not in it are
+        dropped.
+    :return: ``list`` of groups
+    """
+    current = {group["groupId"]: group for group in groups}
+    first = [current[group["groupId"]] for group in remaining
+             if group["groupId"] in current]
+    carried = set(group["groupId"] for group in first)
+    return first + [group for group in groups
+                    if group["groupId"] not in carried]
+
+
+@attr.s
+class TenantsInBuckets(object):
+    """
+    Callable telling if a tenant is in one of the given convergence buckets.
+
+    :ivar buckets: Collection of buckets
+    """
+    buckets = attr.ib()
+
+    def __call__(self, tenant_id):
+        return bucket_of_tenant(tenant_id, get_num_buckets()) in self.buckets
+
+
+def get_groups_to_converge(config_func, tenant_filter=None):
     """
     Get all tenant's all groups that needs convergence triggering
+
+    :param callable tenant_filter: Only groups of tenants for which it
+        returns True are got if given
     """
-    eff = Effect(GetAllValidGroups())
+    eff = Effect(GetAllValidGroups(tenant_filter))
     eff = eff.on(
         filter(lambda g: tenant_is_enabled(g["tenantId"], config_func)))
     return eff.on(list)
 
 
+def can_trigger(group):
+    """
+    Can convergence be triggered on the group? It can be if the group is
+    ACTIVE and not paused or suspended.
+
+    :param dict group: Group row as got from :obj:`GetAllValidGroups`
+    """
+    return (group.get("status") in (None, "ACTIVE") and
+            not (group.get("paused") or group.get("suspended")))
+
+
 @do
-def check_and_trigger(tenant_id, group_id):
+def check_and_trigger(group, recently_converged=None, window=0):
     """
-    Trigger convergence on given group if it is ACTIVE and not paused
+    Trigger convergence on given group if it has not converged within last
+    `window` seconds
+
+    :param dict group: Group row as got from :obj:`GetAllValidGroups`
+    :param recently_converged: ``Reference`` to pmap of group ID to time its
+        last convergence finished or None
+    :param float window: Seconds
     """
-    try:
-        group, info = yield Effect(
-            GetScalingGroupInfo(tenant_id=tenant_id, group_id=group_id))
-    except NoSuchScalingGroupError:
-        # Nothing to do if group has been deleted
-        yield msg("selfheal-group-deleted",
-                  tenant_id=tenant_id, scaling_group_id=group_id)
-    else:
-        state = info["state"]
-        if (state.status == ScalingGroupStatus.ACTIVE and
-                not (state.paused or state.suspended)):
-            yield with_log(
-                trigger_convergence(tenant_id, group_id),
-                tenant_id=tenant_id, scaling_group_id=group_id)
+    tenant_id, group_id = group["tenantId"], group["groupId"]
+    if recently_converged is not None:
+        recent = yield recently_converged.read()
+        if group_id in recent:
+            now = yield Effect(Func(time.time))
+            if now - recent[group_id] < window:
+                yield do_return(None)
+    yield with_log(
+        trigger_convergence(tenant_id, group_id),
+        tenant_id=tenant_id, scaling_group_id=group_id)
@@ -42,12 +42,28 @@ The top-level entry-points into this module are :func:`trigger_convergence` and
 # creation/deletion of resources as the concurrent processes race against each
 # other. In order to do this, we use a ZooKeeper set partitioner (see
 # otter.util.zkpartitioner). All groups are stably mapped to a partitioned
-# "bucket" via a simple hash/mod algorithm.
+# "bucket" via a simple hash/mod algorithm. The number of buckets is
+# configurable ("converger.buckets") so that there can be many more buckets
+# than nodes. Buckets are assigned to nodes with a consistent hash ring (see
+# otter.util.hashring) that gives each node a similar number of buckets. When
+# the number of buckets changes, the flags found in the directory of a bucket
+# that they no longer belong to are moved to the right bucket.
 #
 # In order to actually register that a group needs convergence, we create a
-# ZooKeeper node with the name of the tenant and group, and convergence nodes
-# watch the ZK directory and filter for groups that map to their allocated
-# buckets.
+# ZooKeeper node with the name of the tenant and group in the directory of the
+# group's bucket (CONVERGENCE_DIRTY_BUCKETS_DIR/<bucket>/<tenant>_<group>), and
+# convergence nodes watch only the directories of their allocated buckets.
+#
+# Flags used to be created directly in CONVERGENCE_DIRTY_DIR. Bucket
+# directories are kept out of it since older convergence nodes expect every
+# child of CONVERGENCE_DIRTY_DIR to be a flag. Convergence nodes still watch it
+# and move any flags of their buckets into the bucket's directory. Nodes keep
+# creating flags in CONVERGENCE_DIRTY_DIR, where both older and newer
+# convergence nodes find them, until "converger.bucketed_flags" is enabled.
+# Upgrade order is hence:
+#
+# 1. Deploy the code on all the nodes with "converger.bucketed_flags" off.
+# 2. Once no node runs the older code, enable "converger.bucketed_flags".
 #
 # Marking a group divergent (or "dirty") is tricky enough that just using a
 # boolean flag for "is group dirty or not" won't work, because that will allow
@@ -84,6 +100,22 @@ The top-level entry-points into this module are :func:`trigger_convergence` and
 # convergence, since convergence always uses the most recent data.
 
 
+# # Note [Convergence state]
+#
+# A node remembers when it last converged each group (`recently_converged`)
+# and how many iterations it has waited on LIMITED_RETRY steps (`waiting`) in
+# memory. When a bucket moves to another node or a node restarts, the node
+# converging the bucket next would not know any of this and would converge all
+# of the bucket's divergent groups at once and wait on LIMITED_RETRY steps
+# afresh. So after an iteration that leaves the divergent flag in place, the
+# state is also stored as the content of the flag, if the flag's version has
+# not changed since the iteration started (otherwise the group has been marked
+# dirty again and should be converged without delay anyway). Setting the
+# content does not fire the children watch of the bucket directory. The node
+# converging the group reads the content along with the version and restores
+# the state if it is more recent than what it knows.
+
+
 # # Note [Convergence servers cache]
 # Each convergence cycle runs 3 primary steps: gather, generate plan and
 # execute plan. For launch_server type convergence it keeps cache of servers
@@ -98,30 +130,46 @@ The top-level entry-points into this module are :func:`trigger_convergence` and
 # See https://github.com/rackerlabs/otter/issues/1966
 
 
+# # Note [Convergence fingerprints]
+# Self-heal keeps triggering convergence on groups that are mostly already
+# converged. When an iteration plans no steps for a group, the fingerprint
+# (hash) of the group's desired state and the gathered resources (servers
+# including their metadata, LB nodes and LBs) is remembered. If the next
+# iteration gathers resources with the same fingerprint and the group is still
+# ACTIVE, the plan would again be empty, so the iteration stops right after
+# gathering without updating the group's status or the servers cache and
+# without planning. Planning is time dependent only for servers in BUILD and
+# nodes that are draining, both of which always result in some steps, so an
+# empty plan does not go stale with time. The fingerprint is forgotten after
+# any other outcome. Fingerprints are kept in memory by the Converger.
+
+
+import json
 import operator
 import time
 import uuid
 from datetime import datetime
 from functools import partial
-from hashlib import sha1
 
 import attr
 
-from effect import Constant, Effect, FirstError, Func, parallel
+from effect import Constant, Effect, FirstError, Func, catch, parallel
 from effect.do import do, do_return
 from effect.ref import Reference
 
 from kazoo.exceptions import BadVersionError, NoNodeError
 from kazoo.recipe.partitioner import PartitionState
 
-from pyrsistent import pmap, pset
+from pyrsistent import freeze, pmap, pset
 from pyrsistent import thaw
 
 import six
 
 from sumtypes import match
 
+from toolz.dicttoolz import assoc
 from toolz.functoolz import curry
+from toolz.itertoolz import concat
 
 from twisted.application.service import MultiService
 
@@ -129,29 +177,39 @@ from txeffect import exc_info_to_failure, perform
 
 from otter.auth import NoSuchEndpoint
 from otter.cloud_client import TenantScope
-from otter.constants import CONVERGENCE_DIRTY_DIR
+from otter.constants import (
+    CONVERGENCE_BUCKETS, CONVERGENCE_DIRTY_BUCKETS_DIR, CONVERGENCE_DIRTY_DIR)
 from otter.convergence.composition import (get_desired_server_group_state,
                                            get_desired_stack_group_state)
 from otter.convergence.effecting import steps_to_effect
 from otter.convergence.errors import present_reasons, structure_reason
 from otter.convergence.gathering import (get_all_launch_server_data,
                                          get_all_launch_stack_data)
-from otter.convergence.logging import log_steps
+from otter.convergence.logging import execute_convergence_fields, log_steps
 from otter.convergence.model import (
     ConvergenceIterationStatus,
     ErrorReason,
+    NovaServer,
     ServerState,
-    StepResult)
+    StepResult,
+    apply_lb_node_changes)
 from otter.convergence.planning import plan_launch_server, plan_launch_stack
-from otter.convergence.transforming import get_step_limits_from_conf
+from otter.convergence.profiling import ITERATION_PHASE, timed_phase
+from otter.convergence.steps import CreateServer
+from otter.convergence.transforming import (
+    AdaptiveStepLimits, get_step_limits_from_conf)
 from otter.log.cloudfeeds import cf_err, cf_msg
+from otter.log.formatters import Lazy
 from otter.log.intents import err, msg, msg_with_time, with_log
 from otter.models.intents import (
     DeleteGroup, GetScalingGroupInfo, LoadAndUpdateGroupStatus,
     UpdateGroupErrorReasons, UpdateGroupStatus, UpdateServersCache)
 from otter.models.interface import NoSuchScalingGroupError, ScalingGroupStatus
+from otter.util.config import config_value
+from otter.util.hashring import stable_hash
 from otter.util.timestamp import datetime_to_epoch
-from otter.util.zk import CreateOrSet, DeleteNode, GetChildren, GetStat
+from otter.util.zk import (
+    CreateOrSet, DeleteNode, GetChildren, GetData, SetData)
 
 
 def get_executor(launch_config):
@@ -214,7 +272,7 @@ def update_servers_cache(group, now, servers, lb_nodes, lbs,
     """
     server_dicts = []
     for server in servers:
-        sd = thaw(server.json)
+        sd = dict(server.json)
         if is_autoscale_active(server, lb_nodes):
             sd["_is_as_active"] = True
         if server.state != ServerState.DELETED or include_deleted:
@@ -224,30 +282,45 @@ def update_servers_cache(group, now, servers, lb_nodes, lbs,
         UpdateServersCache(group.tenant_id, group.uuid, now, server_dicts))
 
 
+def _results_to_log(steps, results):
+    """
+    Return loggable form of results of executing steps
+    """
+    return [
+        {'step': step,
+         'result': result,
+         'reasons': map(structure_reason, reasons)}
+        for step, (result, reasons) in zip(steps, results)
+    ]
+
+
 @do
 def _execute_steps(steps):
     """
     Given a set of steps, executes them, logs the result, and returns the worst
-    priority with a list of reasons for that result.
+    priority with a list of reasons for that result and the changes made to
+    LB nodes by the steps.
 
     :return: a tuple of (:class:`StepResult` constant,
-                         list of :obj:`ErrorReason`)
+                         list of :obj:`ErrorReason`,
+                         list of :obj:`LBNodeChange`,
+                         list of (:class:`StepResult`, reasons) of each step)
     """
+    changes = []
+    results = []
     if len(steps) > 0:
         results = yield steps_to_effect(steps)
+        # Steps that succeed changing LB nodes also return the changes
+        changes = list(concat(result[2] for result in results
+                              if len(result) > 2))
+        results = [result[:2] for result in results]
 
         severity = [StepResult.FAILURE, StepResult.RETRY,
                     StepResult.LIMITED_RETRY, StepResult.SUCCESS]
         priority = sorted(results,
                           key=lambda (status, reasons): severity.index(status))
         worst_status = priority[0][0]
-        results_to_log = [
-            {'step': step,
-             'result': result,
-             'reasons': map(structure_reason, reasons)}
-            for step, (result, reasons) in
-            zip(steps, results)
-        ]
+        results_to_log = Lazy(_results_to_log, (steps, results))
         reasons = reduce(operator.add,
                          (x[1] for x in results if x[0] == worst_status))
     else:
@@ -257,7 +330,7 @@ def _execute_steps(steps):
     yield msg('execute-convergence-results',
               results=results_to_log,
               worst_status=worst_status.name)
-    yield do_return((worst_status, reasons))
+    yield do_return((worst_status, reasons, changes, results))
 
 
 @do
@@ -275,14 +348,13 @@ def convergence_exec_data(tenant_id, group_id, now, get_executor):
 
     executor = get_executor(launch_config)
 
-    resources = yield executor.gather(tenant_id, group_id, now)
+    resources = yield timed_phase(
+        'gather', executor.gather(tenant_id, group_id, now))
 
     if group_state.status == ScalingGroupStatus.DELETING:
         desired_capacity = 0
     else:
         desired_capacity = group_state.desired
-        # See [Convergence servers cache] comment on top of the file.
-        yield executor.update_cache(scaling_group, now, **resources)
 
     desired_group_state = executor.get_desired_group_state(
         group_id, launch_config, desired_capacity)
@@ -291,18 +363,177 @@ def convergence_exec_data(tenant_id, group_id, now, get_executor):
                      resources))
 
 
+def _apply_changes(resources, changes):
+    """
+    Return resources with changes made to LB nodes by executed steps applied,
+    so that they need not be gathered again.
+    """
+    if not changes or 'lb_nodes' not in resources:
+        return resources
+    return assoc(resources, 'lb_nodes',
+                 apply_lb_node_changes(resources['lb_nodes'], changes))
+
+
+def _has_remaining_steps(executor, desired_group_state, now, build_timeout,
+                         step_limits, resources):
+    """
+    Return True if planning against resources as they are after executing
+    the steps still gives steps to execute
+    """
+    return len(executor.plan(desired_group_state, now, build_timeout,
+                             step_limits, **resources)) > 0
+
+
+def _tenant_step_limits(adaptive_limits, tenant_id, step_limits):
+    """
+    Return step limits of the tenant, adapted by ``adaptive_limits`` if it
+    is not None
+    """
+    if adaptive_limits is None:
+        return step_limits
+    return adaptive_limits.limits(tenant_id, step_limits)
+
+
+def _adapted_step_limits(adaptive_limits, tenant_id, group_id, now,
+                         build_timeout, step_limits, resources):
+    """
+    Return step limits of the tenant after adapting them to the servers
+    gathered
+    """
+    if adaptive_limits is not None and 'servers' in resources:
+        adaptive_limits.observe_servers(tenant_id, group_id,
+                                        resources['servers'], now,
+                                        build_timeout, step_limits)
+    return _tenant_step_limits(adaptive_limits, tenant_id, step_limits)
+
+
+def _record_creates(adaptive_limits, tenant_id, steps, results):
+    """
+    Return Effect of adapting step limits of the tenant to results of
+    :obj:`CreateServer` steps executed
+    """
+    create_results = [result for step, (result, _) in zip(steps, results)
+                      if isinstance(step, CreateServer)]
+    if adaptive_limits is None or not create_results:
+        return Effect(Constant(None))
+    return Effect(Func(partial(adaptive_limits.creates_executed, tenant_id,
+                               create_results)))
+
+
+def _fingerprint_part(resource):
+    """
+    Return hashable form of a gathered resource that has everything planning
+    depends on
+    """
+    if isinstance(resource, NovaServer):
+        # Planning also looks at server's metadata
+        return (resource, freeze(resource.json.get('metadata', {})))
+    if isinstance(resource, dict):
+        return frozenset(resource.items())
+    if isinstance(resource, (list, tuple)):
+        return frozenset(map(_fingerprint_part, resource))
+    return resource
+
+
+def convergence_fingerprint(desired_group_state, resources):
+    """
+    Return fingerprint of group's desired state and gathered resources or
+    None if it cannot be computed. See note [Convergence fingerprints].
+    """
+    try:
+        return hash((desired_group_state,) + tuple(
+            (name, _fingerprint_part(resource))
+            for name, resource in sorted(resources.items())))
+    except TypeError:
+        return None
+
+
+class ConvergenceFingerprints(object):
+    """
+    Fingerprints of groups whose last convergence iteration did not plan any
+    steps. See note [Convergence fingerprints].
+    """
+
+    def __init__(self):
+        self._fingerprints = {}
+
+    def matches(self, group_id, fingerprint):
+        """
+        Is the fingerprint same as the one remembered for the group?
+        """
+        return (fingerprint is not None and
+                self._fingerprints.get(group_id) == fingerprint)
+
+    def remember(self, group_id, fingerprint):
+        """
+        Remember the group's fingerprint or forget it if it is None.
+        """
+        if fingerprint is None:
+            self._fingerprints.pop(group_id, None)
+        else:
+            self._fingerprints[group_id] = fingerprint
+
+
+def _unchanged_since_converged(fingerprints, group_id, group_state,
+                               fingerprint):
+    """
+    Return Effect of whether the ACTIVE group has the same fingerprint as when
+    it was last found converged. See note [Convergence fingerprints].
+    """
+    if (fingerprints is None or
+            group_state.status != ScalingGroupStatus.ACTIVE):
+        return Effect(Constant(False))
+    return Effect(Func(partial(fingerprints.matches, group_id, fingerprint)))
+
+
+def _remember_if_converged(fingerprints, group_id, fingerprint, steps,
+                           result):
+    """
+    Return Effect of remembering the group's fingerprint if no steps were
+    planned and the group is converged, or forgetting it otherwise.
+    """
+    if fingerprints is None:
+        return Effect(Constant(None))
+    converged = (len(steps) == 0 and
+                 result == ConvergenceIterationStatus.Stop())
+    return Effect(Func(partial(fingerprints.remember, group_id,
+                               fingerprint if converged else None)))
+
+
 def _clean_waiting(waiting, group_id):
     return waiting.modify(
         lambda group_iterations: group_iterations.discard(group_id))
 
 
+@do
+def _begin_converging(executor, scaling_group, group_state, now, resources):
+    """
+    Update group's status to ACTIVE as it is being converged and update
+    servers cache with the gathered resources
+    """
+    try:
+        yield Effect(LoadAndUpdateGroupStatus(scaling_group.tenant_id,
+                                              scaling_group.uuid,
+                                              ScalingGroupStatus.ACTIVE))
+    except NoSuchScalingGroupError:
+        # Expected for DELETING group. Ignore.
+        pass
+    if group_state.status != ScalingGroupStatus.DELETING:
+        # See [Convergence servers cache] comment on top of the file.
+        yield timed_phase(
+            'cache', executor.update_cache(scaling_group, now, **resources))
+
+
 @do
 def execute_convergence(tenant_id, group_id, build_timeout, waiting,
                         limited_retry_iterations, step_limits,
-                        get_executor=get_executor):
+                        get_executor=get_executor,
+                        adaptive_limits=None, fingerprints=None):
     """
     Gather data, plan a convergence, save active and pending servers to the
-    group state, and then execute the convergence.
+    group state, and then execute the convergence. If nothing has changed
+    since the group was last found converged, the iteration stops after
+    gathering.
 
     :param str tenant_id: the tenant ID for the group to converge
     :param str group_id: the ID of the group to be converged
@@ -314,20 +545,18 @@ def execute_convergence(tenant_id, group_id, build_timeout, waiting,
     :param dict step_limits: Mapping of step class to number of executions
         allowed in a convergence cycle
     :param callable get_executor: like :func`get_executor`, used for testing.
+    :param adaptive_limits: :obj:`AdaptiveStepLimits` that adapt
+        ``step_limits`` of the tenant to how its servers fare. If None,
+        ``step_limits`` are used as they are.
+    :param fingerprints: :obj:`ConvergenceFingerprints` of groups found
+        converged. If None, the iteration is never stopped after gathering.
 
     :return: Effect of :obj:`ConvergenceIterationStatus`.
     :raise: :obj:`NoSuchScalingGroupError` if the group doesn't exist.
     """
     clean_waiting = _clean_waiting(waiting, group_id)
 
-    # Begin convergence by updating group status to ACTIVE
     yield msg("begin-convergence")
-    try:
-        yield Effect(LoadAndUpdateGroupStatus(tenant_id, group_id,
-                                              ScalingGroupStatus.ACTIVE))
-    except NoSuchScalingGroupError:
-        # Expected for DELETING group. Ignore.
-        pass
 
     # Gather data
     now_dt = yield Effect(Func(datetime.utcnow))
@@ -345,16 +574,32 @@ def execute_convergence(tenant_id, group_id, build_timeout, waiting,
             yield do_return(result)
         raise fe
 
+    # Stop if nothing has changed since the group was found converged.
+    # See note [Convergence fingerprints]
+    fingerprint = convergence_fingerprint(desired_group_state, resources)
+    if (yield _unchanged_since_converged(fingerprints, group_id, group_state,
+                                         fingerprint)):
+        yield msg("convergence-unchanged")
+        yield do_return(ConvergenceIterationStatus.Stop())
+
+    yield _begin_converging(executor, scaling_group, group_state, now_dt,
+                            resources)
+
     # prepare plan
-    steps = executor.plan(desired_group_state, datetime_to_epoch(now_dt),
-                          build_timeout, step_limits, **resources)
+    now = datetime_to_epoch(now_dt)
+    steps = yield timed_phase('plan', Effect(Func(lambda: executor.plan(
+        desired_group_state, now, build_timeout,
+        _adapted_step_limits(adaptive_limits, tenant_id, group_id, now,
+                             build_timeout, step_limits, resources),
+        **resources))))
     yield log_steps(steps)
 
     # Execute plan
     yield msg('execute-convergence',
-              steps=steps, now=now_dt, desired=desired_group_state,
-              **resources)
-    worst_status, reasons = yield _execute_steps(steps)
+              **execute_convergence_fields(steps, now_dt, desired_group_state,
+                                           resources))
+    worst_status, reasons, changes, results = yield _execute_steps(steps)
+    yield _record_creates(adaptive_limits, tenant_id, steps, results)
 
     if worst_status != StepResult.LIMITED_RETRY:
         # If we're not waiting any more, there's no point in keeping track of
@@ -363,8 +608,11 @@ def execute_convergence(tenant_id, group_id, build_timeout, waiting,
 
     # Handle the status from execution
     if worst_status == StepResult.SUCCESS:
-        result = yield convergence_succeeded(
-            executor, scaling_group, group_state, resources)
+        result = yield _succeeded_or_continue(
+            executor, scaling_group, group_state, desired_group_state, now,
+            build_timeout,
+            _tenant_step_limits(adaptive_limits, tenant_id, step_limits),
+            resources, changes)
     elif worst_status == StepResult.FAILURE:
         result = yield convergence_failed(tenant_id, group_id, reasons)
     elif worst_status is StepResult.LIMITED_RETRY:
@@ -384,9 +632,31 @@ def execute_convergence(tenant_id, group_id, build_timeout, waiting,
             result = ConvergenceIterationStatus.Continue()
     else:
         result = ConvergenceIterationStatus.Continue()
+
+    yield _remember_if_converged(fingerprints, group_id, fingerprint, steps,
+                                 result)
     yield do_return(result)
 
 
+def _succeeded_or_continue(executor, scaling_group, group_state,
+                           desired_group_state, now, build_timeout,
+                           step_limits, resources, changes):
+    """
+    Return Effect of handling successful execution of steps: continue
+    converging if steps are left after applying the changes made by them,
+    otherwise handle convergence success.
+    """
+    applied = _apply_changes(resources, changes)
+    if changes and _has_remaining_steps(
+            executor, desired_group_state, now, build_timeout, step_limits,
+            applied):
+        # Some LB steps were left out of the plan (only one mutating step
+        # is executed per CLB); converge again to execute them
+        return Effect(Constant(ConvergenceIterationStatus.Continue()))
+    return convergence_succeeded(
+        executor, scaling_group, group_state, applied)
+
+
 def update_stacks_cache(scaling_group, now, stacks, include_deleted=True):
     return Effect(Func(lambda: None))
 
@@ -409,8 +679,9 @@ def convergence_succeeded(executor, scaling_group, group_state, resources):
     # update servers cache with latest servers.
     # See [Convergence servers cache] comment on top of the file.
     now = yield Effect(Func(datetime.utcnow))
-    yield executor.update_cache(scaling_group, now, include_deleted=False,
-                                **resources)
+    yield timed_phase(
+        'cache', executor.update_cache(scaling_group, now,
+                                       include_deleted=False, **resources))
     yield do_return(ConvergenceIterationStatus.Stop())
 
 
@@ -453,6 +724,57 @@ def parse_dirty_flag(flag):
     return flag.split('_', 1)
 
 
+def is_dirty_flag(name):
+    """Is the ZooKeeper node name a dirty flag?"""
+    return '_' in name
+
+
+def bucket_dir(bucket):
+    """Return path of ZooKeeper directory of dirty flags of a bucket."""
+    return '{}/{}'.format(CONVERGENCE_DIRTY_BUCKETS_DIR, bucket)
+
+
+def bucketed_flags_enabled():
+    """
+    Are dirty flags created in the directory of their bucket? Otherwise they
+    are created directly in ``CONVERGENCE_DIRTY_DIR``. It is configured by
+    ``converger.bucketed_flags`` and must only be enabled after all the nodes
+    run code that watches bucket directories. See note [Divergent flags].
+    """
+    return bool(config_value('converger.bucketed_flags'))
+
+
+def flat_dirty_flag_path(tenant_id, group_id):
+    """
+    Return path of the dirty flag ZooKeeper node of a group directly in
+    ``CONVERGENCE_DIRTY_DIR``.
+    """
+    return '{}/{}'.format(CONVERGENCE_DIRTY_DIR,
+                          format_dirty_flag(tenant_id, group_id))
+
+
+def get_num_buckets():
+    """
+    Return number of buckets that groups are partitioned into for
+    convergence. It is configured by ``converger.buckets`` and must be same on
+    all the nodes.
+    """
+    return config_value('converger.buckets') or CONVERGENCE_BUCKETS
+
+
+def dirty_flag_path(tenant_id, group_id, num_buckets=None):
+    """
+    Return path of the dirty flag ZooKeeper node of a group.
+
+    :param int num_buckets: Number of buckets. Defaults to
+        :func:`get_num_buckets`.
+    """
+    if num_buckets is None:
+        num_buckets = get_num_buckets()
+    return '{}/{}'.format(bucket_dir(bucket_of_tenant(tenant_id, num_buckets)),
+                          format_dirty_flag(tenant_id, group_id))
+
+
 def mark_divergent(tenant_id, group_id):
     """
     Indicate that a group should be converged.
@@ -467,8 +789,10 @@ def mark_divergent(tenant_id, group_id):
         recorded.
     """
     # See note [Divergent flags]
-    flag = format_dirty_flag(tenant_id, group_id)
-    path = CONVERGENCE_DIRTY_DIR + '/' + flag
+    if bucketed_flags_enabled():
+        path = dirty_flag_path(tenant_id, group_id)
+    else:
+        path = flat_dirty_flag_path(tenant_id, group_id)
     eff = Effect(CreateOrSet(path=path, content='dirty'))
     return eff
 
@@ -479,24 +803,125 @@ def delete_divergent_flag(tenant_id, group_id, version):
     Delete the dirty flag, if its version hasn't changed. See note [Divergent
     flags] for more info.
 
+    Unconditional deletion (``version`` of -1) also deletes the flag from
+    ``CONVERGENCE_DIRTY_DIR`` if it may still be created there.
+
+    :return: Effect of None.
+    """
+    paths = [dirty_flag_path(tenant_id, group_id)]
+    if version == -1 and not bucketed_flags_enabled():
+        paths.insert(0, flat_dirty_flag_path(tenant_id, group_id))
+    for path in paths:
+        fields = dict(path=path, dirty_version=version)
+        try:
+            yield Effect(DeleteNode(path=path, version=version))
+        except BadVersionError:
+            # BadVersionError shouldn't be logged as an error because it's an
+            # expected occurrence any time convergence is requested multiple
+            # times rapidly.
+            yield msg('mark-clean-skipped', **fields)
+        except NoNodeError:
+            yield msg('mark-clean-not-found', **fields)
+        except Exception:
+            yield err(None, 'mark-clean-failure', **fields)
+        else:
+            yield msg('mark-clean-success')
+
+
+def format_convergence_state(converged, waited):
+    """
+    Return content of a dirty flag storing state of the group's convergence.
+    See note [Convergence state].
+
+    :param float converged: Time when the group's last convergence iteration
+        finished
+    :param int waited: Number of iterations waited on LIMITED_RETRY steps
+    """
+    return json.dumps({'converged': converged, 'waited': waited},
+                      sort_keys=True)
+
+
+def parse_convergence_state(content):
+    """
+    Return ``(converged, waited)`` stored in dirty flag's content by
+    :func:`format_convergence_state` or None if the content does not have
+    it, like when the group has been marked divergent after its last
+    convergence iteration.
+    """
+    try:
+        state = json.loads(content)
+        return state['converged'], state['waited']
+    except (TypeError, ValueError, KeyError):
+        return None
+
+
+@do
+def save_convergence_state(recently_converged, waiting, tenant_id, group_id,
+                           version):
+    """
+    Store state of the group's convergence in its dirty flag if the flag's
+    version is still ``version``. See note [Convergence state].
+
     :return: Effect of None.
     """
-    flag = format_dirty_flag(tenant_id, group_id)
-    path = CONVERGENCE_DIRTY_DIR + '/' + flag
-    fields = dict(path=path, dirty_version=version)
+    converged = (yield recently_converged.read()).get(group_id)
+    waited = (yield waiting.read()).get(group_id, 0)
+    path = dirty_flag_path(tenant_id, group_id)
     try:
-        yield Effect(DeleteNode(path=path, version=version))
-    except BadVersionError:
-        # BadVersionError shouldn't be logged as an error because it's an
-        # expected occurrence any time convergence is requested multiple times
-        # rapidly.
-        yield msg('mark-clean-skipped', **fields)
-    except NoNodeError:
-        yield msg('mark-clean-not-found', **fields)
+        yield Effect(SetData(path=path,
+                             value=format_convergence_state(converged, waited),
+                             version=version))
+    except (BadVersionError, NoNodeError):
+        # The group has been marked divergent again or is converged
+        pass
     except Exception:
-        yield err(None, 'mark-clean-failure', **fields)
-    else:
-        yield msg('mark-clean-success')
+        yield err(None, 'converge-save-state-failure', path=path)
+
+
+@do
+def restore_convergence_state(recently_converged, waiting, group_id, content,
+                              interval):
+    """
+    Restore state of the group's convergence stored in its dirty flag's
+    content if it is more recent than the one in ``recently_converged``. See
+    note [Convergence state].
+
+    :return: Effect of True if the group converged in last ``interval``
+        seconds as per the restored state, False otherwise.
+    """
+    state = parse_convergence_state(content)
+    if state is None:
+        yield do_return(False)
+    converged, waited = state
+    if converged <= (yield recently_converged.read()).get(group_id, 0):
+        yield do_return(False)
+    yield recently_converged.modify(lambda rc: rc.set(group_id, converged))
+    yield waiting.modify(
+        lambda w: w.set(group_id, waited) if waited else w.discard(group_id))
+    now = yield Effect(Func(time.time))
+    yield do_return(now - converged <= interval)
+
+
+@do
+def move_flat_flag(flag, num_buckets, directory=CONVERGENCE_DIRTY_DIR):
+    """
+    Move dirty flag created directly in ``CONVERGENCE_DIRTY_DIR`` into the
+    directory of its bucket. See note [Divergent flags].
+
+    :param str directory: Directory the flag is in. Flags can also be in
+        directory of another bucket if number of buckets has changed.
+    :return: Effect of None.
+    """
+    tenant_id, group_id = parse_dirty_flag(flag)
+    yield Effect(CreateOrSet(
+        path=dirty_flag_path(tenant_id, group_id, num_buckets),
+        content='dirty'))
+    try:
+        yield Effect(DeleteNode(path=directory + '/' + flag, version=-1))
+    except NoNodeError:
+        # Another node moved it
+        pass
+    yield msg('move-flat-dirty-flag', flag=flag, directory=directory)
 
 
 @curry
@@ -558,15 +983,16 @@ def get_my_divergent_groups(my_buckets, all_buckets, divergent_flags):
     :returns: list of dicts, where each dict has ``tenant_id``,
         ``group_id``, and ``dirty-flag`` keys.
     """
+    num_buckets = len(all_buckets)
+
     def structure_info(path):
         # Names of the dirty flags are {tenant_id}_{group_id}.
         tenant, group = parse_dirty_flag(path)
         return {'tenant_id': tenant,
                 'group_id': group,
-                'dirty-flag': CONVERGENCE_DIRTY_DIR + '/' + path}
+                'dirty-flag': dirty_flag_path(tenant, group, num_buckets)}
 
     dirty_info = map(structure_info, divergent_flags)
-    num_buckets = len(all_buckets)
     converging = [
         info for info in dirty_info
         if bucket_of_tenant(info['tenant_id'], num_buckets) in my_buckets]
@@ -583,7 +1009,8 @@ def eff_finally(eff, after_eff):
 def converge_one_group(currently_converging, recently_converged, waiting,
                        tenant_id, group_id, version,
                        build_timeout, limited_retry_iterations, step_limits,
-                       execute_convergence=execute_convergence):
+                       execute_convergence=execute_convergence,
+                       adaptive_limits=None, fingerprints=None):
     """
     Converge one group, non-concurrently, and clean up the dirty flag when
     done.
@@ -602,13 +1029,21 @@ def converge_one_group(currently_converging, recently_converged, waiting,
         allowed in a convergence cycle
     :param callable execute_convergence: like :func`execute_convergence`, to
         be used for test injection only
+    :param adaptive_limits: :obj:`AdaptiveStepLimits` given to
+        :func:`execute_convergence`
+    :param fingerprints: :obj:`ConvergenceFingerprints` given to
+        :func:`execute_convergence`
     """
     mark_recently_converged = Effect(Func(time.time)).on(
         lambda time_done: recently_converged.modify(
             lambda rcg: rcg.set(group_id, time_done)))
     cvg = eff_finally(
-        execute_convergence(tenant_id, group_id, build_timeout, waiting,
-                            limited_retry_iterations, step_limits),
+        timed_phase(
+            ITERATION_PHASE,
+            execute_convergence(tenant_id, group_id, build_timeout, waiting,
+                                limited_retry_iterations, step_limits,
+                                adaptive_limits=adaptive_limits,
+                                fingerprints=fingerprints)),
         mark_recently_converged)
 
     try:
@@ -626,11 +1061,14 @@ def converge_one_group(currently_converging, recently_converged, waiting,
         # We specifically don't clean up the dirty flag in the case of
         # unexpected errors, so convergence will be retried.
         yield err(None, 'converge-non-fatal-error')
+        yield save_convergence_state(recently_converged, waiting, tenant_id,
+                                     group_id, version)
     else:
         @match(ConvergenceIterationStatus)
         class clean_up(object):
             def Continue():
-                return Effect(Constant(None))
+                return save_convergence_state(
+                    recently_converged, waiting, tenant_id, group_id, version)
 
             def Stop():
                 return delete_divergent_flag(tenant_id, group_id, version)
@@ -648,7 +1086,8 @@ def converge_all_groups(
         my_buckets, all_buckets,
         divergent_flags, build_timeout, interval,
         limited_retry_iterations, step_limits,
-        converge_one_group=converge_one_group):
+        converge_one_group=converge_one_group, retention=None,
+        adaptive_limits=None, fingerprints=None):
     """
     Check for groups that need convergence and which match up to the
     buckets we've been allocated.
@@ -674,6 +1113,12 @@ def converge_all_groups(
         allowed in a convergence cycle
     :param callable converge_one_group: function to use to converge a single
         group - to be used for test injection only
+    :param number retention: number of seconds groups are kept in
+        ``recently_converged`` after converging. Defaults to ``interval``.
+    :param adaptive_limits: :obj:`AdaptiveStepLimits` given to
+        ``converge_one_group``
+    :param fingerprints: :obj:`ConvergenceFingerprints` given to
+        ``converge_one_group``
     """
     group_infos = get_my_divergent_groups(
         my_buckets, all_buckets, divergent_flags)
@@ -687,26 +1132,34 @@ def converge_all_groups(
 
     @do
     def converge(tenant_id, group_id, dirty_flag):
-        stat = yield Effect(GetStat(dirty_flag))
-        # If the node disappeared, ignore it. `stat` will be None here if the
+        data = yield Effect(GetData(dirty_flag))
+        # If the node disappeared, ignore it. `data` will be None here if the
         # divergent flag was discovered only after the group is removed from
         # currently_converging, but before the divergent flag is deleted, and
-        # then the deletion happens, and then our GetStat happens. This
+        # then the deletion happens, and then our GetData happens. This
         # basically means it happens when one convergence is starting as
         # another one for the same group is ending.
-        if stat is None:
+        if data is None:
             yield msg('converge-divergent-flag-disappeared', znode=dirty_flag)
-        else:
-            eff = converge_one_group(currently_converging, recently_converged,
-                                     waiting,
-                                     tenant_id, group_id,
-                                     stat.version, build_timeout,
-                                     limited_retry_iterations, step_limits)
-            result = yield Effect(TenantScope(eff, tenant_id))
-            yield do_return(result)
+            return
+        content, stat = data
+        # Don't converge a group if another node has recently converged it.
+        # See note [Convergence state]
+        if (yield restore_convergence_state(recently_converged, waiting,
+                                            group_id, content, interval)):
+            return
+        eff = converge_one_group(currently_converging, recently_converged,
+                                 waiting,
+                                 tenant_id, group_id,
+                                 stat.version, build_timeout,
+                                 limited_retry_iterations, step_limits,
+                                 adaptive_limits=adaptive_limits,
+                                 fingerprints=fingerprints)
+        result = yield Effect(TenantScope(eff, tenant_id))
+        yield do_return(result)
 
     recent_groups = yield get_recently_converged_groups(recently_converged,
-                                                        interval)
+                                                        interval, retention)
     effs = []
     for info in group_infos:
         tenant_id, group_id = info['tenant_id'], info['group_id']
@@ -721,25 +1174,28 @@ def converge_all_groups(
 
 
 @do
-def get_recently_converged_groups(recently_converged, interval):
+def get_recently_converged_groups(recently_converged, interval,
+                                  retention=None):
     """
-    Return a list of recently converged groups, and garbage-collect any groups
-    in the recently_converged map that are no longer 'recent'.
+    Return a list of groups converged in last `interval` seconds, and
+    garbage-collect any groups in the recently_converged map that converged
+    more than `retention` seconds ago. `retention` defaults to `interval`.
     """
+    retention = max(interval, retention or interval)
     # STM would be cool but this is synchronous so whatever
     recent = yield recently_converged.read()
     now = yield Effect(Func(time.time))
-    to_remove = [group for group in recent if now - recent[group] > interval]
+    to_remove = [group for group in recent
+                 if now - recent[group] > retention]
     cleaned = reduce(lambda m, g: m.remove(g), to_remove, recent)
     if recent != cleaned:
         yield recently_converged.modify(lambda _: cleaned)
-    yield do_return(cleaned.keys())
+    yield do_return([group for group in cleaned
+                     if now - cleaned[group] <= interval])
 
 
-def _stable_hash(s):
-    """Get a stable hash of a string as an integer."""
-    # :func:`hash` is not stable with different pythons/architectures.
-    return int(sha1(s).hexdigest(), 16)
+# Memoized buckets of tenants, keyed on (tenant, num_buckets)
+_tenant_buckets = {}
 
 
 def bucket_of_tenant(tenant, num_buckets):
@@ -749,7 +1205,46 @@ def bucket_of_tenant(tenant, num_buckets):
     :param str tenant: tenant ID
     :param int num_buckets: global number of buckets
     """
-    return _stable_hash(tenant) % num_buckets
+    key = (tenant, num_buckets)
+    bucket = _tenant_buckets.get(key)
+    if bucket is None:
+        bucket = _tenant_buckets[key] = stable_hash(tenant) % num_buckets
+    return bucket
+
+
+class DirtyFlags(object):
+    """
+    The divergent flags in ZooKeeper of the buckets being watched, kept up to
+    date incrementally from the children lists given by the children watches
+    of bucket directories or listed by :obj:`Converger`.
+    """
+
+    def __init__(self):
+        self._by_bucket = {}
+
+    def known(self, bucket):
+        """Are the flags of the bucket known?"""
+        return bucket in self._by_bucket
+
+    def update(self, bucket, children):
+        """
+        Replace the flags of the bucket with given children of its directory.
+
+        :return: set of flags that were not there before
+        """
+        children = set(children)
+        added = children - self._by_bucket.get(bucket, set())
+        self._by_bucket[bucket] = children
+        return added
+
+    def forget(self, bucket):
+        """Forget the flags of a bucket no longer watched."""
+        self._by_bucket.pop(bucket, None)
+
+    def in_buckets(self, buckets):
+        """Return sorted list of flags in the given buckets."""
+        return sorted(concat(self._by_bucket.get(bucket, ())
+                             for bucket in buckets))
 
 
 class Converger(MultiService):
@@ -763,16 +1258,17 @@ class Converger(MultiService):
     - virtual "buckets" are partitioned between nodes running this service by
       using ZooKeeper (thus, this service could/should be run separately from
       the API). group IDs are deterministically mapped to these buckets.
-    - we repeatedly check for 'dirty flags' created by
-      :func:`trigger_convergence` service, and determine if they're "ours" with
-      the partitioner.
+    - we watch the directories of 'dirty flags' created by
+      :func:`trigger_convergence` of the buckets allocated to us by the
+      partitioner.
     - we ensure we don't execute convergence for the same group concurrently.
     """
 
     def __init__(self, log, dispatcher, num_buckets, partitioner_factory,
                  build_timeout, interval,
                  limited_retry_iterations, step_limits,
-                 converge_all_groups=converge_all_groups):
+                 converge_all_groups=converge_all_groups,
+                 watch_children=None, recently_converged_retention=None):
         """
         :param log: a bound log
         :param dispatcher: The dispatcher to use to perform effects.
@@ -792,6 +1288,15 @@ class Converger(MultiService):
             LIMITED_RETRY steps
         :param dict step_limits: Mapping of step name to number of executions
             allowed in a convergence cycle
+        :param callable watch_children: Function of ZooKeeper path and
+            callback that installs a children watch on the path, like
+            :func:`txkazoo.recipe.watchers.watch_children` partialed with
+            the client. Directories of our buckets are listed on every
+            partitioner check if this is not given.
+        :param number recently_converged_retention: Number of seconds groups
+            are kept in :attr:`recently_converged` after converging, so that
+            others like self-heal can tell they converged. Defaults to
+            ``interval``.
         """
         MultiService.__init__(self)
         self.log = log.bind(otter_service='converger')
@@ -806,12 +1311,20 @@ class Converger(MultiService):
         self.interval = interval
         self.limited_retry_iterations = limited_retry_iterations
         self.step_limits = get_step_limits_from_conf(step_limits)
+        self._watch_children = watch_children
+        self.recently_converged_retention = recently_converged_retention
 
         # ephemeral mutable state
+        self.dirty_flags = DirtyFlags()
+        self._watched = set()
         self.currently_converging = Reference(pset())
         self.recently_converged = Reference(pmap())
         # Groups we're waiting on temporarily, and may give up on.
         self.waiting = Reference(pmap())  # {group_id: num_iterations_waited}
+        # CreateServer limits of tenants adapted to how their servers fare
+        self.adaptive_limits = AdaptiveStepLimits()
+        # Fingerprints of groups found converged
+        self.fingerprints = ConvergenceFingerprints()
 
     def _converge_all(self, my_buckets, divergent_flags):
         """Run :func:`converge_all_groups` and log errors."""
@@ -819,7 +1332,10 @@ class Converger(MultiService):
             self.currently_converging, self.recently_converged,
             self.waiting,
             my_buckets, self._buckets, divergent_flags, self.build_timeout,
-            self.interval, self.limited_retry_iterations, self.step_limits)
+            self.interval, self.limited_retry_iterations, self.step_limits,
+            retention=self.recently_converged_retention,
+            adaptive_limits=self.adaptive_limits,
+            fingerprints=self.fingerprints)
         return eff.on(
             error=lambda e: err(
                 exc_info_to_failure(e), 'converge-all-groups-error'))
@@ -832,13 +1348,93 @@ class Converger(MultiService):
             lambda uid: with_log(eff, otter_service='converger',
                                  converger_run_id=uid))
 
+    def my_buckets(self):
+        """
+        Return buckets allocated to us or None if the partitioner is not
+        settled.
+        """
+        if self.partitioner.get_current_state() != PartitionState.ACQUIRED:
+            return None
+        return self.partitioner.get_current_buckets()
+
+    def _watch_buckets(self, my_buckets):
+        """Watch directories of the buckets that are not being watched."""
+        if self._watch_children is None:
+            return
+        for bucket in set(my_buckets) - self._watched:
+            self._watched.add(bucket)
+            path = bucket_dir(bucket)
+            # The directory needs to exist to be watched
+            d = perform(self._dispatcher,
+                        Effect(CreateOrSet(path=path, content='')))
+            d.addCallback(lambda _, path=path, bucket=bucket:
+                          self._watch_children(
+                              path, partial(self.bucket_changed, bucket)))
+            d.addErrback(self._watch_failed, bucket)
+
+    def _watch_failed(self, failure, bucket):
+        """Log failure to watch a bucket; it is retried on next check."""
+        self._watched.discard(bucket)
+        self.log.err(failure, 'converge-watch-bucket-error', bucket=bucket)
+
+    def _list_flags(self, my_buckets):
+        """
+        Return Effect of divergent flags of our buckets. Directories of
+        buckets are listed from ZooKeeper only until their children watch has
+        told us what the flags are.
+        """
+        known = self.dirty_flags.in_buckets(my_buckets)
+        unknown = [bucket for bucket in my_buckets
+                   if not self.dirty_flags.known(bucket)]
+        if not unknown:
+            return Effect(Constant(known))
+
+        def list_bucket(bucket):
+            return Effect(GetChildren(bucket_dir(bucket))).on(
+                error=catch(NoNodeError, lambda _: [])).on(
+                partial(self._own_flags, bucket))
+
+        return parallel(map(list_bucket, unknown)).on(
+            lambda listed: sorted(known + list(concat(listed))))
+
+    def _split_flags(self, bucket, children):
+        """
+        Split children of bucket's directory into flags that belong to the
+        bucket and Effect of moving the others to their bucket. Flags can be
+        in the wrong bucket when number of buckets is changed.
+
+        :return: (list of flags, Effect or None)
+        """
+        num_buckets = len(self._buckets)
+        own, misplaced = [], []
+        for child in children:
+            tenant_id = parse_dirty_flag(child)[0]
+            (own if bucket_of_tenant(tenant_id, num_buckets) == bucket
+             else misplaced).append(child)
+        if not misplaced:
+            return own, None
+        return own, parallel(
+            [move_flat_flag(flag, num_buckets, bucket_dir(bucket))
+             for flag in misplaced])
+
+    def _own_flags(self, bucket, children):
+        """
+        Return flags among children of bucket's directory that belong to the
+        bucket, or Effect of them after moving the others.
+        """
+        own, move_eff = self._split_flags(bucket, children)
+        if move_eff is None:
+            return own
+        return move_eff.on(lambda _: own)
+
     def buckets_acquired(self, my_buckets):
         """
-        Get dirty flags from zookeeper and run convergence with them.
+        Get dirty flags of our buckets and run convergence with them.
 
         This is used as the partitioner callback.
         """
-        ceff = Effect(GetChildren(CONVERGENCE_DIRTY_DIR)).on(
+        self._watch_buckets(my_buckets)
+        ceff = self._list_flags(my_buckets).on(
             partial(self._converge_all, my_buckets))
         # Return deferred as 1-element tuple for testing only.
         # Returning deferred would block otter from shutting down until
@@ -846,22 +1442,48 @@ class Converger(MultiService):
         # and will be triggered in next start of otter
         return (perform(self._dispatcher, self._with_conv_runid(ceff)), )
 
+    def bucket_changed(self, bucket, children):
+        """
+        ZooKeeper children-watch callback of a bucket's directory. If any
+        flags have been added since last time, a convergence will be
+        triggered on the flags of our buckets.
+
+        :return: False to stop watching if the bucket is not ours any more
+        """
+        my_buckets = self.my_buckets()
+        if my_buckets is not None and bucket not in my_buckets:
+            self._watched.discard(bucket)
+            self.dirty_flags.forget(bucket)
+            return False
+        flags, move_eff = self._split_flags(bucket, children)
+        if move_eff is not None:
+            perform(self._dispatcher, self._with_conv_runid(move_eff))
+        added = self.dirty_flags.update(bucket, flags)
+        if my_buckets is not None and added:
+            eff = self._converge_all(
+                my_buckets, self.dirty_flags.in_buckets(my_buckets))
+            perform(self._dispatcher, self._with_conv_runid(eff))
+
     def divergent_changed(self, children):
         """
-        ZooKeeper children-watch callback that lets this service know when the
-        divergent groups have changed. If any of the divergent flags are for
-        tenants associated with this service's buckets, a convergence will be
-        triggered.
+        ZooKeeper children-watch callback of ``CONVERGENCE_DIRTY_DIR``. Dirty
+        flags in it of tenants associated with this service's buckets were
+        created by older code and are moved into their bucket's directory.
+        See note [Divergent flags].
         """
-        if self.partitioner.get_current_state() != PartitionState.ACQUIRED:
+        my_buckets = self.my_buckets()
+        if my_buckets is None:
             return
-        my_buckets = self.partitioner.get_current_buckets()
-        changed_buckets = set(
-            bucket_of_tenant(parse_dirty_flag(child)[0], len(self._buckets))
-            for child in children)
-        if set(my_buckets).intersection(changed_buckets):
+        num_buckets = len(self._buckets)
+        flags = [
+            child for child in children
+            if is_dirty_flag(child) and
+            bucket_of_tenant(parse_dirty_flag(child)[0], num_buckets)
+            in my_buckets]
+        if flags:
+            eff = parallel([move_flat_flag(flag, num_buckets)
+                            for flag in flags])
             # the return value is ignored, but we return this for testing
-            eff = self._converge_all(my_buckets, children)
             return perform(self._dispatcher, self._with_conv_runid(eff))
 
 
@@ -1,4 +1,5 @@
 """Steps for convergence."""
+from functools import partial
 from uuid import uuid4
 
 import attr
@@ -38,7 +39,14 @@ from otter.cloud_client.clb import (
     change_clb_node,
     remove_clb_nodes)
 from otter.constants import ServiceType
-from otter.convergence.model import ErrorReason, HeatStack, StepResult
+from otter.convergence.model import (
+    CLBNode,
+    ErrorReason,
+    HeatStack,
+    LBNodeChange,
+    RCv3Description,
+    RCv3Node,
+    StepResult)
 from otter.util.fp import set_in
 from otter.util.hashkey import generate_server_name
 from otter.util.http import APIError, append_segments
@@ -130,6 +138,18 @@ def _failure_reporter(*terminal_err_types):
     return reporter
 
 
+def _changes_applied(changes):
+    """
+    Return result of a step that succeeded making given changes::
+
+        (StepResult.SUCCESS, [], changes)
+
+    where ``changes`` is list of :obj:`LBNodeChange`. The converger applies
+    them to the gathered state instead of gathering it again.
+    """
+    return StepResult.SUCCESS, [], changes
+
+
 def _success_reporter(success_reason):
     """
     Return a callable that takes a result and returns a::
@@ -277,10 +297,11 @@ class AddNodesToCLB(object):
     :ivar iterable address_configs: A collection of two-tuples of address and
         :obj:`CLBDescription`.
 
-    Retry if successful (to re-gather to update the active cache) or if there
-    was a non-terminal failure (if there were duplicate nodes, if the CLB is
-    in PENDING_UDPATE, or if the CLB rate-limited the request).  These can
-    all be fixed in the next convergence cycle.
+    Succeed with the added nodes if successful. Retry if the added nodes
+    could not be found in the response (to re-gather to update the active
+    cache) or if there was a non-terminal failure (if there were duplicate
+    nodes, if the CLB is in PENDING_UDPATE, or if the CLB rate-limited the
+    request).  These can all be fixed in the next convergence cycle.
 
     Fail otherwise.
     """
@@ -293,10 +314,19 @@ class AddNodesToCLB(object):
               'type': lbc.type.name}
              for address, lbc in self.address_configs])
 
+        def added((_, body)):
+            try:
+                nodes = [CLBNode.from_node_json(self.lb_id, node)
+                         for node in body['nodes']]
+            except (KeyError, TypeError, ValueError):
+                return _success_reporter(
+                    'must re-gather after adding to CLB in order to update '
+                    'the active cache')(body)
+            return _changes_applied(
+                [LBNodeChange.Added(node=node) for node in nodes])
+
         return eff.on(
-            success=_success_reporter(
-                'must re-gather after adding to CLB in order to update '
-                'the active cache'),
+            success=added,
             error=_failure_reporter(CLBNotFoundError, CLBNodeLimitError))
 
 
@@ -319,7 +349,9 @@ class RemoveNodesFromCLB(object):
         return eff.on(
             error=_ignore_errors(CLBNotFoundError, NoSuchCLBNodeError)
         ).on(
-            success=lambda r: (StepResult.SUCCESS, []),
+            success=lambda r: _changes_applied([
+                LBNodeChange.CLBRemoved(lb_id=self.lb_id, node_id=node_id)
+                for node_id in sorted(self.node_ids)]),
             error=_failure_reporter())
 
 
@@ -340,9 +372,10 @@ class ChangeCLBNode(object):
                               condition=self.condition.name,
                               _type=self.type.name)
         return eff.on(
-            success=lambda _: (StepResult.RETRY, [ErrorReason.String(
-                'must re-gather after CLB change in order to update the '
-                'active cache')]),
+            success=lambda _: _changes_applied([LBNodeChange.Changed(
+                lb_id=self.lb_id, node_id=self.node_id,
+                condition=self.condition, weight=self.weight,
+                type=self.type)]),
             error=_failure_reporter(CLBNotFoundError, NoSuchCLBNodeError))
 
 
@@ -368,12 +401,36 @@ class BulkAddToRCv3(object):
         """
         eff = rcv3.bulk_add(self.lb_node_pairs)
         return eff.on(
-            success=lambda _: (StepResult.RETRY, [ErrorReason.String(
-                'must re-gather after LB add in order to update the '
-                'active cache')]),
+            success=partial(_handle_bulk_add_success, self.lb_node_pairs),
             error=catch(rcv3.BulkErrors, _handle_bulk_add_errors))
 
 
+def _handle_bulk_add_success(lb_node_pairs, body):
+    """
+    Return the added nodes from RCv3 bulk add response body. If some pairs
+    were already members the body is None or only has the remaining pairs,
+    in which case we don't know the IDs of all the nodes and must re-gather.
+    Same if the body is not as expected.
+    """
+    retry = (StepResult.RETRY, [ErrorReason.String(
+        'must re-gather after LB add in order to update the active cache')])
+    try:
+        nodes = [
+            RCv3Node(node_id=node['id'],
+                     description=RCv3Description(
+                         lb_id=node['load_balancer_pool']['id']),
+                     cloud_server_id=node['cloud_server']['id'])
+            for node in body]
+    except (KeyError, TypeError):
+        return retry
+    added = set((node.description.lb_id.lower(), node.cloud_server_id)
+                for node in nodes)
+    if added != set((lb_id.lower(), server_id)
+                    for lb_id, server_id in lb_node_pairs):
+        return retry
+    return _changes_applied([LBNodeChange.Added(node=node) for node in nodes])
+
+
 def _handle_bulk_add_errors(exc_tuple):
     error = exc_tuple[1]
     failures = []
@@ -409,9 +466,9 @@ class BulkRemoveFromRCv3(object):
         """
         eff = rcv3.bulk_delete(self.lb_node_pairs)
         return eff.on(
-            success=lambda _: (StepResult.RETRY, [ErrorReason.String(
-                'must re-gather after RCv3 LB change in order to update the '
-                'active cache')]),
+            success=lambda _: _changes_applied([
+                LBNodeChange.RCv3Removed(lb_id=lb_id, server_id=server_id)
+                for lb_id, server_id in sorted(self.lb_node_pairs)]),
             error=_failure_reporter(rcv3.BulkErrors))
 
 
@@ -3,7 +3,8 @@ Functions for transforming collections of steps.
 
 - optimizing (converting multiple steps into one for the purposes of reducing
   API roundtrips)
-- limiting (by truncating the number of steps we take)
+- limiting (by truncating the number of steps we take), with limits that can
+  adapt to how the steps fare
 """
 
 from pyrsistent import pbag, pmap, pset
@@ -12,6 +13,7 @@ from toolz.curried import groupby
 from toolz.dicttoolz import merge
 from toolz.itertoolz import concat, concatv
 
+from otter.convergence.model import ServerState, StepResult
 from otter.convergence.steps import (
     AddNodesToCLB,
     BulkAddToRCv3,
@@ -172,3 +174,195 @@ def limit_steps_by_count(steps, step_limits):
     return pbag(concat(typed_steps[:step_limits.get(cls)]
                        for (cls, typed_steps)
                        in groupby(type, steps).iteritems()))
+
+
+class _Window(object):
+    """
+    Number of steps of a type allowed in an iteration, grown and shrunk like
+    TCP's congestion window: it grows by one for every success until it
+    reaches ``threshold`` (slow start) and by one per window of successes
+    after that (additive increase). A failure halves it and sets
+    ``threshold`` to the halved size (multiplicative decrease).
+    """
+
+    def __init__(self, size, threshold):
+        self.size = float(size)
+        self.threshold = threshold
+
+    def grow(self, successes, cap):
+        """Grow by given number of successes, up to ``cap``."""
+        for _ in range(successes):
+            if self.size < self.threshold:
+                self.size += 1
+            else:
+                self.size += 1 / self.size
+        self.size = min(self.size, cap)
+
+    def shrink(self):
+        """Halve the window on failure."""
+        self.size = self.threshold = max(self.size / 2, 1)
+
+
+def _build_outcomes(building, timed_out, group_id, servers, now,
+                    build_timeout):
+    """
+    Return number of servers of the group that have built successfully and
+    that have failed to build since last seen, updating ``building`` with
+    servers still building and ``timed_out`` with servers that have timed out
+    building. A server that stays in building after timing out is counted as
+    failed only once.
+
+    :param dict building: Mapping of ID of servers seen building to ID of
+        their group
+    :param dict timed_out: Mapping of ID of servers seen timed out building
+        to ID of their group
+    """
+    seen = set()
+    successes = failures = 0
+    for server in servers:
+        seen.add(server.id)
+        was_building = building.pop(server.id, None) is not None
+        if server.state == ServerState.BUILD:
+            if now - server.created < build_timeout:
+                building[server.id] = group_id
+            elif server.id not in timed_out:
+                timed_out[server.id] = group_id
+                failures += 1
+            continue
+        timed_out.pop(server.id, None)
+        if was_building and server.state == ServerState.ACTIVE:
+            successes += 1
+        elif was_building and server.state == ServerState.ERROR:
+            failures += 1
+    # Forget servers of this group that were deleted
+    for tracked in (building, timed_out):
+        for server_id, server_group in tracked.items():
+            if server_group == group_id and server_id not in seen:
+                del tracked[server_id]
+    return successes, failures
+
+
+class AdaptiveStepLimits(object):
+    """
+    Per-tenant limits on the number of :obj:`CreateServer` steps executed in
+    a convergence iteration that adapt to how the servers fare. The limit of
+    a tenant starts at ``initial`` and grows as servers created build
+    successfully. It is halved when creating servers fails or when servers
+    go into ERROR or do not build in time. It never goes above the static
+    limit given to :meth:`limits` or below 1.
+
+    State is kept only in memory and is per node; since a tenant's groups are
+    always converged on the node owning its bucket, that is where all the
+    feedback about the tenant is. State of tenants whose servers have not
+    been observed for ``idle_timeout`` seconds is forgotten.
+    """
+
+    def __init__(self, initial=2, idle_timeout=3600):
+        """
+        :param int initial: Limit of a tenant to begin with
+        :param number idle_timeout: Seconds after which state of a tenant
+            not observed is forgotten
+        """
+        self.initial = initial
+        self.idle_timeout = idle_timeout
+        self._windows = {}
+        # tenant ID -> {server ID: group ID} of servers seen building
+        self._building = {}
+        # tenant ID -> {server ID: group ID} of servers seen timed out
+        # building
+        self._timed_out = {}
+        # tenant ID -> time its servers were last observed
+        self._observed = {}
+        self._pruned = None
+
+    def _window(self, tenant_id, cap):
+        window = self._windows.get(tenant_id)
+        if window is None:
+            window = self._windows[tenant_id] = _Window(
+                min(self.initial, cap), cap)
+        return window
+
+    def limits(self, tenant_id, step_limits):
+        """
+        Return step limits of the tenant.
+
+        :param dict step_limits: Static step limits, mapping of step class
+            to its limit. The :obj:`CreateServer` limit in it is the maximum
+            the adapted limit can reach. Adaptation is disabled if it is not
+            there.
+        :return: ``step_limits`` with :obj:`CreateServer` limit adapted
+        """
+        cap = step_limits.get(CreateServer)
+        if cap is None:
+            return step_limits
+        window = self._windows.get(tenant_id)
+        size = self.initial if window is None else window.size
+        return merge(step_limits,
+                     {CreateServer: max(1, min(cap, int(size)))})
+
+    def observe_servers(self, tenant_id, group_id, servers, now,
+                        build_timeout, step_limits):
+        """
+        Adapt the limit of the tenant to the servers of a group gathered in
+        a convergence iteration. Servers that were building earlier and are
+        now ACTIVE grow the limit. Servers that go into ERROR while building
+        or that time out building shrink it, once per server.
+
+        :param servers: Sequence of :obj:`NovaServer` of the group
+        :param float now: Current time in seconds since epoch
+        :param number build_timeout: Seconds after which a building server
+            is considered timed out
+        :param dict step_limits: Static step limits as given to
+            :meth:`limits`
+        """
+        cap = step_limits.get(CreateServer)
+        if cap is None:
+            return
+        self._prune(now)
+        self._observed[tenant_id] = now
+        building = self._building.setdefault(tenant_id, {})
+        timed_out = self._timed_out.setdefault(tenant_id, {})
+        successes, failures = _build_outcomes(
+            building, timed_out, group_id, servers, now, build_timeout)
+        if not building:
+            del self._building[tenant_id]
+        if not timed_out:
+            del self._timed_out[tenant_id]
+
+        window = self._window(tenant_id, cap)
+        if failures:
+            window.shrink()
+        else:
+            window.grow(successes, cap)
+
+    def creates_executed(self, tenant_id, results):
+        """
+        Shrink the limit of the tenant if creating any server failed.
+
+        Successful creates return RETRY to wait for the server to become
+        active, so only FAILURE counts here. Servers that fail to build are
+        noticed by :meth:`observe_servers`.
+
+        :param results: :obj:`StepResult` of every :obj:`CreateServer` step
+            executed
+        """
+        window = self._windows.get(tenant_id)
+        if window is not None and StepResult.FAILURE in results:
+            window.shrink()
+
+    def _prune(self, now):
+        """
+        Forget tenants not observed for ``idle_timeout`` seconds. This is
+        done at most once every ``idle_timeout`` seconds.
+        """
+        if self._pruned is None:
+            self._pruned = now
+        if now - self._pruned < self.idle_timeout:
+            return
+        self._pruned = now
+        for tenant_id, observed in self._observed.items():
+            if now - observed >= self.idle_timeout:
+                del self._observed[tenant_id]
+                self._windows.pop(tenant_id, None)
+                self._building.pop(tenant_id, None)
+                self._timed_out.pop(tenant_id, None)
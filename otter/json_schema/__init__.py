@@ -4,9 +4,25 @@ of data that will be transmitted to and from otter.
 """
 import functools
 
-from jsonschema import Draft3Validator, validate, FormatChecker
+from jsonschema import Draft3Validator, FormatChecker, validate
 
-# This is there since later modules need to add specific format validators to this.
+# This is there since later modules need to add specific format validators to
+# this.
 format_checker = FormatChecker()
 
-validate = functools.partial(validate, cls=Draft3Validator, format_checker=format_checker)
+validate = functools.partial(validate, cls=Draft3Validator,
+                             format_checker=format_checker)
+
+
+def compile_validator(schema):
+    """
+    Check the schema and return a validator for it that validates like
+    :func:`validate`. Checking the schema against the metaschema is costly for
+    big schemas, so this is meant to be done once per schema and the
+    validator reused.
+
+    :raises: :obj:`jsonschema.SchemaError` if the schema is invalid
+    :return: :obj:`Draft3Validator`
+    """
+    Draft3Validator.check_schema(schema)
+    return Draft3Validator(schema, format_checker=format_checker)
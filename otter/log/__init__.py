@@ -2,9 +2,11 @@
 Package for all otter specific logging functionality.
 """
 
-from otter.log.setup import observer_factory, observer_factory_debug
+from twisted.python.log import err, msg
+
 from otter.log.bound import BoundLog
-from twisted.python.log import msg, err
+from otter.log.setup import (
+    observer_factory, observer_factory_debug, observer_factory_threaded)
 
 log = BoundLog(msg, err).bind(system='otter')
 
@@ -21,4 +23,5 @@ def audit(log):
     return log.bind(audit_log=True)
 
 
-__all__ = ['observer_factory', 'observer_factory_debug', 'log']
+__all__ = ['observer_factory', 'observer_factory_debug',
+           'observer_factory_threaded', 'log']
@@ -2,16 +2,23 @@
 Composable log observers for use with Twisted's log module.
 """
 import json
+import random
+import threading
 import time
+from collections import deque
 from datetime import datetime
 from uuid import uuid4
 
+import attr
+
 from pyrsistent import pmap
 
 from singledispatch import singledispatch
 
 from twisted.python.failure import Failure
 
+from otter.util.config import config_value
+
 
 THROTTLED_MESSAGES = [
     pmap({'system': 'kazoo', 'message': ('Received Ping',)}),
@@ -85,8 +92,11 @@ class FanoutObserver(object):
         """
         Emit a copy of the event dict to every subobserver.
         """
-        for ob in self.subobservers:
+        # The last subobserver is given the event itself since nothing else
+        # will look at it afterwards
+        for ob in self.subobservers[:-1]:
             ob(event_dict.copy())
+        self.subobservers[-1](event_dict)
 
 
 class LoggingEncoder(json.JSONEncoder):
@@ -113,6 +123,42 @@ class LoggingEncoder(json.JSONEncoder):
         return repr(obj)
 
 
+_snapshot_encoder = LoggingEncoder()
+
+_IMMUTABLE_TYPES = (basestring, int, long, float, type(None))
+
+
+def snapshot_event(obj):
+    """
+    Return a copy of a log event, or of a value in it, that shares no mutable
+    object with it. Dicts, lists and tuples are copied and values that are
+    not JSON types are converted as :class:`LoggingEncoder` would convert
+    them, so the copy serializes to the same JSON as `obj`.
+    """
+    if isinstance(obj, _IMMUTABLE_TYPES):
+        return obj
+    if isinstance(obj, dict):
+        return {key: snapshot_event(value) for key, value in obj.iteritems()}
+    if isinstance(obj, (list, tuple)):
+        return [snapshot_event(value) for value in obj]
+    return snapshot_event(_snapshot_encoder.default(obj))
+
+
+def SnapshotWrapper(observer):
+    """
+    Create an observer that delegates a snapshot of the eventDict taken with
+    :func:`snapshot_event` to `observer`.
+
+    :param ILogObserver observer: The observer to delegate to.
+
+    :rtype: :class:`ILogObserver`
+    """
+    def SnapshotObserver(eventDict):
+        observer(snapshot_event(eventDict))
+
+    return SnapshotObserver
+
+
 def JSONObserverWrapper(observer, **kwargs):
     """
     Create an observer that will format the eventDict as JSON using the
@@ -153,6 +199,145 @@ def StreamObserverWrapper(stream, delimiter='\n', buffered=False):
     return StreamObserver
 
 
+class ThreadedObserver(object):
+    """
+    An observer that queues events in a bounded ring buffer and delivers them
+    to the wrapped observer from a worker thread, so that serialization and
+    blocking writes happen off the reactor thread.
+
+    Queued events are used by the worker thread as they are, so they must
+    not be mutated by the calling thread afterwards. Give it snapshots of
+    events taken with :func:`SnapshotWrapper` so that the worker thread
+    only sees objects no other thread refers to.
+
+    Events are delivered in batches of at most ``batch_size`` after which
+    ``flush`` is called. When the buffer is full the oldest queued event is
+    dropped; the number of dropped events is reported to ``drops_observer``
+    as a separate event before the next batch.
+
+    :ivar int queued: Number of events received
+    :ivar int dropped: Number of events dropped because the buffer was full
+    :ivar int delivered: Number of events given to the wrapped observer
+    :ivar int errors: Number of events the wrapped observer failed on
+    """
+
+    def __init__(self, observer, flush=None, max_events=10000,
+                 batch_size=100, seconds=time.time, drops_observer=None):
+        """
+        :param ILogObserver observer: The observer to deliver events to
+        :param flush: No-argument callable called after every batch
+        :param ILogObserver drops_observer: The observer that events
+            reporting dropped events are given to from the worker thread.
+            Defaults to ``observer``
+        :param int max_events: Maximum number of events buffered
+        :param int batch_size: Maximum number of events in a batch
+        :param seconds: No-argument callable returning current time
+        """
+        self.observer = observer
+        self.drops_observer = drops_observer or observer
+        self.flush = flush
+        self.batch_size = batch_size
+        self.seconds = seconds
+        self._events = deque(maxlen=max_events)
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self._unreported_drops = 0
+        self.queued = self.dropped = self.delivered = self.errors = 0
+
+    def __call__(self, event_dict):
+        """
+        Queue the event to be delivered by the worker thread.
+        """
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+                self._unreported_drops += 1
+            self._events.append(event_dict)
+            self.queued += 1
+            self._cond.notify()
+
+    def start(self):
+        """
+        Start the worker thread.
+        """
+        self._thread = threading.Thread(
+            target=self._run, name='otter-log-writer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop the worker thread after it has delivered all queued events.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _next_batch(self):
+        """
+        Wait for events and return them as a batch along with number of events
+        dropped since the last batch. Returns empty batch if stopping and
+        there are no more events to deliver.
+        """
+        with self._cond:
+            while not self._events and not self._stopping:
+                # Waiting with a timeout keeps the thread interruptible
+                self._cond.wait(1)
+            batch = [self._events.popleft()
+                     for _ in range(min(self.batch_size, len(self._events)))]
+            drops, self._unreported_drops = self._unreported_drops, 0
+            return batch, drops
+
+    def deliver(self, batch, drops):
+        """
+        Deliver batch of events to the wrapped observer and flush it
+        """
+        if drops:
+            try:
+                self.drops_observer(
+                    {'message': ('Dropped {} log events'.format(drops),),
+                     'system': 'otter.log',
+                     'time': self.seconds(),
+                     'num_dropped': drops})
+            except Exception:
+                self.errors += 1
+        for event in batch:
+            try:
+                self.observer(event)
+                self.delivered += 1
+            except Exception:
+                self.errors += 1
+        if self.flush is not None:
+            try:
+                self.flush()
+            except Exception:
+                self.errors += 1
+
+    def _run(self):
+        """
+        Deliver batches until stopped.
+        """
+        while True:
+            batch, drops = self._next_batch()
+            if not batch and not drops:
+                return
+            self.deliver(batch, drops)
+
+    def stats(self):
+        """
+        Return dict of counts of events queued, dropped, delivered, errored
+        and currently buffered.
+        """
+        with self._cond:
+            pending = len(self._events)
+        return {'queued': self.queued, 'dropped': self.dropped,
+                'delivered': self.delivered, 'errors': self.errors,
+                'pending': pending}
+
+
 def SystemFilterWrapper(observer):
     """
     Normalize the system key in the eventDict to not leak strange
@@ -342,6 +527,56 @@ def throttling_wrapper(observer):
     return emit
 
 
+@attr.s
+class Lazy(object):
+    """
+    Log field value that is computed only if the event is going to be
+    emitted, i.e. after it has been sampled. Log it like
+
+    >>> log.msg("some-event", field=Lazy(expensive_func, (arg1, arg2)))
+
+    :ivar callable func: Function returning the actual field value
+    :ivar tuple args: Arguments to call ``func`` with
+    """
+    func = attr.ib()
+    args = attr.ib(default=())
+
+    def render(self):
+        """Return the actual field value."""
+        return self.func(*self.args)
+
+
+def render_lazy_fields(event):
+    """
+    Replace :obj:`Lazy` values in event with their rendered values, in place.
+    """
+    for key, value in event.items():
+        if isinstance(value, Lazy):
+            event[key] = value.render()
+
+
+def sampling_wrapper(observer, get_config_value=config_value,
+                     random=random.random):
+    """
+    An observer that emits only a configured fraction of non-error events of
+    a message type and renders :obj:`Lazy` fields of the events it emits.
+
+    The fraction is looked up on every event from ``logging.sample_rates``
+    config, which is a mapping of message type to a number between 0 and 1.
+    Message types not in the mapping are always emitted.
+    """
+    def emit(event):
+        if not event.get('isError', False):
+            rates = get_config_value('logging.sample_rates') or {}
+            rate = rates.get(''.join(event.get('message', ())))
+            if rate is not None and random() >= rate:
+                return
+        render_lazy_fields(event)
+        observer(event)
+
+    return emit
+
+
 def cf_id_wrapper(observer):
     """
     Wrapper that adds a cloud feeds ID to each cloud feeds event dictionary.
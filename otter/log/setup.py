@@ -1,6 +1,7 @@
 """
 Observer factories which will be used to configure twistd logging.
 """
+import atexit
 import socket
 import sys
 
@@ -9,35 +10,64 @@ from otter.log.formatters import (
     JSONObserverWrapper,
     ObserverWrapper,
     PEP3101FormattingWrapper,
+    SnapshotWrapper,
     StreamObserverWrapper,
     SystemFilterWrapper,
+    ThreadedObserver,
     add_to_fanout,
-    get_fanout,
     cf_id_wrapper,
+    get_fanout,
+    sampling_wrapper,
     throttling_wrapper,
 )
 from otter.log.spec import SpecificationObserverWrapper
 
 
-def make_observer_chain(ultimate_observer, indent):
+# Seconds to wait at exit for the log writer thread to write pending events.
+# Bounded so that a blocked stdout cannot hang shutdown
+THREADED_STOP_TIMEOUT = 5
+
+
+def make_observer_chain(ultimate_observer, indent, threaded=False,
+                        flush=None):
     """
     Return our feature observers wrapped our the ultimate_observer
+
+    :param bool threaded: If True, events are serialized and given to
+        ultimate_observer by a worker thread instead of the calling thread.
+        See :class:`ThreadedObserver`
+    :param flush: No-argument callable called by the worker thread after
+        writing a batch of events. Only used if `threaded` is True
     """
-    add_to_fanout(
-        ObserverWrapper(
-            JSONObserverWrapper(
-                ultimate_observer,
-                sort_keys=True,
-                indent=indent or None),
-            hostname=socket.gethostname()))
+    def formatting(observer):
+        return ObserverWrapper(observer, hostname=socket.gethostname())
+
+    json_observer = JSONObserverWrapper(
+        ultimate_observer,
+        sort_keys=True,
+        indent=indent or None)
+
+    if threaded:
+        # The worker thread serializes snapshots of events so that it never
+        # sees objects that the calling thread may still mutate
+        writer = ThreadedObserver(
+            json_observer, flush=flush,
+            drops_observer=formatting(json_observer))
+        writer.start()
+        atexit.register(writer.stop, THREADED_STOP_TIMEOUT)
+        observer = formatting(SnapshotWrapper(writer))
+    else:
+        observer = formatting(json_observer)
+    add_to_fanout(observer)
 
     return throttling_wrapper(
-        SpecificationObserverWrapper(
-            PEP3101FormattingWrapper(
-                SystemFilterWrapper(
-                    ErrorFormattingWrapper(
-                        cf_id_wrapper(
-                            get_fanout()))))))
+        sampling_wrapper(
+            SpecificationObserverWrapper(
+                PEP3101FormattingWrapper(
+                    SystemFilterWrapper(
+                        ErrorFormattingWrapper(
+                            cf_id_wrapper(
+                                get_fanout())))))))
 
 
 def observer_factory():
@@ -52,3 +82,13 @@ def observer_factory_debug():
     Log pretty JSON formatted structures to sys.stdout.
     """
     return make_observer_chain(StreamObserverWrapper(sys.stdout), 2)
+
+
+def observer_factory_threaded():
+    """
+    Log non-pretty JSON formatted structures to sys.stdout from a worker
+    thread, writing and flushing them in batches.
+    """
+    return make_observer_chain(
+        StreamObserverWrapper(sys.stdout, buffered=True), False,
+        threaded=True, flush=sys.stdout.flush)
@@ -11,6 +11,7 @@ from toolz.functoolz import compose, curry
 from twisted.python.failure import Failure
 
 from otter.log.formatters import LoggingEncoder
+from otter.util.config import config_value
 
 
 _json_len = compose(len, curry(json.dumps, cls=LoggingEncoder))
@@ -39,13 +40,14 @@ def split_execute_convergence(event, max_length=event_max_length):
         have one tuple.
     """
     message = "Executing convergence"
-    if _json_len(event) <= max_length:
+    event_len = _json_len(event)
+    if event_len <= max_length:
         return [(event, message)]
 
     events = [(event, message)]
-    large_things = sorted(('servers', 'lb_nodes'),
-                          key=compose(_json_len, event.get),
-                          reverse=True)
+    thing_lens = {thing: _json_len(event[thing])
+                  for thing in ('servers', 'lb_nodes')}
+    large_things = sorted(thing_lens, key=thing_lens.get, reverse=True)
 
     # simplified event which serves as a base for the split out events
     base_event = keyfilter(
@@ -53,12 +55,14 @@ def split_execute_convergence(event, max_length=event_max_length):
         event)
 
     for thing in large_things:
-        split_up_events = split(
-            assoc(base_event, thing), event[thing], max_length,
-            _json_len)
-        events.extend([(e, message) for e in split_up_events])
+        base_len = _json_len(assoc(base_event, thing, []))
+        chunks = pack_by_length(event[thing], map(_json_len, event[thing]),
+                                max_length - base_len)
+        events.extend([(assoc(base_event, thing, chunk), message)
+                       for chunk in chunks])
         del event[thing]
-        if _json_len(event) <= max_length:
+        event_len -= _json_dict_item_len(thing, thing_lens[thing])
+        if event_len <= max_length:
             break
 
     return events
@@ -83,10 +87,12 @@ def split_list_servers(event, maxlength=event_max_length):
         event["response_body"] = _json
         return [(event, message)]
 
-    def part_json(servers):
-        return json.dumps({"servers": servers})
-
-    parts = split(part_json, event["response_body"]["servers"], maxlength, len)
+    servers = map(json.dumps, event["response_body"]["servers"])
+    base_len = len(json.dumps({"servers": []}))
+    parts = [
+        '{"servers": [' + ', '.join(chunk) + ']}'
+        for chunk in pack_by_length(servers, map(len, servers),
+                                    maxlength - base_len)]
     del event["response_body"]
     return [(assoc(event, "response_body", part), message) for part in parts]
 
@@ -145,6 +151,11 @@ msg_types = {
         "putting group into ERROR state."),
     "converge-non-fatal-error": (
         "Non-fatal error while converging group {scaling_group_id}"),
+    "converge-save-state-failure": (
+        "Failed to store convergence state of group {scaling_group_id}"),
+    "convergence-unchanged": (
+        "Not converging group {scaling_group_id} since nothing has changed "
+        "since it was found converged"),
     "delete-server": "Deleting {server_id} server",
     "execute-convergence": split_execute_convergence,
     "execute-convergence-results": (
@@ -215,9 +226,11 @@ msg_types = {
     # Selfheal service
     "selfheal-setup-err": (
         "SelfHeal service errored occurred when scheduling convergence"),
-    "selfheal-calls-err": "SelfHeal service has {active} scheduled calls",
-    "selfheal-lock-acquired": "SelfHeal service acquired lock",
-    "selfheal-group-deleted": "Group deleted when selfhealing"
+    "selfheal-calls-err": (
+        "SelfHeal service has {active} groups not triggered yet"),
+    "selfheal-buckets-unknown": (
+        "SelfHeal service is not triggering convergence since converger "
+        "buckets are not known yet"),
 }
 
 
@@ -233,6 +246,49 @@ def halve(l):
     return (l[:half_index], l[half_index:])
 
 
+def _json_dict_item_len(key, value_len):
+    """
+    Return length taken by a key and its value of JSON length `value_len`
+    in JSON-serialized dict that has other items too, including the
+    separator
+    """
+    return len(json.dumps(key)) + len(': ') + value_len + len(', ')
+
+
+def pack_by_length(elements, lengths, max_len, separator_len=len(', ')):
+    """
+    Split elements into consecutive sub-lists such that sum of lengths of
+    elements in each sub-list along with separators between them is at most
+    ``max_len``. This can be used to split a list whose JSON serialization is
+    too long without serializing the list or its sub-lists repeatedly: each
+    element's length is calculated only once by the caller and the lists are
+    packed in a single pass.
+
+    Elements longer than ``max_len`` will still be returned in their own
+    sub-list, so ``max_len`` mustn't be assumed to be a hard constraint.
+
+    :param list elements: Elements to split
+    :param list lengths: Length of each element in ``elements``
+    :param int max_len: Maximum length of a sub-list
+    :param int separator_len: Length of separator between two elements
+
+    :return: non-empty ``list`` of sub-lists of elements. If ``elements`` is
+        empty, a single empty sub-list is returned.
+    """
+    chunks = []
+    chunk, chunk_len = [], 0
+    for element, length in zip(elements, lengths):
+        if chunk and chunk_len + separator_len + length > max_len:
+            chunks.append(chunk)
+            chunk, chunk_len = [], 0
+        if chunk:
+            chunk_len += separator_len
+        chunk.append(element)
+        chunk_len += length
+    chunks.append(chunk)
+    return chunks
+
+
 def split(render, elements, max_len, calculate_len=len):
     """
     Split given elements into sub-lists, ensuring that length (as calculated by
@@ -340,8 +396,27 @@ def get_validated_event(event, specs=msg_types):
         return [event]
 
 
+def cap_split_events(events, get_config_value=config_value):
+    """
+    Limit number of events an event is split into as per
+    ``logging.max_split_events`` config, which is a mapping of message type to
+    maximum number of events. The last event kept gets number of events
+    dropped in ``dropped_split_events`` field.
+    """
+    if len(events) < 2:
+        return events
+    caps = get_config_value('logging.max_split_events') or {}
+    cap = caps.get(events[0].get('otter_msg_type'))
+    if cap is None or len(events) <= cap:
+        return events
+    kept = events[:max(cap, 1)]
+    kept[-1]['dropped_split_events'] = len(events) - len(kept)
+    return kept
+
+
 def SpecificationObserverWrapper(observer,
-                                 get_validated_event=get_validated_event):
+                                 get_validated_event=get_validated_event,
+                                 cap_split_events=cap_split_events):
     """
     Return observer that validates messages based on specification
     and delegates to given observer.
@@ -358,7 +433,7 @@ def SpecificationObserverWrapper(observer,
     """
     def validating_observer(event_dict):
         try:
-            speced_events = get_validated_event(event_dict)
+            speced_events = cap_split_events(get_validated_event(event_dict))
         except (ValueError, TypeError):
             speced_events = [error_event(
                 event_dict, Failure(), "Error validating event")]
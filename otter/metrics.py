@@ -41,7 +41,8 @@ from otter.convergence.model import NovaServer, group_id_from_metadata
 from otter.convergence.planning import Destiny, get_destiny
 from otter.effect_dispatcher import get_legacy_dispatcher
 from otter.log import log as otter_log
-from otter.models.cass import CassScalingGroupCollection
+from otter.models.cass import (
+    CassScalingGroupCollection, reconcile_all_counts)
 from otter.models.intents import GetAllValidGroups, get_model_dispatcher
 from otter.util.fp import partition_bool
 
@@ -301,6 +302,29 @@ def collect_metrics(reactor, config, log, client=None, authenticator=None,
     defer.returnValue(group_metrics)
 
 
+@defer.inlineCallbacks
+def reconcile_resource_counts(client, log):
+    """
+    Reconcile resource counts of all tenants with their rows so that drift in
+    the counters read by limits endpoint and admin metrics does not
+    accumulate. See :func:`otter.models.cass.reconcile_all_counts`.
+
+    Tenants are found by reading the tenant and group IDs of every group row,
+    which is a full scan of the scaling group table, and then rows are counted
+    in each tenant's partitions. This is why it is run much less often than
+    metrics are collected.
+
+    :param :class:`silverberg.client.CQLClient` client: Cassandra client
+    :return: :class:`Deferred` fired with None
+    """
+    store = CassScalingGroupCollection(client, None, 1000)
+    groups = yield store.get_scaling_group_rows(
+        props=['"tenantId"', '"groupId"'])
+    totals = yield reconcile_all_counts(
+        client, set(group['tenantId'] for group in groups))
+    log.msg('reconciled resource counts', **totals)
+
+
 class Options(usage.Options):
     """
     Options for otter-metrics service
@@ -390,6 +414,13 @@ class MetricsService(Service, object):
             client=self._client,
             authenticator=generate_authenticator(reactor, config['identity']))
         self._service.clock = clock or reactor
+        # Only one otter-metrics service runs in a region, which is needed
+        # for reconciling the counts
+        self._reconcile_service = TimerService(
+            get_in(['metrics', 'counts_reconcile_interval'], config,
+                   default=3600),
+            self.reconcile_counts)
+        self._reconcile_service.clock = clock or reactor
 
     @defer.inlineCallbacks
     def collect(self, *a, **k):
@@ -410,19 +441,29 @@ class MetricsService(Service, object):
         except Exception:
             self.log.err(None, "Error collecting metrics")
 
+    def reconcile_counts(self):
+        """
+        Reconcile resource counts, logging any error
+        """
+        d = reconcile_resource_counts(self._client, self.log)
+        return d.addErrback(self.log.err, "Error reconciling resource counts")
+
     def startService(self):
         """
-        Start this service by starting internal TimerService
+        Start this service by starting internal TimerServices
         """
         Service.startService(self)
+        self._reconcile_service.startService()
         return self._service.startService()
 
     def stopService(self):
         """
-        Stop service by stopping the timerservice and disconnecting cass client
+        Stop service by stopping the timerservices and disconnecting cass
+        client
         """
         Service.stopService(self)
-        d = self._service.stopService()
+        d = defer.gatherResults([self._service.stopService(),
+                                 self._reconcile_service.stopService()])
         return d.addCallback(lambda _: self._client.disconnect())
 
 
@@ -22,6 +22,8 @@ from pyrsistent import freeze
 
 from silverberg.client import ConsistencyLevel
 
+import six
+
 from toolz.curried import filter, map
 from toolz.dicttoolz import assoc, keymap
 from toolz.functoolz import compose
@@ -45,6 +47,7 @@ from otter.models.interface import (
     NoSuchScalingGroupError,
     NoSuchWebhookError,
     PoliciesOverLimitError,
+    STRONG_CONSISTENCY,
     ScalingGroupOverLimitError,
     ScalingGroupStatus,
     UnrecognizedCapabilityError,
@@ -52,7 +55,7 @@ from otter.models.interface import (
     next_cron_occurrence)
 from otter.util import timestamp, zk
 from otter.util.config import config_value
-from otter.util.cqlbatch import Batch, batch
+from otter.util.cqlbatch import Batch, batch, counter_batch
 from otter.util.deferredutils import with_lock
 from otter.util.hashkey import generate_capability, generate_key_str
 from otter.util.retry import repeating_interval, retry, retry_times
@@ -63,6 +66,12 @@ LOCK_PATH = '/locks'
 
 DEFAULT_CONSISTENCY = ConsistencyLevel.QUORUM
 
+# Consistency of reads that only serve API requests and never feed a write.
+# Can be changed with "cassandra.read_consistency.default" config or for a
+# particular read with "cassandra.read_consistency.<read>" config where
+# <read> is the name of the method doing it (like "view_config")
+DEFAULT_READ_CONSISTENCY = ConsistencyLevel.LOCAL_QUORUM
+
 QUERY_LIMIT = 10000
 
 # Max number of seconds to wait to acquire group kazoo lock. This should
@@ -74,6 +83,18 @@ ACQUIRE_TIMEOUT = 10
 # error
 RELEASE_TIMEOUT = 10
 
+# Number of groups, policies and webhooks of each tenant are kept in counters
+# of the resource_counts table so that the limits endpoint and metrics need
+# not count rows. Counts of all tenants together are kept against
+# ALL_TENANTS. Counters are not updated atomically with the rows and can
+# drift, so they are periodically reconciled with the rows by
+# reconcile_all_counts, which is recorded by incrementing RECONCILED counter.
+# Limits are enforced by counting the rows of the tenant's partition.
+RESOURCE_COUNTS_TABLE = 'resource_counts'
+RESOURCES = ('groups', 'policies', 'webhooks')
+ALL_TENANTS = '*'
+RECONCILED = 'reconciled'
+
 
 @attributes(['query', 'params', 'consistency_level'])
 class CQLQueryExecute(object):
@@ -111,6 +132,49 @@ def cql_eff(query, params={}, consistency_level=DEFAULT_CONSISTENCY):
                         consistency_level=consistency_level))
 
 
+def get_read_consistency(read):
+    """
+    Return consistency level to use for a read-only query that does not feed
+    a write.
+
+    :param str read: Name of the read, i.e. the method doing it
+    :return: One of :class:`ConsistencyLevel` values
+    """
+    name = (config_value('cassandra.read_consistency.' + read) or
+            config_value('cassandra.read_consistency.default'))
+    if name is None:
+        return DEFAULT_READ_CONSISTENCY
+    return ConsistencyLevel._NAMES_TO_VALUES[name]
+
+
+def validate_read_consistency_config():
+    """
+    Ensure every level in "cassandra.read_consistency" config is a valid
+    consistency level so that misconfiguration is caught at startup instead
+    of failing every read.
+
+    :raises ValueError: if any of the configured levels is invalid
+    """
+    levels = config_value('cassandra.read_consistency') or {}
+    invalid = {read: name for read, name in six.iteritems(levels)
+               if name not in ConsistencyLevel._NAMES_TO_VALUES}
+    if invalid:
+        raise ValueError(
+            'Invalid cassandra.read_consistency config: {}'.format(invalid))
+
+
+def _read_consistency(consistency, read):
+    """
+    Return Cassandra consistency level to use for `read` given `consistency`
+    argument passed to an :class:`IScalingGroup` read method.
+    """
+    if consistency is None:
+        return get_read_consistency(read)
+    elif consistency is STRONG_CONSISTENCY:
+        return DEFAULT_CONSISTENCY
+    return consistency
+
+
 def serialize_json_data(data, ver):
     """
     Serialize json data to cassandra by adding a version and dumping it to a
@@ -255,6 +319,15 @@ _cql_count_for_group = (
     'AND "groupId" = :groupId;')
 _cql_count_all = ('SELECT COUNT(*) FROM {cf};')
 
+# Counter table of number of resources per tenant
+_cql_view_counts = (
+    'SELECT resource, count FROM {cf} WHERE "tenantId" = :tenantId;')
+_cql_add_count = (
+    'UPDATE {cf} SET count = count + :{name}delta '
+    'WHERE "tenantId" = :{name}tenantId AND resource = :{name}resource')
+_cql_list_counted_tenants = 'SELECT DISTINCT "tenantId" FROM {cf};'
+_cql_list_tenant_groups = 'SELECT * FROM {cf} WHERE "tenantId"=:tenantId;'
+
 # seems to be pretty quick no matter the consistency - unfortunately this only
 # checks we can connect to Cassandra, and not whether the otter keyspace is
 # correct, etc.
@@ -558,21 +631,30 @@ def verified_view(connection, view_query, del_query, data, consistency,
     deleted and `exception_if_empty` is raised. Also raises
     `exception_if_empty` if group's status is DELETING
 
+    A row is deleted only if it looks resurrected when read at
+    `DEFAULT_CONSISTENCY`, and the delete is also done at that level, so that
+    a lagging replica read at a weaker `consistency` cannot cause a live
+    group's rows to be deleted.
+
     :return: Deferred that fires with result of executing view query
     """
-    def _check_resurrection(result):
+    def _check_resurrection(result, consistency):
         if len(result) == 0:
             raise exception_if_empty
         group = result[0]
         if group.get('created_at') is None:
+            if consistency != DEFAULT_CONSISTENCY:
+                # Could be a lagging replica. Confirm before deleting
+                d = connection.execute(view_query, data, DEFAULT_CONSISTENCY)
+                return d.addCallback(_check_resurrection, DEFAULT_CONSISTENCY)
             # resurrected row, trigger its deletion and raise empty exception
             log.msg('Resurrected row', row=result[0], row_params=data)
-            connection.execute(del_query, data, consistency)
+            connection.execute(del_query, data, DEFAULT_CONSISTENCY)
             raise exception_if_empty
         return group
 
     d = connection.execute(view_query, data, consistency)
-    return d.addCallback(_check_resurrection)
+    return d.addCallback(_check_resurrection, consistency)
 
 
 def _del_webhook_queries(table, webhooks):
@@ -605,6 +687,208 @@ def _check_deleting(group, get_deleting=False):
     return group
 
 
+def update_counters(connection, updates):
+    """
+    Add to counters in resource_counts table in a counter batch.
+
+    :param connection: Silverberg client
+    :param list updates: (tenant ID, resource, delta) tuples. Counters whose
+        delta is 0 are not updated.
+    :return: `Deferred` fired with None
+    """
+    updates = [update for update in updates if update[2] != 0]
+    if not updates:
+        return defer.succeed(None)
+    queries, params = [], {}
+    for i, (tenant_id, resource, delta) in enumerate(updates):
+        name = 'count{}'.format(i)
+        queries.append(
+            _cql_add_count.format(cf=RESOURCE_COUNTS_TABLE, name=name))
+        params.update({name + 'tenantId': tenant_id,
+                       name + 'resource': resource,
+                       name + 'delta': delta})
+    d = connection.execute(counter_batch(queries), params,
+                           DEFAULT_CONSISTENCY)
+    return d.addCallback(lambda _: None)
+
+
+def add_counts(connection, tenant_id, deltas):
+    """
+    Add to counts of tenant's resources and to counts of all tenants.
+
+    :param connection: Silverberg client
+    :param str tenant_id: Tenant ID
+    :param dict deltas: Resource name to change in its count
+    :return: `Deferred` fired with None
+    """
+    return update_counters(
+        connection,
+        [(tenant, resource, delta)
+         for resource, delta in sorted(deltas.items())
+         for tenant in (tenant_id, ALL_TENANTS)])
+
+
+def view_counts(connection, tenant_id, consistency=ConsistencyLevel.ONE):
+    """
+    Read counters of a tenant.
+
+    :return: `Deferred` fired with ``dict`` of resource name to its count.
+        Resources whose counter was never updated are not in it.
+    """
+    d = connection.execute(
+        _cql_view_counts.format(cf=RESOURCE_COUNTS_TABLE),
+        {'tenantId': tenant_id}, consistency)
+    return d.addCallback(
+        lambda rows: {row['resource']: row['count'] for row in rows})
+
+
+def count_rows(connection, tenant_id, consistency=ConsistencyLevel.ONE):
+    """
+    Count tenant's groups that are not being deleted, its policies and
+    webhooks from their rows. Each query reads only the tenant's partition.
+
+    :return: `Deferred` fired with ``dict`` of resource name to its count
+    """
+    deleting = {'scaling_group': 'AND deleting=false'}
+    deferreds = []
+    for table in ['scaling_group', 'scaling_policies', 'policy_webhooks']:
+        d = connection.execute(
+            _cql_count_for_tenant.format(
+                cf=table, deleting=deleting.get(table, '')),
+            {'tenantId': tenant_id}, consistency)
+        d.addCallback(lambda r: r[0]['count'])
+        deferreds.append(d)
+    d = defer.gatherResults(deferreds, consumeErrors=True)
+    return d.addCallback(lambda counts: dict(zip(RESOURCES, counts)))
+
+
+def _correct_counts(connection, tenant_id, counts, actual):
+    """
+    Correct counters of a tenant by their difference from actual counts and
+    record that they are reconciled.
+
+    :param dict counts: Current counters as returned by :func:`view_counts`
+    :param dict actual: Resource name to its actual count
+    :return: `Deferred` fired with `actual`
+    """
+    updates = [
+        (tenant_id, resource, actual[resource] - counts.get(resource, 0))
+        for resource in RESOURCES]
+    if not counts.get(RECONCILED):
+        updates.append((tenant_id, RECONCILED, 1))
+    d = update_counters(connection, updates)
+    return d.addCallback(lambda _: actual)
+
+
+@defer.inlineCallbacks
+def reconcile_counts(connection, tenant_id):
+    """
+    Correct counters of a tenant to match the number of its rows got from
+    :func:`count_rows`. Counters of all tenants are not changed; they are
+    corrected by :func:`reconcile_all_counts`.
+
+    Counters are read with QUORUM like they are written. Counter increments
+    are not idempotent, so a resource created or deleted between reading the
+    counters and correcting them would be counted twice. The counters are
+    read again after counting the rows and the correction is skipped if they
+    changed. This does not close the window completely: a change whose row
+    is counted but whose counter is updated only after the second read is
+    still counted twice. That drift is removed by the next reconciliation.
+
+    :return: `Deferred` fired with ``dict`` of resource name to its count
+    """
+    counts = yield view_counts(connection, tenant_id, ConsistencyLevel.QUORUM)
+    actual = yield count_rows(connection, tenant_id, ConsistencyLevel.QUORUM)
+    recounts = yield view_counts(
+        connection, tenant_id, ConsistencyLevel.QUORUM)
+    if recounts == counts:
+        yield _correct_counts(connection, tenant_id, counts, actual)
+    defer.returnValue(actual)
+
+
+def _counted_tenants(connection):
+    """
+    Return `Deferred` fired with ``list`` of IDs of tenants having counters,
+    not including ALL_TENANTS.
+    """
+    d = connection.execute(
+        _cql_list_counted_tenants.format(cf=RESOURCE_COUNTS_TABLE), {},
+        ConsistencyLevel.ONE)
+    return d.addCallback(
+        lambda rows: [row['tenantId'] for row in rows
+                      if row['tenantId'] != ALL_TENANTS])
+
+
+def list_counted_tenants(connection):
+    """
+    List tenants having counters. Once counts of all tenants are reconciled,
+    every tenant that has groups has counters: creating a group adds them and
+    :func:`reconcile_all_counts` adds them for tenants whose update failed.
+
+    :return: `Deferred` fired with ``list`` of tenant IDs or None if counts
+        of all tenants were never reconciled
+    """
+    def _list(counts):
+        if not counts.get(RECONCILED):
+            return None
+        return _counted_tenants(connection)
+
+    return view_counts(connection, ALL_TENANTS).addCallback(_list)
+
+
+@defer.inlineCallbacks
+def reconcile_all_counts(connection, tenant_ids=()):
+    """
+    Reconcile counters of given tenants and of every tenant having counters
+    with :func:`reconcile_counts`, one tenant at a time, and then correct
+    counters of all tenants to their sum.
+
+    This is meant to be run periodically by a single process: reconciling the
+    same tenant concurrently would correct its counters more than once.
+    Like in :func:`reconcile_counts`, counters of all tenants are corrected
+    only if they did not change while tenants were reconciled. They are
+    still marked reconciled otherwise, since every tenant with groups then
+    has counters.
+
+    :param tenant_ids: IDs of tenants that may not have counters yet, like
+        the tenants of all the groups
+    :return: `Deferred` fired with ``dict`` of resource name to its count
+        across all tenants
+    """
+    counts = yield view_counts(
+        connection, ALL_TENANTS, ConsistencyLevel.QUORUM)
+    counted = yield _counted_tenants(connection)
+    tenants = set(tenant_ids) | set(counted)
+    totals = dict.fromkeys(RESOURCES, 0)
+    for tenant_id in sorted(tenants):
+        actual = yield reconcile_counts(connection, tenant_id)
+        for resource in RESOURCES:
+            totals[resource] += actual[resource]
+    recounts = yield view_counts(
+        connection, ALL_TENANTS, ConsistencyLevel.QUORUM)
+    if recounts == counts:
+        yield _correct_counts(connection, ALL_TENANTS, counts, totals)
+    elif not recounts.get(RECONCILED):
+        yield update_counters(connection, [(ALL_TENANTS, RECONCILED, 1)])
+    defer.returnValue(totals)
+
+
+def tenant_counts(connection, tenant_id):
+    """
+    Get counts of tenant's resources from its counters, or by counting its
+    rows with :func:`count_rows` if its counters were never reconciled.
+
+    :return: `Deferred` fired with ``dict`` of resource name to its count
+    """
+    def check(counts):
+        if counts.get(RECONCILED):
+            return {resource: counts.get(resource, 0)
+                    for resource in RESOURCES}
+        return count_rows(connection, tenant_id)
+
+    return view_counts(connection, tenant_id).addCallback(check)
+
+
 @implementer(IScalingGroup)
 class CassScalingGroup(object):
     """
@@ -687,6 +971,16 @@ class CassScalingGroup(object):
             return func(get_client_ts(self.reactor), *args)
         return wrapper
 
+    def _add_counts(self, result, **deltas):
+        """
+        Add to counts of tenant's resources after changing them and return
+        `result`. Failing to update the counts does not fail the change
+        since they get corrected when reconciled.
+        """
+        d = add_counts(self.connection, self.tenant_id, deltas)
+        d.addErrback(self.log.err, 'resource-counts-update-error', **deltas)
+        return d.addCallback(lambda _: result)
+
     def view_manifest(self, with_policies=True, with_webhooks=False,
                       get_deleting=False):
         """
@@ -743,10 +1037,12 @@ class CassScalingGroup(object):
 
         return d
 
-    def view_config(self):
+    def view_config(self, consistency=None):
         """
         see :meth:`otter.models.interface.IScalingGroup.view_config`
         """
+        consistency = _read_consistency(consistency, 'view_config')
+
         view_query = _cql_view.format(
             cf=self.group_table, column='group_config')
         del_query = _cql_delete_all_in_group.format(
@@ -754,17 +1050,19 @@ class CassScalingGroup(object):
         d = verified_view(self.connection, view_query, del_query,
                           {"tenantId": self.tenant_id,
                            "groupId": self.uuid},
-                          DEFAULT_CONSISTENCY,
+                          consistency,
                           NoSuchScalingGroupError(self.tenant_id, self.uuid),
                           self.log)
 
         return d.addCallback(lambda group:
                              _jsonloads_data(group['group_config']))
 
-    def view_launch_config(self):
+    def view_launch_config(self, consistency=None):
         """
         see :meth:`otter.models.interface.IScalingGroup.view_launch_config`
         """
+        consistency = _read_consistency(consistency, 'view_launch_config')
+
         view_query = _cql_view.format(
             cf=self.group_table, column='launch_config')
         del_query = _cql_delete_all_in_group.format(
@@ -772,7 +1070,7 @@ class CassScalingGroup(object):
         d = verified_view(self.connection, view_query, del_query,
                           {"tenantId": self.tenant_id,
                            "groupId": self.uuid},
-                          DEFAULT_CONSISTENCY,
+                          consistency,
                           NoSuchScalingGroupError(self.tenant_id, self.uuid),
                           self.log)
 
@@ -873,9 +1171,9 @@ class CassScalingGroup(object):
                  'groupId': self.uuid,
                  'ts': ts,
                  'deleting': True},
-                DEFAULT_CONSISTENCY)
+                DEFAULT_CONSISTENCY).addCallback(self._add_counts, groups=-1)
 
-        d = self.view_config()
+        d = self.view_config(DEFAULT_CONSISTENCY)
         if status == ScalingGroupStatus.DELETING:
             d.addCallback(set_deleting)
         else:
@@ -898,7 +1196,7 @@ class CassScalingGroup(object):
                  "reasons": reasons, "ts": ts},
                 DEFAULT_CONSISTENCY)
 
-        d = self.view_config()
+        d = self.view_config(DEFAULT_CONSISTENCY)
         d.addCallback(_do_update)
         return d
 
@@ -920,7 +1218,7 @@ class CassScalingGroup(object):
                       consistency=DEFAULT_CONSISTENCY)
             return b.execute(self.connection)
 
-        d = self.view_config()
+        d = self.view_config(DEFAULT_CONSISTENCY)
         d.addCallback(_do_update_config)
         return d
 
@@ -943,11 +1241,12 @@ class CassScalingGroup(object):
             d = b.execute(self.connection)
             return d
 
-        d = self.view_config()
+        d = self.view_config(DEFAULT_CONSISTENCY)
         d.addCallback(_do_update_launch)
         return d
 
-    def _naive_list_policies(self, limit=None, marker=None):
+    def _naive_list_policies(self, limit=None, marker=None,
+                             consistency=DEFAULT_CONSISTENCY):
         """
         Like :meth:`otter.models.cass.CassScalingGroup.list_policies`, but gets
         all the policies associated with particular scaling group
@@ -967,22 +1266,26 @@ class CassScalingGroup(object):
             params = {"tenantId": self.tenant_id, "groupId": self.uuid}
 
         d = self.connection.execute(cql.format(cf=self.policies_table), params,
-                                    DEFAULT_CONSISTENCY)
+                                    consistency)
         d.addCallback(insert_id)
         return d
 
-    def list_policies(self, limit=100, marker=None):
+    def list_policies(self, limit=100, marker=None, consistency=None):
         """
         see :meth:`otter.models.interface.IScalingGroup.list_policies`
         """
+        consistency = _read_consistency(consistency, 'list_policies')
+
         # If there are no policies - make sure it's not because the group
         # doesn't exist
         def _check_if_empty(policies_dict):
             if len(policies_dict) == 0:
-                return self.view_config().addCallback(lambda _: policies_dict)
+                d = self.view_config(consistency)
+                return d.addCallback(lambda _: policies_dict)
             return policies_dict
 
-        d = self._naive_list_policies(limit=limit, marker=marker)
+        d = self._naive_list_policies(limit=limit, marker=marker,
+                                      consistency=consistency)
         return d.addCallback(_check_if_empty)
 
     def get_policy(self, policy_id, version=None):
@@ -1003,7 +1306,7 @@ class CassScalingGroup(object):
                 raise NoSuchPolicyError(self.tenant_id, self.uuid, policy_id)
             return _jsonloads_data(rows[0]['data'])
 
-        d = self.view_config()  # Ensure group exists
+        d = self.view_config(DEFAULT_CONSISTENCY)  # Ensure group exists
         return d.addCallback(fetch_policy)
 
     def create_policies(self, data):
@@ -1013,16 +1316,11 @@ class CassScalingGroup(object):
         self.log.bind(policies=data).msg("Creating policies")
 
         def _do_limits_check(lastRev):
-            d = self.connection.execute(
-                _cql_count_for_group.format(cf=self.policies_table),
-                {"tenantId": self.tenant_id,
-                 "groupId": self.uuid},
-                DEFAULT_CONSISTENCY)
+            d = self._count_policies()
             return d.addCallback(_check_limit).addCallback(lambda _: lastRev)
 
         def _check_limit(curr_policies):
             max_policies = config_value('limits.absolute.maxPoliciesPerGroup')
-            curr_policies = curr_policies[0]['count']
             if curr_policies + len(data) > max_policies:
                 raise PoliciesOverLimitError(
                     curr_policies=curr_policies,
@@ -1043,13 +1341,25 @@ class CassScalingGroup(object):
             b = Batch(queries, cqldata,
                       consistency=DEFAULT_CONSISTENCY)
             d = b.execute(self.connection)
-            return d.addCallback(lambda _: outpolicies)
+            return d.addCallback(self._add_counts, policies=len(data)
+                                 ).addCallback(lambda _: outpolicies)
 
-        d = self.view_config()
+        d = self.view_config(DEFAULT_CONSISTENCY)
         d.addCallback(_do_limits_check)
         d.addCallback(_do_create_pol)
         return d
 
+    def _count_policies(self):
+        """
+        Count policies of the group. Does not check if group exists
+        """
+        d = self.connection.execute(
+            _cql_count_for_group.format(cf=self.policies_table),
+            {"tenantId": self.tenant_id,
+             "groupId": self.uuid},
+            DEFAULT_CONSISTENCY)
+        return d.addCallback(lambda r: r[0]['count'])
+
     def update_policy(self, policy_id, data):
         """
         see :meth:`otter.models.interface.IScalingGroup.update_policy`
@@ -1103,7 +1413,9 @@ class CassScalingGroup(object):
                            "policyId": policy_id})
             b = Batch(queries, params,
                       consistency=DEFAULT_CONSISTENCY)
-            return b.execute(self.connection)
+            d = b.execute(self.connection)
+            return d.addCallback(self._add_counts, policies=-1,
+                                 webhooks=-len(webhooks))
 
         d = self.get_policy(policy_id)
         d.addCallback(
@@ -1200,15 +1512,18 @@ class CassScalingGroup(object):
             b = Batch(queries, cql_params,
                       consistency=DEFAULT_CONSISTENCY)
             d = b.execute(self.connection)
-            return d.addCallback(lambda _: output)
+            return d.addCallback(self._add_counts, webhooks=len(data)
+                                 ).addCallback(lambda _: output)
 
         d.addCallback(_do_create)
         return d
 
-    def get_webhook(self, policy_id, webhook_id):
+    def get_webhook(self, policy_id, webhook_id, consistency=None):
         """
         see :meth:`otter.models.interface.IScalingGroup.get_webhook`
         """
+        consistency = _read_consistency(consistency, 'get_webhook')
+
         def _assemble_webhook(cass_data):
             if len(cass_data) == 0:
                 raise NoSuchWebhookError(self.tenant_id, self.uuid, policy_id,
@@ -1222,7 +1537,7 @@ class CassScalingGroup(object):
                                          "groupId": self.uuid,
                                          "policyId": policy_id,
                                          "webhookId": webhook_id},
-                                        DEFAULT_CONSISTENCY)
+                                        consistency)
             d.addCallback(_assemble_webhook)
             return d
 
@@ -1230,7 +1545,8 @@ class CassScalingGroup(object):
         # corresponding policy and webhook entries will remain.
         # We need not check if policy exists since corresponding
         # webhook row will not be there if policy is not there
-        return self.view_config().addCallback(fetch_webhook)
+        d = self.view_config(consistency)
+        return d.addCallback(fetch_webhook)
 
     def update_webhook(self, policy_id, webhook_id, data):
         """
@@ -1251,7 +1567,7 @@ class CassScalingGroup(object):
                  "data": serialize_json_data(data, 1)},
                 DEFAULT_CONSISTENCY)
 
-        d = self.get_webhook(policy_id, webhook_id)
+        d = self.get_webhook(policy_id, webhook_id, DEFAULT_CONSISTENCY)
         return d.addCallback(_update_data)
 
     def delete_webhook(self, policy_id, webhook_id):
@@ -1274,9 +1590,10 @@ class CassScalingGroup(object):
                  "webhookId": webhook_id,
                  "webhookKey": lastRev['capability']['hash']},
                 DEFAULT_CONSISTENCY)
-            return d
+            return d.addCallback(self._add_counts, webhooks=-1)
 
-        return self.get_webhook(policy_id, webhook_id).addCallback(_do_delete)
+        d = self.get_webhook(policy_id, webhook_id, DEFAULT_CONSISTENCY)
+        return d.addCallback(_do_delete)
 
     def delete_group(self):
         """
@@ -1304,14 +1621,19 @@ class CassScalingGroup(object):
 
             return b.execute(self.connection)
 
+        @defer.inlineCallbacks
         def _maybe_delete(state):
-            if (state.status != ScalingGroupStatus.DELETING and
-                    len(state.active) + len(state.pending) > 0):
+            deleting = state.status == ScalingGroupStatus.DELETING
+            if not deleting and len(state.active) + len(state.pending) > 0:
                 raise GroupNotEmptyError(self.tenant_id, self.uuid)
 
-            d = self._naive_list_all_webhooks()
-            d.addCallback(_delete_everything)
-            return d
+            policies = yield self._count_policies()
+            webhooks = yield self._naive_list_all_webhooks()
+            yield _delete_everything(webhooks)
+            # A deleting group is already out of the groups count
+            yield self._add_counts(None, groups=0 if deleting else -1,
+                                   policies=-policies,
+                                   webhooks=-len(webhooks))
 
         def _delete_group():
             d = self.view_state(get_deleting=True)
@@ -1418,7 +1740,8 @@ class CassScalingGroupCollection:
         scaling_group_id = generate_key_str('scalinggroup')
         log = log.bind(tenant_id=tenant_id, scaling_group_id=scaling_group_id)
 
-        # obey limits
+        # obey limits. The groups are counted rather than read from the
+        # tenant's counter since it can drift
         d = self.get_groups_count(log, tenant_id)
 
         def check_groups(cur_count):
@@ -1466,6 +1789,10 @@ class CassScalingGroupCollection:
                       consistency=DEFAULT_CONSISTENCY)
 
             bd = b.execute(self.connection)
+            bd.addCallback(lambda _: add_counts(
+                self.connection, tenant_id,
+                {'groups': 1, 'policies': len(policies or [])}).addErrback(
+                    log.err, 'resource-counts-update-error'))
             bd.addCallback(lambda _: {
                 'groupConfiguration': config,
                 'launchConfiguration': launch,
@@ -1646,9 +1973,6 @@ class CassScalingGroupCollection:
             CQLQueryExecute(query=batch(stmts), params=data,
                             consistency_level=ConsistencyLevel.ONE))
 
-    def _extract_count(self, r):
-        return r[0]['count']
-
     def get_groups_count(self, log, tenant_id):
         """
         Return number of valid (non-deleting) groups of the tenant
@@ -1657,25 +1981,13 @@ class CassScalingGroupCollection:
             _cql_count_for_tenant.format(cf='scaling_group',
                                          deleting='AND deleting=false'),
             {'tenantId': tenant_id}, ConsistencyLevel.ONE)
-        return d.addCallback(self._extract_count)
+        return d.addCallback(lambda r: r[0]['count'])
 
     def get_counts(self, log, tenant_id):
         """
         see :meth:`otter.models.interface.IScalingGroupCollection.get_counts`
         """
-        deferreds = []
-        for table in ['scaling_policies', 'policy_webhooks']:
-            d = self.connection.execute(
-                _cql_count_for_tenant.format(cf=table, deleting=''),
-                {'tenantId': tenant_id}, ConsistencyLevel.ONE)
-            d.addCallback(self._extract_count)
-            deferreds.append(d)
-
-        deferreds = [self.get_groups_count(log, tenant_id)] + deferreds
-        d = defer.gatherResults(deferreds)
-        d.addCallback(lambda results: dict(zip(
-            ('groups', 'policies', 'webhooks'), results)))
-        return d
+        return tenant_counts(self.connection, tenant_id)
 
     def kazoo_health_check(self):
         """
@@ -1726,10 +2038,14 @@ class CassScalingGroupCollection:
                               self.reactor.seconds() - start_time}))
         return d
 
-    def get_all_valid_groups(self):
+    def get_all_valid_groups(self, tenant_filter=None):
         """
         Get all *valid* scaling groups
 
+        :param callable tenant_filter: If given, only groups of tenants for
+            which it returns True are got. Only partitions of these tenants
+            are read if tenants can be listed with
+            :func:`list_counted_tenants`. Otherwise all groups are read.
         :return: `Deferred` fired with ``list`` of group ``dict``
         """
         def _valid_group_row(row):
@@ -1737,9 +2053,32 @@ class CassScalingGroupCollection:
                     row.get('desired') is not None and
                     not row.get('deleting', False))
 
-        d = self.get_scaling_group_rows()
+        if tenant_filter is None:
+            d = self.get_scaling_group_rows()
+        else:
+            d = self._get_tenants_group_rows(tenant_filter)
         return d.addCallback(lambda gs: list(filter(_valid_group_row, gs)))
 
+    @defer.inlineCallbacks
+    def _get_tenants_group_rows(self, tenant_filter):
+        """
+        Return `Deferred` fired with ``list`` of scaling group rows of
+        tenants for which `tenant_filter` returns True
+        """
+        tenants = yield list_counted_tenants(self.connection)
+        if tenants is None:
+            rows = yield self.get_scaling_group_rows()
+            defer.returnValue(
+                [row for row in rows if tenant_filter(row['tenantId'])])
+        groups = []
+        # One tenant at a time to not load Cassandra with many queries at once
+        for tenant_id in sorted(t for t in tenants if tenant_filter(t)):
+            rows = yield self.connection.execute(
+                _cql_list_tenant_groups.format(cf=self.group_table),
+                {'tenantId': tenant_id}, ConsistencyLevel.ONE)
+            groups.extend(rows)
+        defer.returnValue(groups)
+
     @defer.inlineCallbacks
     def get_scaling_group_rows(self, props=None, batch_size=100):
         """
@@ -1894,30 +2233,38 @@ class CassAdmin(object):
         """
         see :meth:`otter.models.interface.IAdmin.get_metrics`
         """
+        def _format_result(value, label):
+            """
+            :param value: Count of resources
+            :param label: Label for the metric
+
+            :return: dict of metric label, value and time
+            """
+            return dict(
+                id="otter.metrics.{0}".format(label),
+                value=value,
+                time=int(time.time()))
+
         def _get_metric(table, label):
             """
             Execute a CQL statement and return a formatted result
             """
-            def _format_result(result, label):
-                """
-                :param result: Result from metric collection
-                :param label: Label for the metric
-
-                :return: dict of metric label, value and time
-                """
-                return dict(
-                    id="otter.metrics.{0}".format(label),
-                    value=result[0]['count'],
-                    time=int(time.time()))
-
             dc = self.connection.execute(_cql_count_all.format(cf=table), {},
                                          ConsistencyLevel.QUORUM)
-            dc.addCallback(_format_result, label)
+            dc.addCallback(lambda result: _format_result(result[0]['count'],
+                                                         label))
             return dc
 
-        tables = ['scaling_group', 'scaling_policies', 'policy_webhooks']
-        labels = ['groups', 'policies', 'webhooks']
-        mapping = zip(tables, labels)
-
-        deferreds = [_get_metric(table, label) for table, label in mapping]
-        return defer.gatherResults(deferreds, consumeErrors=True)
+        def _from_counts(counts):
+            # Counting rows of all tenants is slow and only needed until
+            # counts of all tenants are reconciled
+            if counts.get(RECONCILED):
+                return [_format_result(counts.get(resource, 0), resource)
+                        for resource in RESOURCES]
+            tables = ['scaling_group', 'scaling_policies', 'policy_webhooks']
+            deferreds = [_get_metric(table, label)
+                         for table, label in zip(tables, RESOURCES)]
+            return defer.gatherResults(deferreds, consumeErrors=True)
+
+        d = view_counts(self.connection, ALL_TENANTS, ConsistencyLevel.QUORUM)
+        return d.addCallback(_from_counts)
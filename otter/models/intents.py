@@ -17,12 +17,16 @@ from otter.util.fp import assoc_obj
 
 @attr.s
 class GetAllValidGroups(object):
-    pass
+    """
+    Get all valid groups, or only the ones of tenants for which
+    ``tenant_filter`` returns True if it is given.
+    """
+    tenant_filter = attr.ib(default=None)
 
 
 @deferred_performer
 def perform_get_all_valid_groups(store, dispatcher, intent):
-    return store.get_all_valid_groups()
+    return store.get_all_valid_groups(intent.tenant_filter)
 
 
 @attributes(['tenant_id', 'group_id'])
@@ -18,6 +18,12 @@ from otter.util import timestamp
 from otter.util.http import lenient_ascii_text
 
 
+# Value of `consistency` argument of :class:`IScalingGroup` read methods to
+# use when what is read will be written back or acted upon. Stores read it at
+# the same consistency they use for writes.
+STRONG_CONSISTENCY = 'strong'
+
+
 class ScalingGroupStatus(Names):
     """
     Status of scaling group
@@ -287,8 +293,13 @@ class IScalingGroup(Interface):
             with this uuid) does not exist
         """
 
-    def view_config():
+    def view_config(consistency=None):
         """
+        :param consistency: Consistency of the read. By default a
+            weaker, store-configured consistency suited for reads that do not
+            feed a write is used. Pass :data:`STRONG_CONSISTENCY` when the
+            result feeds a write.
+
         :return: a view of the config, as specified by
             :data:`otter.json_schema.group_schemas.config`
         :rtype: a :class:`twisted.internet.defer.Deferred` that fires with
@@ -298,8 +309,13 @@ class IScalingGroup(Interface):
             with this uuid) does not exist
         """
 
-    def view_launch_config():
+    def view_launch_config(consistency=None):
         """
+        :param consistency: Consistency of the read. By default a
+            weaker, store-configured consistency suited for reads that do not
+            feed a write is used. Pass :data:`STRONG_CONSISTENCY` when the
+            result feeds a write.
+
         :return: a view of the launch config, as specified by
             :data:`otter.json_schema.group_schemas.launch_config`
         :rtype: a :class:`twisted.internet.defer.Deferred` that fires with
@@ -449,7 +465,7 @@ class IScalingGroup(Interface):
         :raises NoSuchPolicyError: if the policy id does not exist
         """
 
-    def list_policies(limit=100, marker=None):
+    def list_policies(limit=100, marker=None, consistency=None):
         """
         Gets all the policies associated with particular scaling group.
 
@@ -457,6 +473,10 @@ class IScalingGroup(Interface):
             (for pagination purposes)
         :param bytes marker: the policy ID of the last seen policy (for
             pagination purposes - page offsets)
+        :param consistency: Consistency of the read. By default a
+            weaker, store-configured consistency suited for reads that do not
+            feed a write is used. Pass :data:`STRONG_CONSISTENCY` when the
+            result feeds a write.
 
         :return: a list of the policies, as specified by
             :data:`otter.json_schema.model_schemas.policy_list`
@@ -550,7 +570,7 @@ class IScalingGroup(Interface):
             webhooks would put the user over their limit of webhooks per policy
         """
 
-    def get_webhook(policy_id, webhook_id):
+    def get_webhook(policy_id, webhook_id, consistency=None):
         """
         Gets the specified webhook for the specified policy on this particular
         scaling group.
@@ -561,6 +581,11 @@ class IScalingGroup(Interface):
         :param webhook_id: the uuid of the webhook
         :type webhook_id: :class:`bytes`
 
+        :param consistency: Consistency of the read. By default a
+            weaker, store-configured consistency suited for reads that do not
+            feed a write is used. Pass :data:`STRONG_CONSISTENCY` when the
+            result feeds a write.
+
         :return: a webhook, as specified by
             :data:`otter.json_schema.model_schemas.webhook`
         :rtype: a :class:`twisted.internet.defer.Deferred` that fires with
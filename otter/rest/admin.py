@@ -1,8 +1,10 @@
 """
 Autoscale REST endpoints having to do with administration of Otter.
 """
+from otter.convergence.profiling import profiler as default_profiler
 from otter.rest.metrics import OtterMetrics
 from otter.rest.otterapp import OtterApp
+from otter.rest.profiling import OtterConvergenceProfile
 
 
 class OtterAdmin(object):
@@ -11,11 +13,12 @@ class OtterAdmin(object):
     """
     app = OtterApp()
 
-    def __init__(self, store):
+    def __init__(self, store, profiler=default_profiler):
         """
         Initialize OtterAdmin.
         """
         self.store = store
+        self.profiler = profiler
 
     @app.route('/', methods=['GET'])
     def root(self, request):
@@ -30,3 +33,11 @@ class OtterAdmin(object):
         Routes related to metrics are delegated to OtterMetrics.
         """
         return OtterMetrics(self.store).app.resource()
+
+    @app.route('/convergence/profile/', branch=True)
+    def convergence_profile(self, request):
+        """
+        Routes related to convergence profiling are delegated to
+        OtterConvergenceProfile.
+        """
+        return OtterConvergenceProfile(self.profiler).app.resource()
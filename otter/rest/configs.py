@@ -12,6 +12,7 @@ from otter import controller
 from otter.json_schema import group_schemas
 from otter.log import log
 from otter.log.bound import bound_log_kwargs
+from otter.models.interface import STRONG_CONSISTENCY
 from otter.rest.decorators import (
     fails_with,
     succeeds_with,
@@ -117,7 +118,7 @@ class OtterConfig(object):
                 "minEntities must be less than or equal to maxEntities")
 
         def _get_launch_and_obey_config_change(scaling_group, state):
-            d = scaling_group.view_launch_config()
+            d = scaling_group.view_launch_config(STRONG_CONSISTENCY)
             d.addCallback(partial(
                 controller.obey_config_change,
                 self.log,
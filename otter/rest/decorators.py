@@ -2,20 +2,19 @@
 Wrapper for handling faults in a scalable fashion
 """
 
-from functools import wraps
 import json
+from functools import wraps
 
 from jsonschema import ValidationError
 
 from twisted.internet import defer
 from twisted.python import reflect
 
+from otter.json_schema import compile_validator
 from otter.log import audit
 from otter.util.config import config_value
-from otter.util.hashkey import generate_transaction_id
 from otter.util.deferredutils import unwrap_first_error
-
-from otter.json_schema import validate
+from otter.util.hashkey import generate_transaction_id
 
 
 def fails_with(mapping):
@@ -174,15 +173,19 @@ def validate_body(schema):
     Decorator that validates dependent on the schema passed in.
     See http://json-schema.org/ for schema documentation.
 
+    The schema is checked and its validator is built once when decorating.
+
     :return: decorator
     """
+    validator = compile_validator(schema)
+
     def decorator(f):
         @wraps(f)
         def _(self, request, *args, **kwargs):
             try:
                 request.content.seek(0)
                 data = json.loads(request.content.read())
-                validate(data, schema)
+                validator.validate(data)
             except ValueError as e:
                 return defer.fail(InvalidJsonError())
             except ValidationError, e:
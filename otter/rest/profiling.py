@@ -0,0 +1,74 @@
+"""
+Admin endpoints for viewing where convergence time is spent on this node.
+"""
+import json
+
+from twisted.internet import defer
+
+from otter.convergence.profiling import profiler as default_profiler
+from otter.log import log
+from otter.rest.decorators import (InvalidQueryArgument, fails_with,
+                                   succeeds_with, with_transaction_id)
+from otter.rest.errors import exception_codes
+from otter.rest.otterapp import OtterApp
+
+
+class OtterConvergenceProfile(object):
+    """
+    Endpoints for getting the convergence profile recorded on this node.
+    """
+    app = OtterApp()
+
+    def __init__(self, profiler=default_profiler):
+        """
+        Initialize OtterConvergenceProfile with a
+        :obj:`otter.convergence.profiling.ConvergenceProfiler`.
+        """
+        self.log = log.bind(system='otter.rest.profiling')
+        self.profiler = profiler
+
+    @app.route('/', methods=['GET'])
+    @with_transaction_id()
+    @fails_with(exception_codes)
+    @succeeds_with(200)
+    def view_profile(self, request):
+        """
+        Get the slowest groups and the phases that took most time. The number
+        of items in each list can be given with ``limit`` query argument and
+        defaults to 10.
+
+        Example response::
+
+            {
+                "groups": [
+                    {
+                        "tenant_id": "123",
+                        "group_id": "abc",
+                        "iteration": {"count": 4, "total": 20.4,
+                                      "mean": 5.1, "max": 8.0, "last": 3.2},
+                        "phases": {"gather.nova": 2.2, "plan": 0.01,
+                                   "execute.CreateServer": 1.5}
+                    }
+                ],
+                "phases": [
+                    {"phase": "gather.clb", "count": 30, "total": 81.0,
+                     "mean": 2.7, "max": 9.0, "last": 1.2}
+                ]
+            }
+        """
+        try:
+            limit = int(request.args.get('limit', [10])[0])
+        except ValueError:
+            return defer.fail(InvalidQueryArgument(
+                'Invalid query argument for "limit"'))
+        return json.dumps(self.profiler.report(max(limit, 1)))
+
+    @app.route('/', methods=['DELETE'])
+    @with_transaction_id()
+    @fails_with(exception_codes)
+    @succeeds_with(204)
+    def reset_profile(self, request):
+        """
+        Forget the profile recorded so far.
+        """
+        self.profiler.reset()
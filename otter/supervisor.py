@@ -14,7 +14,8 @@ from zope.interface import Interface, implementer
 
 from otter.effect_dispatcher import get_legacy_dispatcher
 from otter.log import audit
-from otter.models.interface import NoSuchScalingGroupError
+from otter.models.interface import (
+    NoSuchScalingGroupError, STRONG_CONSISTENCY)
 from otter.undo import InMemoryUndoStack
 from otter.util.config import config_value
 from otter.util.deferredutils import DeferredPool
@@ -683,10 +684,11 @@ def remove_server_from_group(log, trans_id, server_id, replace, purge, group, st
     if server_id not in state.active:
         raise ServerNotFoundError(group.tenant_id, group.uuid, server_id)
     elif replace:
-        d = group.view_launch_config()
-        d.addCallback(lambda lc: execute_launch_config(log, trans_id, state, lc, group, 1))
+        d = group.view_launch_config(STRONG_CONSISTENCY)
+        d.addCallback(lambda lc: execute_launch_config(
+            log, trans_id, state, lc, group, 1))
     else:
-        d = group.view_config()
+        d = group.view_config(STRONG_CONSISTENCY)
         d.addCallback(maybe_reduce_desired)
 
     if purge:
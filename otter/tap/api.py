@@ -10,7 +10,6 @@ import jsonfig
 
 from kazoo.client import KazooClient
 
-from silverberg.cluster import RoundRobinCassandraCluster
 from silverberg.logger import LoggingCQLClient
 
 from toolz.dicttoolz import get_in
@@ -37,21 +36,26 @@ from otter.constants import (
     CONVERGENCE_PARTITIONER_PATH,
     get_service_configs)
 from otter.convergence.selfheal import SelfHeal
-from otter.convergence.service import Converger
+from otter.convergence.service import Converger, get_num_buckets
 from otter.effect_dispatcher import get_full_dispatcher
 from otter.log import log
 from otter.log.cloudfeeds import CloudFeedsObserver
 from otter.log.formatters import add_to_fanout
-from otter.models.cass import CassAdmin, CassScalingGroupCollection
+from otter.models.cass import (
+    CassAdmin,
+    CassScalingGroupCollection,
+    validate_read_consistency_config)
 from otter.rest.admin import OtterAdmin
 from otter.rest.application import Otter
 from otter.rest.bobby import set_bobby
 from otter.scheduler import SchedulerService
 from otter.supervisor import SupervisorService, set_supervisor
-from otter.util import zk
+from otter.util import logging_treq
 from otter.util.config import config_value, set_config_data
-from otter.util.cqlbatch import TimingOutCQLClient
+from otter.util.cqlbatch import PooledCassandraCluster, TimingOutCQLClient
 from otter.util.deferredutils import timeout_deferred
+from otter.util.hashring import ring_partitioner
+from otter.util.logging_treq import MeteredHTTPConnectionPool
 from otter.util.zkpartitioner import Partitioner
 
 assert os.environ.get("PYRSISTENT_NO_C_EXTENSION"), (
@@ -187,22 +191,27 @@ def makeService(config):
     """
     config = dict(config)
     set_config_data(config)
+    validate_read_consistency_config()
 
     parent = MultiService()
 
     region = config_value('region')
 
     seed_endpoints = [
-        clientFromString(reactor, str(host))
+        (str(host), clientFromString(reactor, str(host)))
         for host in config_value('cassandra.seed_hosts')]
 
+    cassandra_pool = PooledCassandraCluster(
+        seed_endpoints,
+        config_value('cassandra.keyspace'),
+        connections_per_host=(
+            config_value('cassandra.connections_per_host') or 1),
+        max_in_flight=config_value('cassandra.max_in_flight_per_connection'),
+        disconnect_on_cancel=True)
     cassandra_cluster = LoggingCQLClient(
         TimingOutCQLClient(
             reactor,
-            RoundRobinCassandraCluster(
-                seed_endpoints,
-                config_value('cassandra.keyspace'),
-                disconnect_on_cancel=True),
+            cassandra_pool,
             config_value('cassandra.timeout') or 30),
         log.bind(system='otter.silverberg'))
 
@@ -210,6 +219,13 @@ def makeService(config):
         cassandra_cluster, reactor, config_value('limits.absolute.maxGroups'))
     admin_store = CassAdmin(cassandra_cluster)
 
+    http_pool = MeteredHTTPConnectionPool(
+        reactor,
+        max_persistent_per_host=(
+            config_value('http.max_persistent_per_host') or 10),
+        idle_timeout=config_value('http.idle_timeout') or 240)
+    logging_treq.set_pool(http_pool)
+
     bobby_url = config_value('bobby_url')
     if bobby_url is not None:
         set_bobby(BobbyClient(bobby_url))
@@ -226,7 +242,9 @@ def makeService(config):
     health_checker = HealthChecker(reactor, {
         'store': getattr(store, 'health_check', None),
         'kazoo': store.kazoo_health_check,
-        'supervisor': supervisor.health_check
+        'supervisor': supervisor.health_check,
+        'cassandra_pool': cassandra_pool.health_check,
+        'http_pool': http_pool.health_check
     })
 
     # Setup cassandra cluster to disconnect when otter shuts down
@@ -234,6 +252,10 @@ def makeService(config):
         parent.addService(FunctionalService(stop=partial(
             call_after_supervisor, cassandra_cluster.disconnect, supervisor)))
 
+    # Close idle outbound HTTP connections when otter shuts down
+    parent.addService(FunctionalService(stop=partial(
+        call_after_supervisor, http_pool.closeCachedConnections, supervisor)))
+
     otter = Otter(store, region, health_checker.health_check)
     site = Site(otter.app.resource())
     site.displayTracebacks = False
@@ -305,7 +327,7 @@ def makeService(config):
                 stop=partial(call_after_supervisor,
                              kz_client.stop, supervisor)))
 
-            setup_converger(
+            converger = setup_converger(
                 parent, kz_client, dispatcher,
                 config_value('converger.interval') or 10,
                 config_value('converger.build_timeout') or 3600,
@@ -314,7 +336,7 @@ def makeService(config):
 
             # Setup selfheal service
             sh_svc = setup_selfheal_service(
-                reactor, config, dispatcher, health_checker, log)
+                reactor, config, dispatcher, log, converger)
             if sh_svc is not None:
                 parent.addService(sh_svc)
 
@@ -324,16 +346,16 @@ def makeService(config):
     return parent
 
 
-def setup_selfheal_service(clock, config, dispatcher, health_checker, log):
+def setup_selfheal_service(clock, config, dispatcher, log, converger):
     """
-    Setup selfheal timer service and return it.
+    Setup selfheal timer service and return it. The service triggers
+    convergence on groups in buckets allocated to the converger.
 
     :param clock: :obj:`IReactorTime` provider
     :param dict config: Configuration dict containing selfheal info
     :param dispatcher: Effect dispatcher
-    :param health_checker: ``HealthChecker`` object where SelfHeal's health
-        check will be added
     :param log: :obj:`BoundLog` logger used by service
+    :param converger: :obj:`Converger` service of this node
 
     :return: selfheal service or None if relevant config is not found
     :rtype: :obj:`IService`
@@ -341,12 +363,11 @@ def setup_selfheal_service(clock, config, dispatcher, health_checker, log):
     if "selfheal" not in config:
         return None
     interval = get_in(["selfheal", "interval"], config, no_default=True)
-    selfheal = SelfHeal(clock, dispatcher, config_value, interval, log)
-    func, lock = zk.locked_logged_func(
-        dispatcher, "/selfheallock", log, "selfheal-lock-acquired",
-        selfheal.setup)
-    health_checker.checks["selfheal"] = zk.create_health_check(lock)
-    sh_timer = TimerService(interval, func)
+    selfheal = SelfHeal(clock, dispatcher, config_value, interval, log,
+                        converger.recently_converged,
+                        get_in(["selfheal", "max_rate"], config),
+                        converger.my_buckets)
+    sh_timer = TimerService(interval, selfheal.setup)
     sh_timer.clock = clock
     return sh_timer
 
@@ -356,6 +377,8 @@ def setup_converger(parent, kz_client, dispatcher, interval, build_timeout,
     """
     Create a Converger service, which has a Partitioner as a child service, so
     that if the Converger is stopped, the partitioner is also stopped.
+
+    :return: The :obj:`Converger`
     """
     partitioner_factory = partial(
         Partitioner,
@@ -363,11 +386,17 @@ def setup_converger(parent, kz_client, dispatcher, interval, build_timeout,
         interval=interval,
         partitioner_path=CONVERGENCE_PARTITIONER_PATH,
         time_boundary=15,  # time boundary
+        partition_func=ring_partitioner(),
     )
-    cvg = Converger(log, dispatcher, 10, partitioner_factory, build_timeout,
-                    interval / 2, limited_retry_iterations, step_limits)
+    cvg = Converger(log, dispatcher, get_num_buckets(), partitioner_factory,
+                    build_timeout, interval / 2, limited_retry_iterations,
+                    step_limits,
+                    watch_children=partial(watch_children, kz_client),
+                    recently_converged_retention=config_value(
+                        'selfheal.interval'))
     cvg.setServiceParent(parent)
     watch_children(kz_client, CONVERGENCE_DIRTY_DIR, cvg.divergent_changed)
+    return cvg
 
 
 def setup_scheduler(parent, dispatcher, store, kz_client):
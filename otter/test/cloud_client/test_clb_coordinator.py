@@ -0,0 +1,232 @@
+"""Tests for otter.cloud_client.clb_coordinator"""
+
+from effect import (
+    ComposedDispatcher, Constant, Effect, Error, TypeDispatcher,
+    base_dispatcher)
+
+from twisted.internet.defer import Deferred
+from twisted.internet.task import Clock
+from twisted.trial.unittest import SynchronousTestCase
+
+from txeffect import perform
+
+from otter.cloud_client import service_request
+from otter.cloud_client.clb_coordinator import (
+    CLBMutationCoordinator,
+    CoordinatedCLBMutation,
+    clb_mutation_lb_id,
+    coordinated_clb_mutation,
+    perform_coordinated_clb_mutation)
+from otter.constants import ServiceType
+from otter.util.http import APIError
+
+
+def clb_request(method, url, **kwargs):
+    """Return CLB :obj:`ServiceRequest`"""
+    return service_request(
+        ServiceType.CLOUD_LOAD_BALANCERS, method, url, **kwargs).intent
+
+
+def add_request(*addresses):
+    """Return request adding nodes of given addresses to CLB 5"""
+    return clb_request(
+        'POST', 'loadbalancers/5/nodes',
+        data={'nodes': [{'address': a, 'port': 80} for a in addresses]})
+
+
+def remove_request(*ids):
+    """Return request removing nodes of given IDs from CLB 5"""
+    return clb_request('DELETE', 'loadbalancers/5/nodes',
+                       params={'id': list(ids)})
+
+
+class CLBMutationLBIDTests(SynchronousTestCase):
+    """Tests for :func:`clb_mutation_lb_id`"""
+
+    def test_mutations(self):
+        """
+        Returns CLB ID of requests adding, changing or removing nodes.
+        """
+        self.assertEqual(
+            clb_mutation_lb_id(clb_request('POST', 'loadbalancers/5/nodes')),
+            '5')
+        self.assertEqual(
+            clb_mutation_lb_id(
+                clb_request('DELETE', 'loadbalancers/5/nodes')),
+            '5')
+        self.assertEqual(
+            clb_mutation_lb_id(clb_request('PUT', 'loadbalancers/5/nodes/2')),
+            '5')
+
+    def test_others(self):
+        """
+        Returns None for other requests.
+        """
+        self.assertIsNone(
+            clb_mutation_lb_id(clb_request('GET', 'loadbalancers/5/nodes')))
+        self.assertIsNone(
+            clb_mutation_lb_id(clb_request('PUT', 'loadbalancers/5')))
+        self.assertIsNone(
+            clb_mutation_lb_id(
+                service_request(ServiceType.CLOUD_SERVERS, 'POST',
+                                'loadbalancers/5/nodes').intent))
+
+
+class CLBMutationCoordinatorTests(SynchronousTestCase):
+    """Tests for :obj:`CLBMutationCoordinator`"""
+
+    def setUp(self):
+        self.clock = Clock()
+        self.coordinator = CLBMutationCoordinator(self.clock, lambda: 2,
+                                                  max_immutable_retries=1)
+        self.performed = []
+
+    def perform(self, request):
+        """Record request and return Deferred of its result"""
+        d = Deferred()
+        self.performed.append((request, d))
+        return d
+
+    def submit(self, request, key='lb'):
+        return self.coordinator.submit(key, request, self.perform)
+
+    def test_serialized_with_delay(self):
+        """
+        Requests of a CLB are made one after the other, waiting between them.
+        Requests of other CLBs are made independently.
+        """
+        d1 = self.submit(clb_request('PUT', 'loadbalancers/5/nodes/1'))
+        d2 = self.submit(clb_request('PUT', 'loadbalancers/5/nodes/2'))
+        d3 = self.submit(clb_request('PUT', 'loadbalancers/6/nodes/3'), 'lb2')
+        self.assertEqual(len(self.performed), 2)
+        self.assertEqual(self.coordinator.stats(),
+                         {'busy_clbs': 2, 'waiting': 1})
+        self.performed[0][1].callback('r1')
+        self.assertEqual(self.successResultOf(d1), 'r1')
+        self.assertEqual(len(self.performed), 2)
+        self.clock.advance(2)
+        self.assertEqual(len(self.performed), 3)
+        self.assertEqual(self.performed[2][0].url, 'loadbalancers/5/nodes/2')
+        self.performed[2][1].callback('r2')
+        self.assertEqual(self.successResultOf(d2), 'r2')
+        self.assertNoResult(d3)
+        self.clock.advance(2)
+        self.assertEqual(self.coordinator.stats(),
+                         {'busy_clbs': 1, 'waiting': 0})
+
+    def test_adds_merged(self):
+        """
+        Queued requests adding nodes are merged into one request and each
+        gets the nodes it asked for from its response.
+        """
+        self.submit(clb_request('PUT', 'loadbalancers/5/nodes/1'))
+        d1 = self.submit(add_request('a', 'b'))
+        self.submit(remove_request('1'))
+        d2 = self.submit(add_request('c'))
+        self.performed[0][1].callback('r')
+        self.clock.advance(2)
+        request, d = self.performed[1]
+        self.assertEqual(request, add_request('a', 'b', 'c'))
+        d.callback(('resp', {'nodes': [{'address': 'a', 'port': 80},
+                                       {'address': 'b', 'port': 80},
+                                       {'address': 'c', 'port': 80}]}))
+        self.assertEqual(
+            self.successResultOf(d1),
+            ('resp', {'nodes': [{'address': 'a', 'port': 80},
+                                {'address': 'b', 'port': 80}]}))
+        self.assertEqual(
+            self.successResultOf(d2),
+            ('resp', {'nodes': [{'address': 'c', 'port': 80}]}))
+        self.clock.advance(2)
+        self.assertEqual(self.performed[2][0], remove_request('1'))
+
+    def test_removes_merged_within_limit(self):
+        """
+        Queued requests removing nodes are merged as long as they remove at
+        most 10 nodes in total.
+        """
+        self.submit(clb_request('PUT', 'loadbalancers/5/nodes/1'))
+        d1 = self.submit(remove_request(*map(str, range(4))))
+        d2 = self.submit(remove_request(*map(str, range(4, 8))))
+        self.submit(remove_request(*map(str, range(8, 12))))
+        self.performed[0][1].callback('r')
+        self.clock.advance(2)
+        request, d = self.performed[1]
+        self.assertEqual(request, remove_request(*map(str, range(8))))
+        d.callback(('resp', ''))
+        self.assertEqual(self.successResultOf(d1), ('resp', ''))
+        self.assertEqual(self.successResultOf(d2), ('resp', ''))
+        self.clock.advance(2)
+        self.assertEqual(self.performed[2][0],
+                         remove_request(*map(str, range(8, 12))))
+
+    def test_pending_update_retried(self):
+        """
+        Request rejected since CLB is in PENDING_UPDATE is retried after
+        delay up to configured times.
+        """
+        d = self.submit(add_request('a'))
+        body = ("Load Balancer '5' has a status of 'PENDING_UPDATE' and is "
+                "considered immutable.")
+        self.performed[0][1].errback(APIError(422, body))
+        self.assertNoResult(d)
+        self.clock.advance(2)
+        self.assertEqual(self.performed[1][0], add_request('a'))
+        self.performed[1][1].errback(APIError(422, body))
+        self.failureResultOf(d, APIError)
+
+    def test_merged_failure_made_separately(self):
+        """
+        If a merged request fails then the requests are made again
+        separately.
+        """
+        self.submit(clb_request('PUT', 'loadbalancers/5/nodes/1'))
+        d1 = self.submit(add_request('a'))
+        d2 = self.submit(add_request('b'))
+        self.performed[0][1].callback('r')
+        self.clock.advance(2)
+        self.performed[1][1].errback(APIError(422, 'duplicate'))
+        self.assertNoResult(d1)
+        self.clock.advance(2)
+        self.assertEqual(self.performed[2][0], add_request('a'))
+        self.performed[2][1].errback(APIError(422, 'duplicate'))
+        self.failureResultOf(d1, APIError)
+        self.clock.advance(2)
+        self.assertEqual(self.performed[3][0], add_request('b'))
+        self.performed[3][1].callback(('resp', {'nodes': []}))
+        self.assertEqual(self.successResultOf(d2), ('resp', {'nodes': []}))
+
+
+class PerformCoordinatedCLBMutationTests(SynchronousTestCase):
+    """Tests for :func:`perform_coordinated_clb_mutation`"""
+
+    def test_perform(self):
+        """
+        The request is submitted to the coordinator and its concretized
+        effect is performed with the dispatcher.
+        """
+        coordinator = CLBMutationCoordinator(Clock(), lambda: 0)
+        request = add_request('a')
+        dispatcher = ComposedDispatcher([
+            TypeDispatcher({
+                CoordinatedCLBMutation: perform_coordinated_clb_mutation}),
+            base_dispatcher])
+        eff = coordinated_clb_mutation(
+            coordinator, 'lb', request,
+            lambda r: Effect(Constant(('done', r))))
+        self.assertEqual(self.successResultOf(perform(dispatcher, eff)),
+                         ('done', request))
+
+    def test_failure(self):
+        """
+        Failure of the concretized effect fails the intent.
+        """
+        coordinator = CLBMutationCoordinator(Clock(), lambda: 0)
+        dispatcher = ComposedDispatcher([
+            TypeDispatcher({
+                CoordinatedCLBMutation: perform_coordinated_clb_mutation}),
+            base_dispatcher])
+        eff = coordinated_clb_mutation(
+            coordinator, 'lb', add_request('a'),
+            lambda r: Effect(Error(ValueError('a'))))
+        self.failureResultOf(perform(dispatcher, eff), ValueError)
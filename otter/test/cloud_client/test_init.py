@@ -11,7 +11,8 @@ from effect import (
     TypeDispatcher,
     base_dispatcher,
     raise_,
-    sync_perform)
+    sync_perform,
+    sync_performer)
 from effect.testing import EQFDispatcher, SequenceDispatcher, perform_sequence
 
 import mock
@@ -20,6 +21,7 @@ import six
 
 from toolz.dicttoolz import assoc
 
+from twisted.internet.defer import Deferred
 from twisted.internet.task import Clock
 from twisted.trial.unittest import SynchronousTestCase
 
@@ -53,6 +55,8 @@ from otter.cloud_client import (
     service_request,
     set_nova_metadata_item,
     update_stack)
+from otter.cloud_client.clb_coordinator import (
+    CoordinatedCLBMutation, perform_coordinated_clb_mutation)
 from otter.constants import ServiceType
 from otter.log.intents import Log
 from otter.test.utils import (
@@ -65,7 +69,7 @@ from otter.test.worker.test_launch_server_v1 import fake_service_catalog
 from otter.util.config import set_config_data
 from otter.util.http import APIError, headers
 from otter.util.pure_http import Request, has_code
-from otter.util.weaklocks import WeakLocks
+from otter.util.ratelimit import TokenBuckets
 
 
 def make_service_configs():
@@ -230,7 +234,23 @@ class PerformServiceRequestTests(SynchronousTestCase):
         self.assertEqual(
             next_eff.intent,
             Request(method='GET', url='http://dfw.openstack/servers',
-                    headers=headers('token'), log=self.log))
+                    headers=headers('token'), log=self.log,
+                    json_items={}))
+
+    def test_json_items(self):
+        """
+        ``json_items`` of the service request is passed on to the HTTP request
+        if the response is JSON and None is passed otherwise.
+        """
+        items = {'servers': lambda s: s['id']}
+        eff = service_request(ServiceType.CLOUD_SERVERS, 'GET', 'servers',
+                              json_items=items)
+        next_eff = resolve_authenticate(self._concrete(eff.intent))
+        self.assertIs(next_eff.intent.json_items, items)
+        eff = service_request(ServiceType.CLOUD_SERVERS, 'GET', 'servers',
+                              json_response=False)
+        next_eff = resolve_authenticate(self._concrete(eff.intent))
+        self.assertIsNone(next_eff.intent.json_items)
 
     def test_invalidate_on_auth_error_code(self):
         """
@@ -257,7 +277,8 @@ class PerformServiceRequestTests(SynchronousTestCase):
         self.assertEqual(
             next_eff.intent,
             Request(method='GET', url='myurl/servers',
-                    headers=headers('token'), log=self.log))
+                    headers=headers('token'), log=self.log,
+                    json_items={}))
 
     def test_json(self):
         """
@@ -339,7 +360,8 @@ class PerformServiceRequestTests(SynchronousTestCase):
                                log=self.log),
                   lambda i: ('token', fake_service_catalog)),
                  (Request(method='GET', url='http://dfw.openstack/servers',
-                          headers=headers('token'), log=self.log),
+                          headers=headers('token'), log=self.log,
+                          json_items={}),
                   lambda i: response),
              ])),
         ])
@@ -377,13 +399,14 @@ class DefaultThrottlerTests(SynchronousTestCase):
     def test_mismatch(self):
         """policy doesn't have a throttler for random junk."""
         bracket = _default_throttler(
-            WeakLocks(), None, 'foo', 'get', 'any-tenant')
+            TokenBuckets(Clock()), 'foo', 'get', 'any-tenant')
         self.assertIs(bracket, None)
 
     def test_no_config(self):
         """ No config results in no throttling """
         bracket = _default_throttler(
-            WeakLocks(), None, ServiceType.CLOUD_SERVERS, 'get', 'any-tenant')
+            TokenBuckets(Clock()), ServiceType.CLOUD_SERVERS, 'get',
+            'any-tenant')
         self.assertIs(bracket, None)
 
     def test_post_and_delete_not_the_same(self):
@@ -393,66 +416,117 @@ class DefaultThrottlerTests(SynchronousTestCase):
         set_config_data(
             {"cloud_client": {"throttling": {"create_server_delay": 1,
                                              "delete_server_delay": 0.4}}})
-        clock = Clock()
-        locks = WeakLocks()
+        buckets = TokenBuckets(Clock())
         deleter = _default_throttler(
-            locks, clock, ServiceType.CLOUD_SERVERS, 'delete', 'any-tenant')
+            buckets, ServiceType.CLOUD_SERVERS, 'delete', 'any-tenant')
         poster = _default_throttler(
-            locks, clock, ServiceType.CLOUD_SERVERS, 'post', 'any-tenant')
-        self.assertIsNot(deleter, poster)
+            buckets, ServiceType.CLOUD_SERVERS, 'post', 'any-tenant')
+        self.assertIsNot(deleter.__self__, poster.__self__)
 
     def _test_throttle(self, cfg_name, stype, method):
         """Test a specific throttling configuration."""
-        locks = WeakLocks()
+        clock = Clock()
+        buckets = TokenBuckets(clock)
         set_config_data(
             {'cloud_client': {'throttling': {cfg_name: 500}}})
         self.addCleanup(set_config_data, {})
-        clock = Clock()
-        bracket = _default_throttler(locks, clock, stype, method, 'tenant1')
+        bracket = _default_throttler(buckets, stype, method, 'tenant1')
         if bracket is None:
             self.fail("No throttler for %s and %s" % (stype, method))
+        self.assertEqual(bracket.__self__.base_rate, 1 / 500.0)
+        self.assertEqual(bracket.__self__.max_rate, 2 / 500.0)
         d = bracket(lambda: 'foo')
-        clock.advance(499)
-        self.assertNoResult(d)
-        clock.advance(500)
         self.assertEqual(self.successResultOf(d), 'foo')
 
-        # also make sure that the lock is shared between different calls to the
-        # throttler.
-        bracket1 = _default_throttler(locks, clock, stype, method, 'tenant1')
+        # also make sure that the bucket is shared between different calls to
+        # the throttler.
+        bracket1 = _default_throttler(buckets, stype, method, 'tenant1')
         result1 = bracket1(lambda: 'bar1')
-        bracket2 = _default_throttler(locks, clock, stype, method, 'tenant1')
+        bracket2 = _default_throttler(buckets, stype, method, 'tenant1')
         result2 = bracket2(lambda: 'bar2')
-        clock.advance(499)
+        self.assertIs(bracket1.__self__, bracket2.__self__)
         self.assertNoResult(result1)
         self.assertNoResult(result2)
-        clock.advance(1)
+        # rate has gone up by a tenth after the successful call
+        clock.advance(500 / 1.1)
         self.assertEqual(self.successResultOf(result1), 'bar1')
         self.assertNoResult(result2)
-        clock.advance(500)
+        clock.advance(500 / 1.2)
         self.assertEqual(self.successResultOf(result2), 'bar2')
 
     def _test_tenant(self, cfg_name, stype, method):
         """
-        Test a specific throttling configuration, and ensure that locks are
+        Test a specific throttling configuration, and ensure that buckets are
         per-tenant.
         """
-        locks = WeakLocks()
+        clock = Clock()
+        buckets = TokenBuckets(clock)
         set_config_data(
             {'cloud_client': {'throttling': {cfg_name: 500}}})
         self.addCleanup(set_config_data, {})
-        clock = Clock()
-        bracket1 = _default_throttler(locks, clock, stype, method, 'tenant1')
+        bracket1 = _default_throttler(buckets, stype, method, 'tenant1')
         if bracket1 is None:
             self.fail("No throttler for %s and %s" % (stype, method))
-        result1 = bracket1(lambda: 'bar1')
-        bracket2 = _default_throttler(locks, clock, stype, method, 'tenant2')
-        result2 = bracket2(lambda: 'bar2')
-        self.assertNoResult(result1)
-        self.assertNoResult(result2)
-        clock.advance(500)
-        self.assertEqual(self.successResultOf(result1), 'bar1')
-        self.assertEqual(self.successResultOf(result2), 'bar2')
+        bracket2 = _default_throttler(buckets, stype, method, 'tenant2')
+        self.assertIsNot(bracket1.__self__, bracket2.__self__)
+        # Both tenants can make a request right away
+        self.assertEqual(self.successResultOf(bracket1(lambda: 'bar1')),
+                         'bar1')
+        self.assertEqual(self.successResultOf(bracket2(lambda: 'bar2')),
+                         'bar2')
+
+    def test_max_rate_configurable(self):
+        """
+        Maximum rate is the rate given by the delay multiplied by
+        ``max_rate_factor`` config.
+        """
+        set_config_data(
+            {'cloud_client': {'throttling': {'create_server_delay': 2,
+                                             'max_rate_factor': 4}}})
+        self.addCleanup(set_config_data, {})
+        bracket = _default_throttler(
+            TokenBuckets(Clock()), ServiceType.CLOUD_SERVERS, 'post',
+            'tenant1')
+        self.assertEqual(bracket.__self__.max_rate, 2)
+
+    def test_delay_changed(self):
+        """
+        The bucket is recreated with the new rate when configured delay
+        changes.
+        """
+        buckets = TokenBuckets(Clock())
+        set_config_data(
+            {'cloud_client': {'throttling': {'create_server_delay': 2}}})
+        self.addCleanup(set_config_data, {})
+        bracket1 = _default_throttler(
+            buckets, ServiceType.CLOUD_SERVERS, 'post', 'tenant1')
+        set_config_data(
+            {'cloud_client': {'throttling': {'create_server_delay': 4}}})
+        bracket2 = _default_throttler(
+            buckets, ServiceType.CLOUD_SERVERS, 'post', 'tenant1')
+        self.assertIsNot(bracket1.__self__, bracket2.__self__)
+        self.assertEqual(bracket2.__self__.base_rate, 0.25)
+
+    def test_one_request_at_a_time(self):
+        """
+        A request of a bucket is not made until the previous one finishes,
+        even if the rate allows it.
+        """
+        set_config_data(
+            {'cloud_client': {'throttling': {'create_server_delay': 1}}})
+        self.addCleanup(set_config_data, {})
+        clock = Clock()
+        bracket = _default_throttler(
+            TokenBuckets(clock), ServiceType.CLOUD_SERVERS, 'post', 't1')
+        first = Deferred()
+        calls = []
+        bracket(lambda: first)
+        d = bracket(lambda: calls.append('second'))
+        clock.advance(10)
+        self.assertEqual(calls, [])
+        first.callback(None)
+        self.assertEqual(calls, ['second'])
+        self.successResultOf(d)
 
     def test_delay_configurable(self):
         """Delays are configurable."""
@@ -481,7 +555,7 @@ class DefaultThrottlerTests(SynchronousTestCase):
         self._test_throttle(
             'delete_rcv3_delay', ServiceType.RACKCONNECT_V3, 'delete')
 
-    def test_tenant_specific_locking(self):
+    def test_tenant_specific_buckets(self):
         self._test_tenant(
             'get_clb_delay', ServiceType.CLOUD_LOAD_BALANCERS, 'get')
         self._test_tenant(
@@ -502,16 +576,26 @@ class GetCloudClientDispatcherTests(SynchronousTestCase):
                              effect=Effect(Constant('foo')))
         self.assertIs(dispatcher(throttle), _perform_throttle)
 
-    @mock.patch('twisted.internet.defer.DeferredLock.run')
-    def test_performs_tenant_scope(self, deferred_lock_run):
+    def test_performs_coordinated_clb_mutation(self):
+        """
+        :func:`perform_coordinated_clb_mutation` performs
+        :obj:`CoordinatedCLBMutation`.
+        """
+        dispatcher = get_cloud_client_dispatcher(None, None, None, None)
+        self.assertIs(
+            dispatcher(CoordinatedCLBMutation(None, None, None, None)),
+            perform_coordinated_clb_mutation)
+
+    @mock.patch('otter.util.ratelimit.TokenBucket.run')
+    def test_performs_tenant_scope(self, bucket_run):
         """
         :func:`perform_tenant_scope` performs :obj:`TenantScope`, and uses the
         default throttler
         """
         # We want to ensure
         # 1. the TenantScope can be performed
-        # 2. the ServiceRequest is run within a lock, since it matches the
-        #    default throttling policy
+        # 2. the ServiceRequest is run within a token bucket, since it matches
+        #    the default throttling policy
 
         set_config_data(
             {"cloud_client": {"throttling": {"create_server_delay": 1,
@@ -530,7 +614,7 @@ class GetCloudClientDispatcherTests(SynchronousTestCase):
             result.addCallback(
                 lambda x: (x[0], assoc(x[1], 'locked', True)))
             return result
-        deferred_lock_run.side_effect = run
+        bucket_run.side_effect = run
 
         response = stub_pure_response({}, 200)
         seq = SequenceDispatcher([
@@ -538,15 +622,14 @@ class GetCloudClientDispatcherTests(SynchronousTestCase):
                           tenant_id='111', log=log),
              lambda i: ('token', fake_service_catalog)),
             (Request(method='POST', url='http://dfw.openstack/servers',
-                     headers=headers('token'), log=log),
+                     headers=headers('token'), log=log,
+                     json_items={}),
              lambda i: response),
         ])
 
         disp = ComposedDispatcher([seq, dispatcher])
         with seq.consume():
             result = perform(disp, Effect(tscope))
-            self.assertNoResult(result)
-            clock.advance(1)
             self.assertEqual(self.successResultOf(result),
                              (response[0], {'locked': True}))
 
@@ -566,6 +649,7 @@ class PerformTenantScopeTests(SynchronousTestCase):
             return Effect(Constant(('concretized', au, lo, smap, throttler,
                                     tenid, srvreq)))
 
+        self.concretize = concretize
         self.dispatcher = ComposedDispatcher([
             TypeDispatcher({
                 TenantScope: partial(perform_tenant_scope, self.authenticator,
@@ -606,6 +690,42 @@ class PerformTenantScopeTests(SynchronousTestCase):
             ('concretized', self.authenticator, self.log, self.service_configs,
              self.throttler, 1, ereq.intent))
 
+    def test_clb_mutation_coordinated(self):
+        """
+        When given a CLB coordinator, requests changing CLB nodes are made
+        through it while other requests are concretized as usual.
+        """
+        coordinator = object()
+
+        @sync_performer
+        def coordinate(dispatcher, intent):
+            return (intent.coordinator, intent.key, intent.request,
+                    sync_perform(dispatcher,
+                                 intent.concretize(intent.request)))
+
+        dispatcher = ComposedDispatcher([
+            TypeDispatcher({
+                TenantScope: partial(
+                    perform_tenant_scope, self.authenticator, self.log,
+                    self.service_configs, self.throttler,
+                    _concretize=self.concretize,
+                    clb_coordinator=coordinator),
+                CoordinatedCLBMutation: coordinate}),
+            base_dispatcher])
+        ereq = service_request(ServiceType.CLOUD_LOAD_BALANCERS, 'POST',
+                               'loadbalancers/5/nodes')
+        self.assertEqual(
+            sync_perform(dispatcher, Effect(TenantScope(ereq, 1))),
+            (coordinator, (1, '5'), ereq.intent,
+             ('concretized', self.authenticator, self.log,
+              self.service_configs, self.throttler, 1, ereq.intent)))
+        ereq = service_request(ServiceType.CLOUD_LOAD_BALANCERS, 'GET',
+                               'loadbalancers/5/nodes')
+        self.assertEqual(
+            sync_perform(dispatcher, Effect(TenantScope(ereq, 1))),
+            ('concretized', self.authenticator, self.log, self.service_configs,
+             self.throttler, 1, ereq.intent))
+
 
 class NovaClientTests(SynchronousTestCase):
     """
@@ -977,6 +1097,32 @@ class NovaClientTests(SynchronousTestCase):
         result = perform_sequence(seq, eff)
         self.assertEqual(result, ['1', '2', '3', '4', '5', '6'])
 
+    def test_list_servers_details_all_filters_each_page(self):
+        """
+        :func:`list_servers_details_all` keeps only the servers of each page
+        that ``server_filter`` returns True for.
+        """
+        bodies = [
+            {'servers': ['1', '2'],
+             'servers_links': [{'href': 'doesnt_matter_url?marker=3',
+                                'rel': 'next'}]},
+            {'servers': ['3', '4'], 'servers_links': []}
+        ]
+        resps = [json.dumps(d) for d in bodies]
+
+        eff = list_servers_details_all({'marker': ['1']},
+                                       lambda s: s in ('1', '4'))
+        seq = [
+            (self._list_server_details_intent({'marker': ['1']}),
+             service_request_eqf(stub_pure_response(resps[0], 200))),
+            (self._list_server_details_log_intent(bodies[0]), lambda _: None),
+            (self._list_server_details_intent({'marker': ['3']}),
+             service_request_eqf(stub_pure_response(resps[1], 200))),
+            (self._list_server_details_log_intent(bodies[1]), lambda _: None)
+        ]
+        result = perform_sequence(seq, eff)
+        self.assertEqual(result, ['1', '4'])
+
     def test_list_servers_details_all_blows_up_if_got_same_link_twice(self):
         """
         :func:`list_servers_details_all` raises an exception if Nova returns
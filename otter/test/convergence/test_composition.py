@@ -6,6 +6,7 @@ from pyrsistent import pset
 
 from twisted.trial.unittest import SynchronousTestCase
 
+from otter.convergence import composition
 from otter.convergence.composition import (
     get_desired_server_group_state,
     get_desired_stack_group_state,
@@ -181,6 +182,19 @@ class FeatureFlagTest(SynchronousTestCase):
                                            get_config_value),
                          False)
 
+    def test_same_list_set_reused(self):
+        """
+        The set of disabled tenants is built once for the same list and
+        rebuilt when the list changes
+        """
+        tenants = ['t1', 't2']
+        self.assertFalse(tenant_is_enabled('t1', lambda k: tenants))
+        tenants_set = composition._disabled_tenants[1]
+        self.assertEqual(tenants_set, frozenset(tenants))
+        self.assertTrue(tenant_is_enabled('t3', lambda k: tenants))
+        self.assertIs(composition._disabled_tenants[1], tenants_set)
+        self.assertTrue(tenant_is_enabled('t1', lambda k: ['t2']))
+
     def test_unconfigured(self):
         """
         When no `non-convergence-tenants` key is available in the config,
@@ -4,24 +4,35 @@ from effect import Constant, Effect, Error, ParallelEffects, sync_perform
 
 from testtools.matchers import MatchesException
 
+from twisted.internet.task import Clock
 from twisted.trial.unittest import SynchronousTestCase
 
 from otter.convergence.effecting import steps_to_effect
 from otter.convergence.model import ErrorReason, StepResult
+from otter.convergence.profiling import (
+    ConvergenceProfiler, get_profiling_dispatcher)
 from otter.test.utils import TestStep, matches, test_dispatcher
 
 
 class StepsToEffectTests(SynchronousTestCase):
     """Tests for :func:`steps_to_effect`"""
     def test_uses_step_request(self):
-        """Steps are converted to requests."""
+        """
+        Steps are converted to requests and the time taken by them is
+        recorded against their step type.
+        """
         steps = [TestStep(Effect(Constant((StepResult.SUCCESS, 'foo')))),
                  TestStep(Effect(Error(RuntimeError('uh oh'))))]
         effect = steps_to_effect(steps)
         self.assertIs(type(effect.intent), ParallelEffects)
         expected_exc_info = matches(MatchesException(RuntimeError('uh oh')))
+        profiler = ConvergenceProfiler()
+        disp = test_dispatcher(get_profiling_dispatcher(Clock(), profiler))
         self.assertEqual(
-            sync_perform(test_dispatcher(), effect),
+            sync_perform(disp, effect),
             [(StepResult.SUCCESS, 'foo'),
              (StepResult.RETRY,
               [ErrorReason.Exception(expected_exc_info)])])
+        self.assertEqual(
+            [(p['phase'], p['count']) for p in profiler.top_phases(10)],
+            [('execute.TestStep', 2)])
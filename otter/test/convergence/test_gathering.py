@@ -16,7 +16,7 @@ from effect import (
 
 from effect.async import perform_parallel_async
 from effect.testing import (
-    EQDispatcher, EQFDispatcher, Stub, intent_func, nested_sequence,
+    EQDispatcher, EQFDispatcher, Stub, const, intent_func, nested_sequence,
     parallel_sequence, perform_sequence)
 
 import mock
@@ -62,8 +62,10 @@ from otter.test.utils import (
     patch,
     resolve_stubs,
     server,
-    stack
+    stack,
+    timed_sequence
 )
+from otter.util.config import set_config_data
 from otter.util.retry import (
     Retry, ShouldDelayAndRetry, exponential_backoff_interval, retry_times)
 from otter.util.timestamp import timestamp_to_epoch
@@ -104,8 +106,9 @@ class GetAllServerDetailsTests(SynchronousTestCase):
         :func:`get_all_server_details` called with arguments will use a default
         batch size.
         """
-        self.assertEqual(get_all_server_details().intent,
-                         service_request(**svc_request_args(limit=100)).intent)
+        self.assertEqual(
+            get_all_server_details().intent,
+            service_request(**svc_request_args(limit=1000)).intent)
 
     def test_respects_batch_size_and_changes_since(self):
         """
@@ -120,6 +123,31 @@ class GetAllServerDetailsTests(SynchronousTestCase):
                 **svc_request_args(limit=10, changes_since=since)).intent
         )
 
+    def test_batch_size_from_config(self):
+        """
+        :func:`get_all_server_details` uses batch size from
+        ``cloud_client.servers_page_size`` config if it is set.
+        """
+        set_config_data({'cloud_client': {'servers_page_size': 50}})
+        self.addCleanup(set_config_data, {})
+        self.assertEqual(get_all_server_details().intent,
+                         service_request(**svc_request_args(limit=50)).intent)
+
+    def test_server_filter(self):
+        """
+        Servers are filtered with ``server_filter`` as they are received.
+        """
+        body = {'servers': [{'id': i} for i in range(5)]}
+        eff = get_all_server_details(
+            batch_size=10, server_filter=lambda s: s['id'] % 2 == 0)
+        sequence = [
+            (service_request(**svc_request_args(limit=10)).intent,
+             lambda i: (StubResponse(200, None), body)),
+            (Log(mock.ANY, mock.ANY), lambda i: None)
+        ]
+        self.assertEqual(perform_sequence(sequence, eff),
+                         [{'id': 0}, {'id': 2}, {'id': 4}])
+
 
 class GetAllScalingGroupServersTests(SynchronousTestCase):
     """
@@ -129,7 +157,7 @@ class GetAllScalingGroupServersTests(SynchronousTestCase):
     def setUp(self):
         """Save basic reused data."""
         self.req = (ServiceType.CLOUD_SERVERS, 'GET',
-                    'servers/detail', None, None, {'limit': ['100']})
+                    'servers/detail', None, None, {'limit': ['1000']})
 
     def test_with_changes_since(self):
         """
@@ -141,7 +169,7 @@ class GetAllScalingGroupServersTests(SynchronousTestCase):
 
         sequence = [
             (service_request(
-                **svc_request_args(changes_since=since, limit=100)).intent,
+                **svc_request_args(changes_since=since, limit=1000)).intent,
              lambda i: (StubResponse(200, None), body)),
             (Log(mock.ANY, mock.ANY), lambda i: None)
         ]
@@ -239,7 +267,11 @@ class GetScalingGroupServersTests(SynchronousTestCase):
         return get_scaling_group_servers(
             'tid', 'gid', self.now, cache_class=EffectServersCache,
             all_as_servers=intent_func("all-as"),
-            all_servers=intent_func("alls"))
+            all_servers=self._all_servers)
+
+    def _all_servers(self, server_filter):
+        self.server_filter = server_filter
+        return Effect(("alls",))
 
     def _test_no_cache(self, empty):
         current = [] if empty else [{'id': 'a', 'a': 'b'},
@@ -281,6 +313,12 @@ class GetScalingGroupServersTests(SynchronousTestCase):
         self.assertEqual(
             self.freeze(perform_sequence(sequence, self._invoke())),
             self.freeze([del_cache_server, cache[-1]] + current[0:2]))
+        # Servers in cache or in some group are kept as they are received
+        self.assertTrue(self.server_filter({'id': 'b'}))
+        self.assertTrue(self.server_filter(
+            {'id': 'y', 'metadata': {asmetakey: "other"}}))
+        self.assertFalse(self.server_filter({'id': 'y', 'metadata': {}}))
+        self.assertFalse(self.server_filter({'id': 'y'}))
 
     def test_mark_deleted_servers_precedence(self):
         """
@@ -485,8 +523,9 @@ class GetCLBContentsTests(SynchronousTestCase):
                                [nodes_req(2, [node21, node22])],
                                [lb_hm_req(1, {"type": "CONNECT"})],
                                [lb_hm_req(2, {})]]),
-            parallel_sequence([[node_feed_req('1', '11', '11feed')],
-                               [node_feed_req('2', '22', '22feed')]]),
+            timed_sequence('gather.clb_feeds', [
+                parallel_sequence([[node_feed_req('1', '11', '11feed')],
+                                   [node_feed_req('2', '22', '22feed')]])]),
         ]
         eff = get_clb_contents()
         self.assertEqual(
@@ -504,7 +543,8 @@ class GetCLBContentsTests(SynchronousTestCase):
         seq = [
             lb_req('loadbalancers', True, {'loadBalancers': []}),
             parallel_sequence([]),  # No LBs to fetch
-            parallel_sequence([]),  # No nodes to fetch
+            # No nodes to fetch
+            timed_sequence('gather.clb_feeds', [parallel_sequence([])]),
         ]
         eff = get_clb_contents()
         self.assertEqual(perform_sequence(seq, eff), ([], {}))
@@ -520,7 +560,8 @@ class GetCLBContentsTests(SynchronousTestCase):
                 [nodes_req(1, [])], [nodes_req(2, [])],
                 [lb_hm_req(1, {})], [lb_hm_req(2, {"type": "a"})]
             ]),
-            parallel_sequence([]),  # No nodes to fetch
+            # No nodes to fetch
+            timed_sequence('gather.clb_feeds', [parallel_sequence([])]),
         ]
         self.assertEqual(
             perform_sequence(seq, get_clb_contents()),
@@ -537,7 +578,8 @@ class GetCLBContentsTests(SynchronousTestCase):
                                [nodes_req(2, [node('21', 'a21')])],
                                [lb_hm_req(1, {})],
                                [lb_hm_req(2, {})]]),
-            parallel_sequence([])  # No nodes to fetch
+            # No nodes to fetch
+            timed_sequence('gather.clb_feeds', [parallel_sequence([])])
         ]
         make_desc = partial(CLBDescription, port=20, weight=2,
                             condition=CLBNodeCondition.ENABLED,
@@ -567,7 +609,8 @@ class GetCLBContentsTests(SynchronousTestCase):
                 [lb_req('loadbalancers/2/healthmonitor', True,
                         CLBNotFoundError(lb_id=u'2'))]
             ]),
-            parallel_sequence([])  # No node feeds to fetch
+            # No node feeds to fetch
+            timed_sequence('gather.clb_feeds', [parallel_sequence([])])
         ]
         make_desc = partial(CLBDescription, port=20, weight=2,
                             condition=CLBNodeCondition.ENABLED,
@@ -595,9 +638,10 @@ class GetCLBContentsTests(SynchronousTestCase):
                 [lb_hm_req(1, {"type": "CONNECT"})],
                 [lb_hm_req(2, {"type": "CONNECT"})]
             ]),
-            parallel_sequence([
-                [node_feed_req('1', '11', CLBNotFoundError(lb_id=u'1'))],
-                [node_feed_req('2', '21', '22feed')]]),
+            timed_sequence('gather.clb_feeds', [
+                parallel_sequence([
+                    [node_feed_req('1', '11', CLBNotFoundError(lb_id=u'1'))],
+                    [node_feed_req('2', '21', '22feed')]])]),
         ]
         eff = get_clb_contents()
         self.assertEqual(
@@ -741,6 +785,26 @@ class GetAllLaunchServerDataTests(SynchronousTestCase):
         ]
         self.now = datetime(2010, 10, 20, 03, 30, 00)
 
+    def _invoke(self):
+        return get_all_launch_server_data(
+            'tid', 'gid', self.now,
+            get_scaling_group_servers=intent_func('gsgs'),
+            get_clb_contents=intent_func('gclbc'),
+            get_rcv3_contents=intent_func('grcv3c'))
+
+    def _gather_seq(self, servers, clb_contents, rcv3_nodes):
+        """
+        Return sequence of gathering from each source timed as a separate
+        phase
+        """
+        return [parallel_sequence([
+            [timed_sequence('gather.nova', [
+                (('gsgs', 'tid', 'gid', self.now), const(servers))])],
+            [timed_sequence('gather.clb', [
+                (('gclbc',), const(clb_contents))])],
+            [timed_sequence('gather.rcv3', [
+                (('grcv3c',), const(rcv3_nodes))])]])]
+
     def test_success(self):
         """
         The data is returned as a tuple of ([NovaServer], [CLBNode/RCv3Node]).
@@ -750,15 +814,11 @@ class GetAllLaunchServerDataTests(SynchronousTestCase):
         rcv3_nodes = [RCv3Node(node_id='node2', cloud_server_id='a',
                                description=RCv3Description(lb_id='lb2'))]
 
-        eff = get_all_launch_server_data(
-            'tid',
-            'gid',
-            self.now,
-            get_scaling_group_servers=_constant_as_eff(
-                ('tid', 'gid', self.now), self.servers),
-            get_clb_contents=_constant_as_eff(
-                (), (clb_nodes, {'lb1': CLB(True), 'lb2': CLB(False)})),
-            get_rcv3_contents=_constant_as_eff((), rcv3_nodes))
+        eff = self._invoke()
+        seq = self._gather_seq(
+            self.servers,
+            (clb_nodes, {'lb1': CLB(True), 'lb2': CLB(False)}),
+            rcv3_nodes)
 
         expected_servers = [
             server('a', ServerState.ACTIVE, servicenet_address='10.0.0.1',
@@ -769,7 +829,7 @@ class GetAllLaunchServerDataTests(SynchronousTestCase):
                    links=freeze([{'href': 'link2', 'rel': 'self'}]),
                    json=freeze(self.servers[1]))
         ]
-        self.assertEqual(resolve_stubs(eff),
+        self.assertEqual(perform_sequence(seq, eff),
                          {'servers': expected_servers,
                           'lb_nodes': clb_nodes + rcv3_nodes,
                           'lbs': {'lb1': CLB(True), 'lb2': CLB(False)}})
@@ -779,17 +839,9 @@ class GetAllLaunchServerDataTests(SynchronousTestCase):
         If there are no servers in a group, get_all_launch_server_data includes
         an empty list.
         """
-        eff = get_all_launch_server_data(
-            'tid',
-            'gid',
-            self.now,
-            get_scaling_group_servers=_constant_as_eff(
-                ('tid', 'gid', self.now), []),
-            get_clb_contents=_constant_as_eff((), ([], {'a': CLB(False)})),
-            get_rcv3_contents=_constant_as_eff((), []))
-
+        seq = self._gather_seq([], ([], {'a': CLB(False)}), [])
         self.assertEqual(
-            resolve_stubs(eff),
+            perform_sequence(seq, self._invoke()),
             {'servers': [], 'lb_nodes': [], 'lbs': {'a': CLB(False)}})
 
 
@@ -9,15 +9,15 @@ from pyrsistent import freeze, pbag, pset
 
 from twisted.trial.unittest import SynchronousTestCase
 
-from otter.convergence.logging import log_steps
+from otter.convergence.logging import execute_convergence_fields, log_steps
 from otter.convergence.model import (
-    CLBDescription, CLBNodeCondition, CLBNodeType, ErrorReason)
+    CLBDescription, CLBNodeCondition, CLBNodeType, ErrorReason, ServerState)
 from otter.convergence.steps import (
     AddNodesToCLB, BulkAddToRCv3, BulkRemoveFromRCv3, ChangeCLBNode,
     ConvergeLater, CreateServer, DeleteServer, RemoveNodesFromCLB,
     SetMetadataItemOnServer)
 from otter.log.intents import Log
-from otter.test.utils import test_dispatcher
+from otter.test.utils import server, test_dispatcher
 
 
 def _clbd(lbid, port):
@@ -218,3 +218,48 @@ class LogStepsTests(SynchronousTestCase):
                 fields={'servers': ['s3'], 'key': 'k2', 'value': 'v2',
                         'cloud_feed': True})
         ])
+
+
+class ExecuteConvergenceFieldsTests(SynchronousTestCase):
+    """Tests for :func:`execute_convergence_fields`."""
+
+    def setUp(self):
+        self.resources = {
+            'servers': [server('a', ServerState.ACTIVE),
+                        server('b', ServerState.ACTIVE),
+                        server('c', ServerState.BUILD)],
+            'lb_nodes': ['node'],
+            'lbs': {}}
+
+    def test_steps(self):
+        """
+        All resources are logged when there are steps to execute.
+        """
+        steps = pbag([ConvergeLater([ErrorReason.String("foo")])])
+        self.assertEqual(
+            execute_convergence_fields(steps, 'now', 'desired',
+                                       self.resources),
+            dict(self.resources, steps=steps, now='now', desired='desired'))
+
+    def test_steady_state_summary(self):
+        """
+        Only counts of resources and server states are logged when there are
+        no steps.
+        """
+        self.assertEqual(
+            execute_convergence_fields(pbag([]), 'now', 'desired',
+                                       self.resources),
+            {'steps': pbag([]), 'now': 'now', 'desired': 'desired',
+             'summary': True,
+             'resource_counts': {'servers': 3, 'lb_nodes': 1, 'lbs': 0},
+             'server_states': {'ACTIVE': 2, 'BUILD': 1}})
+
+    def test_summary_without_servers(self):
+        """
+        Server states are not logged if there are no servers in resources.
+        """
+        self.assertEqual(
+            execute_convergence_fields(pbag([]), 'now', 'desired',
+                                       {'stacks': ['s']}),
+            {'steps': pbag([]), 'now': 'now', 'desired': 'desired',
+             'summary': True, 'resource_counts': {'stacks': 1}})
@@ -3,6 +3,8 @@ Tests for convergence models.
 """
 from uuid import uuid4
 
+import attr
+
 from characteristic import attributes
 
 from pyrsistent import freeze, pmap, pset
@@ -21,14 +23,17 @@ from otter.convergence.model import (
     IDrainable,
     ILBDescription,
     ILBNode,
+    LBNodeChange,
     NovaServer,
     RCv3Description,
+    RCv3Node,
     ServerState,
     StackState,
     _private_ipv4_addresses,
     _servicenet_address,
-    get_service_metadata,
+    apply_lb_node_changes,
     generate_metadata,
+    get_service_metadata,
     group_id_from_metadata
 )
 
@@ -623,6 +628,20 @@ class NovaServerTests(SynchronousTestCase):
                 'valid_image', 'valid_flavor', self.servers[0]['links'], set(),
                 '', expected_json]]))
 
+    def test_json_not_copied(self):
+        """
+        The server JSON is kept as given without being frozen or copied, and
+        frozen JSON is thawed. The server is hashable regardless.
+        """
+        server = NovaServer.from_server_details_json(self.servers[0])
+        self.assertIs(server.json, self.servers[0])
+        frozen = NovaServer(id='a', state=ServerState.ACTIVE, created=0,
+                            image_id='i', flavor_id='f',
+                            json=freeze(self.servers[0]))
+        self.assertEqual(type(frozen.json), dict)
+        self.assertEqual(frozen.json, self.servers[0])
+        self.assertEqual(hash(frozen), hash(attr.assoc(frozen, json={})))
+
     def test_unknown_state(self):
         """
         When nova provides an unknown server state, it's set to
@@ -740,3 +759,79 @@ class HeatStackTests(SynchronousTestCase):
                     id='a', name='b', action=action, status=status)
                 self.assertEqual(stack.get_state(), result,
                                  'Failed at %s_%s' % (action, status))
+
+
+class ApplyLBNodeChangesTests(SynchronousTestCase):
+    """
+    Tests for :func:`apply_lb_node_changes`
+    """
+
+    def setUp(self):
+        self.clb_node = CLBNode(
+            node_id='1', address='1.1.1.1',
+            description=CLBDescription(lb_id='5', port=80))
+        self.rcv3_node = RCv3Node(
+            node_id='x', description=RCv3Description(lb_id='LB'),
+            cloud_server_id='s')
+        self.nodes = (self.clb_node, self.rcv3_node)
+
+    def test_no_changes(self):
+        """
+        Nodes are returned as list if there are no changes.
+        """
+        self.assertEqual(apply_lb_node_changes(self.nodes, []),
+                         list(self.nodes))
+
+    def test_added(self):
+        """
+        Added nodes are appended.
+        """
+        node = CLBNode(node_id='2', address='1.1.1.2',
+                       description=CLBDescription(lb_id='5', port=80))
+        self.assertEqual(
+            apply_lb_node_changes(self.nodes,
+                                  [LBNodeChange.Added(node=node)]),
+            [self.clb_node, self.rcv3_node, node])
+
+    def test_changed(self):
+        """
+        Description of the changed CLB node is updated.
+        """
+        changes = [
+            LBNodeChange.Changed(
+                lb_id='5', node_id='1', condition=CLBNodeCondition.DRAINING,
+                weight=3, type=CLBNodeType.SECONDARY),
+            LBNodeChange.Changed(
+                lb_id='6', node_id='1', condition=CLBNodeCondition.DISABLED,
+                weight=3, type=CLBNodeType.SECONDARY)]
+        self.assertEqual(
+            apply_lb_node_changes(self.nodes, changes),
+            [CLBNode(node_id='1', address='1.1.1.1',
+                     description=CLBDescription(
+                         lb_id='5', port=80, weight=3,
+                         condition=CLBNodeCondition.DRAINING,
+                         type=CLBNodeType.SECONDARY)),
+             self.rcv3_node])
+
+    def test_rcv3_removed(self):
+        """
+        RCv3 node of the server in the LB is removed, comparing LB ID
+        case-insensitively.
+        """
+        self.assertEqual(
+            apply_lb_node_changes(
+                self.nodes,
+                [LBNodeChange.RCv3Removed(lb_id='lb', server_id='s'),
+                 LBNodeChange.RCv3Removed(lb_id='lb', server_id='t')]),
+            [self.clb_node])
+
+    def test_clb_removed(self):
+        """
+        CLB node with the ID in the LB is removed.
+        """
+        self.assertEqual(
+            apply_lb_node_changes(
+                self.nodes,
+                [LBNodeChange.CLBRemoved(lb_id='5', node_id='1'),
+                 LBNodeChange.CLBRemoved(lb_id='6', node_id='2')]),
+            [self.rcv3_node])
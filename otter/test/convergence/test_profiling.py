@@ -0,0 +1,143 @@
+"""Tests for :mod:`otter.convergence.profiling`."""
+
+from effect import (
+    ComposedDispatcher, Effect, Func, base_dispatcher, raise_, sync_perform)
+from effect.testing import perform_sequence
+
+from twisted.internet.task import Clock
+from twisted.trial.unittest import SynchronousTestCase
+
+from otter.convergence.profiling import (
+    ConvergenceProfiler,
+    get_profiling_dispatcher,
+    timed_phase)
+from otter.log.intents import get_log_dispatcher, with_log
+from otter.test.utils import mock_log
+
+
+class ConvergenceProfilerTests(SynchronousTestCase):
+    """Tests for :obj:`ConvergenceProfiler`."""
+
+    def setUp(self):
+        self.profiler = ConvergenceProfiler()
+
+    def test_top_phases(self):
+        """
+        Phases are aggregated and returned sorted on total time taken,
+        limited to the given number.
+        """
+        self.profiler.record('plan', 1)
+        self.profiler.record('gather.nova', 2, 't', 'g')
+        self.profiler.record('gather.nova', 4, 't', 'g2')
+        self.profiler.record('cache', 0.5)
+        self.assertEqual(
+            self.profiler.top_phases(2),
+            [{'phase': 'gather.nova', 'count': 2, 'total': 6.0, 'mean': 3.0,
+              'max': 4.0, 'last': 4.0},
+             {'phase': 'plan', 'count': 1, 'total': 1.0, 'mean': 1.0,
+              'max': 1.0, 'last': 1.0}])
+
+    def test_slowest_groups(self):
+        """
+        Groups are returned sorted on their mean iteration time along with
+        mean time taken by each of their phases. Phases not recorded
+        against a group do not show up in groups.
+        """
+        self.profiler.record('iteration', 3, 't1', 'g1')
+        self.profiler.record('gather.clb', 2, 't1', 'g1')
+        self.profiler.record('iteration', 5, 't2', 'g2')
+        self.profiler.record('iteration', 7, 't2', 'g2')
+        self.profiler.record('plan', 1)
+        self.assertEqual(
+            self.profiler.slowest_groups(5),
+            [{'tenant_id': 't2', 'group_id': 'g2',
+              'iteration': {'count': 2, 'total': 12.0, 'mean': 6.0,
+                            'max': 7.0, 'last': 7.0},
+              'phases': {}},
+             {'tenant_id': 't1', 'group_id': 'g1',
+              'iteration': {'count': 1, 'total': 3.0, 'mean': 3.0,
+                            'max': 3.0, 'last': 3.0},
+              'phases': {'gather.clb': 2.0}}])
+        self.assertEqual(len(self.profiler.slowest_groups(1)), 1)
+
+    def test_groups_bounded(self):
+        """
+        Only the ``max_groups`` most recently recorded groups are
+        remembered.
+        """
+        profiler = ConvergenceProfiler(max_groups=2)
+        profiler.record('iteration', 1, 't', 'g1')
+        profiler.record('iteration', 2, 't', 'g2')
+        profiler.record('iteration', 3, 't', 'g1')
+        profiler.record('iteration', 4, 't', 'g3')
+        self.assertEqual(
+            sorted(g['group_id'] for g in profiler.slowest_groups(10)),
+            ['g1', 'g3'])
+
+    def test_report_and_reset(self):
+        """
+        `report` returns both slowest groups and top phases and `reset`
+        forgets everything.
+        """
+        self.profiler.record('iteration', 3, 't1', 'g1')
+        report = self.profiler.report()
+        self.assertEqual(report['groups'], self.profiler.slowest_groups(10))
+        self.assertEqual(report['phases'], self.profiler.top_phases(10))
+        self.profiler.reset()
+        self.assertEqual(self.profiler.report(), {'groups': [], 'phases': []})
+
+
+class TimedPhaseTests(SynchronousTestCase):
+    """Tests for performing :obj:`TimedPhase`."""
+
+    def setUp(self):
+        self.clock = Clock()
+        self.profiler = ConvergenceProfiler()
+        self.disp = ComposedDispatcher([
+            get_profiling_dispatcher(self.clock, self.profiler),
+            get_log_dispatcher(mock_log(), {}),
+            base_dispatcher])
+
+    def _phases(self):
+        return [(p['phase'], p['total'])
+                for p in self.profiler.top_phases(10)]
+
+    def test_records_time(self):
+        """
+        Time taken by the wrapped effect is recorded and its result
+        returned. The group is taken from bound log fields.
+        """
+        seq = [("internal", lambda i: self.clock.advance(3) or "result")]
+        eff = with_log(timed_phase("plan", Effect("internal")),
+                       tenant_id='t', scaling_group_id='g')
+        self.assertEqual(perform_sequence(seq, eff, self.disp), "result")
+        self.assertEqual(self._phases(), [('plan', 3.0)])
+        self.assertEqual(self.profiler.slowest_groups(10)[0]['phases'],
+                         {'plan': 3.0})
+
+    def test_records_time_on_error(self):
+        """
+        Time is recorded even when the wrapped effect fails and the error is
+        propagated.
+        """
+        seq = [("internal",
+                lambda i: self.clock.advance(2) or raise_(ValueError("oops")))]
+        self.assertRaises(
+            ValueError, perform_sequence, seq,
+            timed_phase("gather", Effect("internal")), self.disp)
+        self.assertEqual(self._phases(), [('gather', 2.0)])
+        self.assertEqual(self.profiler.slowest_groups(10), [])
+
+    def test_no_log_context(self):
+        """
+        Time is recorded only in aggregate when there is no log context to
+        get group from.
+        """
+        disp = ComposedDispatcher([
+            get_profiling_dispatcher(self.clock, self.profiler),
+            base_dispatcher])
+        eff = timed_phase(
+            "plan", Effect(Func(lambda: self.clock.advance(1) or "r")))
+        self.assertEqual(sync_perform(disp, eff), "r")
+        self.assertEqual(self._phases(), [('plan', 1.0)])
+        self.assertEqual(self.profiler.slowest_groups(10), [])
@@ -2,24 +2,25 @@
 Tests for :mod:`otter.convergence.selfheal`
 """
 
-from effect import base_dispatcher, raise_
+import time
+
+from effect import Func, base_dispatcher
+from effect.ref import ReadReference, Reference
 from effect.testing import (
     SequenceDispatcher, const, conste, intent_func, nested_sequence, noop,
     perform_sequence)
 
 import mock
 
-from testtools.matchers import IsInstance
+from pyrsistent import pmap
 
 from twisted.internet.task import Clock
 from twisted.trial.unittest import SynchronousTestCase
 
 from otter.convergence import selfheal as sh
-from otter.log.intents import BoundFields, Log
-from otter.models.intents import GetAllValidGroups, GetScalingGroupInfo
-from otter.models.interface import (
-    GroupState, NoSuchScalingGroupError, ScalingGroupStatus)
-from otter.test.utils import CheckFailure, matches, mock_log
+from otter.log.intents import BoundFields
+from otter.models.intents import GetAllValidGroups
+from otter.test.utils import CheckFailure, mock_log
 
 
 class SelfHealTests(SynchronousTestCase):
@@ -31,36 +32,61 @@ class SelfHealTests(SynchronousTestCase):
         self.clock = Clock()
         self.log = mock_log()
         self.patch(sh, "get_groups_to_converge", intent_func("ggtc"))
-        self.patch(sh, "check_and_trigger", lambda t, g: t + g)
+        self.patch(sh, "check_and_trigger", intent_func("cat"))
         self.s = sh.SelfHeal(self.clock, base_dispatcher, "cf", 300.0,
-                             self.log)
+                             self.log, "recent")
         self.groups = [
             {"tenantId": "t{}".format(i), "groupId": "g{}".format(i)}
             for i in range(5)]
+        self.triggered = []
+
+    def _trigger(self, group, result=None):
+        """
+        Return sequence item of triggering convergence on the group that
+        records the time it was triggered
+        """
+        def record(intent):
+            self.triggered.append((group["groupId"], self.clock.seconds()))
+            return result
+        return (("cat", group, "recent", 300.0), record)
+
+    def _ggtc(self):
+        """
+        Return intent of getting groups to converge
+        """
+        return ("ggtc", "cf", None)
+
+    def _setup(self, groups, triggered=None):
+        """
+        Set dispatcher expecting groups to be got and given groups triggered
+        and call ``self.s.setup()``
+        """
+        triggered = groups if triggered is None else triggered
+        seq = [(self._ggtc(), const(groups))]
+        self.s.dispatcher = SequenceDispatcher(
+            seq + map(self._trigger, triggered))
+        self.successResultOf(self.s.setup())
 
     def test_setup(self):
         """
         ``self.s.setup()`` will setup convergences to be triggered over
-        specified time range
+        specified time range with a single timer
         """
-        self.s.dispatcher = SequenceDispatcher(
-            [(("ggtc", "cf"), const(self.groups))])
-        d = self.s.setup()
-        self.successResultOf(d)
-        calls = self.clock.getDelayedCalls()
-        self.assertEqual(self.s._calls, calls)
-        for i, c in enumerate(calls):
-            self.assertEqual(c.getTime(), i * 60)
-            self.assertEqual(c.func, sh.perform)
-            self.assertEqual(c.args,
-                             (self.s.dispatcher, "t{}g{}".format(i, i)))
+        self._setup(self.groups)
+        for _ in range(5):
+            self.assertLessEqual(len(self.clock.getDelayedCalls()), 1)
+            self.clock.advance(60)
+        self.assertEqual(self.triggered,
+                         [("g{}".format(i), i * 60) for i in range(5)])
+        self.assertTrue(self.s.dispatcher.consumed())
+        self.assertEqual(self.clock.getDelayedCalls(), [])
 
     def test_setup_err(self):
         """
         ``self.s.setup()`` will log any error and return success
         """
         self.s.dispatcher = SequenceDispatcher(
-            [(("ggtc", "cf"), conste(ValueError("h")))])
+            [(self._ggtc(), conste(ValueError("h")))])
         d = self.s.setup()
         self.successResultOf(d)
         self.log.err.assert_called_once_with(
@@ -71,32 +97,157 @@ class SelfHealTests(SynchronousTestCase):
         """
         ``self.s.setup()`` gets groups and does nothing if there are no groups
         """
-        self.s.dispatcher = SequenceDispatcher([(("ggtc", "cf"), const([]))])
-        d = self.s.setup()
-        self.successResultOf(d)
-        self.assertEqual(self.s._calls, [])
+        self._setup([])
         self.assertEqual(self.clock.getDelayedCalls(), [])
 
-    def test_setup_still_active(self):
+    def test_trigger_err_ignored(self):
         """
-        If there are scheduled calls when perform is called, they are
-        cancelled and err is logged. Future calls are scheduled as usual
+        Error triggering convergence on a group does not stop triggering
+        others
         """
-        self.clock.advance(-0.6)
-        call1 = self.clock.callLater(1, noop, None)
-        call2 = self.clock.callLater(0, noop, None)
-        call3 = self.clock.callLater(2, noop, None)
-        self.clock.advance(0.6)
-        self.s._calls = [call1, call2, call3]
         self.s.dispatcher = SequenceDispatcher(
-            [(("ggtc", "cf"), const(self.groups))])
-        d = self.s.setup()
-        self.successResultOf(d)
-        self.log.err.assert_called_once_with(
-            matches(IsInstance(RuntimeError)), "selfheal-calls-err", active=2,
-            otter_service="selfheal")
-        self.assertFalse(call1.active())
-        self.assertFalse(call2.active())
+            [(self._ggtc(), const(self.groups[:2])),
+             (("cat", self.groups[0], "recent", 300.0),
+              conste(ValueError("c"))),
+             self._trigger(self.groups[1])])
+        self.successResultOf(self.s.setup())
+        self.clock.advance(150)
+        self.assertEqual(self.triggered, [("g1", 150)])
+
+    def test_only_triggerable_groups(self):
+        """
+        Only groups that are ACTIVE and not paused or suspended are
+        triggered.
+        """
+        self.groups[1]["paused"] = True
+        self.groups[2]["suspended"] = True
+        self.groups[3]["status"] = "ERROR"
+        self.groups[4]["status"] = "ACTIVE"
+        self._setup(self.groups, [self.groups[0], self.groups[4]])
+        self.clock.advance(150)
+        self.assertEqual(self.triggered, [("g0", 0), ("g4", 150)])
+
+    def test_groups_due_together(self):
+        """
+        Groups that become due within ``MIN_TRIGGER_INTERVAL`` are triggered
+        together
+        """
+        groups = [{"tenantId": "t", "groupId": "g{}".format(i)}
+                  for i in range(1000)]
+        self._setup(groups)
+        self.assertEqual(len(self.triggered), 1)
+        self.clock.advance(1)
+        # groups due at 0.3, 0.6 and 0.9
+        self.assertEqual(len(self.triggered), 4)
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.clock.pump([1] * 300)
+        self.assertEqual(len(self.triggered), 1000)
+        self.assertEqual(self.triggered[-1], ("g999", 300))
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+    def test_max_rate(self):
+        """
+        Groups are not triggered faster than ``max_rate``. Groups not
+        triggered when next setup happens are triggered first then.
+        """
+        self.s.max_rate = 0.01
+        self._setup(self.groups, self.groups[:3])
+        self.clock.pump([100] * 2)
+        self.assertEqual(self.triggered,
+                         [("g0", 0), ("g1", 100), ("g2", 200)])
+        self.triggered = []
+        self._setup(self.groups, [self.groups[3]])
+        self.log.msg.assert_called_once_with(
+            "selfheal-calls-carried", remaining=2, otter_service="selfheal")
+        self.s.dispatcher = SequenceDispatcher(
+            map(self._trigger, [self.groups[i] for i in [4, 0, 1]]))
+        self.clock.pump([100] * 3)
+        self.assertEqual(self.triggered,
+                         [("g3", 200), ("g4", 300), ("g0", 400), ("g1", 500)])
+        self.assertTrue(self.s.dispatcher.consumed())
+
+    def test_max_rate_carried_groups_gone(self):
+        """
+        Groups not triggered when next setup happens are dropped if they are
+        not got again
+        """
+        self.s.max_rate = 0.01
+        self._setup(self.groups, self.groups[:1])
+        self.triggered = []
+        self._setup(self.groups[3:], self.groups[3:4])
+        self.s.dispatcher = SequenceDispatcher(
+            [self._trigger(self.groups[4])])
+        self.clock.advance(150)
+        self.assertEqual(self.triggered, [("g3", 0), ("g4", 150)])
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+class SelfHealBucketsTests(SelfHealTests):
+    """
+    Tests for :obj:`SelfHeal` triggering groups in its converger's buckets
+    """
+
+    def setUp(self):
+        super(SelfHealBucketsTests, self).setUp()
+        self.patch(sh, "get_num_buckets", lambda: 2)
+        # Tenants t0, t3 and t4 are in bucket 0 and t1, t2 are in bucket 1
+        self.buckets = [0, 1]
+        self.s.my_buckets = lambda: self.buckets
+
+    def _ggtc(self):
+        """
+        Return intent of getting groups of tenants in our buckets
+        """
+        return ("ggtc", "cf", sh.TenantsInBuckets(set(self.buckets)))
+
+    def test_other_buckets_skipped(self):
+        """
+        Groups in buckets not allocated to us are not triggered.
+        """
+        self.buckets = [1]
+        self._setup(self.groups, self.groups[1:3])
+        self.clock.advance(150)
+        self.assertEqual(self.triggered, [("g1", 0), ("g2", 150)])
+
+    def test_first_bucket(self):
+        """
+        Groups in first bucket are triggered when it is ours
+        """
+        self.buckets = [0]
+        self._setup(self.groups, [self.groups[0], self.groups[3],
+                                  self.groups[4]])
+        self.clock.pump([100] * 2)
+        self.assertEqual(self.triggered, [("g0", 0), ("g3", 100),
+                                          ("g4", 200)])
+
+    def test_buckets_unknown(self):
+        """
+        Groups are not got and nothing is triggered when our buckets are not
+        known and groups not triggered yet are dropped
+        """
+        self.s.max_rate = 0.01
+        self._setup(self.groups, self.groups[:1])
+        self.buckets = None
+        self.s.dispatcher = SequenceDispatcher([])
+        self.successResultOf(self.s.setup())
+        self.log.msg.assert_called_once_with(
+            "selfheal-buckets-unknown", otter_service="selfheal")
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+    def test_bucket_lost(self):
+        """
+        Groups in a bucket that is no longer ours are skipped when they
+        are due
+        """
+        self._setup(self.groups, self.groups[:2])
+        self.clock.advance(60)
+        self.buckets = [0]
+        self.s.dispatcher = SequenceDispatcher(
+            map(self._trigger, self.groups[3:]))
+        self.clock.pump([60] * 3)
+        self.assertEqual(self.triggered, [("g0", 0), ("g1", 60), ("g3", 180),
+                                          ("g4", 240)])
+        self.assertTrue(self.s.dispatcher.consumed())
 
 
 class GetGroupsToConvergeTests(SynchronousTestCase):
@@ -116,6 +267,49 @@ class GetGroupsToConvergeTests(SynchronousTestCase):
         seq = [(GetAllValidGroups(), const(groups))]
         self.assertEqual(perform_sequence(seq, eff), groups[2:])
 
+    def test_tenant_filter(self):
+        """
+        Groups are got only for tenants accepted by given filter
+        """
+        groups = [{"tenantId": "t2", "groupId": "g2"}]
+        eff = sh.get_groups_to_converge({}.get, "filter")
+        seq = [(GetAllValidGroups("filter"), const(groups))]
+        self.assertEqual(perform_sequence(seq, eff), groups)
+
+
+class TenantsInBucketsTests(SynchronousTestCase):
+    """
+    Tests for :obj:`TenantsInBuckets`
+    """
+
+    def test_call(self):
+        """
+        Tenants are in buckets if their bucket is one of them
+        """
+        self.patch(sh, "get_num_buckets", lambda: 2)
+        # Tenants t0, t3 and t4 are in bucket 0 and t1, t2 are in bucket 1
+        in_buckets = sh.TenantsInBuckets(set([0]))
+        self.assertEqual(map(in_buckets, ["t0", "t1", "t2", "t3", "t4"]),
+                         [True, False, False, True, True])
+
+
+class CanTriggerTests(SynchronousTestCase):
+    """
+    Tests for :func:`can_trigger`
+    """
+
+    def test_can_trigger(self):
+        """
+        Returns True only for ACTIVE groups that are not paused or suspended
+        """
+        self.assertTrue(sh.can_trigger({}))
+        self.assertTrue(sh.can_trigger({"status": "ACTIVE", "paused": False,
+                                        "suspended": None}))
+        self.assertFalse(sh.can_trigger({"status": "ERROR"}))
+        self.assertFalse(sh.can_trigger({"status": "DISABLED"}))
+        self.assertFalse(sh.can_trigger({"paused": True}))
+        self.assertFalse(sh.can_trigger({"suspended": True}))
+
 
 class CheckTriggerTests(SynchronousTestCase):
     """
@@ -124,71 +318,44 @@ class CheckTriggerTests(SynchronousTestCase):
 
     def setUp(self):
         self.patch(sh, "trigger_convergence", intent_func("tg"))
-        self.state = GroupState("tid", "gid", 'group-name',
-                                {}, {}, None, {}, False,
-                                ScalingGroupStatus.ACTIVE, desired=2)
-        self.manifest = {"state": self.state}
-
-    def test_active_resumed(self):
-        """
-        Convergence is triggerred on ACTIVE resumed group
-        """
-        seq = [
-            (GetScalingGroupInfo(tenant_id="tid", group_id="gid"),
-             const(("group", self.manifest))),
+        self.group = {"tenantId": "tid", "groupId": "gid"}
+        self.recent = Reference(pmap({"gid": 100}))
+        self.trigger_seq = [
             (BoundFields(effect=mock.ANY,
                          fields=dict(tenant_id="tid", scaling_group_id="gid")),
              nested_sequence([(("tg", "tid", "gid"), noop)]))
         ]
-        self.assertIsNone(
-            perform_sequence(seq, sh.check_and_trigger("tid", "gid")))
 
-    def test_active_paused(self):
+    def test_trigger(self):
         """
-        Convergence is not triggerred on ACTIVE paused group
+        Convergence is triggerred on the group
         """
-        self.state.paused = True
-        seq = [
-            (GetScalingGroupInfo(tenant_id="tid", group_id="gid"),
-             const(("group", self.manifest))),
-        ]
         self.assertIsNone(
-            perform_sequence(seq, sh.check_and_trigger("tid", "gid")))
+            perform_sequence(self.trigger_seq,
+                             sh.check_and_trigger(self.group)))
 
-    def test_active_suspended(self):
+    def test_not_recently_converged(self):
         """
-        Convergence is not triggerred on ACTIVE suspended group
+        Convergence is triggerred on group that did not converge recently
         """
-        self.state.suspended = True
-        seq = [
-            (GetScalingGroupInfo(tenant_id="tid", group_id="gid"),
-             const(("group", self.manifest))),
-        ]
+        seq = [(ReadReference(self.recent), lambda i: pmap({"gid": 100})),
+               (Func(time.time), const(400))] + self.trigger_seq
         self.assertIsNone(
-            perform_sequence(seq, sh.check_and_trigger("tid", "gid")))
-
-    def test_inactive_group(self):
-        """
-        Convergence is not triggerred on in-ACTIVE group
-        """
-        self.state.status = ScalingGroupStatus.ERROR
-        seq = [
-            (GetScalingGroupInfo(tenant_id="tid", group_id="gid"),
-             const(("group", self.manifest))),
-        ]
+            perform_sequence(
+                seq, sh.check_and_trigger(self.group, self.recent, 300)))
+        seq = [(ReadReference(self.recent), lambda i: pmap())]
         self.assertIsNone(
-            perform_sequence(seq, sh.check_and_trigger("tid", "gid")))
+            perform_sequence(
+                seq + self.trigger_seq,
+                sh.check_and_trigger(self.group, self.recent, 300)))
 
-    def test_group_deleted(self):
+    def test_recently_converged(self):
         """
-        Does nothing if group has been deleted
+        Convergence is not triggerred on group that converged within the
+        window
         """
-        seq = [
-            (GetScalingGroupInfo(tenant_id="tid", group_id="gid"),
-             lambda i: raise_(NoSuchScalingGroupError("tid", "gid"))),
-            (Log("selfheal-group-deleted",
-                 dict(tenant_id="tid", scaling_group_id="gid")),
-             noop)
-        ]
+        seq = [(ReadReference(self.recent), lambda i: pmap({"gid": 100})),
+               (Func(time.time), const(399))]
         self.assertIsNone(
-            perform_sequence(seq, sh.check_and_trigger("tid", "gid")))
+            perform_sequence(
+                seq, sh.check_and_trigger(self.group, self.recent, 300)))
@@ -7,8 +7,8 @@ from datetime import datetime, timedelta
 import attr
 
 from effect import (
-    ComposedDispatcher, Effect, Error, FirstError, Func, base_dispatcher,
-    raise_, sync_perform)
+    ComposedDispatcher, Constant, Effect, Error, FirstError, Func,
+    base_dispatcher, raise_, sync_perform)
 from effect.ref import (
     ModifyReference, ReadReference, Reference, reference_dispatcher)
 from effect.testing import (
@@ -27,45 +27,54 @@ from twisted.trial.unittest import SynchronousTestCase
 from otter.auth import NoSuchEndpoint
 from otter.cloud_client import TenantScope
 from otter.cloud_client.clb import NoSuchCLBError
-from otter.constants import CONVERGENCE_DIRTY_DIR
 from otter.convergence.composition import (get_desired_server_group_state,
                                            get_desired_stack_group_state)
 from otter.convergence.gathering import (get_all_launch_server_data,
                                          get_all_launch_stack_data)
 from otter.convergence.model import (
     CLBDescription, CLBNode, ConvergenceIterationStatus, ErrorReason,
-    ServerState, StepResult)
+    LBNodeChange, ServerState, StepResult)
 from otter.convergence.planning import plan_launch_server, plan_launch_stack
 from otter.convergence.service import (
     ConcurrentError,
     ConvergenceExecutor,
+    ConvergenceFingerprints,
     Converger,
+    DirtyFlags,
     converge_all_groups,
     converge_one_group,
+    convergence_fingerprint,
+    dirty_flag_path,
     execute_convergence,
+    format_convergence_state,
     get_executor,
     get_my_divergent_groups,
+    get_num_buckets,
     is_autoscale_active,
     launch_server_executor,
     launch_stack_executor,
     non_concurrently,
+    parse_convergence_state,
+    restore_convergence_state,
     trigger_convergence,
     update_servers_cache,
     update_stacks_cache)
 from otter.convergence.steps import ConvergeLater, CreateServer
+from otter.convergence.transforming import AdaptiveStepLimits
 from otter.log.intents import BoundFields, Log, LogErr, MsgWithTime
 from otter.models.intents import (
     DeleteGroup,
     GetScalingGroupInfo,
+    LoadAndUpdateGroupStatus,
     UpdateGroupErrorReasons,
     UpdateGroupStatus,
-    LoadAndUpdateGroupStatus,
     UpdateServersCache)
 from otter.models.interface import (
     GroupState, NoSuchScalingGroupError, ScalingGroupStatus)
 from otter.test.convergence.test_planning import server
 from otter.test.util.test_zk import ZNodeStatStub
 from otter.test.utils import (
+    CheckFailure,
     CheckFailureValue,
     FakePartitioner,
     TestStep,
@@ -74,8 +83,11 @@ from otter.test.utils import (
     mock_group,
     mock_log,
     raise_to_exc_info,
+    timed_sequence,
     transform_eq)
-from otter.util.zk import CreateOrSet, DeleteNode, GetChildren, GetStat
+from otter.util.config import set_config_data
+from otter.util.zk import (
+    CreateOrSet, DeleteNode, GetChildren, GetData, SetData)
 
 
 class TriggerConvergenceTests(SynchronousTestCase):
@@ -85,10 +97,29 @@ class TriggerConvergenceTests(SynchronousTestCase):
 
     def test_success(self):
         """
-        Divergent flag is set with bound log and msg is logged
+        Divergent flag is set with bound log and msg is logged. It is created
+        directly in the divergent directory by default.
+        """
+        seq = [
+            (CreateOrSet(path="/groups/divergent/t_g", content="dirty"),
+             noop),
+            (Log("mark-dirty-success", {}), noop)
+        ]
+        self.assertEqual(
+            perform_sequence(seq, trigger_convergence("t", "g")),
+            None)
+
+    def test_bucketed_flags(self):
+        """
+        Divergent flag is created in the directory of the group's bucket when
+        ``converger.bucketed_flags`` is enabled.
         """
+        set_config_data({'converger': {'bucketed_flags': True}})
+        self.addCleanup(set_config_data, {})
         seq = [
-            (CreateOrSet(path="/groups/divergent/t_g", content="dirty"), noop),
+            (CreateOrSet(path="/groups/divergent-buckets/3/t_g",
+                         content="dirty"),
+             noop),
             (Log("mark-dirty-success", {}), noop)
         ]
         self.assertEqual(
@@ -117,7 +148,8 @@ class ConvergerTests(SynchronousTestCase):
         self.log = mock_log()
         self.num_buckets = 10
 
-    def _converger(self, converge_all_groups, dispatcher=None):
+    def _converger(self, converge_all_groups, dispatcher=None,
+                   watch_children=None):
         if dispatcher is None:
             dispatcher = _get_dispatcher()
         # patch global default step limits to have empty {} step_limits
@@ -129,7 +161,8 @@ class ConvergerTests(SynchronousTestCase):
             self._pfactory, build_timeout=3600,
             interval=15,
             limited_retry_iterations=23, step_limits={},
-            converge_all_groups=converge_all_groups)
+            converge_all_groups=converge_all_groups,
+            watch_children=watch_children)
 
     def _pfactory(self, buckets, log, got_buckets):
         self.assertEqual(buckets, range(self.num_buckets))
@@ -155,26 +188,35 @@ class ConvergerTests(SynchronousTestCase):
         def converge_all_groups(currently_converging, recent, waiting,
                                 _my_buckets, all_buckets,
                                 divergent_flags, build_timeout, interval,
-                                limited_retry_iterations, step_limits):
+                                limited_retry_iterations, step_limits,
+                                retention, adaptive_limits, fingerprints):
             return Effect(
                 ('converge-all', currently_converging, _my_buckets,
                  all_buckets, divergent_flags, build_timeout, interval,
-                 limited_retry_iterations, step_limits))
+                 limited_retry_iterations, step_limits, adaptive_limits,
+                 fingerprints))
 
         my_buckets = [0, 5]
+        # sha1('t0') % 10 == 0, sha1('t5') % 10 == 0
         bound_sequence = [
-            (GetChildren(CONVERGENCE_DIRTY_DIR),
-                lambda i: ['flag1', 'flag2']),
+            parallel_sequence([
+                [(GetChildren('/groups/divergent-buckets/0'),
+                  lambda i: ['t5_g3', 't0_g1'])],
+                [(GetChildren('/groups/divergent-buckets/5'),
+                  lambda i: raise_(NoNodeError()))]]),
             (('converge-all',
                 transform_eq(lambda cc: cc is converger.currently_converging,
                              True),
                 my_buckets,
                 range(self.num_buckets),
-                ['flag1', 'flag2'],
+                ['t0_g1', 't5_g3'],
                 3600,
                 15,
                 23,
-                {}),
+                {},
+                transform_eq(lambda al: al is converger.adaptive_limits,
+                             True),
+                transform_eq(lambda fp: fp is converger.fingerprints, True)),
                 lambda i: 'foo')
         ]
         sequence = self._log_sequence(bound_sequence)
@@ -185,6 +227,104 @@ class ConvergerTests(SynchronousTestCase):
             result, = self.fake_partitioner.got_buckets(my_buckets)
         self.assertEqual(self.successResultOf(result), 'foo')
 
+    def test_buckets_acquired_misplaced_flags(self):
+        """
+        Flags listed in a bucket's directory that belong to another bucket,
+        like after number of buckets is changed, are moved to their bucket's
+        directory and not converged.
+        """
+        def converge_all_groups(currently_converging, recent, waiting,
+                                _my_buckets, all_buckets,
+                                divergent_flags, build_timeout, interval,
+                                limited_retry_iterations, step_limits,
+                                retention, adaptive_limits, fingerprints):
+            return Effect(('converge-all', divergent_flags))
+
+        # sha1('t1') % 10 == 9
+        bound_sequence = [
+            parallel_sequence([
+                [(GetChildren('/groups/divergent-buckets/0'),
+                  lambda i: ['t0_g1', 't1_g2']),
+                 parallel_sequence([
+                     [(CreateOrSet(path='/groups/divergent-buckets/9/t1_g2',
+                                   content='dirty'), noop),
+                      (DeleteNode(path='/groups/divergent-buckets/0/t1_g2',
+                                  version=-1), noop),
+                      (Log('move-flat-dirty-flag',
+                           {'flag': 't1_g2',
+                            'directory': '/groups/divergent-buckets/0'}),
+                       noop)]])]
+            ]),
+            (('converge-all', ['t0_g1']), lambda i: 'foo')
+        ]
+        sequence = self._log_sequence(bound_sequence)
+        self._converger(converge_all_groups, dispatcher=sequence)
+
+        with sequence.consume():
+            result, = self.fake_partitioner.got_buckets([0])
+        self.assertEqual(self.successResultOf(result), 'foo')
+
+    def test_buckets_acquired_watches(self):
+        """
+        When buckets are allocated, their directories are created and
+        watched, and flags told by the watches are used instead of listing
+        the directories.
+        """
+        def converge_all_groups(currently_converging, recent, waiting,
+                                _my_buckets, all_buckets,
+                                divergent_flags, build_timeout, interval,
+                                limited_retry_iterations, step_limits,
+                                retention, adaptive_limits, fingerprints):
+            return Effect(('converge-all', divergent_flags))
+
+        watches = []
+
+        def watch_children(path, callback):
+            watches.append(path)
+            # Like ChildrenWatch, callback is called right away
+            callback(['t0_g1'])
+
+        uid = uuid.uuid4()
+        sequence = SequenceDispatcher([
+            (CreateOrSet(path='/groups/divergent-buckets/0', content=''),
+             noop),
+            (Func(uuid.uuid4), lambda i: uid),
+            (BoundFields(effect=mock.ANY, fields=mock.ANY),
+             nested_sequence([
+                 (('converge-all', ['t0_g1']), lambda i: 'foo')]))])
+        converger = self._converger(converge_all_groups, dispatcher=sequence,
+                                    watch_children=watch_children)
+
+        with sequence.consume():
+            result, = self.fake_partitioner.got_buckets([0])
+        self.assertEqual(self.successResultOf(result), 'foo')
+        self.assertEqual(watches, ['/groups/divergent-buckets/0'])
+        self.assertEqual(converger.dirty_flags.in_buckets([0]), ['t0_g1'])
+
+    def test_buckets_acquired_watch_fails(self):
+        """
+        Failure to watch a bucket is logged and the bucket is watched again
+        when buckets are allocated next time.
+        """
+        sequence = SequenceDispatcher([
+            (CreateOrSet(path='/groups/divergent-buckets/0', content=''),
+             lambda i: raise_(ValueError('bad'))),
+            (CreateOrSet(path='/groups/divergent-buckets/0', content=''),
+             lambda i: raise_(ValueError('bad')))])
+        self._converger(lambda *a, **kw: Effect(Constant(None)),
+                        dispatcher=ComposedDispatcher(
+                            [sequence, base_dispatcher]),
+                        watch_children=lambda path, callback: 1 / 0)
+        self.patch(Converger, '_list_flags',
+                   lambda self, buckets: Effect(Constant([])))
+        self.patch(Converger, '_with_conv_runid', lambda self, eff: eff)
+        with sequence.consume():
+            self.fake_partitioner.got_buckets([0])
+            self.fake_partitioner.got_buckets([0])
+        self.log.err.assert_called_with(
+            CheckFailure(ValueError), 'converge-watch-bucket-error',
+            bucket=0, otter_service='converger')
+
     def test_buckets_acquired_errors(self):
         """
         Errors raised from performing the converge_all_groups effect are
@@ -193,12 +333,14 @@ class ConvergerTests(SynchronousTestCase):
         def converge_all_groups(currently_converging, recent, waiting,
                                 _my_buckets, all_buckets,
                                 divergent_flags, build_timeout, interval,
-                                limited_retry_iterations, step_limits):
+                                limited_retry_iterations, step_limits,
+                                retention, adaptive_limits, fingerprints):
             return Effect('converge-all')
 
         bound_sequence = [
-            (GetChildren(CONVERGENCE_DIRTY_DIR),
-                lambda i: ['flag1', 'flag2']),
+            parallel_sequence([
+                [(GetChildren('/groups/divergent-buckets/0'),
+                  lambda i: ['t0_g1', 't0_g2'])]]),
             ('converge-all', lambda i: raise_(RuntimeError('foo'))),
             (LogErr(
                 CheckFailureValue(RuntimeError('foo')),
@@ -213,55 +355,152 @@ class ConvergerTests(SynchronousTestCase):
             result, = self.fake_partitioner.got_buckets([0])
         self.assertEqual(self.successResultOf(result), None)
 
+    def test_bucket_changed(self):
+        """
+        When notified that flags of a bucket assigned to us have been added,
+        convergence is triggered with the flags of our buckets.
+        """
+        def converge_all_groups(currently_converging, recent, waiting,
+                                _my_buckets, all_buckets,
+                                divergent_flags, build_timeout, interval,
+                                limited_retry_iterations, step_limits,
+                                retention, adaptive_limits, fingerprints):
+            return Effect(('converge-all-groups', divergent_flags))
+
+        sequence = self._log_sequence(
+            [(('converge-all-groups', ['t0_g1', 't5_g2']), noop)])
+        converger = self._converger(converge_all_groups, dispatcher=sequence)
+        converger.bucket_changed(0, ['t0_g1'])
+
+        self.fake_partitioner.current_state = PartitionState.ACQUIRED
+        self.fake_partitioner.my_buckets = [0]
+        with sequence.consume():
+            self.assertIsNone(
+                converger.bucket_changed(0, ['t0_g1', 't5_g2']))
+
+    def test_bucket_changed_misplaced_flags(self):
+        """
+        When notified of flags in a bucket's directory that belong to another
+        bucket, they are moved to their bucket's directory and not counted as
+        flags of the bucket.
+        """
+        sequence = self._log_sequence([
+            parallel_sequence([
+                [(CreateOrSet(path='/groups/divergent-buckets/9/t1_g2',
+                              content='dirty'), noop),
+                 (DeleteNode(path='/groups/divergent-buckets/0/t1_g2',
+                             version=-1),
+                  noop),
+                 (Log('move-flat-dirty-flag',
+                      {'flag': 't1_g2',
+                       'directory': '/groups/divergent-buckets/0'}),
+                  noop)]])])
+        converger = self._converger(lambda *a, **kw: 1 / 0,
+                                    dispatcher=sequence)
+        with sequence.consume():
+            converger.bucket_changed(0, ['t0_g1', 't1_g2'])
+        self.assertEqual(converger.dirty_flags.in_buckets([0]), ['t0_g1'])
+
+    def test_bucket_changed_nothing_added(self):
+        """
+        When notified that flags of a bucket have changed, but no flag has
+        been added since last time, nothing is done.
+        """
+        converger = self._converger(lambda *a, **kw: 1 / 0,
+                                    dispatcher=SequenceDispatcher([]))
+        converger.bucket_changed(0, ['t0_g1', 't5_g2'])
+        self.fake_partitioner.current_state = PartitionState.ACQUIRED
+        self.fake_partitioner.my_buckets = [0]
+        converger.bucket_changed(0, ['t0_g1'])
+        self.assertEqual(converger.dirty_flags.in_buckets([0]), ['t0_g1'])
+
+    def test_bucket_changed_not_ours(self):
+        """
+        When notified that flags of a bucket not assigned to us any more have
+        changed, the bucket's flags are forgotten and the watch is stopped.
+        """
+        converger = self._converger(lambda *a, **kw: 1 / 0,
+                                    dispatcher=SequenceDispatcher([]))
+        converger.bucket_changed(0, ['t0_g1'])
+        self.fake_partitioner.current_state = PartitionState.ACQUIRED
+        self.fake_partitioner.my_buckets = [3]
+        self.assertFalse(converger.bucket_changed(0, ['t0_g1', 't5_g2']))
+        self.assertFalse(converger.dirty_flags.known(0))
+
     def test_divergent_changed_not_acquired(self):
         """
-        When notified that divergent groups have changed and we have not
-        acquired our buckets, nothing is done.
+        When notified that flags directly in the divergent directory have
+        changed and we have not acquired our buckets, nothing is done.
         """
         dispatcher = SequenceDispatcher([])  # "nothing happens"
         converger = self._converger(lambda *a, **kw: 1 / 0,
                                     dispatcher=dispatcher)
         # Doesn't try to get buckets
         self.fake_partitioner.get_current_buckets = lambda s: 1 / 0
-        converger.divergent_changed(['group1', 'group2'])
+        converger.divergent_changed(['group1_a', 'group2_b'])
 
     def test_divergent_changed_not_ours(self):
         """
-        When notified that divergent groups have changed but they're not ours,
-        nothing is done.
+        When notified that flags directly in the divergent directory have
+        changed but they're not ours, nothing is done.
         """
         dispatcher = SequenceDispatcher([])  # "nothing happens"
         converger = self._converger(lambda *a, **kw: 1 / 0,
                                     dispatcher=dispatcher)
         self.fake_partitioner.current_state = PartitionState.ACQUIRED
-        converger.divergent_changed(['group1', 'group2'])
+        converger.divergent_changed(['group1_a', 'group2_b'])
 
     def test_divergent_changed(self):
         """
-        When notified that divergent groups have changed, and one of the groups
-        is associated with a bucket assigned to us, convergence is triggered,
-        and the list of child nodes is passed on to
-        :func:`converge_all_groups`.
+        When notified that flags directly in the divergent directory have
+        changed, the ones associated with buckets assigned to us are moved to
+        their bucket's directory. Bucket directories are ignored.
         """
-        def converge_all_groups(currently_converging, recent, waiting,
-                                _my_buckets, all_buckets,
-                                divergent_flags, build_timeout, interval,
-                                limited_retry_iterations, step_limits):
-            return Effect(('converge-all-groups', divergent_flags))
-
         intents = [
-            (('converge-all-groups', ['group1', 'group2']),
-             noop)
+            parallel_sequence([
+                [(CreateOrSet(path='/groups/divergent-buckets/3/group1_a',
+                              content='dirty'), noop),
+                 (DeleteNode(path='/groups/divergent/group1_a', version=-1),
+                  lambda i: raise_(NoNodeError())),
+                 (Log('move-flat-dirty-flag',
+                      {'flag': 'group1_a', 'directory': '/groups/divergent'}),
+                  noop)]
+            ])
         ]
         sequence = self._log_sequence(intents)
 
-        converger = self._converger(converge_all_groups, dispatcher=sequence)
+        converger = self._converger(lambda *a, **kw: 1 / 0,
+                                    dispatcher=sequence)
 
         # sha1('group1') % 10 == 3
         self.fake_partitioner.current_state = PartitionState.ACQUIRED
         self.fake_partitioner.my_buckets = [3]
         with sequence.consume():
-            converger.divergent_changed(['group1', 'group2'])
+            d = converger.divergent_changed(['3', 'group1_a', 'group2_b'])
+        self.successResultOf(d)
+
+
+class DirtyFlagsTests(SynchronousTestCase):
+    """Tests for :obj:`DirtyFlags`."""
+
+    def test_update(self):
+        """
+        :func:`DirtyFlags.update` returns the flags added to the bucket and
+        the flags of buckets are known after that.
+        """
+        flags = DirtyFlags()
+        self.assertFalse(flags.known(0))
+        self.assertEqual(flags.update(0, ['t0_g1', 't5_g3']),
+                         set(['t0_g1', 't5_g3']))
+        self.assertEqual(flags.update(9, ['t1_g2']), set(['t1_g2']))
+        self.assertTrue(flags.known(0))
+        self.assertEqual(flags.in_buckets([0, 9]),
+                         ['t0_g1', 't1_g2', 't5_g3'])
+        self.assertEqual(flags.update(0, ['t5_g3', 't0_g4']), set(['t0_g4']))
+        self.assertEqual(flags.in_buckets([0, 3]), ['t0_g4', 't5_g3'])
+        flags.forget(0)
+        self.assertFalse(flags.known(0))
+        self.assertEqual(flags.in_buckets([0, 9]), ['t1_g2'])
 
 
 def add_to_recently(recently, group_id, cvg_time):
@@ -294,6 +533,22 @@ def remove_from_currently(currently, group_id):
             dispatch(reference_dispatcher))
 
 
+def timed_step(step_type, seq):
+    """
+    Return a parallel_sequence item that expects a step of given type to be
+    timed while its effect is performed with the given intent-sequence.
+    """
+    return [timed_sequence('execute.' + step_type, seq)]
+
+
+def rendered(value):
+    """
+    Return an object that compares equal to a :obj:`Lazy` log field that
+    renders to the given value.
+    """
+    return transform_eq(lambda lazy: lazy.render(), value)
+
+
 def clean_waiting(waiting, group_id):
     """
     Return an intent that matches a removal of the given group ID.
@@ -321,16 +576,18 @@ class ConvergeOneGroupTests(SynchronousTestCase):
             'ec', self.tenant_id, self.group_id, 3600, self.waiting, 43, {})
 
     def _execute_convergence(self, tenant_id, group_id, build_timeout, waiting,
-                             limited_retry_iterations, step_limits):
+                             limited_retry_iterations, step_limits,
+                             adaptive_limits, fingerprints):
         return Effect(('ec', tenant_id, group_id, build_timeout, waiting,
                        limited_retry_iterations, step_limits))
 
     def _expect_exec(self, iter_status):
         """
-        Return a sequence item that expects the execute_convergence effect,
-        and results in the given values.
+        Return a sequence item that expects the timed execute_convergence
+        effect, and results in the given values.
         """
-        return (self._exec_intent, lambda i: iter_status)
+        return timed_sequence(
+            'iteration', [(self._exec_intent, lambda i: iter_status)])
 
     def _verify_sequence(self, sequence, converging=None,
                          recent=None, allow_refs=True):
@@ -353,7 +610,7 @@ class ConvergeOneGroupTests(SynchronousTestCase):
         if version is None:
             version = self.version
         return [
-            (DeleteNode(path='/groups/divergent/%s_%s' % (tenant, group),
+            (DeleteNode(path=dirty_flag_path(tenant, group),
                         version=version), noop),
             (Log('mark-clean-success', {}), noop)
         ]
@@ -406,7 +663,8 @@ class ConvergeOneGroupTests(SynchronousTestCase):
         """
         expected_error = NoSuchScalingGroupError(self.tenant_id, self.group_id)
         sequence = [
-            (self._exec_intent, lambda i: raise_(expected_error)),
+            timed_sequence('iteration', [
+                (self._exec_intent, lambda i: raise_(expected_error))]),
             (LogErr(CheckFailureValue(expected_error),
                     'converge-fatal-error', {}),
              noop),
@@ -424,7 +682,8 @@ class ConvergeOneGroupTests(SynchronousTestCase):
         sequence = [
             (ReadReference(converging), lambda i: pset()),
             add_to_currently(converging, self.group_id),
-            (self._exec_intent, lambda i: raise_(expected_error)),
+            timed_sequence('iteration', [
+                (self._exec_intent, lambda i: raise_(expected_error))]),
             (Func(time.time), lambda i: 100),
             add_to_recently(recent, self.group_id, 100),
             (ModifyReference(converging,
@@ -433,6 +692,11 @@ class ConvergeOneGroupTests(SynchronousTestCase):
             (LogErr(CheckFailureValue(expected_error),
                     'converge-non-fatal-error', {}),
              noop),
+            (ReadReference(recent), lambda i: pmap({self.group_id: 100})),
+            (ReadReference(self.waiting), lambda i: pmap()),
+            (SetData(path='/groups/divergent-buckets/3/tenant-id_g1',
+                     value=format_convergence_state(100, 0),
+                     version=self.version), noop)
         ]
         self._verify_sequence(sequence, converging=converging, recent=recent,
                               allow_refs=False)
@@ -445,11 +709,11 @@ class ConvergeOneGroupTests(SynchronousTestCase):
         """
         sequence = [
             self._expect_exec(ConvergenceIterationStatus.Stop()),
-            (DeleteNode(path='/groups/divergent/tenant-id_g1',
+            (DeleteNode(path='/groups/divergent-buckets/3/tenant-id_g1',
                         version=self.version),
              lambda i: raise_(BadVersionError())),
             (Log('mark-clean-skipped',
-                 dict(path='/groups/divergent/tenant-id_g1',
+                 dict(path='/groups/divergent-buckets/3/tenant-id_g1',
                       dirty_version=self.version)), noop)
         ]
         self._verify_sequence(sequence)
@@ -461,11 +725,11 @@ class ConvergeOneGroupTests(SynchronousTestCase):
         """
         sequence = [
             self._expect_exec(ConvergenceIterationStatus.Stop()),
-            (DeleteNode(path='/groups/divergent/tenant-id_g1',
+            (DeleteNode(path='/groups/divergent-buckets/3/tenant-id_g1',
                         version=self.version),
              lambda i: raise_(NoNodeError())),
             (Log('mark-clean-not-found',
-                 dict(path='/groups/divergent/tenant-id_g1',
+                 dict(path='/groups/divergent-buckets/3/tenant-id_g1',
                       dirty_version=self.version)), noop)
         ]
         self._verify_sequence(sequence)
@@ -474,35 +738,83 @@ class ConvergeOneGroupTests(SynchronousTestCase):
         """When marking clean raises arbitrary errors, an error is logged."""
         sequence = [
             self._expect_exec(ConvergenceIterationStatus.Stop()),
-            (DeleteNode(path='/groups/divergent/tenant-id_g1',
+            (DeleteNode(path='/groups/divergent-buckets/3/tenant-id_g1',
                         version=self.version),
              lambda i: raise_(ZeroDivisionError())),
             (LogErr(CheckFailureValue(ZeroDivisionError()),
                     'mark-clean-failure',
-                    dict(path='/groups/divergent/tenant-id_g1',
+                    dict(path='/groups/divergent-buckets/3/tenant-id_g1',
                          dirty_version=self.version)), noop)
         ]
         self._verify_sequence(sequence)
 
+    def _retry_sequence(self, recent, save_result=noop):
+        """
+        Return sequence of an iteration that returns Continue with
+        convergence state being saved in the dirty flag with given result
+        """
+        return [
+            self._expect_exec(ConvergenceIterationStatus.Continue()),
+            (Func(time.time), lambda i: 100),
+            (ModifyReference(recent, match_func(pmap(), pmap({'g1': 100}))),
+             lambda i: pmap({'g1': 100})),
+            (ReadReference(recent), lambda i: pmap({'g1': 100})),
+            (ReadReference(self.waiting), lambda i: pmap({'g1': 2})),
+            (SetData(path='/groups/divergent-buckets/3/tenant-id_g1',
+                     value=format_convergence_state(100, 2),
+                     version=self.version), save_result)
+        ]
+
     def test_retry(self):
         """
         When execute_convergence returns Continue, the divergent flag is not
-        deleted.
+        deleted. The convergence state is stored in it instead.
         """
-        sequence = [
-            self._expect_exec(ConvergenceIterationStatus.Continue())
-        ]
-        self._verify_sequence(sequence)
+        recent = Reference(pmap())
+        self._verify_sequence(self._retry_sequence(recent), recent=recent)
+
+    def test_retry_flag_changed(self):
+        """
+        Convergence state is not stored if the divergent flag has changed or
+        disappeared
+        """
+        for exc in (BadVersionError(), NoNodeError()):
+            recent = Reference(pmap())
+            self._verify_sequence(
+                self._retry_sequence(recent, lambda i, e=exc: raise_(e)),
+                recent=recent)
+
+    def test_retry_save_error(self):
+        """
+        Other errors in storing convergence state are logged
+        """
+        recent = Reference(pmap())
+        seq = self._retry_sequence(
+            recent, lambda i: raise_(ZeroDivisionError()))
+        seq.append(
+            (LogErr(CheckFailureValue(ZeroDivisionError()),
+                    'converge-save-state-failure',
+                    dict(path='/groups/divergent-buckets/3/tenant-id_g1')),
+                noop))
+        self._verify_sequence(seq, recent=recent)
 
     def test_delete_flag_unconditionally_when_group_deleted(self):
         """
         When execute_convergence's return value indicates the group has been
         deleted, the divergent flag is unconditionally deleted (ignoring
-        mismatched versions), because a re-converge would be fruitless.
+        mismatched versions), because a re-converge would be fruitless. The
+        flag is also deleted from the divergent directory where it may still
+        be created.
         """
         sequence = [
             self._expect_exec(ConvergenceIterationStatus.GroupDeleted()),
             (DeleteNode(path='/groups/divergent/tenant-id_g1', version=-1),
+             lambda i: raise_(NoNodeError())),
+            (Log('mark-clean-not-found',
+                 dict(path='/groups/divergent/tenant-id_g1',
+                      dirty_version=-1)), noop),
+            (DeleteNode(path='/groups/divergent-buckets/3/tenant-id_g1',
+                        version=-1),
              noop),
             (Log('mark-clean-success', {}), noop),
         ]
@@ -528,9 +840,9 @@ class ConvergeAllGroupsTests(SynchronousTestCase):
         self.all_buckets = range(10)
         self.group_infos = [
             {'tenant_id': '00', 'group_id': 'g1',
-             'dirty-flag': '/groups/divergent/00_g1'},
+             'dirty-flag': '/groups/divergent-buckets/6/00_g1'},
             {'tenant_id': '01', 'group_id': 'g2',
-             'dirty-flag': '/groups/divergent/01_g2'}
+             'dirty-flag': '/groups/divergent-buckets/1/01_g2'}
         ]
 
     def _converge_all_groups(self, flags):
@@ -547,24 +859,27 @@ class ConvergeAllGroupsTests(SynchronousTestCase):
     def _converge_one_group(self,
                             currently_converging, recently_converged, waiting,
                             tenant_id, group_id, version, build_timeout,
-                            limited_retry_iterations, step_limits):
+                            limited_retry_iterations, step_limits,
+                            adaptive_limits, fingerprints):
         return Effect(
             ('converge', tenant_id, group_id, version, build_timeout,
              limited_retry_iterations, step_limits))
 
-    def _expect_group_converged(self, tenant_id, group_id):
+    def _expect_group_converged(self, tenant_id, group_id, restore=()):
         """
         Return a SequenceDispatcher two-tuple that matches the usual sequence
         of intents for converging a single group.
         """
+        content = 'dirty'
+        if restore:
+            content = format_convergence_state(50, 2)
         return (
             BoundFields(mock.ANY,
                         dict(tenant_id=tenant_id, scaling_group_id=group_id)),
             nested_sequence([
-                (GetStat(
-                    path='/groups/divergent/{tenant_id}_{group_id}'.format(
-                        tenant_id=tenant_id, group_id=group_id)),
-                 lambda i: ZNodeStatStub(version=5)),
+                (GetData(path=dirty_flag_path(tenant_id, group_id)),
+                 lambda i: (content, ZNodeStatStub(version=5)))] +
+                list(restore) + [
                 (TenantScope(mock.ANY, tenant_id),
                  nested_sequence([
                      (('converge', tenant_id, group_id, 5, 3600, 23, {}),
@@ -655,6 +970,91 @@ class ConvergeAllGroupsTests(SynchronousTestCase):
         ]
         self.assertEqual(perform_sequence(sequence, eff), ['converged g1!'])
 
+    def test_retention(self):
+        """
+        Groups converged within ``retention`` seconds are kept in the
+        ``recently_converged`` map even if they are converged again since
+        they did not converge within ``interval``.
+        """
+        eff = converge_all_groups(
+            self.currently_converging, self.recently_converged, self.waiting,
+            self.my_buckets, self.all_buckets, ['00_g1'], 3600, 15, 23, {},
+            converge_one_group=self._converge_one_group, retention=18)
+        sequence = [
+            (ReadReference(ref=self.currently_converging), lambda i: pset([])),
+            (Log('converge-all-groups',
+                 dict(group_infos=[self.group_infos[0]],
+                      currently_converging=[])),
+             noop),
+            (ReadReference(ref=self.recently_converged),
+             lambda i: pmap({'g1': 4, 'g3': 0})),
+            (Func(time.time), lambda i: 20),
+            (ModifyReference(self.recently_converged,
+                             match_func(pmap({'g1': 4, 'g3': 0}),
+                                        pmap({'g1': 4}))),
+             noop),
+            parallel_sequence([[self._expect_group_converged('00', 'g1')]])
+        ]
+        self.assertEqual(perform_sequence(sequence, eff), ['converged g1!'])
+
+    def _restore_sequence(self, now):
+        """
+        Return sequence of restoring convergence state stored by
+        ``_expect_group_converged`` when current time is ``now``
+        """
+        return [
+            (ReadReference(self.recently_converged), lambda i: pmap()),
+            (ModifyReference(self.recently_converged,
+                             match_func(pmap(), pmap({'g1': 50}))), noop),
+            (ModifyReference(self.waiting,
+                             match_func(pmap(), pmap({'g1': 2}))), noop),
+            (Func(time.time), lambda i: now)]
+
+    def test_restore_state(self):
+        """
+        Convergence state stored in the divergent flag by another node is
+        restored before converging the group
+        """
+        eff = self._converge_all_groups(['00_g1'])
+        sequence = [
+            (ReadReference(ref=self.currently_converging), lambda i: pset()),
+            (Log('converge-all-groups',
+                 dict(group_infos=[self.group_infos[0]],
+                      currently_converging=[])),
+             noop),
+            (ReadReference(ref=self.recently_converged), lambda i: pmap()),
+            (Func(time.time), lambda i: 100),
+            parallel_sequence([[self._expect_group_converged(
+                '00', 'g1', self._restore_sequence(100))]])
+        ]
+        self.assertEqual(perform_sequence(sequence, eff), ['converged g1!'])
+
+    def test_restored_recently_converged(self):
+        """
+        Group is not converged if the convergence state stored in the
+        divergent flag says it converged within interval
+        """
+        eff = self._converge_all_groups(['00_g1'])
+        flag = dirty_flag_path('00', 'g1')
+        sequence = [
+            (ReadReference(ref=self.currently_converging), lambda i: pset()),
+            (Log('converge-all-groups',
+                 dict(group_infos=[self.group_infos[0]],
+                      currently_converging=[])),
+             noop),
+            (ReadReference(ref=self.recently_converged), lambda i: pmap()),
+            (Func(time.time), lambda i: 60),
+            parallel_sequence([[(
+                BoundFields(mock.ANY,
+                            dict(tenant_id='00', scaling_group_id='g1')),
+                nested_sequence(
+                    [(GetData(path=flag),
+                      lambda i: (format_convergence_state(50, 2),
+                                 ZNodeStatStub(version=5)))] +
+                    self._restore_sequence(60)))]])
+        ]
+        self.assertEqual(perform_sequence(sequence, eff), [None])
+
     def test_no_log_on_no_groups(self):
         """When there's no work, no log message is emitted."""
         def converge_one_group(*args, **kwargs):
@@ -677,11 +1077,11 @@ class ConvergeAllGroupsTests(SynchronousTestCase):
         eff = self._converge_all_groups(['00_g1'])
 
         def get_bound_sequence(tid, gid):
-            # since this GetStat is going to return None, no more effects will
+            # since this GetData is going to return None, no more effects will
             # be run. This is the crux of what we're testing.
-            znode = '/groups/divergent/{}_{}'.format(tid, gid)
+            znode = dirty_flag_path(tid, gid)
             return [
-                (GetStat(path=znode), noop),
+                (GetData(path=znode), noop),
                 (Log('converge-divergent-flag-disappeared',
                      fields={'znode': znode}),
                  noop)]
@@ -703,6 +1103,82 @@ class ConvergeAllGroupsTests(SynchronousTestCase):
         self.assertEqual(perform_sequence(sequence, eff), [None])
 
 
+class ConvergenceStateTests(SynchronousTestCase):
+    """
+    Tests for :func:`format_convergence_state`,
+    :func:`parse_convergence_state` and :func:`restore_convergence_state`
+    """
+
+    def setUp(self):
+        self.recent = Reference(pmap({'g1': 50}))
+        self.waiting = Reference(pmap({'g1': 1}))
+
+    def test_format_parse(self):
+        """
+        State formatted by :func:`format_convergence_state` is parsed back
+        by :func:`parse_convergence_state`
+        """
+        self.assertEqual(
+            parse_convergence_state(format_convergence_state(1.5, 2)),
+            (1.5, 2))
+
+    def test_parse_no_state(self):
+        """
+        :func:`parse_convergence_state` returns None if content does not
+        have convergence state
+        """
+        for content in ('dirty', '', None, '[]', '{"converged": 1}'):
+            self.assertIsNone(parse_convergence_state(content))
+
+    def _restore(self, content, now=None):
+        seq = [] if now is None else [(Func(time.time), lambda i: now)]
+        return perform_sequence(
+            seq,
+            restore_convergence_state(self.recent, self.waiting, 'g1',
+                                      content, 15),
+            fallback_dispatcher=_get_dispatcher())
+
+    def test_restore_no_state(self):
+        """
+        Nothing is restored if content does not have convergence state
+        """
+        self.assertFalse(self._restore('dirty'))
+        self.assertEqual(sync_perform(_get_dispatcher(), self.recent.read()),
+                         pmap({'g1': 50}))
+
+    def test_restore_older_state(self):
+        """
+        Nothing is restored if the group converged on this node after the
+        stored state
+        """
+        self.assertFalse(self._restore(format_convergence_state(50, 3)))
+        self.assertEqual(sync_perform(_get_dispatcher(), self.waiting.read()),
+                         pmap({'g1': 1}))
+
+    def test_restore_recent(self):
+        """
+        Newer state is restored and True is returned if the group converged
+        within interval
+        """
+        self.assertTrue(self._restore(format_convergence_state(60, 3), 70))
+        self.assertEqual(sync_perform(_get_dispatcher(), self.recent.read()),
+                         pmap({'g1': 60}))
+        self.assertEqual(sync_perform(_get_dispatcher(), self.waiting.read()),
+                         pmap({'g1': 3}))
+
+    def test_restore_not_recent(self):
+        """
+        Newer state is restored and False is returned if the group did not
+        converge within interval. Group is removed from ``waiting`` if the
+        state says it was not waiting.
+        """
+        self.assertFalse(self._restore(format_convergence_state(60, 0), 80))
+        self.assertEqual(sync_perform(_get_dispatcher(), self.recent.read()),
+                         pmap({'g1': 60}))
+        self.assertEqual(sync_perform(_get_dispatcher(), self.waiting.read()),
+                         pmap())
+
+
 class GetMyDivergentGroupsTests(SynchronousTestCase):
 
     def test_get_my_divergent_groups(self):
@@ -716,9 +1192,30 @@ class GetMyDivergentGroupsTests(SynchronousTestCase):
         self.assertEqual(
             result,
             [{'tenant_id': '00', 'group_id': 'gr1',
-              'dirty-flag': '/groups/divergent/00_gr1'},
+              'dirty-flag': '/groups/divergent-buckets/6/00_gr1'},
              {'tenant_id': '00', 'group_id': 'gr2',
-              'dirty-flag': '/groups/divergent/00_gr2'}])
+              'dirty-flag': '/groups/divergent-buckets/6/00_gr2'}])
+
+
+class BucketsTests(SynchronousTestCase):
+    """
+    Tests for number of buckets
+    """
+
+    def test_num_buckets_configured(self):
+        """
+        Number of buckets is taken from ``converger.buckets`` config and
+        defaults to 10. It is used in paths of dirty flags.
+        """
+        self.assertEqual(get_num_buckets(), 10)
+        set_config_data({'converger': {'buckets': 64}})
+        self.addCleanup(set_config_data, {})
+        self.assertEqual(get_num_buckets(), 64)
+        # sha1('t') % 64 == 53
+        self.assertEqual(dirty_flag_path('t', 'g'),
+                         '/groups/divergent-buckets/53/t_g')
+        self.assertEqual(dirty_flag_path('t', 'g', 10),
+                         '/groups/divergent-buckets/3/t_g')
 
 
 def _get_dispatcher():
@@ -816,8 +1313,8 @@ class ExecuteConvergenceTests(SynchronousTestCase):
                    links=freeze([{'href': 'link2', 'rel': 'self'}]))
         )
         self.state_active = {}
-        self.cache = [thaw(self.servers[0].json.set('_is_as_active', True)),
-                      thaw(self.servers[1].json.set('_is_as_active', True))]
+        self.cache = [dict(self.servers[0].json, _is_as_active=True),
+                      dict(self.servers[1].json, _is_as_active=True)]
         self.gsgi = GetScalingGroupInfo(tenant_id='tenant-id',
                                         group_id='group-id')
         self.manifest = {  # Many details elided!
@@ -830,11 +1327,12 @@ class ExecuteConvergenceTests(SynchronousTestCase):
                                       'lbs': {}}
         self.now = datetime(1970, 1, 1)
         self.waiting = Reference(pmap())
+        self.fingerprints = ConvergenceFingerprints()
 
     def get_seq(self, with_cache=True, upd_status_nogroup_err=False):
         """
         Return list of (intent, performer) tuples for all the effects produced
-        during gathering step of ``execute_convergence`` function
+        during gathering and planning steps of ``execute_convergence`` function
 
         :param bool with_cache: Should it include tuple corresponding to
             updating servers cache effect?
@@ -843,39 +1341,45 @@ class ExecuteConvergenceTests(SynchronousTestCase):
         """
         exec_seq = [
             (self.gsgi, lambda i: self.gsgi_result),
-            (("gacd", self.tenant_id, self.group_id, self.now),
-             self.gacd_runner)
+            timed_sequence('gather', [
+                (("gacd", self.tenant_id, self.group_id, self.now),
+                 self.gacd_runner)])
         ]
-        if with_cache:
-            exec_seq.append(
-                (UpdateServersCache(
-                    self.tenant_id, self.group_id, self.now, self.cache),
-                 noop)
-            )
         if upd_status_nogroup_err:
             def handler(i):
                 raise NoSuchScalingGroupError(self.tenant_id, self.group_id)
         else:
             handler = noop
-        return [
+        seq = [
             (Log("begin-convergence", {}), noop),
-            (LoadAndUpdateGroupStatus(
-                self.tenant_id, self.group_id, ScalingGroupStatus.ACTIVE),
-             handler),
             (Func(datetime.utcnow), lambda i: self.now),
             (MsgWithTime("gather-convergence-data", mock.ANY),
-             nested_sequence(exec_seq))
+             nested_sequence(exec_seq)),
+            (LoadAndUpdateGroupStatus(
+                self.tenant_id, self.group_id, ScalingGroupStatus.ACTIVE),
+             handler)
         ]
+        if with_cache:
+            # launch_stack cache updates do not produce any intents
+            seq.append(
+                timed_sequence('cache', [
+                    (UpdateServersCache(
+                        self.tenant_id, self.group_id, self.now, self.cache),
+                     noop)] if self.cache is not None else [])
+            )
+        return seq + [timed_sequence('plan', [])]
 
-    def _invoke(self, plan=None, executor_base=launch_server_executor):
-        kwargs = {'plan': plan} if plan is not None else {}
+    def _invoke(self, plan=None, executor_base=launch_server_executor,
+                step_limits={}, **kwargs):
+        changes = {'plan': plan} if plan is not None else {}
         executor = attr.assoc(executor_base,
-                              gather=intent_func("gacd"), **kwargs)
+                              gather=intent_func("gacd"), **changes)
+        kwargs.setdefault('fingerprints', self.fingerprints)
         return execute_convergence(
             self.tenant_id, self.group_id, build_timeout=3600,
             waiting=self.waiting,
-            limited_retry_iterations=43, step_limits={},
-            get_executor=lambda _: executor)
+            limited_retry_iterations=43, step_limits=step_limits,
+            get_executor=lambda _: executor, **kwargs)
 
     def test_no_steps(self):
         """
@@ -893,11 +1397,12 @@ class ExecuteConvergenceTests(SynchronousTestCase):
                  {'results': [], 'worst_status': 'SUCCESS'}), noop),
             clean_waiting(self.waiting, self.group_id),
             (Func(datetime.utcnow), const(success_cache_update_time)),
-            (UpdateServersCache(
-                "tenant-id", "group-id", success_cache_update_time,
-                [thaw(self.servers[0].json.set('_is_as_active', True)),
-                 thaw(self.servers[1].json.set("_is_as_active", True))]),
-             noop)
+            timed_sequence('cache', [
+                (UpdateServersCache(
+                    "tenant-id", "group-id", success_cache_update_time,
+                    [dict(self.servers[0].json, _is_as_active=True),
+                     dict(self.servers[1].json, _is_as_active=True)]),
+                 noop)])
         ]
         self.state_active = {
             'a': {'id': 'a', 'links': [{'href': 'link1', 'rel': 'self'}]},
@@ -909,6 +1414,92 @@ class ExecuteConvergenceTests(SynchronousTestCase):
             perform_sequence(self.get_seq() + sequence, self._invoke()),
             ConvergenceIterationStatus.Stop())
 
+    def _converge_no_steps(self):
+        """
+        Converge the group with empty plan
+        """
+        sequence = [
+            parallel_sequence([]),
+            (Log('execute-convergence', mock.ANY), noop),
+            (Log('execute-convergence-results', mock.ANY), noop),
+            clean_waiting(self.waiting, self.group_id),
+            (Func(datetime.utcnow), const(self.now)),
+            timed_sequence('cache', [(mock.ANY, noop)])
+        ]
+        self.assertEqual(
+            perform_sequence(self.get_seq() + sequence,
+                             self._invoke(lambda *a, **kw: [])),
+            ConvergenceIterationStatus.Stop())
+
+    def test_unchanged_skipped(self):
+        """
+        When gathered resources are same as when the group was last found
+        converged, the iteration stops without updating status, cache or
+        planning
+        """
+        self._converge_no_steps()
+        sequence = self.get_seq()[:3] + [
+            (Log('convergence-unchanged', {}), noop)]
+        self.assertEqual(
+            perform_sequence(sequence, self._invoke(lambda *a, **kw: 1 / 0)),
+            ConvergenceIterationStatus.Stop())
+
+    def test_changed_not_skipped(self):
+        """
+        Group is converged if gathered resources have changed since it was
+        last found converged
+        """
+        self._converge_no_steps()
+        self.servers = self.servers[:1]
+        self.cache = self.cache[:1]
+        self._converge_no_steps()
+
+    def test_unchanged_not_active(self):
+        """
+        Group that is not ACTIVE is converged even if nothing has changed
+        """
+        self._converge_no_steps()
+        self.state.status = ScalingGroupStatus.ERROR
+        sequence = [
+            parallel_sequence([]),
+            (Log('execute-convergence', mock.ANY), noop),
+            (Log('execute-convergence-results', mock.ANY), noop),
+            clean_waiting(self.waiting, self.group_id),
+            (UpdateGroupStatus(scaling_group=self.group,
+                               status=ScalingGroupStatus.ACTIVE), noop),
+            (Log('group-status-active', mock.ANY), noop),
+            (Func(datetime.utcnow), const(self.now)),
+            timed_sequence('cache', [(mock.ANY, noop)])
+        ]
+        self.assertEqual(
+            perform_sequence(self.get_seq() + sequence,
+                             self._invoke(lambda *a, **kw: [])),
+            ConvergenceIterationStatus.Stop())
+
+    def test_steps_forget_fingerprint(self):
+        """
+        Fingerprint is forgotten when an iteration plans some steps
+        """
+        self._converge_no_steps()
+        servers, cache = self.servers, self.cache
+        self.servers = self.servers[:1]
+        self.cache = self.cache[:1]
+        steps = [TestStep(Effect('step').on(
+            lambda _: (StepResult.RETRY, [])))]
+        sequence = [
+            parallel_sequence([]),
+            (Log('execute-convergence', mock.ANY), noop),
+            parallel_sequence([timed_step('TestStep', [('step', noop)])]),
+            (Log('execute-convergence-results', mock.ANY), noop),
+            clean_waiting(self.waiting, self.group_id)
+        ]
+        self.assertEqual(
+            perform_sequence(self.get_seq() + sequence,
+                             self._invoke(lambda *a, **kw: steps)),
+            ConvergenceIterationStatus.Continue())
+        self.servers, self.cache = servers, cache
+        self._converge_no_steps()
+
     def test_success(self):
         """
         Executes the plan and returns SUCCESS when that's the most severe
@@ -941,23 +1532,25 @@ class ExecuteConvergenceTests(SynchronousTestCase):
                  dict(servers=self.servers, lb_nodes=self.lb_nodes, lbs={},
                       steps=steps, now=self.now, desired=dgs)), noop),
             parallel_sequence([
-                [({'dgs': dgs, 'servers': self.servers,
-                   'lb_nodes': (), 'now': 0},
-                  noop)]
+                timed_step('TestStep', [
+                    ({'dgs': dgs, 'servers': self.servers,
+                      'lb_nodes': (), 'now': 0},
+                     noop)])
             ]),
             (Log('execute-convergence-results',
-                 {'results': [{'step': steps[0],
-                               'result': StepResult.SUCCESS,
-                               'reasons': []}],
+                 {'results': rendered([{'step': steps[0],
+                                        'result': StepResult.SUCCESS,
+                                        'reasons': []}]),
                   'worst_status': 'SUCCESS'}), noop),
             clean_waiting(self.waiting, self.group_id),
             # Note that servers arg is non-deleted servers
             (Func(datetime.utcnow), const(success_cache_update_time)),
-            (UpdateServersCache(
-                "tenant-id", "group-id", success_cache_update_time,
-                [thaw(self.servers[0].json.set("_is_as_active", True)),
-                 thaw(self.servers[1].json.set("_is_as_active", True))]),
-             noop)
+            timed_sequence('cache', [
+                (UpdateServersCache(
+                    "tenant-id", "group-id", success_cache_update_time,
+                    [dict(self.servers[0].json, _is_as_active=True),
+                     dict(self.servers[1].json, _is_as_active=True)]),
+                 noop)])
         ]
 
         # all the servers updated in cache in beginning
@@ -967,6 +1560,68 @@ class ExecuteConvergenceTests(SynchronousTestCase):
             perform_sequence(self.get_seq() + sequence, self._invoke(plan)),
             ConvergenceIterationStatus.Stop())
 
+    def test_success_applies_lb_node_changes(self):
+        """
+        LB node changes returned by successful steps are applied to the
+        gathered LB nodes when updating the servers cache, without gathering
+        again.
+        """
+        added = self.lb_nodes.pop()
+        self.cache[1] = thaw(self.servers[1].json)
+        steps = [
+            TestStep(Effect('add').on(
+                lambda _: (StepResult.SUCCESS, [],
+                           [LBNodeChange.Added(node=added)])))]
+
+        def plan(*args, **kwargs):
+            return [] if added in kwargs['lb_nodes'] else steps
+
+        sequence = [
+            parallel_sequence([]),
+            (Log('execute-convergence', mock.ANY), noop),
+            parallel_sequence([timed_step('TestStep', [('add', noop)])]),
+            (Log('execute-convergence-results', mock.ANY), noop),
+            clean_waiting(self.waiting, self.group_id),
+            (Func(datetime.utcnow), const(self.now)),
+            timed_sequence('cache', [
+                (UpdateServersCache(
+                    "tenant-id", "group-id", self.now,
+                    [dict(self.servers[0].json, _is_as_active=True),
+                     dict(self.servers[1].json, _is_as_active=True)]),
+                 noop)])
+        ]
+        self.assertEqual(
+            perform_sequence(self.get_seq() + sequence, self._invoke(plan)),
+            ConvergenceIterationStatus.Stop())
+
+    def test_success_with_remaining_steps_continues(self):
+        """
+        If planning again after applying the LB node changes of successful
+        steps still gives steps, i.e. some steps were left out of the
+        executed plan, convergence continues without updating the cache.
+        """
+        added = self.lb_nodes.pop()
+        self.cache[1] = thaw(self.servers[1].json)
+        steps = [
+            TestStep(Effect('add').on(
+                lambda _: (StepResult.SUCCESS, [],
+                           [LBNodeChange.Added(node=added)])))]
+        remaining = [TestStep(Effect('remove'))]
+
+        def plan(*args, **kwargs):
+            return remaining if added in kwargs['lb_nodes'] else steps
+
+        sequence = [
+            parallel_sequence([]),
+            (Log('execute-convergence', mock.ANY), noop),
+            parallel_sequence([timed_step('TestStep', [('add', noop)])]),
+            (Log('execute-convergence-results', mock.ANY), noop),
+            clean_waiting(self.waiting, self.group_id)
+        ]
+        self.assertEqual(
+            perform_sequence(self.get_seq() + sequence, self._invoke(plan)),
+            ConvergenceIterationStatus.Continue())
+
     def test_log_reasons(self):
         """When a step doesn't succeed, useful information is logged."""
         try:
@@ -982,7 +1637,7 @@ class ExecuteConvergenceTests(SynchronousTestCase):
         exc_msg = "ZeroDivisionError('integer division or modulo by zero',)"
         tb_msg = ''.join(traceback.format_exception(*exc_info))
         expected_fields = {
-            'results': [
+            'results': rendered([
                 {
                     'step': step,
                     'result': StepResult.RETRY,
@@ -992,17 +1647,17 @@ class ExecuteConvergenceTests(SynchronousTestCase):
                         {'foo': 'bar'}
                     ]
                 }
-            ],
+            ]),
             'worst_status': 'RETRY'}
         sequence = [
             parallel_sequence([]),
             (Log(msg='execute-convergence', fields=mock.ANY), noop),
             parallel_sequence([
-                [("step_intent", lambda i: (
-                     StepResult.RETRY, [
-                         ErrorReason.Exception(exc_info),
-                         ErrorReason.String('foo'),
-                         ErrorReason.Structured({'foo': 'bar'})]))]
+                timed_step('TestStep', [("step_intent", lambda i: (
+                    StepResult.RETRY, [
+                        ErrorReason.Exception(exc_info),
+                        ErrorReason.String('foo'),
+                        ErrorReason.Structured({'foo': 'bar'})]))])
             ]),
             (Log(msg='execute-convergence-results', fields=expected_fields),
              noop),
@@ -1032,7 +1687,8 @@ class ExecuteConvergenceTests(SynchronousTestCase):
             ]),
             (Log(msg='execute-convergence', fields=mock.ANY), noop),
             parallel_sequence([
-                [("create-server", lambda i: (StepResult.RETRY, []))]
+                timed_step('CreateServer', [
+                    ("create-server", lambda i: (StepResult.RETRY, []))])
             ]),
             (Log(msg='execute-convergence-results', fields=mock.ANY), noop),
             clean_waiting(self.waiting, self.group_id),
@@ -1042,6 +1698,46 @@ class ExecuteConvergenceTests(SynchronousTestCase):
             perform_sequence(self.get_seq() + sequence, self._invoke(plan)),
             ConvergenceIterationStatus.Continue())
 
+    def test_adaptive_step_limits(self):
+        """
+        The plan is given step limits adapted to the tenant and the results
+        of creating servers are recorded against them. A create that
+        succeeds returns RETRY and does not shrink them.
+        """
+        limits = AdaptiveStepLimits(initial=4)
+        step = CreateServer(server_config=pmap({"foo": "bar"}))
+        step.as_effect = lambda: Effect("create-server")
+        planned_limits = []
+
+        def plan(dgs, now, build_timeout, step_limits, **resources):
+            planned_limits.append(step_limits)
+            return pbag([step])
+
+        sequence = [
+            parallel_sequence([
+                [parallel_sequence([
+                    [(Log('convergence-create-servers', mock.ANY), noop)]
+                ])]
+            ]),
+            (Log(msg='execute-convergence', fields=mock.ANY), noop),
+            parallel_sequence([
+                timed_step('CreateServer', [
+                    ("create-server", lambda i: (StepResult.RETRY, []))])
+            ]),
+            (Log(msg='execute-convergence-results', fields=mock.ANY), noop),
+            clean_waiting(self.waiting, self.group_id),
+        ]
+
+        self.assertEqual(
+            perform_sequence(
+                self.get_seq() + sequence,
+                self._invoke(plan, step_limits={CreateServer: 10},
+                             adaptive_limits=limits)),
+            ConvergenceIterationStatus.Continue())
+        self.assertEqual(planned_limits, [{CreateServer: 4}])
+        self.assertEqual(limits.limits(self.tenant_id, {CreateServer: 10}),
+                         {CreateServer: 4})
+
     def _test_deleting_group(self, step_result, with_delete, exec_result):
 
         def _plan(dsg, *a, **kwargs):
@@ -1053,7 +1749,7 @@ class ExecuteConvergenceTests(SynchronousTestCase):
             parallel_sequence([]),
             (Log('execute-convergence', mock.ANY), noop),
             parallel_sequence([
-                [("step", lambda i: (step_result, []))]
+                timed_step('TestStep', [("step", lambda i: (step_result, []))])
             ]),
             (Log('execute-convergence-results', mock.ANY), noop),
             clean_waiting(self.waiting, self.group_id),
@@ -1099,9 +1795,11 @@ class ExecuteConvergenceTests(SynchronousTestCase):
             parallel_sequence([]),
             (Log('execute-convergence', mock.ANY), noop),
             parallel_sequence([
-                [("step1", lambda i: (StepResult.SUCCESS, []))],
-                [("retry", lambda i: (StepResult.RETRY,
-                                      [ErrorReason.String('mywish')]))],
+                timed_step('TestStep', [
+                    ("step1", lambda i: (StepResult.SUCCESS, []))]),
+                timed_step('TestStep', [
+                    ("retry", lambda i: (StepResult.RETRY,
+                                         [ErrorReason.String('mywish')]))]),
             ]),
             (Log('execute-convergence-results', mock.ANY), noop),
             clean_waiting(self.waiting, self.group_id),
@@ -1134,14 +1832,18 @@ class ExecuteConvergenceTests(SynchronousTestCase):
             parallel_sequence([]),
             (Log(msg='execute-convergence', fields=mock.ANY), noop),
             parallel_sequence([
-                [("success1", success)],
-                [("retry", lambda i: (StepResult.RETRY, []))],
-                [("success2", success)],
-                [("fail1", lambda i: (StepResult.FAILURE,
-                                      [ErrorReason.Exception(exc_info)]))],
-                [("fail2", lambda i: (StepResult.FAILURE,
-                                      [ErrorReason.Exception(exc_info2)]))],
-                [("success3", success)],
+                timed_step('TestStep', [("success1", success)]),
+                timed_step('TestStep', [
+                    ("retry", lambda i: (StepResult.RETRY, []))]),
+                timed_step('TestStep', [("success2", success)]),
+                timed_step('TestStep', [
+                    ("fail1", lambda i: (StepResult.FAILURE,
+                                         [ErrorReason.Exception(exc_info)]))]),
+                timed_step('TestStep', [
+                    ("fail2",
+                     lambda i: (StepResult.FAILURE,
+                                [ErrorReason.Exception(exc_info2)]))]),
+                timed_step('TestStep', [("success3", success)]),
             ]),
             (Log(msg='execute-convergence-results', fields=mock.ANY), noop),
             clean_waiting(self.waiting, self.group_id),
@@ -1186,15 +1888,17 @@ class ExecuteConvergenceTests(SynchronousTestCase):
             (UpdateGroupErrorReasons(self.tenant_id, self.group_id, [reason]),
              noop)
         ]
+        # Group status is not updated and cache is not updated
+        gather_seq = self.get_seq()[:3]
         self.assertEqual(
-            perform_sequence(self.get_seq() + seq, self._invoke()),
+            perform_sequence(gather_seq + seq, self._invoke()),
             ConvergenceIterationStatus.Stop())
 
         # Any other error wrapped in FirstError is ignored and propagated
         exc_info = (ValueError, ValueError(2), None)
         self.gacd_runner = conste(FirstError(exc_info, 0))
         self.assertRaises(
-            FirstError, perform_sequence, self.get_seq(), self._invoke())
+            FirstError, perform_sequence, self.get_seq()[:3], self._invoke())
 
     def test_failure_unknown_reasons(self):
         """
@@ -1210,8 +1914,9 @@ class ExecuteConvergenceTests(SynchronousTestCase):
             parallel_sequence([]),
             (Log(msg='execute-convergence', fields=mock.ANY), noop),
             parallel_sequence([
-                [("fail", lambda i: (StepResult.FAILURE,
-                                     [ErrorReason.Exception(exc_info)]))]
+                timed_step('TestStep', [
+                    ("fail", lambda i: (StepResult.FAILURE,
+                                        [ErrorReason.Exception(exc_info)]))])
             ]),
             (Log(msg='execute-convergence-results', fields=mock.ANY), noop),
             clean_waiting(self.waiting, self.group_id),
@@ -1245,7 +1950,8 @@ class ExecuteConvergenceTests(SynchronousTestCase):
             parallel_sequence([]),
             (Log(msg='execute-convergence', fields=mock.ANY), noop),
             parallel_sequence([
-                [("step", lambda i: (StepResult.SUCCESS, []))]
+                timed_step('TestStep', [
+                    ("step", lambda i: (StepResult.SUCCESS, []))])
             ]),
             (Log(msg='execute-convergence-results', fields=mock.ANY), noop),
             clean_waiting(self.waiting, self.group_id),
@@ -1256,11 +1962,12 @@ class ExecuteConvergenceTests(SynchronousTestCase):
                  dict(cloud_feed=True, status='ACTIVE')),
              noop),
             (Func(datetime.utcnow), const(success_cache_update_time)),
-            (UpdateServersCache(
-                "tenant-id", "group-id", success_cache_update_time,
-                [thaw(self.servers[0].json.set('_is_as_active', True)),
-                 thaw(self.servers[1].json.set('_is_as_active', True))]),
-             noop),
+            timed_sequence('cache', [
+                (UpdateServersCache(
+                    "tenant-id", "group-id", success_cache_update_time,
+                    [dict(self.servers[0].json, _is_as_active=True),
+                     dict(self.servers[1].json, _is_as_active=True)]),
+                 noop)]),
         ]
         self.assertEqual(
             perform_sequence(self.get_seq() + sequence, self._invoke(plan)),
@@ -1288,11 +1995,12 @@ class ExecuteConvergenceTests(SynchronousTestCase):
                  dict(cloud_feed=True, status='ACTIVE')),
              noop),
             (Func(datetime.utcnow), const(success_cache_update_time)),
-            (UpdateServersCache(
-                "tenant-id", "group-id", success_cache_update_time,
-                [thaw(self.servers[0].json.set("_is_as_active", True)),
-                 thaw(self.servers[1].json.set("_is_as_active", True))]),
-             noop)
+            timed_sequence('cache', [
+                (UpdateServersCache(
+                    "tenant-id", "group-id", success_cache_update_time,
+                    [dict(self.servers[0].json, _is_as_active=True),
+                     dict(self.servers[1].json, _is_as_active=True)]),
+                 noop)])
         ]
         self.state_active = {
             'a': {'id': 'a', 'links': [{'href': 'link1', 'rel': 'self'}]},
@@ -1317,7 +2025,7 @@ class ExecuteConvergenceTests(SynchronousTestCase):
         sequence = [
             parallel_sequence([]),
             (Log('execute-convergence', mock.ANY), noop),
-            parallel_sequence([[]]),  # Only "base" intents in here
+            parallel_sequence([timed_step('ConvergeLater', [])]),
             (Log('execute-convergence-results', mock.ANY), noop),
             (ReadReference(self.waiting), dispatch(reference_dispatcher)),
             (ModifyReference(self.waiting,
@@ -1344,7 +2052,7 @@ class ExecuteConvergenceTests(SynchronousTestCase):
         sequence = [
             parallel_sequence([]),
             (Log('execute-convergence', mock.ANY), noop),
-            parallel_sequence([[]]),  # Only "base" intents in here
+            parallel_sequence([timed_step('ConvergeLater', [])]),
             (Log('execute-convergence-results', mock.ANY), noop),
             (ReadReference(self.waiting), dispatch(reference_dispatcher)),
             (Log('converge-limited-retry-too-long', fields={}), noop),
@@ -1378,7 +2086,7 @@ class ExecuteConvergenceTests(SynchronousTestCase):
         sequence = [
             parallel_sequence([]),
             (Log('execute-convergence', mock.ANY), noop),
-            parallel_sequence([[]]),  # Only "base" intents in here
+            parallel_sequence([timed_step('ConvergeLater', [])]),
             (Log('execute-convergence-results', mock.ANY), noop),
             (ReadReference(self.waiting), dispatch(reference_dispatcher)),
             (ModifyReference(self.waiting,
@@ -1409,11 +2117,12 @@ class ExecuteConvergenceTests(SynchronousTestCase):
                                         pmap())),
              dispatch(reference_dispatcher)),
             (Func(datetime.utcnow), const(success_cache_update_time)),
-            (UpdateServersCache(
-                "tenant-id", "group-id", success_cache_update_time,
-                [thaw(self.servers[0].json.set("_is_as_active", True)),
-                 thaw(self.servers[1].json.set("_is_as_active", True))]),
-             noop)
+            timed_sequence('cache', [
+                (UpdateServersCache(
+                    "tenant-id", "group-id", success_cache_update_time,
+                    [dict(self.servers[0].json, _is_as_active=True),
+                     dict(self.servers[1].json, _is_as_active=True)]),
+                 noop)])
         ]
         self.assertEqual(
             perform_sequence(self.get_seq() + sequence, self._invoke(plan)),
@@ -1434,6 +2143,7 @@ class ExecuteConvergenceTests(SynchronousTestCase):
 
         self.gsgi_result = (self.group, self.manifest)
         self.gacd_runner = lambda i: {'stacks': []}
+        self.cache = None
 
         def plan(*args, **kwargs):
             return []
@@ -1446,13 +2156,64 @@ class ExecuteConvergenceTests(SynchronousTestCase):
                              match_func(pmap({self.group_id: 43}),
                                         pmap())),
              dispatch(reference_dispatcher)),
+            timed_sequence('cache', []),
         ]
         result = perform_sequence(
-            self.get_seq(with_cache=False) + seq,
+            self.get_seq() + seq,
             self._invoke(plan, executor_base=launch_stack_executor))
         self.assertEqual(result, ConvergenceIterationStatus.Stop())
 
 
+class ConvergenceFingerprintTests(SynchronousTestCase):
+    """Tests for :func:`convergence_fingerprint`."""
+
+    def setUp(self):
+        self.desired = get_desired_server_group_state(
+            'gid', {'args': {'server': {'name': 'foo'}}}, 2)
+        self.clb_desc = CLBDescription(lb_id='23', port=80)
+        self.servers = [server('a', ServerState.ACTIVE),
+                        server('b', ServerState.BUILD)]
+        self.lb_nodes = [CLBNode(node_id='1', address='10.0.0.1',
+                                 description=self.clb_desc)]
+
+    def _fingerprint(self, servers=None, desired=None, lbs=pmap()):
+        return convergence_fingerprint(
+            desired or self.desired,
+            {'servers': self.servers if servers is None else servers,
+             'lb_nodes': self.lb_nodes, 'lbs': lbs})
+
+    def test_order_insensitive(self):
+        """
+        Fingerprint does not depend on order of the resources
+        """
+        self.assertIsNotNone(self._fingerprint())
+        self.assertEqual(self._fingerprint(),
+                         self._fingerprint(self.servers[::-1]))
+
+    def test_changes(self):
+        """
+        Fingerprint changes when desired state, servers or server metadata
+        change
+        """
+        fp = self._fingerprint()
+        self.assertNotEqual(
+            fp, self._fingerprint(self.servers[:1] +
+                                  [server('b', ServerState.ACTIVE)]))
+        self.assertNotEqual(
+            fp, self._fingerprint(self.servers[:1] +
+                                  [server('b', ServerState.BUILD,
+                                          metadata={'m': 'v'})]))
+        self.assertNotEqual(
+            fp, self._fingerprint(desired=get_desired_server_group_state(
+                'gid', {'args': {'server': {'name': 'foo'}}}, 3)))
+
+    def test_unhashable(self):
+        """
+        None is returned if a resource cannot be hashed
+        """
+        self.assertIsNone(self._fingerprint(lbs={'23': {'list': []}}))
+
+
 class IsAutoscaleActiveTests(SynchronousTestCase):
     """Tests for :func:`is_autoscale_active`."""
 
@@ -4,7 +4,7 @@ from uuid import uuid4
 
 from effect import Effect, Func, base_dispatcher, raise_, sync_perform
 from effect.testing import (
-    SequenceDispatcher, intent_func, noop, perform_sequence)
+    SequenceDispatcher, const, intent_func, noop, perform_sequence)
 
 from mock import ANY, patch
 
@@ -43,9 +43,13 @@ from otter.cloud_client.clb import (
 from otter.constants import ServiceType
 from otter.convergence.model import (
     CLBDescription,
+    CLBNode,
     CLBNodeCondition,
     CLBNodeType,
     ErrorReason,
+    LBNodeChange,
+    RCv3Description,
+    RCv3Node,
     StepResult
 )
 from otter.convergence.steps import (
@@ -387,13 +391,14 @@ class StepAsEffectTests(SynchronousTestCase):
         modifying a load balancer node.
         """
         eff = self._change_node_eff()
-        retry_result = (
-            StepResult.RETRY,
-            [ErrorReason.String(
-                'must re-gather after CLB change in order to update the '
-                'active cache')])
+        result = (
+            StepResult.SUCCESS, [],
+            [LBNodeChange.Changed(
+                lb_id='abc123', node_id='node1',
+                condition=CLBNodeCondition.DRAINING, weight=50,
+                type=CLBNodeType.PRIMARY)])
         seq = [(eff.intent, lambda i: (StubResponse(202, {}), {}))]
-        self.assertEqual(perform_sequence(seq, eff), retry_result)
+        self.assertEqual(perform_sequence(seq, eff), result)
 
     def test_change_clb_node_terminal_errors(self):
         """Some errors during :obj:`ChangeCLBNode` make convergence fail."""
@@ -489,6 +494,27 @@ class StepAsEffectTests(SynchronousTestCase):
         with seq.consume():
             self.assertEquals(sync_perform(seq, eff), expected)
 
+    def test_add_nodes_to_clb_success_with_nodes(self):
+        """
+        :obj:`AddNodesToCLB` succeeds with the nodes in the response as
+        added.
+        """
+        eff = self._add_one_node_to_clb()
+        node_json = {'id': 1, 'address': '1.2.3.4', 'port': 80,
+                     'condition': 'ENABLED', 'type': 'PRIMARY', 'weight': 1,
+                     'status': 'ONLINE'}
+        seq = SequenceDispatcher([
+            (eff.intent,
+             lambda i: (StubResponse(202, {}), {'nodes': [node_json]})),
+            (Log(ANY, ANY), lambda _: None)
+        ])
+        with seq.consume():
+            self.assertEquals(
+                sync_perform(seq, eff),
+                (StepResult.SUCCESS, [],
+                 [LBNodeChange.Added(
+                     node=CLBNode.from_node_json('12345', node_json))]))
+
     def test_add_nodes_to_clb_non_terminal_failures(self):
         """
         :obj:`AddNodesToCLB` retries if the CLB is temporarily locked, or if
@@ -611,7 +637,11 @@ class StepAsEffectTests(SynchronousTestCase):
             (expected_req2, lambda i: stub_pure_response('', 202)),
         ]
         r = perform_sequence(seq, step.as_effect())
-        self.assertEqual(r, (StepResult.SUCCESS, []))
+        self.assertEqual(
+            r,
+            (StepResult.SUCCESS, [],
+             [LBNodeChange.CLBRemoved(lb_id=lb_id, node_id=node_id)
+              for node_id in node_ids]))
 
     def test_remove_nodes_from_clb_non_terminal_failures_to_retry(self):
         """
@@ -666,8 +696,11 @@ class StepAsEffectTests(SynchronousTestCase):
         for exc in successes:
             seq = SequenceDispatcher([(eff.intent, lambda i: raise_(exc))])
             with seq.consume():
-                self.assertEquals(sync_perform(seq, eff),
-                                  (StepResult.SUCCESS, []))
+                self.assertEquals(
+                    sync_perform(seq, eff),
+                    (StepResult.SUCCESS, [],
+                     [LBNodeChange.CLBRemoved(lb_id='12345', node_id='1'),
+                      LBNodeChange.CLBRemoved(lb_id='12345', node_id='2')]))
 
 
 class RCv3BulkAddTests(SynchronousTestCase):
@@ -686,7 +719,8 @@ class RCv3BulkAddTests(SynchronousTestCase):
 
     def test_success(self):
         """
-        A successful return from `rcv3.bulk_add` results in RETRY
+        A successful return from `rcv3.bulk_add` without the added nodes
+        results in RETRY
         """
         seq = [(("ba", self.pairs), noop)]
         self.assertEqual(
@@ -697,6 +731,52 @@ class RCv3BulkAddTests(SynchronousTestCase):
                     'active cache')])
         )
 
+    def test_success_with_nodes(self):
+        """
+        A successful return from `rcv3.bulk_add` with the added nodes results
+        in SUCCESS with the nodes as added
+        """
+        body = [{'id': 'x1', 'load_balancer_pool': {'id': 'L1'},
+                 'cloud_server': {'id': 'n1'}},
+                {'id': 'x2', 'load_balancer_pool': {'id': 'l2'},
+                 'cloud_server': {'id': 'n2'}}]
+        seq = [(("ba", self.pairs), const(body))]
+        self.assertEqual(
+            perform_sequence(seq, self.step.as_effect()),
+            (StepResult.SUCCESS, [], [
+                LBNodeChange.Added(node=RCv3Node(
+                    node_id='x1', description=RCv3Description(lb_id='L1'),
+                    cloud_server_id='n1')),
+                LBNodeChange.Added(node=RCv3Node(
+                    node_id='x2', description=RCv3Description(lb_id='l2'),
+                    cloud_server_id='n2'))])
+        )
+
+    def test_success_with_some_nodes(self):
+        """
+        A successful return from `rcv3.bulk_add` with only some of the pairs
+        in it, i.e. when the others were already members, results in RETRY
+        """
+        body = [{'id': 'x1', 'load_balancer_pool': {'id': 'l1'},
+                 'cloud_server': {'id': 'n1'}}]
+        seq = [(("ba", self.pairs), const(body))]
+        self.assertEqual(
+            perform_sequence(seq, self.step.as_effect())[0],
+            StepResult.RETRY)
+
+    def test_success_with_malformed_nodes(self):
+        """
+        A successful return from `rcv3.bulk_add` with nodes missing their
+        LB or server results in RETRY
+        """
+        body = [{'id': 'x1', 'load_balancer_pool': {'id': 'l1'}},
+                {'id': 'x2', 'load_balancer_pool': {'id': 'l2'},
+                 'cloud_server': {'id': 'n2'}}]
+        seq = [(("ba", self.pairs), const(body))]
+        self.assertEqual(
+            perform_sequence(seq, self.step.as_effect())[0],
+            StepResult.RETRY)
+
     def test_failures(self):
         """
         If `rcv3.bulk_add` results in BulkErrors with only
@@ -757,14 +837,14 @@ class RCv3BulkRemoveTests(SynchronousTestCase):
 
     def test_success(self):
         """
-        Returns RETRY if rcv3.bulk_delete succeeds
+        Returns SUCCESS with removed nodes if rcv3.bulk_delete succeeds
         """
         seq = [(("bd", self.pairs), noop)]
         self.assertEqual(
             perform_sequence(seq, self.step.as_effect()),
-            (StepResult.RETRY, [ErrorReason.String(
-                'must re-gather after RCv3 LB change in order to update the '
-                'active cache')])
+            (StepResult.SUCCESS, [],
+             [LBNodeChange.RCv3Removed(lb_id='l1', server_id='n1'),
+              LBNodeChange.RCv3Removed(lb_id='l2', server_id='n2')])
         )
 
     def test_failure(self):
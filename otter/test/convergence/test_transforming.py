@@ -11,7 +11,9 @@ from twisted.trial.unittest import SynchronousTestCase
 from otter.convergence.model import (
     CLBDescription,
     CLBNodeCondition,
-    CLBNodeType)
+    CLBNodeType,
+    ServerState,
+    StepResult)
 from otter.convergence.steps import (
     AddNodesToCLB,
     BulkAddToRCv3,
@@ -22,11 +24,12 @@ from otter.convergence.steps import (
     DeleteServer,
     RemoveNodesFromCLB)
 from otter.convergence.transforming import (
+    AdaptiveStepLimits,
     get_step_limits_from_conf,
     limit_steps_by_count,
     one_clb_step,
     optimize_steps)
-from otter.test.utils import matches
+from otter.test.utils import matches, server
 
 
 class LimitStepCount(SynchronousTestCase):
@@ -94,6 +97,161 @@ class LimitStepCount(SynchronousTestCase):
         self.assertEqual(limits, {CreateServer: 100, CreateStack: 10})
 
 
+class AdaptiveStepLimitsTests(SynchronousTestCase):
+    """
+    Tests for :obj:`AdaptiveStepLimits`
+    """
+
+    def setUp(self):
+        self.limits = AdaptiveStepLimits(initial=2)
+        self.static = {CreateServer: 10, CreateStack: 10}
+
+    def _create_limit(self, tenant_id='t'):
+        return self.limits.limits(tenant_id, self.static)[CreateServer]
+
+    def _observe(self, servers, now=100, group_id='g', tenant_id='t'):
+        self.limits.observe_servers(tenant_id, group_id, servers, now, 3600,
+                                    self.static)
+
+    def _build(self, ids, state=ServerState.ACTIVE, tenant_id='t'):
+        """Observe servers building and then going into given state"""
+        self._observe([server(i, ServerState.BUILD) for i in ids],
+                      tenant_id=tenant_id)
+        self._observe([server(i, state) for i in ids], tenant_id=tenant_id)
+
+    def test_no_static_limit(self):
+        """
+        Limits are returned as is if there is no static CreateServer limit
+        """
+        self.limits.observe_servers('t', 'g', [], 0, 3600, {})
+        self.assertEqual(self.limits.limits('t', {CreateStack: 3}),
+                         {CreateStack: 3})
+
+    def test_slow_start(self):
+        """
+        Limit starts at ``initial`` and grows by one for every server that
+        builds successfully until it reaches the static limit
+        """
+        self.assertEqual(self._create_limit(), 2)
+        self.assertEqual(self._create_limit('t2'), 2)
+        self._build(['a', 'b'])
+        self.assertEqual(self._create_limit(), 4)
+        self._build(['c', 'd', 'e', 'f'])
+        self.assertEqual(self._create_limit(), 8)
+        self._build(['g', 'h', 'i', 'j', 'k'])
+        self.assertEqual(self._create_limit(), 10)
+        self.assertEqual(self.limits.limits('t', self.static)[CreateStack], 10)
+        # other tenant is not affected
+        self.assertEqual(self._create_limit('t2'), 2)
+
+    def test_only_built_servers_grow_limit(self):
+        """
+        Servers that are active without being seen building or that are
+        still building do not grow the limit
+        """
+        self._observe([server('a', ServerState.ACTIVE),
+                       server('b', ServerState.BUILD)])
+        self._observe([server('a', ServerState.ACTIVE),
+                       server('b', ServerState.BUILD)])
+        self.assertEqual(self._create_limit(), 2)
+
+    def test_build_failures_halve(self):
+        """
+        Servers going into ERROR while building or timing out building halve
+        the limit. It grows additively after that.
+        """
+        self.static = {CreateServer: 20}
+        self._build([str(i) for i in range(8)])
+        self.assertEqual(self._create_limit(), 10)
+        self._build(['e1'], ServerState.ERROR)
+        self.assertEqual(self._create_limit(), 5)
+        self._observe([server('s', ServerState.BUILD, created=0)], now=3600)
+        self.assertEqual(self._create_limit(), 2)
+        # additive increase: 2.5 + 1 / 2.5 + 1 / 2.9
+        self._build(['x', 'y'])
+        self.assertEqual(self._create_limit(), 3)
+        for i in range(5):
+            self._observe([server('s{}'.format(i), ServerState.BUILD,
+                                  created=0)],
+                          now=3600)
+        self.assertEqual(self._create_limit(), 1)
+
+    def test_timed_out_counted_once(self):
+        """
+        A server that stays in building after timing out halves the limit
+        only once. It is not counted as built if it becomes active later.
+        Once deleted, it is forgotten.
+        """
+        self._build(['a', 'b'])
+        self.assertEqual(self._create_limit(), 4)
+        for _ in range(3):
+            self._observe([server('s', ServerState.BUILD, created=0)],
+                          now=3600)
+        self.assertEqual(self._create_limit(), 2)
+        self.assertEqual(self.limits._timed_out, {'t': {'s': 'g'}})
+        self._observe([server('s', ServerState.ACTIVE, created=0)],
+                      now=3600)
+        self.assertEqual(self._create_limit(), 2)
+        self.assertEqual(self.limits._timed_out, {})
+        self._observe([server('s2', ServerState.BUILD, created=0)],
+                      now=3600)
+        self._observe([], now=3600)
+        self.assertEqual(self.limits._timed_out, {})
+
+    def test_deleted_while_building_forgotten(self):
+        """
+        Servers of the group that disappear while building are forgotten
+        and do not change the limit. Servers of other groups are kept.
+        """
+        self._observe([server('a', ServerState.BUILD)])
+        self._observe([server('b', ServerState.BUILD)], group_id='g2')
+        self._observe([])
+        self._observe([server('a', ServerState.ACTIVE)])
+        self.assertEqual(self._create_limit(), 2)
+        self._observe([server('b', ServerState.ACTIVE)], group_id='g2')
+        self.assertEqual(self._create_limit(), 3)
+
+    def test_failed_creates_halve(self):
+        """
+        Failed creates halve the limit. Successful ones, which return RETRY
+        to wait for the server to become active, do not change it.
+        """
+        self._build(['a', 'b'])
+        self.limits.creates_executed('t', [StepResult.RETRY] * 4)
+        self.assertEqual(self._create_limit(), 4)
+        self.limits.creates_executed(
+            't', [StepResult.RETRY, StepResult.FAILURE])
+        self.assertEqual(self._create_limit(), 2)
+        self.limits.creates_executed('t', [StepResult.FAILURE])
+        self.assertEqual(self._create_limit(), 1)
+
+    def test_idle_tenants_forgotten(self):
+        """
+        State of tenants whose servers are not observed for
+        ``idle_timeout`` seconds is forgotten. Only observing servers keeps
+        the tenant.
+        """
+        self.limits = AdaptiveStepLimits(initial=2, idle_timeout=1000)
+        self._build(['a', 'b'], tenant_id='t')
+        self._observe([server('c', ServerState.BUILD)], tenant_id='t2')
+        self._observe([], now=900, tenant_id='t3')
+        self.assertEqual(self._create_limit('t'), 4)
+        self._observe([], now=1100, tenant_id='t3')
+        self.assertEqual(self._create_limit('t'), 2)
+        self.assertEqual(sorted(self.limits._windows), ['t3'])
+        self.assertEqual(self.limits._building, {})
+        self.assertEqual(self.limits._timed_out, {})
+        self.assertEqual(sorted(self.limits._observed), ['t3'])
+
+    def test_limit_bounded_by_static(self):
+        """
+        Limit never goes above current static limit
+        """
+        self._build(['a', 'b', 'c'])
+        self.static = {CreateServer: 3}
+        self.assertEqual(self._create_limit(), 3)
+
+
 class OneCLBStepTests(SynchronousTestCase):
     """
     Tests for :func:`one_clb_step`
@@ -4,14 +4,35 @@ Tests for :mod:`otter.jsonschema.group_schemas`
 from copy import deepcopy
 from datetime import datetime, timedelta
 
+from jsonschema import Draft3Validator, SchemaError, ValidationError
+
 from twisted.trial.unittest import SynchronousTestCase
-from jsonschema import Draft3Validator, ValidationError
 
-from otter.json_schema import validate
-from otter.json_schema import group_schemas, group_examples, rest_schemas
+from otter.json_schema import compile_validator, validate
+from otter.json_schema import group_examples, group_schemas, rest_schemas
 from otter.util.config import set_config_data
 
 
+class CompileValidatorTestCase(SynchronousTestCase):
+    """
+    Tests for :func:`compile_validator`
+    """
+    def test_invalid_schema(self):
+        """
+        Invalid schema is rejected when compiling
+        """
+        self.assertRaises(SchemaError, compile_validator, {'type': 12})
+
+    def test_validates_like_validate(self):
+        """
+        Returned validator validates with the format checkers
+        """
+        validator = compile_validator({'type': 'string', 'format': 'cron'})
+        validator.validate('* * * * *')
+        self.assertRaises(ValidationError, validator.validate, 'junk')
+        self.assertRaises(ValidationError, validator.validate, 2)
+
+
 class ScalingGroupConfigTestCase(SynchronousTestCase):
     """
     Simple verification that the JSON schema for scaling groups is correct.
@@ -23,16 +23,22 @@ from otter.log.formatters import (
     ErrorFormattingWrapper,
     FanoutObserver,
     JSONObserverWrapper,
+    Lazy,
     LogLevel,
+    LoggingEncoder,
     ObserverWrapper,
     PEP3101FormattingWrapper,
+    SnapshotWrapper,
     StreamObserverWrapper,
     SystemFilterWrapper,
+    ThreadedObserver,
     add_to_fanout,
     cf_id_wrapper,
     get_fanout,
+    sampling_wrapper,
     serialize_to_jsonable,
     set_fanout,
+    snapshot_event,
     throttling_wrapper)
 from otter.test.utils import SameJSON, matches
 
@@ -241,6 +247,152 @@ class StreamObserverWrapperTests(SynchronousTestCase):
              mock.call('bar')])
 
 
+class ThreadedObserverTests(SynchronousTestCase):
+    """
+    Tests for :obj:`ThreadedObserver`
+    """
+
+    def setUp(self):
+        """
+        Set up observer that records events and flushes
+        """
+        self.events = []
+        self.flushes = []
+        self.observer = ThreadedObserver(
+            self.events.append, flush=lambda: self.flushes.append(1),
+            max_events=3, batch_size=2, seconds=lambda: 100)
+
+    def test_queues_without_delivering(self):
+        """
+        Events are only queued when observed.
+        """
+        self.observer({'a': 1})
+        self.assertEqual(self.events, [])
+        self.assertEqual(
+            self.observer.stats(),
+            {'queued': 1, 'dropped': 0, 'delivered': 0, 'errors': 0,
+             'pending': 1})
+
+    def test_thread_delivers_in_batches(self):
+        """
+        The worker thread delivers all queued events before stopping,
+        flushing after every batch.
+        """
+        for i in range(3):
+            self.observer({'a': i})
+        self.observer.start()
+        self.observer.stop(10)
+        self.assertEqual(self.events, [{'a': 0}, {'a': 1}, {'a': 2}])
+        self.assertEqual(self.flushes, [1, 1])
+        self.assertEqual(self.observer.stats()['delivered'], 3)
+        self.assertFalse(self.observer._thread.is_alive())
+
+    def test_drops_oldest_and_reports(self):
+        """
+        When the buffer is full the oldest events are dropped and the number
+        dropped is delivered as an event before the next batch.
+        """
+        for i in range(5):
+            self.observer({'a': i})
+        self.observer.start()
+        self.observer.stop(10)
+        self.assertEqual(
+            self.events,
+            [{'message': ('Dropped 2 log events',), 'system': 'otter.log',
+              'time': 100, 'num_dropped': 2},
+             {'a': 2}, {'a': 3}, {'a': 4}])
+        self.assertEqual(self.observer.stats()['dropped'], 2)
+
+    def test_drops_reported_to_drops_observer(self):
+        """
+        Dropped events are reported to `drops_observer` if given.
+        """
+        drops = []
+        tobs = ThreadedObserver(self.events.append, max_events=1,
+                                seconds=lambda: 100,
+                                drops_observer=drops.append)
+        tobs({'a': 0})
+        tobs({'a': 1})
+        tobs.start()
+        tobs.stop(10)
+        self.assertEqual(self.events, [{'a': 1}])
+        self.assertEqual(
+            drops,
+            [{'message': ('Dropped 1 log events',), 'system': 'otter.log',
+              'time': 100, 'num_dropped': 1}])
+
+    def test_observer_errors_counted(self):
+        """
+        Errors raised by the wrapped observer or flush are counted and do not
+        stop delivery of other events.
+        """
+        def observer(event):
+            if event['a'] == 0:
+                raise ValueError(event)
+            self.events.append(event)
+
+        def flush():
+            raise IOError('flush')
+
+        tobs = ThreadedObserver(observer, flush=flush)
+        tobs({'a': 0})
+        tobs({'a': 1})
+        tobs.deliver([{'a': 0}, {'a': 1}], 0)
+        self.assertEqual(self.events, [{'a': 1}])
+        self.assertEqual(tobs.errors, 2)
+        self.assertEqual(tobs.delivered, 1)
+
+
+class SnapshotTests(SynchronousTestCase):
+    """
+    Tests for :func:`snapshot_event` and :func:`SnapshotWrapper`
+    """
+
+    def test_copies_containers(self):
+        """
+        Dicts, lists and tuples are copied recursively and immutable values
+        are kept.
+        """
+        inner = {'b': [1, 2.5, None]}
+        event = {'message': ('hi',), 'a': inner, 'c': u'u', 'd': 10 ** 20}
+        snapshot = snapshot_event(event)
+        self.assertEqual(
+            snapshot,
+            {'message': ['hi'], 'a': {'b': [1, 2.5, None]}, 'c': u'u',
+             'd': 10 ** 20})
+        inner['b'].append(3)
+        inner['e'] = 4
+        self.assertEqual(snapshot['a'], {'b': [1, 2.5, None]})
+
+    def test_converts_other_objects(self):
+        """
+        Values that are not JSON types are converted like
+        :class:`LoggingEncoder` does, so the snapshot serializes to the same
+        JSON as the event.
+        """
+        event = {'time': datetime(2015, 1, 1), 'obj': object,
+                 'set': set([1]), 'flag': True}
+        snapshot = snapshot_event(event)
+        self.assertEqual(
+            snapshot,
+            {'time': '2015-01-01T00:00:00', 'obj': repr(object),
+             'set': repr(set([1])), 'flag': True})
+        self.assertEqual(
+            json.dumps(snapshot, sort_keys=True),
+            json.dumps(event, sort_keys=True, cls=LoggingEncoder))
+
+    def test_wrapper(self):
+        """
+        :func:`SnapshotWrapper` gives a snapshot of the event to the wrapped
+        observer.
+        """
+        events = []
+        event = {'a': [1]}
+        SnapshotWrapper(events.append)(event)
+        self.assertEqual(events, [{'a': [1]}])
+        self.assertIsNot(events[0]['a'], event['a'])
+
+
 class SystemFilterWrapperTests(SynchronousTestCase):
     """
     Test the SystemFilterWrapper
@@ -646,6 +798,20 @@ class FanoutObserverTests(SynchronousTestCase):
         self.assertEqual(obs, [{'only': 'message', 'delete_me': 'go'}])
         self.assertEqual(obs_mutated, [{'only': 'message', 'added': 'added'}])
 
+    def test_last_subobserver_gets_event(self):
+        """
+        Every subobserver except the last one gets a copy of the event. The
+        last one gets the event itself.
+        """
+        obs1, obs2 = [], []
+        fanout = FanoutObserver(obs1.append)
+        fanout.add_observer(obs2.append)
+        event = {'only': 'message'}
+        fanout(event)
+        self.assertEqual(obs1, [event])
+        self.assertIsNot(obs1[0], event)
+        self.assertIs(obs2[0], event)
+
     def test_global_fanout(self):
         """
         Setting and getting and adding to the global fanout observer.
@@ -690,3 +856,68 @@ class CFIDWrapperTests(SynchronousTestCase):
             [{'cloud_feed': True, 'this': 'is a cf event',
               'cloud_feed_id': matches(MatchesRegex(uuid_regex))},
              {'this': 'is not a cf event'}])
+
+
+class SamplingWrapperTests(SynchronousTestCase):
+    """Tests for :func:`sampling_wrapper`"""
+
+    def setUp(self):
+        self.events = []
+        self.config = {'logging.sample_rates': {'sampled': 0.25}}
+        self.rand = 0.5
+        self.observer = sampling_wrapper(
+            self.events.append, self.config.get, lambda: self.rand)
+
+    def test_unsampled_type(self):
+        """
+        Events of message types without sample rate are always emitted.
+        """
+        self.observer({'message': ('other',)})
+        self.assertEqual(self.events, [{'message': ('other',)}])
+
+    def test_no_config(self):
+        """
+        Events are emitted if there is no sampling config.
+        """
+        del self.config['logging.sample_rates']
+        self.observer({'message': ('sampled',)})
+        self.assertEqual(self.events, [{'message': ('sampled',)}])
+
+    def test_sampled(self):
+        """
+        Events of sampled message type are emitted only when random value is
+        below the rate. The rate is looked up on every event.
+        """
+        self.observer({'message': ('sampled',)})
+        self.assertEqual(self.events, [])
+        self.rand = 0.1
+        self.observer({'message': ('sampled',)})
+        self.assertEqual(self.events, [{'message': ('sampled',)}])
+        self.config['logging.sample_rates'] = {'sampled': 0.05}
+        self.observer({'message': ('sampled',)})
+        self.assertEqual(len(self.events), 1)
+
+    def test_errors_not_sampled(self):
+        """
+        Error events are always emitted.
+        """
+        event = {'message': ('sampled',), 'isError': True}
+        self.observer(event)
+        self.assertEqual(self.events, [event])
+
+    def test_lazy_rendered(self):
+        """
+        :obj:`Lazy` fields of emitted events are rendered.
+        """
+        self.observer({'message': ('other',), 'a': Lazy(sum, ([1, 2],)),
+                       'b': 3})
+        self.assertEqual(self.events, [{'message': ('other',), 'a': 3,
+                                        'b': 3}])
+
+    def test_lazy_not_rendered_when_dropped(self):
+        """
+        :obj:`Lazy` fields of dropped events are not rendered.
+        """
+        calls = []
+        self.observer({'message': ('sampled',), 'a': Lazy(calls.append)})
+        self.assertEqual(calls, [])
@@ -13,7 +13,9 @@ from otter.convergence.model import DesiredServerGroupState
 
 from otter.log.spec import (
     SpecificationObserverWrapper,
+    cap_split_events,
     get_validated_event,
+    pack_by_length,
     split_cf_messages,
     split_execute_convergence,
     split_list_servers
@@ -78,6 +80,40 @@ class SpecificationObserverWrapperTests(SynchronousTestCase):
         self.assertEqual(self.e, [message, message])
 
 
+class CapSplitEventsTests(SynchronousTestCase):
+    """
+    Tests for :func:`cap_split_events`
+    """
+
+    def setUp(self):
+        self.config = {'logging.max_split_events': {'capped': 2}}
+        self.events = [{'otter_msg_type': 'capped', 'i': i}
+                       for i in range(4)]
+
+    def test_capped(self):
+        """
+        Only configured number of events are kept and the last one kept has
+        number of events dropped.
+        """
+        self.assertEqual(
+            cap_split_events(self.events, self.config.get),
+            [{'otter_msg_type': 'capped', 'i': 0},
+             {'otter_msg_type': 'capped', 'i': 1,
+              'dropped_split_events': 2}])
+
+    def test_not_capped(self):
+        """
+        Events are returned as is if their message type is not configured,
+        there is no config, or there are fewer events than the cap.
+        """
+        events = [{'otter_msg_type': 'other'}] * 3
+        self.assertEqual(cap_split_events(events, self.config.get), events)
+        self.assertEqual(cap_split_events(self.events, {}.get), self.events)
+        self.assertEqual(
+            cap_split_events(self.events[:2], self.config.get),
+            self.events[:2])
+
+
 class GetValidatedEventTests(SynchronousTestCase):
     """
     Tests for `get_validated_event`
@@ -273,7 +309,8 @@ class ExecuteConvergenceSplitTests(SynchronousTestCase):
     def test_split_servers_into_multiple_if_servers_too_long(self):
         """
         Both 'servers' is too long to even fit in one event, split the servers
-        list, so there are more than 2 events returned.
+        list, so there are more than 2 events returned. Each split event has
+        as many servers as can fit in it.
         """
         def event(servers):
             return {'hi': 'there', "servers": servers}
@@ -286,13 +323,49 @@ class ExecuteConvergenceSplitTests(SynchronousTestCase):
         expected = [
             ({'hi': 'there', 'lb_nodes': []}, message),
             (event(['0', '1']), message),
-            (event(['2']), message),
-            (event(['3', '4']), message),
+            (event(['2', '3']), message),
+            (event(['4']), message),
         ]
 
         self.assertEqual(result, expected)
 
 
+class PackByLengthTests(SynchronousTestCase):
+    """
+    Tests for :func:`pack_by_length`
+    """
+
+    def test_empty(self):
+        """
+        Empty elements are returned as one empty sub-list
+        """
+        self.assertEqual(pack_by_length([], [], 10), [[]])
+
+    def test_all_fit(self):
+        """
+        All elements are returned in one sub-list if they fit in max length
+        along with the separators
+        """
+        self.assertEqual(pack_by_length('abc', [2, 2, 2], 10), [list('abc')])
+
+    def test_packs_consecutive(self):
+        """
+        Consecutive elements are packed in sub-lists up to max length,
+        accounting for separator between elements
+        """
+        self.assertEqual(
+            pack_by_length('abcde', [3, 3, 1, 5, 2], 8, separator_len=2),
+            [['a', 'b'], ['c', 'd'], ['e']])
+
+    def test_long_element(self):
+        """
+        Element longer than max length is returned in its own sub-list
+        """
+        self.assertEqual(
+            pack_by_length('abc', [1, 20, 1], 5),
+            [['a'], ['b'], ['c']])
+
+
 class CFMessageSplitTests(SynchronousTestCase):
     """
     Tests for splitting cf message type events
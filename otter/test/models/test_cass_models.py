@@ -45,11 +45,17 @@ from otter.models.cass import (
     CassScalingGroupServersCache,
     WeakLocks,
     _assemble_webhook_from_row,
+    add_counts,
     assemble_webhooks_in_policies,
     cql_eff,
     get_cql_dispatcher,
+    get_read_consistency,
     perform_cql_query,
+    reconcile_all_counts,
+    reconcile_counts,
     serialize_json_data,
+    update_counters,
+    validate_read_consistency_config,
     verified_view
 )
 from otter.models.interface import (
@@ -59,6 +65,7 @@ from otter.models.interface import (
     NoSuchScalingGroupError,
     NoSuchWebhookError,
     PoliciesOverLimitError,
+    STRONG_CONSISTENCY,
     ScalingGroupOverLimitError,
     ScalingGroupStatus,
     UnrecognizedCapabilityError,
@@ -71,6 +78,7 @@ from otter.test.models.test_interface import (
 )
 from otter.test.util.test_zk import ZKCrudModel, create_fake_lock
 from otter.test.utils import (
+    CheckFailure,
     DummyException,
     LockMixin,
     matches,
@@ -127,6 +135,16 @@ def _cassandrify_data(list_of_dicts):
     return _de_identify(list_of_dicts)
 
 
+def _counts_rows(reconciled=1, **counts):
+    """
+    Return rows read from resource_counts table having given counts
+    """
+    counts['reconciled'] = reconciled
+    return [{'resource': resource, 'count': count}
+            for resource, count in sorted(counts.items())
+            if count is not None]
+
+
 class EffectTests(SynchronousTestCase):
     """
     Tests for :func:`perform_cql_query` and :func:`get_cql_dispatcher`
@@ -180,6 +198,280 @@ class SerialJsonDataTestCase(SynchronousTestCase):
                          json.dumps({'_ver': 'version'}))
 
 
+class ResourceCountsTests(SynchronousTestCase):
+    """
+    Tests for :func:`update_counters`, :func:`add_counts`,
+    :func:`reconcile_counts` and :func:`reconcile_all_counts`
+    """
+
+    def setUp(self):
+        self.connection = mock.MagicMock(spec=['execute'])
+        self.connection.execute.return_value = defer.succeed(None)
+
+    def test_update_counters(self):
+        """
+        Counters with non-zero deltas are updated in a counter batch
+        """
+        d = update_counters(self.connection,
+                            [('t1', 'groups', 1), ('t1', 'policies', 0),
+                             ('t2', 'webhooks', -2)])
+        self.assertIsNone(self.successResultOf(d))
+        self.connection.execute.assert_called_once_with(
+            'BEGIN COUNTER BATCH '
+            'UPDATE resource_counts SET count = count + :count0delta '
+            'WHERE "tenantId" = :count0tenantId AND '
+            'resource = :count0resource '
+            'UPDATE resource_counts SET count = count + :count1delta '
+            'WHERE "tenantId" = :count1tenantId AND '
+            'resource = :count1resource '
+            'APPLY BATCH;',
+            {'count0tenantId': 't1', 'count0resource': 'groups',
+             'count0delta': 1,
+             'count1tenantId': 't2', 'count1resource': 'webhooks',
+             'count1delta': -2},
+            ConsistencyLevel.QUORUM)
+
+    def test_update_counters_nothing(self):
+        """
+        Nothing is executed if all deltas are 0
+        """
+        d = update_counters(self.connection, [('t1', 'groups', 0)])
+        self.assertIsNone(self.successResultOf(d))
+        self.assertFalse(self.connection.execute.called)
+
+    def test_add_counts(self):
+        """
+        Counts are added to the tenant's and all tenants' counters
+        """
+        add_counts(self.connection, 't1', {'webhooks': 2, 'policies': -1})
+        self.assertEqual(
+            self.connection.execute.call_args[0][1],
+            {'count0tenantId': 't1', 'count0resource': 'policies',
+             'count0delta': -1,
+             'count1tenantId': '*', 'count1resource': 'policies',
+             'count1delta': -1,
+             'count2tenantId': 't1', 'count2resource': 'webhooks',
+             'count2delta': 2,
+             'count3tenantId': '*', 'count3resource': 'webhooks',
+             'count3delta': 2})
+
+    def test_reconcile_counts(self):
+        """
+        Counters of already reconciled tenant are read with QUORUM and
+        corrected by difference from counted rows. Counters of all tenants
+        are not changed.
+        """
+        counts = _counts_rows(groups=3, policies=2, webhooks=1)
+        returns = [counts, [{'count': 3}], [{'count': 4}], [{'count': 0}],
+                   counts, None]
+        self.connection.execute.side_effect = (
+            lambda *a: defer.succeed(returns.pop(0)))
+        d = reconcile_counts(self.connection, 't1')
+        self.assertEqual(self.successResultOf(d),
+                         {'groups': 3, 'policies': 4, 'webhooks': 0})
+        self.assertEqual(
+            self.connection.execute.call_args[0][1],
+            {'count0tenantId': 't1', 'count0resource': 'policies',
+             'count0delta': 2,
+             'count1tenantId': 't1', 'count1resource': 'webhooks',
+             'count1delta': -1})
+        self.assertEqual(
+            [c[0][2] for c in self.connection.execute.call_args_list],
+            [ConsistencyLevel.QUORUM] * 6)
+
+    def test_reconcile_counts_changed(self):
+        """
+        Counters are not corrected if they changed while rows were counted
+        """
+        returns = [_counts_rows(groups=3, policies=2, webhooks=1),
+                   [{'count': 3}], [{'count': 4}], [{'count': 0}],
+                   _counts_rows(groups=4, policies=2, webhooks=1)]
+        self.connection.execute.side_effect = (
+            lambda *a: defer.succeed(returns.pop(0)))
+        d = reconcile_counts(self.connection, 't1')
+        self.assertEqual(self.successResultOf(d),
+                         {'groups': 3, 'policies': 4, 'webhooks': 0})
+        self.assertEqual(returns, [])
+        self.assertEqual(self.connection.execute.call_count, 5)
+
+    def test_reconcile_counts_first_time(self):
+        """
+        Reconciling a tenant for the first time records that it is reconciled
+        """
+        counts = _counts_rows(reconciled=None, groups=1)
+        returns = [counts, [{'count': 1}], [{'count': 0}], [{'count': 0}],
+                   counts, None]
+        self.connection.execute.side_effect = (
+            lambda *a: defer.succeed(returns.pop(0)))
+        d = reconcile_counts(self.connection, 't1')
+        self.assertEqual(self.successResultOf(d),
+                         {'groups': 1, 'policies': 0, 'webhooks': 0})
+        self.assertEqual(
+            self.connection.execute.call_args[0][1],
+            {'count0tenantId': 't1', 'count0resource': 'reconciled',
+             'count0delta': 1})
+
+    def test_reconcile_all_counts(self):
+        """
+        Given tenants and tenants having counters are reconciled one at a
+        time and counters of all tenants are corrected to their sum
+        """
+        calls = []
+        returns = {
+            't1': {'groups': 2, 'policies': 1, 'webhooks': 0},
+            't2': {'groups': 0, 'policies': 0, 'webhooks': 0},
+            't3': {'groups': 1, 'policies': 3, 'webhooks': 2}}
+
+        def reconcile(connection, tenant_id):
+            self.assertIs(connection, self.connection)
+            calls.append(tenant_id)
+            return defer.succeed(returns[tenant_id])
+
+        patch(self, 'otter.models.cass.reconcile_counts',
+              side_effect=reconcile)
+        queries = self._all_counts_queries(
+            _counts_rows(groups=4, policies=4, webhooks=3),
+            _counts_rows(groups=4, policies=4, webhooks=3),
+            [(mock.ANY,
+              {'count0tenantId': '*', 'count0resource': 'groups',
+               'count0delta': -1,
+               'count1tenantId': '*', 'count1resource': 'webhooks',
+               'count1delta': -1},
+              ConsistencyLevel.QUORUM, None)])
+        d = reconcile_all_counts(self.connection, set(['t1', 't3']))
+        self.assertEqual(self.successResultOf(d),
+                         {'groups': 3, 'policies': 4, 'webhooks': 2})
+        self.assertEqual(calls, ['t1', 't2', 't3'])
+        self.assertEqual(queries, [])
+
+    def _all_counts_queries(self, counts, recounts, updates):
+        """
+        Setup connection to expect queries of :func:`reconcile_all_counts`
+        reading counters of all tenants as `counts` and then `recounts`, and
+        then `updates` queries.
+        """
+        view = ('SELECT resource, count FROM resource_counts '
+                'WHERE "tenantId" = :tenantId;')
+        queries = [
+            (view, {'tenantId': '*'}, ConsistencyLevel.QUORUM, counts),
+            ('SELECT DISTINCT "tenantId" FROM resource_counts;', {},
+             ConsistencyLevel.ONE,
+             [{'tenantId': 't2'}, {'tenantId': '*'}, {'tenantId': 't1'}]),
+            (view, {'tenantId': '*'}, ConsistencyLevel.QUORUM, recounts)
+        ] + updates
+
+        def execute(query, params, consistency):
+            exp_query, exp_params, exp_consistency, result = queries.pop(0)
+            self.assertEqual((query, params, consistency),
+                             (exp_query, exp_params, exp_consistency))
+            return defer.succeed(result)
+
+        self.connection.execute.side_effect = execute
+        return queries
+
+    def test_reconcile_all_counts_changed(self):
+        """
+        Counters of all tenants are not corrected if they changed while
+        tenants were reconciled
+        """
+        patch(self, 'otter.models.cass.reconcile_counts',
+              side_effect=lambda c, t: defer.succeed(
+                  {'groups': 1, 'policies': 0, 'webhooks': 0}))
+        queries = self._all_counts_queries(
+            _counts_rows(groups=4, policies=4, webhooks=3),
+            _counts_rows(groups=5, policies=4, webhooks=3), [])
+        d = reconcile_all_counts(self.connection)
+        self.assertEqual(self.successResultOf(d),
+                         {'groups': 2, 'policies': 0, 'webhooks': 0})
+        self.assertEqual(queries, [])
+
+    def test_reconcile_all_counts_changed_first_time(self):
+        """
+        Counters of all tenants are marked reconciled the first time even if
+        they changed while tenants were reconciled
+        """
+        patch(self, 'otter.models.cass.reconcile_counts',
+              side_effect=lambda c, t: defer.succeed(
+                  {'groups': 1, 'policies': 0, 'webhooks': 0}))
+        queries = self._all_counts_queries(
+            _counts_rows(reconciled=None, groups=4),
+            _counts_rows(reconciled=None, groups=5),
+            [(mock.ANY,
+              {'count0tenantId': '*', 'count0resource': 'reconciled',
+               'count0delta': 1},
+              ConsistencyLevel.QUORUM, None)])
+        d = reconcile_all_counts(self.connection)
+        self.assertEqual(self.successResultOf(d),
+                         {'groups': 2, 'policies': 0, 'webhooks': 0})
+        self.assertEqual(queries, [])
+
+
+class GetReadConsistencyTests(SynchronousTestCase):
+    """
+    Tests for :func:`get_read_consistency`
+    """
+
+    def setUp(self):
+        self.addCleanup(set_config_data, {})
+
+    def test_default(self):
+        """
+        LOCAL_QUORUM is used when there is no config
+        """
+        set_config_data({})
+        self.assertEqual(get_read_consistency('view_config'),
+                         ConsistencyLevel.LOCAL_QUORUM)
+
+    def test_configured_default(self):
+        """
+        Configured default level is used when there is no config for the read
+        """
+        set_config_data(
+            {'cassandra': {'read_consistency': {'default': 'ONE',
+                                                'get_webhook': 'QUORUM'}}})
+        self.assertEqual(get_read_consistency('view_config'),
+                         ConsistencyLevel.ONE)
+
+    def test_read_override(self):
+        """
+        Level configured for the particular read is used if there is one
+        """
+        set_config_data(
+            {'cassandra': {'read_consistency': {'default': 'ONE',
+                                                'get_webhook': 'QUORUM'}}})
+        self.assertEqual(get_read_consistency('get_webhook'),
+                         ConsistencyLevel.QUORUM)
+
+
+class ValidateReadConsistencyConfigTests(SynchronousTestCase):
+    """
+    Tests for :func:`validate_read_consistency_config`
+    """
+
+    def setUp(self):
+        self.addCleanup(set_config_data, {})
+
+    def test_valid(self):
+        """
+        Nothing is raised when there is no config or all levels are valid
+        """
+        set_config_data({})
+        validate_read_consistency_config()
+        set_config_data(
+            {'cassandra': {'read_consistency': {'default': 'ONE',
+                                                'get_webhook': 'QUORUM'}}})
+        validate_read_consistency_config()
+
+    def test_invalid(self):
+        """
+        ValueError is raised if any configured level is invalid
+        """
+        set_config_data(
+            {'cassandra': {'read_consistency': {'default': 'ONE',
+                                                'get_webhook': 'QUORAM'}}})
+        self.assertRaises(ValueError, validate_read_consistency_config)
+
+
 class AssembleWebhooksTests(SynchronousTestCase):
     """
     Tests for `assemble_webhooks_in_policies`
@@ -304,15 +596,18 @@ class VerifiedViewTests(SynchronousTestCase):
 
     def test_resurrected_view(self):
         """
-        Raise empty error if resurrected view
+        Raise empty error if resurrected view. The row is read again at
+        QUORUM to confirm it before deleting it at QUORUM.
         """
-        self.connection.execute.return_value = defer.succeed(
+        self.connection.execute.side_effect = lambda *a: defer.succeed(
             [{'c1': 2, 'created_at': None}])
         r = self._verified_view()
         self.failureResultOf(r, ValueError)
-        self.connection.execute.assert_has_calls(
+        self.assertEqual(
+            self.connection.execute.mock_calls,
             [mock.call('vq', {'d': 2}, ConsistencyLevel.TWO),
-             mock.call('dq', {'d': 2}, ConsistencyLevel.TWO)])
+             mock.call('vq', {'d': 2}, ConsistencyLevel.QUORUM),
+             mock.call('dq', {'d': 2}, ConsistencyLevel.QUORUM)])
         self.log.msg.assert_called_once_with(
             'Resurrected row',
             row={'c1': 2, 'created_at': None},
@@ -333,11 +628,30 @@ class VerifiedViewTests(SynchronousTestCase):
             return defer.Deferred()
 
         self.connection.execute.side_effect = _execute
-        r = self._verified_view()
+        r = verified_view(
+            self.connection, 'vq', 'dq', {'d': 2}, ConsistencyLevel.QUORUM,
+            ValueError, self.log)
         self.failureResultOf(r, ValueError)
         self.connection.execute.assert_has_calls(
+            [mock.call('vq', {'d': 2}, ConsistencyLevel.QUORUM),
+             mock.call('dq', {'d': 2}, ConsistencyLevel.QUORUM)])
+
+    def test_weak_read_resurrected_on_lagging_replica(self):
+        """
+        If a row read at a weaker consistency looks resurrected but is valid
+        when read at QUORUM, the valid row is returned and nothing is
+        deleted.
+        """
+        self.connection.execute.side_effect = [
+            defer.succeed([{'c1': 2, 'created_at': None}]),
+            defer.succeed([{'c1': 2, 'created_at': 23}])]
+        r = self._verified_view()
+        self.assertEqual(self.successResultOf(r), {'c1': 2, 'created_at': 23})
+        self.assertEqual(
+            self.connection.execute.mock_calls,
             [mock.call('vq', {'d': 2}, ConsistencyLevel.TWO),
-             mock.call('dq', {'d': 2}, ConsistencyLevel.TWO)])
+             mock.call('vq', {'d': 2}, ConsistencyLevel.QUORUM)])
+        self.assertFalse(self.log.msg.called)
 
     def test_empty_view(self):
         """
@@ -464,6 +778,9 @@ class CassScalingGroupTestCase(IScalingGroupProviderMixin, LockMixin,
             self, 'otter.models.cass.next_cron_occurrence',
             return_value='next_time')
 
+        self.add_counts = patch(self, 'otter.models.cass.add_counts',
+                                return_value=defer.succeed(None))
+
 
 class CassScalingGroupTests(CassScalingGroupTestCase):
     """
@@ -508,7 +825,7 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
                        'AND "groupId" = :groupId AND deleting=false;')
         expectedData = {"tenantId": "11111", "groupId": "12345678g"}
         self.connection.execute.assert_called_once_with(
-            expectedCql, expectedData, ConsistencyLevel.QUORUM)
+            expectedCql, expectedData, ConsistencyLevel.LOCAL_QUORUM)
         self.assertEqual(r, {})
 
     def test_view_config_recurrected_entry(self):
@@ -517,7 +834,8 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
         'created_at', then NoSuchScalingGroupError is returned and
         that row's deletion is triggered.
         """
-        self.returns = [[{'group_config': '{}', 'created_at': None}], None]
+        self.returns = [[{'group_config': '{}', 'created_at': None}],
+                        [{'group_config': '{}', 'created_at': None}], None]
         r = self.group.view_config()
         self.failureResultOf(r, NoSuchScalingGroupError)
         view_cql = ('SELECT group_config, created_at '
@@ -528,7 +846,8 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
                    '"tenantId" = :tenantId AND "groupId" = :groupId')
         expectedData = {"tenantId": "11111", "groupId": "12345678g"}
         self.connection.execute.assert_has_calls(
-            [mock.call(view_cql, expectedData, ConsistencyLevel.QUORUM),
+            [mock.call(view_cql, expectedData, ConsistencyLevel.LOCAL_QUORUM),
+             mock.call(view_cql, expectedData, ConsistencyLevel.QUORUM),
              mock.call(del_cql, expectedData, ConsistencyLevel.QUORUM)])
 
     def test_view_state(self):
@@ -1053,6 +1372,22 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
                         "tenantId": '11111', 'ts': 10345000}
         self.connection.execute.assert_called_once_with(
             expectedCql, expectedData, ConsistencyLevel.QUORUM)
+        self.add_counts.assert_called_once_with(
+            self.connection, '11111', {'groups': -1})
+
+    @mock.patch('otter.models.cass.CassScalingGroup.view_config',
+                return_value=defer.succeed({}))
+    def test_update_status_deleting_counts_failure(self, mock_vc):
+        """
+        Setting DELETING status succeeds even if groups count could not be
+        updated. The error is logged.
+        """
+        self.add_counts.return_value = defer.fail(DummyException())
+        d = self.group.update_status(ScalingGroupStatus.DELETING)
+        self.assertIsNone(self.successResultOf(d))
+        self.group.log.err.assert_called_once_with(
+            CheckFailure(DummyException), 'resource-counts-update-error',
+            groups=-1)
 
     @mock.patch('otter.models.cass.CassScalingGroup.view_config',
                 return_value=defer.succeed({}))
@@ -1084,6 +1419,28 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
         self.failureResultOf(d, NoSuchScalingGroupError)
         self.assertFalse(self.connection.execute.called)
 
+    def test_view_config_given_consistency(self):
+        """
+        `view_config` reads with given consistency instead of the configured
+        read consistency
+        """
+        self.returns = [[{'group_config': '{}', 'created_at': 24}]]
+        d = self.group.view_config(ConsistencyLevel.QUORUM)
+        self.assertEqual(self.successResultOf(d), {})
+        self.connection.execute.assert_called_once_with(
+            mock.ANY, mock.ANY, ConsistencyLevel.QUORUM)
+
+    def test_view_config_strong_consistency(self):
+        """
+        `view_config` reads at QUORUM when asked for
+        :data:`STRONG_CONSISTENCY`
+        """
+        self.returns = [[{'group_config': '{}', 'created_at': 24}]]
+        d = self.group.view_config(STRONG_CONSISTENCY)
+        self.assertEqual(self.successResultOf(d), {})
+        self.connection.execute.assert_called_once_with(
+            mock.ANY, mock.ANY, ConsistencyLevel.QUORUM)
+
     def test_view_config_no_such_group(self):
         """
         Tests what happens if you try to view a group that doesn't exist.
@@ -1098,7 +1455,7 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
             'AND deleting=false;')
         expectedData = {"tenantId": "11111", "groupId": "12345678g"}
         self.connection.execute.assert_called_once_with(
-            expectedCql, expectedData, ConsistencyLevel.QUORUM)
+            expectedCql, expectedData, ConsistencyLevel.LOCAL_QUORUM)
 
         self.flushLoggedErrors(NoSuchScalingGroupError)
 
@@ -1128,7 +1485,7 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
             'AND deleting=false;')
         expectedData = {"tenantId": "11111", "groupId": "12345678g"}
         self.connection.execute.assert_called_once_with(
-            expectedCql, expectedData, ConsistencyLevel.QUORUM)
+            expectedCql, expectedData, ConsistencyLevel.LOCAL_QUORUM)
 
         self.assertEqual(r, {})
 
@@ -1146,7 +1503,7 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
             'AND deleting=false;')
         expectedData = {"tenantId": "11111", "groupId": "12345678g"}
         self.connection.execute.assert_called_once_with(
-            expectedCql, expectedData, ConsistencyLevel.QUORUM)
+            expectedCql, expectedData, ConsistencyLevel.LOCAL_QUORUM)
 
         self.flushLoggedErrors(NoSuchScalingGroupError)
 
@@ -1180,7 +1537,7 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
         expectedData = {"tenantId": "11111", "groupId": "12345678g"}
         mock_verfied_view.assert_called_once_with(
             self.connection, viewCql, delCql, expectedData,
-            ConsistencyLevel.QUORUM,
+            ConsistencyLevel.LOCAL_QUORUM,
             matches(IsInstance(NoSuchScalingGroupError)),
             self.mock_log)
 
@@ -1334,7 +1691,9 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
         r = self.successResultOf(d)
         self.assertEqual(r, expected_result)
 
-        mock_naive.assert_called_once_with(limit=100, marker=None)
+        mock_naive.assert_called_once_with(
+            limit=100, marker=None,
+            consistency=ConsistencyLevel.LOCAL_QUORUM)
         self.assertEqual(len(mock_view_config.mock_calls), 0)
 
     @mock.patch('otter.models.cass.CassScalingGroup.view_config',
@@ -1352,8 +1711,10 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
         r = self.successResultOf(d)
         self.assertEqual(r, [])
 
-        mock_naive.assert_called_once_with(limit=100, marker=None)
-        mock_view_config.assert_called_with()
+        mock_naive.assert_called_once_with(
+            limit=100, marker=None,
+            consistency=ConsistencyLevel.LOCAL_QUORUM)
+        mock_view_config.assert_called_with(ConsistencyLevel.LOCAL_QUORUM)
 
     @mock.patch('otter.models.cass.CassScalingGroup.view_config',
                 return_value=defer.succeed({}))
@@ -1370,7 +1731,8 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
         r = self.successResultOf(d)
         self.assertEqual(r, expected_result)
 
-        mock_naive.assert_called_once_with(limit=5, marker='blah')
+        mock_naive.assert_called_once_with(
+            limit=5, marker='blah', consistency=ConsistencyLevel.LOCAL_QUORUM)
 
     @mock.patch('otter.models.cass.CassScalingGroup.view_config',
                 return_value=defer.fail(NoSuchScalingGroupError('t', 'g')))
@@ -1431,6 +1793,8 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
 
         self.connection.execute.assert_called_once_with(
             expected_cql, expected_data, ConsistencyLevel.QUORUM)
+        self.add_counts.assert_called_once_with(
+            self.connection, '11111', {'policies': -1, 'webhooks': -2})
 
     @mock.patch('otter.models.cass.CassScalingGroup.get_policy',
                 return_value=defer.fail(NoSuchPolicyError('t', 'g', 'p')))
@@ -1502,6 +1866,8 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
         ]
 
         self.assertEqual(result, expected_results)
+        self.add_counts.assert_called_once_with(
+            self.connection, '11111', {'webhooks': 2})
 
     @mock.patch('otter.models.cass.CassScalingGroup.get_policy',
                 return_value=defer.succeed({}))
@@ -1837,14 +2203,14 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
             [{'data': '{"name": "pokey"}', 'capability': '{"1": "h"}'}])]
         d = self.group.get_webhook("3444", "4555")
         r = self.successResultOf(d)
-        mock_vc.assert_called_once_with()
+        mock_vc.assert_called_once_with(ConsistencyLevel.LOCAL_QUORUM)
         expectedCql = ('SELECT data, capability FROM policy_webhooks WHERE '
                        '"tenantId" = :tenantId AND "groupId" = :groupId AND '
                        '"policyId" = :policyId AND "webhookId" = :webhookId;')
         expectedData = {"tenantId": "11111", "groupId": "12345678g",
                         "policyId": "3444", "webhookId": "4555"}
         self.connection.execute.assert_called_once_with(
-            expectedCql, expectedData, ConsistencyLevel.QUORUM)
+            expectedCql, expectedData, ConsistencyLevel.LOCAL_QUORUM)
 
         self.assertEqual(
             r, {'name': 'pokey', 'capability': {"version": "1", "hash": "h"}})
@@ -1857,7 +2223,7 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
         """
         self.returns = [[]]
         d = self.group.get_webhook('3444', '4555')
-        mock_vc.assert_called_once_with()
+        mock_vc.assert_called_once_with(ConsistencyLevel.LOCAL_QUORUM)
         self.failureResultOf(d, NoSuchWebhookError)
         self.flushLoggedErrors(NoSuchPolicyError)
 
@@ -1938,7 +2304,8 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
             {'data': '{}', 'capability': {"version": "1", "hash": "h"}})
         d = self.group.delete_webhook('3444', '4555')
         self.assertIsNone(self.successResultOf(d))  # delete returns None
-        mock_gw.assert_called_once_with('3444', '4555')
+        mock_gw.assert_called_once_with('3444', '4555',
+                                        ConsistencyLevel.QUORUM)
         expectedCql = ('BEGIN BATCH '
 
                        'DELETE FROM policy_webhooks WHERE '
@@ -1957,6 +2324,8 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
 
         self.connection.execute.assert_called_once_with(
             expectedCql, expectedData, ConsistencyLevel.QUORUM)
+        self.add_counts.assert_called_once_with(
+            self.connection, '11111', {'webhooks': -1})
 
     @mock.patch('otter.models.cass.CassScalingGroup.get_webhook',
                 return_value=defer.fail(NoSuchWebhookError(*range(4))))
@@ -1968,7 +2337,8 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
         self.returns = []
         d = self.group.delete_webhook('3444', '4555')
         self.failureResultOf(d, NoSuchWebhookError)
-        mock_gw.assert_called_once_with('3444', '4555')
+        mock_gw.assert_called_once_with('3444', '4555',
+                                        ConsistencyLevel.QUORUM)
         self.flushLoggedErrors(NoSuchWebhookError)
 
     @mock.patch('otter.models.cass.CassScalingGroup.view_state')
@@ -2005,11 +2375,15 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
 
         mock_naive.return_value = defer.succeed([])
 
-        self.returns = [None]
+        self.returns = [[{'count': 0}], None]
         result = self.successResultOf(self.group.delete_group())
         self.assertIsNone(result)  # delete returns None
 
         mock_view_state.assert_called_once_with(get_deleting=True)
+        # deleting group is already out of groups count
+        self.add_counts.assert_called_once_with(
+            self.connection, self.tenant_id,
+            {'groups': 0, 'policies': 0, 'webhooks': 0})
 
     @mock.patch('otter.models.cass.CassScalingGroup.view_state')
     @mock.patch('otter.models.cass.CassScalingGroup._naive_list_all_webhooks')
@@ -2025,7 +2399,7 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
         mock_naive.return_value = defer.succeed(
             [{'webhookKey': 'w1'}, {'webhookKey': 'w2'}])
 
-        self.returns = [None]
+        self.returns = [[{'count': 1}], None]
         self.clock.advance(34.575)
         result = self.successResultOf(self.group.delete_group())
         self.assertIsNone(result)  # delete returns None
@@ -2057,8 +2431,16 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
 
             'APPLY BATCH;')
 
-        self.connection.execute.assert_called_once_with(
-            expected_cql, expected_data, ConsistencyLevel.QUORUM)
+        self.connection.execute.assert_has_calls([
+            mock.call(
+                'SELECT COUNT(*) FROM scaling_policies '
+                'WHERE "tenantId" = :tenantId AND "groupId" = :groupId;',
+                {'tenantId': self.tenant_id, 'groupId': self.group_id},
+                ConsistencyLevel.QUORUM),
+            mock.call(expected_cql, expected_data, ConsistencyLevel.QUORUM)])
+        self.add_counts.assert_called_once_with(
+            self.connection, self.tenant_id,
+            {'groups': -1, 'policies': -1, 'webhooks': -2})
 
         self.assertFalse(self.lb.acquired)
         self.assertEqual(self.kz_client.nodes, {})
@@ -2077,7 +2459,7 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
             ScalingGroupStatus.ACTIVE))
         mock_naive.return_value = defer.succeed([])
 
-        self.returns = [None]
+        self.returns = [[{'count': 0}], None]
         self.clock.advance(34.575)
         result = self.successResultOf(self.group.delete_group())
         self.assertIsNone(result)  # delete returns None
@@ -2102,7 +2484,7 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
             'WHERE "tenantId" = :tenantId AND "groupId" = :groupId '
             'APPLY BATCH;')
 
-        self.connection.execute.assert_called_once_with(
+        self.connection.execute.assert_called_with(
             expected_cql, expected_data, ConsistencyLevel.QUORUM)
 
         self.assertFalse(self.lb.acquired)
@@ -2163,7 +2545,7 @@ class CassScalingGroupTests(CassScalingGroupTestCase):
 
         self.kz_client.delete = not_empty_error
 
-        self.returns = [None]
+        self.returns = [[{'count': 0}], None]
         self.clock.advance(34.575)
         result = self.successResultOf(self.group.delete_group())
         for i in range(70):
@@ -2726,7 +3108,8 @@ class ScalingGroupAddPoliciesTests(CassScalingGroupTestCase):
         self.returns = [[{'count': 0}], None]
         d = self.group.create_policies([{"b": "lah"}])
         self.successResultOf(d)
-        self.group.view_config.assert_called_once_with()
+        self.group.view_config.assert_called_once_with(
+            ConsistencyLevel.QUORUM)
 
     def test_add_scaling_policy(self):
         """
@@ -2755,6 +3138,8 @@ class ScalingGroupAddPoliciesTests(CassScalingGroupTestCase):
 
         self.assertEqual(result, [{'b': 'lah',
                                    'id': self.mock_key.return_value}])
+        self.add_counts.assert_called_once_with(
+            self.connection, '11111', {'policies': 1})
 
     @mock.patch('otter.models.cass.serialize_json_data',
                 side_effect=lambda *args: _S(args[0]))
@@ -3074,7 +3459,7 @@ class CassScalingGroupsCollectionTestCase(IScalingGroupCollectionProviderMixin,
         set_config_data({'limits': {'absolute': {'maxGroups': 1000}}})
         self.addCleanup(set_config_data, {})
 
-        self.returns = [[{"count": 0}], None]
+        self.returns = [[{'count': 0}], None]
 
         def _responses(*args):
             result = self.returns.pop(0)
@@ -3109,6 +3494,9 @@ class CassScalingGroupsCollectionTestCase(IScalingGroupCollectionProviderMixin,
         self.mock_serial = patch(self, 'otter.models.cass.serialize_json_data',
                                  side_effect=lambda *args: _S(args[0]))
 
+        self.add_counts = patch(self, 'otter.models.cass.add_counts',
+                                return_value=defer.succeed(None))
+
         self.group = {
             'tenantId': '123',
             'groupId': 'group',
@@ -3339,10 +3727,27 @@ class CassScalingGroupsCollectionTestCase(IScalingGroupCollectionProviderMixin,
         self.assertEqual(
             self.connection.execute.mock_calls[0],
             mock.call(expectedCQL, expectedData, ConsistencyLevel.ONE))
+        self.add_counts.assert_called_once_with(
+            self.connection, '1234', {'groups': 1, 'policies': 0})
+
+    def test_create_counts_failure_ignored(self):
+        """
+        Group is created even if its counts could not be updated
+        """
+        self.add_counts.return_value = defer.fail(DummyException())
+        log = mock_log()
+        self.mock_key.return_value = '1111'
+        d = self.collection.create_scaling_group(
+            log, '1234', self.config, self.launch)
+        self.assertEqual(self.successResultOf(d)['id'], '1111')
+        log.err.assert_called_once_with(
+            CheckFailure(DummyException), 'resource-counts-update-error',
+            tenant_id='1234', scaling_group_id='1111')
 
     def test_max_groups_overlimit(self):
         """
-        test scaling group creation when at maxGroups limit
+        test scaling group creation when at maxGroups limit. The groups are
+        counted instead of being read from the tenant's counter.
         """
         self.collection.max_groups = 1
         self.returns = [[{'count': 1}]]
@@ -3624,36 +4029,54 @@ class CassScalingGroupsCollectionTestCase(IScalingGroupCollectionProviderMixin,
 
     def test_get_counts(self):
         """
-        Check get_count returns dictionary in proper format
+        Check get_count returns dictionary in proper format from the tenant's
+        counters
         """
-        self.returns = [
-            [{'count': 101}],
-            [{'count': 102}],
-            [{'count': 100}],
-        ]
+        self.returns = [_counts_rows(groups=100, policies=101, webhooks=102)]
 
-        expectedData = {'tenantId': '123'}
         expectedResults = {
             "groups": 100,
             "policies": 101,
             "webhooks": 102
         }
+        d = self.collection.get_counts(self.mock_log, '123')
+        result = self.successResultOf(d)
+        self.assertEquals(result, expectedResults)
+        self.connection.execute.assert_called_once_with(
+            'SELECT resource, count FROM resource_counts '
+            'WHERE "tenantId" = :tenantId;',
+            {'tenantId': '123'}, ConsistencyLevel.ONE)
+
+    def test_get_counts_not_reconciled(self):
+        """
+        If tenant's counters were never reconciled, the tenant's rows are
+        counted and the counters are not changed
+        """
+        self.returns = [
+            _counts_rows(reconciled=None, groups=None, policies=2,
+                         webhooks=None),
+            [{'count': 100}],
+            [{'count': 101}],
+            [{'count': 102}]
+        ]
+        d = self.collection.get_counts(self.mock_log, '123')
+        self.assertEqual(
+            self.successResultOf(d),
+            {"groups": 100, "policies": 101, "webhooks": 102})
+
+        expectedData = {'tenantId': '123'}
         config_query = ('SELECT COUNT(*) FROM scaling_group '
                         'WHERE "tenantId"=:tenantId AND deleting=false;')
         policy_query = ('SELECT COUNT(*) FROM scaling_policies '
                         'WHERE "tenantId"=:tenantId ;')
         webhook_query = ('SELECT COUNT(*) FROM policy_webhooks '
                          'WHERE "tenantId"=:tenantId ;')
-
-        calls = [
-            mock.call(policy_query, expectedData, ConsistencyLevel.ONE),
-            mock.call(webhook_query, expectedData, ConsistencyLevel.ONE),
-            mock.call(config_query, expectedData, ConsistencyLevel.ONE)]
-
-        d = self.collection.get_counts(self.mock_log, '123')
-        result = self.successResultOf(d)
-        self.assertEquals(result, expectedResults)
-        self.connection.execute.assert_has_calls(calls)
+        calls = self.connection.execute.mock_calls
+        self.assertEqual(
+            calls[1:],
+            [mock.call(config_query, expectedData, ConsistencyLevel.ONE),
+             mock.call(policy_query, expectedData, ConsistencyLevel.ONE),
+             mock.call(webhook_query, expectedData, ConsistencyLevel.ONE)])
 
 
 class CassScalingGroupsCollectionHealthCheckTestCase(
@@ -3955,11 +4378,34 @@ class CassAdminTestCase(SynchronousTestCase):
     @mock.patch('otter.models.cass.time')
     def test_get_metrics(self, time):
         """
-        Check get_metrics returns dictionary in proper format
+        Check get_metrics returns dictionary in proper format from counts of
+        all tenants
+        """
+        time.time.return_value = 1234567890
+        self.returns = [_counts_rows(groups=190, policies=191, webhooks=192)]
+
+        d = self.collection.get_metrics(self.mock_log)
+        self.assertEqual(
+            self.successResultOf(d),
+            [{'id': 'otter.metrics.{}'.format(label), 'value': value,
+              'time': 1234567890}
+             for label, value in [('groups', 190), ('policies', 191),
+                                  ('webhooks', 192)]])
+        self.connection.execute.assert_called_once_with(
+            'SELECT resource, count FROM resource_counts '
+            'WHERE "tenantId" = :tenantId;',
+            {'tenantId': '*'}, ConsistencyLevel.QUORUM)
+
+    @mock.patch('otter.models.cass.time')
+    def test_get_metrics_not_reconciled(self, time):
+        """
+        get_metrics counts all rows if counts of all tenants are not
+        reconciled yet
         """
         time.time.return_value = 1234567890
 
         self.returns = [
+            _counts_rows(reconciled=None, groups=3),
             [{'count': 190}],
             [{'count': 191}],
             [{'count': 192}],
@@ -4020,6 +4466,66 @@ class GetScalingGroupsTests(SynchronousTestCase):
         self.assertEqual(results, [rows[0], rows[3], rows[4], rows[6]])
         mock_gsgr.assert_called_once_with()
 
+    def _collection(self, returns):
+        """
+        Return collection whose connection returns given results for the
+        expected queries
+        """
+        client = mock.Mock(spec=CQLClient)
+
+        def execute(query, params, consistency):
+            exp_query, exp_params, result = returns.pop(0)
+            self.assertEqual((query, params, consistency),
+                             (exp_query, exp_params, ConsistencyLevel.ONE))
+            return defer.succeed(result)
+
+        client.execute.side_effect = execute
+        return CassScalingGroupCollection(client, Clock(), 1)
+
+    def test_tenant_filter(self):
+        """
+        Only partitions of tenants that have counters and are accepted by the
+        filter are read, one tenant at a time
+        """
+        rows = [{'tenantId': 't1', 'created_at': '0', 'desired': 2},
+                {'tenantId': 't1', 'created_at': '0', 'desired': 1,
+                 'deleting': True},
+                {'tenantId': 't3', 'created_at': '0', 'desired': 0}]
+        returns = [
+            ('SELECT resource, count FROM resource_counts '
+             'WHERE "tenantId" = :tenantId;', {'tenantId': '*'},
+             _counts_rows(groups=3)),
+            ('SELECT DISTINCT "tenantId" FROM resource_counts;', {},
+             [{'tenantId': 't3'}, {'tenantId': '*'}, {'tenantId': 't1'},
+              {'tenantId': 't2'}]),
+            ('SELECT * FROM scaling_group WHERE "tenantId"=:tenantId;',
+             {'tenantId': 't1'}, rows[:2]),
+            ('SELECT * FROM scaling_group WHERE "tenantId"=:tenantId;',
+             {'tenantId': 't3'}, rows[2:])]
+        collection = self._collection(returns)
+        d = collection.get_all_valid_groups(lambda t: t in ('t1', 't3'))
+        self.assertEqual(self.successResultOf(d), [rows[0], rows[2]])
+        self.assertEqual(returns, [])
+
+    @mock.patch("otter.models.cass.CassScalingGroupCollection"
+                ".get_scaling_group_rows")
+    def test_tenant_filter_not_reconciled(self, mock_gsgr):
+        """
+        All groups are read and filtered by tenant if counts of all tenants
+        were never reconciled
+        """
+        rows = [{'tenantId': 't1', 'created_at': '0', 'desired': 2},
+                {'tenantId': 't2', 'created_at': '0', 'desired': 1}]
+        mock_gsgr.return_value = defer.succeed(rows)
+        returns = [
+            ('SELECT resource, count FROM resource_counts '
+             'WHERE "tenantId" = :tenantId;', {'tenantId': '*'},
+             _counts_rows(reconciled=None, groups=3))]
+        collection = self._collection(returns)
+        d = collection.get_all_valid_groups(lambda t: t == 't2')
+        self.assertEqual(self.successResultOf(d), rows[1:])
+        mock_gsgr.assert_called_once_with()
+
 
 class GetScalingGroupRowsTests(SynchronousTestCase):
     """Tests for ``get_scaling_group_rows``."""
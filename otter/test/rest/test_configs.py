@@ -17,7 +17,8 @@ from otter.json_schema import rest_schemas, validate
 from otter.json_schema.group_examples import (
     config as config_examples,
     launch_server_config as launch_examples)
-from otter.models.interface import NoSuchScalingGroupError
+from otter.models.interface import (
+    NoSuchScalingGroupError, STRONG_CONSISTENCY)
 from otter.rest.decorators import InvalidJsonError
 from otter.supervisor import set_supervisor
 from otter.test.rest.request import (
@@ -213,6 +214,27 @@ class GroupConfigTestCase(RestAPITestMixin, SynchronousTestCase):
             mock.ANY, "transaction-id", expected_config, self.mock_group,
             self.mock_state, 'launch')
 
+    def test_update_group_config_reads_launch_config_strongly(self):
+        """
+        The launch config handed to ``obey_config_change`` is read with
+        :data:`STRONG_CONSISTENCY`, since it is read while modifying state
+        and is used to launch servers.
+        """
+        self.mock_group.update_config.return_value = defer.succeed(None)
+        self.mock_group.view_launch_config.return_value = defer.succeed(
+            'launch')
+
+        self.assert_status_code(204, method='PUT', body=json.dumps({
+            'name': 'blah',
+            'cooldown': 35,
+            'minEntities': 1,
+            'maxEntities': 25,
+            'metadata': {}
+        }))
+
+        self.mock_group.view_launch_config.assert_called_once_with(
+            STRONG_CONSISTENCY)
+
     def test_update_group_config_propagates_modify_trigger_errors(self):
         """
         If the update succeeds, the data is updated and a 204 is returned.
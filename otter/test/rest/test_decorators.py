@@ -360,10 +360,11 @@ class ValidateBodyTestCase(SynchronousTestCase):
         self.request = mock.MagicMock(spec=["content"],
                                       content=self.request_content)
 
-        self.validate_patch = mock.patch(
-            'otter.rest.decorators.validate')
-        self.mock_validate = self.validate_patch.start()
-        self.addCleanup(self.validate_patch.stop)
+        self.compile_patch = mock.patch(
+            'otter.rest.decorators.compile_validator')
+        self.mock_compile = self.compile_patch.start()
+        self.addCleanup(self.compile_patch.stop)
+        self.mock_validate = self.mock_compile.return_value.validate
 
     def test_success_case(self):
         """
@@ -389,8 +390,11 @@ class ValidateBodyTestCase(SynchronousTestCase):
         d = FakeApp().handle_body(self.request, *args, **kwargs)
         result = self.successResultOf(d)
 
-        # assert that it was validated
-        self.mock_validate.assert_called_once_with(expected_value, schema)
+        # assert that it was validated with validator compiled once
+        self.mock_compile.assert_called_once_with(schema)
+        self.mock_validate.assert_called_once_with(expected_value)
+        FakeApp().handle_body(self.request)
+        self.assertEqual(self.mock_compile.call_count, 1)
 
         # assert that the json was parsed and passed back in the 'data' keyword
         expected_kwargs = dict(kwargs)
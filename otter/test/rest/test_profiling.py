@@ -0,0 +1,59 @@
+"""
+Tests for the OtterConvergenceProfile application.
+"""
+import json
+
+from twisted.trial.unittest import SynchronousTestCase
+
+from otter.convergence.profiling import ConvergenceProfiler
+from otter.rest.admin import OtterAdmin
+from otter.test.rest.request import AdminRestAPITestMixin
+
+
+class ConvergenceProfileEndpointsTestCase(AdminRestAPITestMixin,
+                                          SynchronousTestCase):
+    """
+    Tests for '/convergence/profile' endpoint, which contains time taken by
+    convergence phases on this node.
+    """
+    endpoint = '/convergence/profile/'
+
+    def setUp(self):
+        """
+        Use a separate profiler
+        """
+        super(ConvergenceProfileEndpointsTestCase, self).setUp()
+        self.profiler = ConvergenceProfiler()
+        self.root = OtterAdmin(self.mock_store, self.profiler).app.resource()
+        for i in range(3):
+            self.profiler.record('iteration', i, 't', 'g{}'.format(i))
+            self.profiler.record('phase{}'.format(i), i)
+
+    def test_view_profile(self):
+        """
+        GET returns report of the profiler with default limit of 10
+        """
+        response_body = json.loads(self.assert_status_code(200))
+        self.assertEqual(response_body, self.profiler.report(10))
+
+    def test_view_profile_limit(self):
+        """
+        GET returns report limited to given ``limit`` query argument
+        """
+        response_body = json.loads(
+            self.assert_status_code(200, self.endpoint + '?limit=1'))
+        self.assertEqual(response_body, self.profiler.report(1))
+        self.assertEqual(len(response_body['groups']), 1)
+
+    def test_view_profile_invalid_limit(self):
+        """
+        GET with invalid ``limit`` query argument results in 400
+        """
+        self.assert_status_code(400, self.endpoint + '?limit=foo')
+
+    def test_reset_profile(self):
+        """
+        DELETE forgets the profile recorded so far
+        """
+        self.assert_status_code(204, method='DELETE')
+        self.assertEqual(self.profiler.report(), {'groups': [], 'phases': []})
@@ -38,7 +38,7 @@ from otter.tap.api import (
 from otter.test.test_auth import identity_config
 from otter.test.test_effect_dispatcher import full_intents
 from otter.test.utils import (
-    CheckFailure, exp_func, matches, mock_log, patch)
+    CheckFailure, matches, mock_log, patch)
 from otter.util.config import set_config_data
 from otter.util.deferredutils import DeferredPool
 from otter.util.zkpartitioner import Partitioner
@@ -282,12 +282,15 @@ class APIMakeServiceTests(SynchronousTestCase):
         self.Site = patch(self, 'otter.tap.api.Site')
         self.clientFromString = patch(self, 'otter.tap.api.clientFromString')
 
-        self.RoundRobinCassandraCluster = patch(
-            self, 'otter.tap.api.RoundRobinCassandraCluster')
+        self.PooledCassandraCluster = patch(
+            self, 'otter.tap.api.PooledCassandraCluster')
         self.LoggingCQLClient = patch(
             self, 'otter.tap.api.LoggingCQLClient')
         self.TimingOutCQLClient = patch(
             self, 'otter.tap.api.TimingOutCQLClient')
+        self.MeteredHTTPConnectionPool = patch(
+            self, 'otter.tap.api.MeteredHTTPConnectionPool')
+        self.set_pool = patch(self, 'otter.tap.api.logging_treq.set_pool')
         self.log = patch(self, 'otter.tap.api.log')
 
         Otter_patcher = mock.patch('otter.tap.api.Otter')
@@ -387,13 +390,38 @@ class APIMakeServiceTests(SynchronousTestCase):
 
     def test_cassandra_cluster_with_endpoints_and_keyspace(self):
         """
-        makeService configures a RoundRobinCassandraCluster with the
-        seed_endpoints and the keyspace from the config.
+        makeService configures a PooledCassandraCluster with the
+        seed_endpoints and the keyspace from the config with one connection
+        per host and no in-flight limit by default.
         """
         makeService(test_config)
-        self.RoundRobinCassandraCluster.assert_called_once_with(
-            [self.clientFromString.return_value],
-            'otter_test', disconnect_on_cancel=True)
+        self.PooledCassandraCluster.assert_called_once_with(
+            [('tcp:127.0.0.1:9160', self.clientFromString.return_value)],
+            'otter_test', connections_per_host=1, max_in_flight=None,
+            disconnect_on_cancel=True)
+
+    def test_cassandra_cluster_pool_config(self):
+        """
+        makeService configures the PooledCassandraCluster with connections
+        per host and in-flight limit from the config.
+        """
+        config = deepcopy(test_config)
+        config['cassandra']['connections_per_host'] = 4
+        config['cassandra']['max_in_flight_per_connection'] = 8
+        makeService(config)
+        self.PooledCassandraCluster.assert_called_once_with(
+            [('tcp:127.0.0.1:9160', self.clientFromString.return_value)],
+            'otter_test', connections_per_host=4, max_in_flight=8,
+            disconnect_on_cancel=True)
+
+    def test_invalid_read_consistency(self):
+        """
+        makeService fails if a configured read consistency is not a valid
+        consistency level.
+        """
+        config = deepcopy(test_config)
+        config['cassandra']['read_consistency'] = {'view_config': 'QUORAM'}
+        self.assertRaises(ValueError, makeService, config)
 
     def test_cassandra_scaling_group_collection_with_cluster(self):
         """
@@ -404,7 +432,7 @@ class APIMakeServiceTests(SynchronousTestCase):
         self.log.bind.assert_called_once_with(system='otter.silverberg')
         self.TimingOutCQLClient.assert_called_once_with(
             self.reactor,
-            self.RoundRobinCassandraCluster.return_value,
+            self.PooledCassandraCluster.return_value,
             10)
         self.LoggingCQLClient.assert_called_once_with(
             self.TimingOutCQLClient.return_value,
@@ -424,6 +452,37 @@ class APIMakeServiceTests(SynchronousTestCase):
 
         self.LoggingCQLClient.return_value.disconnect.assert_called_once_with()
 
+    def test_http_pool(self):
+        """
+        makeService creates the outbound HTTP connection pool with default
+        configuration and sets it to be used by all requests
+        """
+        makeService(test_config)
+        self.MeteredHTTPConnectionPool.assert_called_once_with(
+            self.reactor, max_persistent_per_host=10, idle_timeout=240)
+        self.set_pool.assert_called_once_with(
+            self.MeteredHTTPConnectionPool.return_value)
+
+    def test_http_pool_config(self):
+        """
+        makeService creates the outbound HTTP connection pool with
+        persistent connections per host and idle timeout from config
+        """
+        config = deepcopy(test_config)
+        config['http'] = {'max_persistent_per_host': 20, 'idle_timeout': 60}
+        makeService(config)
+        self.MeteredHTTPConnectionPool.assert_called_once_with(
+            self.reactor, max_persistent_per_host=20, idle_timeout=60)
+
+    def test_http_pool_closed_on_stop(self):
+        """
+        Idle HTTP connections are closed when main service is stopped
+        """
+        service = makeService(test_config)
+        service.stopService()
+        pool = self.MeteredHTTPConnectionPool.return_value
+        pool.closeCachedConnections.assert_called_once_with()
+
     def test_cassandra_store(self):
         """
         makeService configures the CassScalingGroupCollection as the
@@ -470,6 +529,12 @@ class APIMakeServiceTests(SynchronousTestCase):
                          self.store.kazoo_health_check)
         self.assertEqual(self.health_checker.checks['supervisor'],
                          get_supervisor().health_check)
+        self.assertEqual(
+            self.health_checker.checks['cassandra_pool'],
+            self.PooledCassandraCluster.return_value.health_check)
+        self.assertEqual(
+            self.health_checker.checks['http_pool'],
+            self.MeteredHTTPConnectionPool.return_value.health_check)
 
     @mock.patch('otter.tap.api.SupervisorService', wraps=SupervisorService)
     def test_supervisor_service_set_by_default(self, supervisor):
@@ -593,7 +658,7 @@ class APIMakeServiceTests(SynchronousTestCase):
         mock_cvg.assert_called_once_with(
             parent, kz_client, "disp", 20, 300, 15, {"s": "l"})
         mock_shsvc.assert_called_once_with(
-            self.reactor, config, "disp", self.health_checker, self.log)
+            self.reactor, config, "disp", self.log, mock_cvg.return_value)
         self.assertTrue(mock_shsvc.return_value in list(parent))
 
         # check no selfheal config case
@@ -746,37 +811,27 @@ class SetupSelfhealTests(SynchronousTestCase):
     Test for :func:`setup_selfheal_service`
     """
 
-    def _test_setup(self, config, interval):
+    def _test_setup(self, config, interval, max_rate=None):
         """
-        SelfHeal function wrapped with locking and logging is setup to call
-        again using TimerService. It is setup on given interval based on
-        config
+        SelfHeal's setup is called again using TimerService. It is setup on
+        given interval based on config and triggers groups in converger's
+        buckets
         """
         clock = Clock()
         log = mock_log()
-        health_checker = HealthChecker("clock", {})
-        from otter.tap.api import zk
+        converger = mock.Mock(spec=["recently_converged", "my_buckets"])
         from otter.util.config import config_value
-        selfheal = SelfHeal(clock, base_dispatcher, config_value, interval,
-                            log)
-        self.patch(
-            zk, "locked_logged_func",
-            exp_func(self, ("func", "lock"), base_dispatcher, "/selfheallock",
-                     log, "selfheal-lock-acquired", selfheal.setup))
-        self.patch(zk, "create_health_check",
-                   exp_func(self, "hc_func", "lock"))
-
-        svc = setup_selfheal_service(
-            clock,
-            config,
-            base_dispatcher,
-            health_checker,
-            log)
+
+        svc = setup_selfheal_service(clock, config, base_dispatcher, log,
+                                     converger)
 
         self.assertIsInstance(svc, TimerService)
-        self.assertEqual(svc.call, ("func", (), {}))
+        self.assertEqual(
+            svc.call,
+            (SelfHeal(clock, base_dispatcher, config_value, interval, log,
+                      converger.recently_converged, max_rate,
+                      converger.my_buckets).setup, (), {}))
         self.assertIs(svc.clock, clock)
-        self.assertIs(health_checker.checks["selfheal"], "hc_func")
 
     def test_setup_from_config(self):
         """
@@ -784,16 +839,18 @@ class SetupSelfhealTests(SynchronousTestCase):
         """
         self._test_setup({"selfheal": {"interval": 30.0}}, 30.0)
 
+    def test_setup_max_rate(self):
+        """
+        SelfHeal service is configured with max rate taken from config
+        """
+        self._test_setup({"selfheal": {"interval": 30.0, "max_rate": 5}},
+                         30.0, 5)
+
     def test_no_config(self):
         """
         returns None if "selfheal" config is not there
         """
-        svc = setup_selfheal_service(
-            "clock",
-            {},
-            "disp",
-            "health_checker",
-            "log")
+        svc = setup_selfheal_service("clock", {}, "disp", "log", "converger")
         self.assertIsNone(svc)
 
     def test_no_default(self):
@@ -816,12 +873,19 @@ class ConvergerSetupTests(SynchronousTestCase):
         service.
         """
         ms = MultiService()
-        kz_client = object()
+        kz_client = mock.Mock(spec=['kazoo_client'])
         dispatcher = object()
         interval = 50
-        setup_converger(ms, kz_client, dispatcher, interval, 35, 52, {"a": 3})
+        set_config_data({"converger": {"buckets": 64},
+                         "selfheal": {"interval": 300}})
+        self.addCleanup(set_config_data, {})
+        cvg = setup_converger(ms, kz_client, dispatcher, interval, 35, 52,
+                              {"a": 3})
         [converger] = ms.services
+        self.assertIs(converger, cvg)
         self.assertIs(converger.__class__, Converger)
+        # Converged groups are kept long enough for self heal to see them
+        self.assertEqual(converger.recently_converged_retention, 300)
         self.assertEqual(converger.build_timeout, 35)
         self.assertEqual(converger._dispatcher, dispatcher)
         self.assertEqual(converger.interval, interval / 2)
@@ -834,8 +898,17 @@ class ConvergerSetupTests(SynchronousTestCase):
         self.assertIs(partitioner, converger.partitioner)
         self.assertIs(partitioner.kz_client, kz_client)
         self.assertEqual(timer.step, interval)
+        self.assertEqual(partitioner.buckets, range(64))
+        # Buckets are partitioned with the hash ring
+        self.assertEqual(
+            sorted(partitioner.partition_func('a', ['a', 'b'], range(64)) +
+                   partitioner.partition_func('b', ['a', 'b'], range(64))),
+            range(64))
         mock_watch_children.assert_called_once_with(
             kz_client, CONVERGENCE_DIRTY_DIR, converger.divergent_changed)
+        # Bucket directories are watched with same client
+        converger._watch_children('/path', 'callback')
+        mock_watch_children.assert_called_with(kz_client, '/path', 'callback')
 
 
 class SchedulerSetupTests(SynchronousTestCase):
@@ -78,6 +78,10 @@ class PauseGroupTests(SynchronousTestCase):
                      [(DeleteNode(path="/groups/divergent/tid_gid",
                                   version=-1),
                        noop),
+                      (Log("mark-clean-success", {}), noop),
+                      (DeleteNode(path="/groups/divergent-buckets/4/tid_gid",
+                                  version=-1),
+                       noop),
                       (Log("mark-clean-success", {}), noop)],
                  ])
              ]))
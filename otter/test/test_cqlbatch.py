@@ -1,12 +1,15 @@
 """ CQL Batch wrapper test """
-from twisted.trial.unittest import SynchronousTestCase
 import mock
-from twisted.internet import defer
-from twisted.internet.task import Clock
 
 from silverberg.client import ConsistencyLevel
 
-from otter.util.cqlbatch import Batch, TimingOutCQLClient
+from twisted.internet import defer
+from twisted.internet.error import ConnectError
+from twisted.internet.task import Clock
+from twisted.trial.unittest import SynchronousTestCase
+
+from otter.util.cqlbatch import (
+    Batch, PooledCassandraCluster, TimingOutCQLClient, counter_batch)
 from otter.util.deferredutils import TimedOutError
 
 
@@ -73,6 +76,14 @@ class CqlBatchTestCase(SynchronousTestCase):
         self.connection.execute.assert_called_once_with(
             expected, {}, ConsistencyLevel.QUORUM)
 
+    def test_counter_batch(self):
+        """
+        `counter_batch` wraps statements in a counter batch
+        """
+        self.assertEqual(
+            counter_batch(['UPDATE BLAH', 'UPDATE BLOO']),
+            'BEGIN COUNTER BATCH UPDATE BLAH UPDATE BLOO APPLY BATCH;')
+
 
 class TimingOutCQLClientTests(SynchronousTestCase):
     """
@@ -114,3 +125,135 @@ class TimingOutCQLClientTests(SynchronousTestCase):
         self.assertNoResult(d)
         self.clock.advance(10)
         self.failureResultOf(d, TimedOutError)
+
+
+class PooledCassandraClusterTests(SynchronousTestCase):
+    """
+    Tests for :class:`PooledCassandraCluster`
+    """
+
+    def setUp(self):
+        """
+        Pool with 2 hosts and 2 connections per host whose queries return
+        deferreds stored in `self.results`
+        """
+        self.clients = []
+        self.results = []
+
+        def client_factory(endpoint, keyspace, disconnect_on_cancel):
+            client = mock.Mock(spec=['execute', 'disconnect'])
+            client.endpoint = endpoint
+
+            def execute(*args):
+                d = defer.Deferred()
+                self.results.append((client, args, d))
+                return d
+
+            client.execute.side_effect = execute
+            client.disconnect.return_value = defer.succeed(None)
+            self.clients.append(client)
+            return client
+
+        self.pool = PooledCassandraCluster(
+            [('h1', 'e1'), ('h2', 'e2')], 'ks', connections_per_host=2,
+            max_in_flight=1, disconnect_on_cancel=True,
+            client_factory=client_factory)
+
+    def test_connections_per_host(self):
+        """
+        Given number of connections are created per host
+        """
+        self.assertEqual([c.endpoint for c in self.clients],
+                         ['e1', 'e1', 'e2', 'e2'])
+
+    def test_round_robin_hosts(self):
+        """
+        Hosts are selected in round robin fashion
+        """
+        self.pool.execute('q', {}, 1)
+        self.pool.execute('q', {}, 1)
+        self.pool.execute('q', {}, 1)
+        self.assertEqual([c.endpoint for c, _, _ in self.results],
+                         ['e2', 'e1', 'e2'])
+
+    def test_least_busy_connection(self):
+        """
+        Query is executed on connection of host with least queries in flight
+        and result of query is returned
+        """
+        d1 = self.pool.execute('q1', {}, 1)
+        self.pool.execute('q2', {}, 1)
+        d3 = self.pool.execute('q3', {}, 1)
+        [(c1, _, r1), _, (c3, args, _)] = self.results
+        self.assertEqual(args, ('q3', {}, 1))
+        self.assertIs(c1, self.clients[2])
+        self.assertIs(c3, self.clients[3])
+        r1.callback('r1')
+        self.assertEqual(self.successResultOf(d1), 'r1')
+        self.assertNoResult(d3)
+
+    def test_max_in_flight(self):
+        """
+        Queries wait when all connections of the host have reached their
+        in-flight limit and are executed when one of them completes
+        """
+        for i in range(5):
+            self.pool.execute('q{}'.format(i), {}, 1)
+        self.assertEqual(len(self.results), 4)
+        self.assertEqual(
+            self.pool.stats(),
+            [{'host': 'h1', 'connections': 2, 'in_flight': 2, 'waiting': 0,
+              'completed': 0, 'failed': 0},
+             {'host': 'h2', 'connections': 2, 'in_flight': 2, 'waiting': 1,
+              'completed': 0, 'failed': 0}])
+        self.results[0][2].callback(None)
+        self.assertEqual(len(self.results), 5)
+        self.assertEqual(self.results[4][:2], (self.clients[2], ('q4', {}, 1)))
+
+    def test_connect_error_tries_next_host(self):
+        """
+        When query fails to connect to a host it is tried on next host
+        and failures are recorded in stats
+        """
+        d = self.pool.execute('q', {}, 1)
+        self.results[0][2].errback(ConnectError())
+        self.assertEqual(self.results[1][0].endpoint, 'e1')
+        self.results[1][2].callback('r')
+        self.assertEqual(self.successResultOf(d), 'r')
+        self.assertEqual(
+            [(s['failed'], s['completed']) for s in self.pool.stats()],
+            [(0, 1), (1, 1)])
+
+    def test_connect_error_all_hosts(self):
+        """
+        When query fails to connect to all hosts, the error is returned
+        """
+        d = self.pool.execute('q', {}, 1)
+        self.results[0][2].errback(ConnectError())
+        self.results[1][2].errback(ConnectError())
+        self.failureResultOf(d, ConnectError)
+
+    def test_other_error_not_retried(self):
+        """
+        Errors other than connection error are returned without trying other
+        hosts
+        """
+        d = self.pool.execute('q', {}, 1)
+        self.results[0][2].errback(ValueError())
+        self.failureResultOf(d, ValueError)
+        self.assertEqual(len(self.results), 1)
+
+    def test_health_check(self):
+        """
+        Health check is always healthy with stats in the details
+        """
+        self.assertEqual(self.pool.health_check(),
+                         (True, {'hosts': self.pool.stats()}))
+
+    def test_disconnect(self):
+        """
+        All connections are disconnected
+        """
+        self.successResultOf(self.pool.disconnect())
+        for client in self.clients:
+            client.disconnect.assert_called_once_with()
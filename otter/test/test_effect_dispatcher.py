@@ -7,6 +7,7 @@ from twisted.trial.unittest import SynchronousTestCase
 
 from otter.auth import Authenticate, InvalidateToken
 from otter.cloud_client import TenantScope
+from otter.convergence.profiling import TimedPhase
 from otter.effect_dispatcher import (
     get_full_dispatcher,
     get_legacy_dispatcher,
@@ -16,7 +17,7 @@ from otter.models.cass import CQLQueryExecute
 from otter.models.intents import GetScalingGroupInfo
 from otter.util.pure_http import Request
 from otter.util.retry import Retry
-from otter.util.zk import CreateOrSet
+from otter.util.zk import CreateOrSet, GetData, SetData
 from otter.worker_intents import EvictServerFromScalingGroup
 
 
@@ -42,11 +43,14 @@ def legacy_intents():
 def full_intents():
     return legacy_intents() + [
         CreateOrSet(path='foo', content='bar'),
+        GetData(path='foo'),
+        SetData(path='foo', value='bar'),
         GetScalingGroupInfo(tenant_id='foo', group_id='bar'),
         EvictServerFromScalingGroup(log='log', transaction_id='transaction_id',
                                     scaling_group='scaling_group',
                                     server_id='server_id'),
         MsgWithTime('msg', Effect(None)),
+        TimedPhase('phase', Effect(None)),
         CQLQueryExecute(query='q', params={}, consistency_level=7)
     ]
 
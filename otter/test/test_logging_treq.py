@@ -160,6 +160,27 @@ class LoggingTreqTest(SynchronousTestCase):
         self.failureResultOf(d, TimedOutError)
         self._assert_failure_logging('patch', TimedOutError, 45)
 
+    def test_request_with_pool(self):
+        """
+        Requests are made with the LoggingTreq's connection pool if it has one
+        """
+        ltreq = logging_treq.LoggingTreq(pool='pool')
+        ltreq.request('get', self.url, log=self.log, clock=self.clock)
+        self.treq.request.assert_called_once_with(
+            method='get', url=self.url, pool='pool',
+            headers={'x-otter-request-id': ['uuid']})
+
+    def test_set_pool(self):
+        """
+        `set_pool` sets the pool used by module-level request functions
+        """
+        logging_treq.set_pool('pool')
+        self.addCleanup(logging_treq.set_pool, None)
+        logging_treq.get(self.url, log=self.log, clock=self.clock)
+        self.treq.get.assert_called_once_with(
+            url=self.url, pool='pool',
+            headers={'x-otter-request-id': ['uuid']})
+
     def test_request_with_response_logging(self):
         """
         On a successful request with response logging turned on, response is
@@ -368,3 +389,77 @@ class LoggingTreqTest(SynchronousTestCase):
                           "{0}.{1} ({2}) is not treq.{1} ({3})"
                           .format(ltreq_instance.__name__, name, actual,
                                   expected))
+
+
+class MeteredHTTPConnectionPoolTests(SynchronousTestCase):
+    """
+    Tests for :class:`logging_treq.MeteredHTTPConnectionPool`
+    """
+
+    def setUp(self):
+        """
+        Pool with a fake endpoint whose connections are stored in
+        `self.connects`
+        """
+        self.clock = Clock()
+        self.pool = logging_treq.MeteredHTTPConnectionPool(
+            self.clock, max_persistent_per_host=5, idle_timeout=30)
+        self.connects = []
+        self.endpoint = mock.Mock(spec=['connect'])
+
+        def connect(factory):
+            d = Deferred()
+            self.connects.append(d)
+            return d
+
+        self.endpoint.connect.side_effect = connect
+
+    def test_config(self):
+        """
+        Persistent connections per host and idle timeout are set as given
+        """
+        self.assertTrue(self.pool.persistent)
+        self.assertEqual(self.pool.maxPersistentPerHost, 5)
+        self.assertEqual(self.pool.cachedConnectionTimeout, 30)
+
+    def test_new_connection_timed(self):
+        """
+        Time taken by new connection to get established is recorded
+        """
+        d = self.pool.getConnection('key', self.endpoint)
+        self.clock.advance(3)
+        self.connects[0].callback('protocol')
+        self.assertEqual(self.successResultOf(d), 'protocol')
+        self.assertEqual(
+            self.pool.stats(),
+            {'requests': 1, 'new_connections': 1, 'reuse_rate': 0.0,
+             'mean_connect_time': 3.0, 'idle_connections': 0})
+
+    def test_reused_connection(self):
+        """
+        Connection returned to the pool is reused and counted in reuse rate
+        """
+        protocol = mock.Mock(state='QUIESCENT')
+        self.pool.retryAutomatically = False
+        self.pool.getConnection('key', self.endpoint)
+        self.clock.advance(2)
+        self.connects[0].callback(protocol)
+        self.pool._putConnection('key', protocol)
+        self.assertEqual(self.pool.stats()['idle_connections'], 1)
+
+        d = self.pool.getConnection('key', self.endpoint)
+        self.assertIs(self.successResultOf(d), protocol)
+        self.assertEqual(len(self.connects), 1)
+        self.assertEqual(
+            self.pool.health_check(),
+            (True, {'requests': 2, 'new_connections': 1, 'reuse_rate': 0.5,
+                    'mean_connect_time': 2.0, 'idle_connections': 0}))
+
+    def test_stats_without_requests(self):
+        """
+        Stats are all zeros when no request has been made
+        """
+        self.assertEqual(
+            self.pool.stats(),
+            {'requests': 0, 'new_connections': 0, 'reuse_rate': 0.0,
+             'mean_connect_time': 0.0, 'idle_connections': 0})
@@ -36,11 +36,13 @@ from otter.metrics import (
     get_all_metrics_effects,
     get_tenant_metrics,
     makeService,
+    reconcile_resource_counts,
     unchanged_divergent_groups
 )
 from otter.test.convergence.test_model import sample_servers
 from otter.test.test_auth import identity_config
 from otter.test.utils import (
+    CheckFailure,
     CheckFailureValue,
     Provides,
     matches,
@@ -417,6 +419,33 @@ class CollectMetricsTests(SynchronousTestCase):
         self.assertFalse(self.add_to_cloud_metrics.called)
 
 
+class ReconcileResourceCountsTests(SynchronousTestCase):
+    """
+    Tests for :func:`reconcile_resource_counts`
+    """
+
+    def test_reconcile(self):
+        """
+        Counts are reconciled for tenants of all groups and totals are logged
+        """
+        rows = patch(
+            self, 'otter.metrics.CassScalingGroupCollection'
+        ).return_value.get_scaling_group_rows
+        rows.return_value = succeed(
+            [{'tenantId': 't1', 'groupId': 'g1'},
+             {'tenantId': 't1', 'groupId': 'g2'},
+             {'tenantId': 't2', 'groupId': 'g3'}])
+        reconcile = patch(self, 'otter.metrics.reconcile_all_counts',
+                          return_value=succeed({'groups': 3}))
+        log = mock_log()
+        d = reconcile_resource_counts('client', log)
+        self.assertIsNone(self.successResultOf(d))
+        rows.assert_called_once_with(props=['"tenantId"', '"groupId"'])
+        reconcile.assert_called_once_with('client', set(['t1', 't2']))
+        log.msg.assert_called_once_with('reconciled resource counts',
+                                        groups=3)
+
+
 class APIOptionsTests(SynchronousTestCase):
     """
     Test the various command line options.
@@ -450,8 +479,12 @@ class ServiceTests(SynchronousTestCase):
             return_value=self.client)
         self.mock_cm = patch(
             self, 'otter.metrics.collect_metrics', return_value=succeed(None))
+        self.mock_rrc = patch(
+            self, 'otter.metrics.reconcile_resource_counts',
+            return_value=succeed(None))
         self.config = {'cassandra': 'c', 'identity': identity_config,
-                       'metrics': {'interval': 20}}
+                       'metrics': {'interval': 20,
+                                   'counts_reconcile_interval': 100}}
         self.log = mock_log()
         self.clock = Clock()
 
@@ -530,6 +563,30 @@ class ServiceTests(SynchronousTestCase):
         self.assertIsNone(self.successResultOf(d))
         self.log.err.assert_called_once_with(None, "Error collecting metrics")
 
+    def test_reconcile_counts_called_again(self):
+        """
+        Resource counts are reconciled when service starts and again based on
+        interval given in config
+        """
+        s = self._service()
+        s.startService()
+        self.mock_rrc.assert_called_once_with(self.client, self.log)
+        self.clock.advance(80)
+        self.assertEqual(len(self.mock_rrc.mock_calls), 1)
+        self.clock.advance(20)
+        self.assertEqual(len(self.mock_rrc.mock_calls), 2)
+
+    def test_reconcile_counts_error(self):
+        """
+        Error reconciling resource counts is logged
+        """
+        s = self._service()
+        self.mock_rrc.return_value = fail(ValueError('a'))
+        d = s.reconcile_counts()
+        self.assertIsNone(self.successResultOf(d))
+        self.log.err.assert_called_once_with(
+            CheckFailure(ValueError), "Error reconciling resource counts")
+
     def test_stop_service(self):
         """
         Client is disconnected when service is stopped
@@ -541,6 +598,7 @@ class ServiceTests(SynchronousTestCase):
         d = s.stopService()
         self.assertEqual(self.successResultOf(d), 'disconnected')
         self.assertFalse(s.running)
-        # self.collect is not called again
-        self.clock.advance(20)
+        # self.collect and reconciling are not called again
+        self.clock.advance(100)
         self.assertEqual(len(self.collect.mock_calls), 1)
+        self.assertEqual(len(self.mock_rrc.mock_calls), 1)
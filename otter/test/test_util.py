@@ -517,6 +517,19 @@ class ConfigTest(SynchronousTestCase):
         self.assertIsNone(config.config_value("a"))
         config.update_config_data("a.b", 2)
 
+    def test_update_config_memoized(self):
+        """
+        Values are memoized in the config snapshot and updating config gives
+        a new snapshot with new values
+        """
+        snapshot = config.config_snapshot()
+        self.assertEqual(snapshot.value('baz.bax'), 'quux')
+        self.assertIn('baz.bax', snapshot._values)
+        config.update_config_data("baz.bax", "new")
+        self.assertEqual(config.config_value("baz.bax"), "new")
+        self.assertEqual(snapshot.value('baz.bax'), 'quux')
+        self.assertIsNot(config.config_snapshot(), snapshot)
+
 
 class WithLockTests(SynchronousTestCase):
     """
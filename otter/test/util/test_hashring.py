@@ -0,0 +1,115 @@
+"""
+Tests for :mod:`otter.util.hashring`
+"""
+
+from hashlib import sha1
+
+from twisted.trial.unittest import SynchronousTestCase
+
+from otter.util.hashring import assign_buckets, ring_partitioner, stable_hash
+
+
+class StableHashTests(SynchronousTestCase):
+    """
+    Tests for :func:`stable_hash`
+    """
+
+    def test_stable(self):
+        """
+        Returns integer from sha1 of the string
+        """
+        self.assertEqual(stable_hash('00'), int(sha1('00').hexdigest(), 16))
+
+
+class AssignBucketsTests(SynchronousTestCase):
+    """
+    Tests for :func:`assign_buckets`
+    """
+
+    members = ['n{}'.format(i) for i in range(4)]
+    buckets = range(256)
+
+    def assert_partitioned(self, assigned, buckets):
+        """
+        Every bucket is assigned to exactly one member
+        """
+        self.assertEqual(sorted(sum(assigned.values(), [])), sorted(buckets))
+
+    def test_no_members(self):
+        """
+        Returns empty dict when there are no members
+        """
+        self.assertEqual(assign_buckets([], self.buckets), {})
+
+    def test_partitions(self):
+        """
+        All buckets are assigned to some member in sorted order and members
+        get roughly equal number of buckets
+        """
+        assigned = assign_buckets(self.members, self.buckets)
+        self.assertEqual(sorted(assigned), self.members)
+        self.assert_partitioned(assigned, self.buckets)
+        for buckets in assigned.values():
+            self.assertEqual(buckets, sorted(buckets))
+            self.assertLessEqual(len(buckets), 1.25 * 256 / 4)
+        # Order of members does not matter
+        self.assertEqual(assign_buckets(reversed(self.members), self.buckets),
+                         assigned)
+
+    def test_member_leaving_moves_few_buckets(self):
+        """
+        When a member leaves, only its buckets and a few others move
+        """
+        before = assign_buckets(self.members, self.buckets)
+        after = assign_buckets(self.members[:-1], self.buckets)
+        self.assert_partitioned(after, self.buckets)
+        moved = sum(len(set(before[m]) - set(after[m]))
+                    for m in self.members[:-1])
+        self.assertLess(moved, 256 / 8)
+
+    def test_bounded(self):
+        """
+        No member gets more than ``load_factor`` times average number of
+        buckets
+        """
+        assigned = assign_buckets(self.members, self.buckets, vnodes=1,
+                                  load_factor=1.1)
+        self.assert_partitioned(assigned, self.buckets)
+        for buckets in assigned.values():
+            self.assertLessEqual(len(buckets), 1.1 * 256 / 4)
+
+    def test_over_capacity(self):
+        """
+        Bucket that no member has room for goes to the member with least
+        buckets
+        """
+        assigned = assign_buckets(['a', 'b'], range(3), load_factor=0.5)
+        self.assert_partitioned(assigned, range(3))
+        self.assertEqual(sorted(map(len, assigned.values())), [1, 2])
+
+
+class RingPartitionerTests(SynchronousTestCase):
+    """
+    Tests for :func:`ring_partitioner`
+    """
+
+    def test_partition(self):
+        """
+        The partition function returns buckets assigned to the identifier
+        """
+        partition = ring_partitioner(vnodes=10, load_factor=2)
+        members = ['a', 'b', 'c']
+        expected = assign_buckets(members, range(30), 10, 2)
+        self.assertEqual(partition('b', members, range(30)), expected['b'])
+
+    def test_members_agree(self):
+        """
+        Every member computing its own buckets covers all the buckets exactly
+        once
+        """
+        partition = ring_partitioner()
+        members = ['a', 'b', 'c']
+        self.assertEqual(
+            sorted(sum([partition(m, members, range(64)) for m in members],
+                       [])),
+            range(64))
@@ -0,0 +1,110 @@
+"""
+Tests for :mod:`otter.util.jsonstream`
+"""
+
+import json
+
+from twisted.trial.unittest import SynchronousTestCase
+
+from otter.util.jsonstream import JSONStreamDecoder
+
+
+def decode(text, chunk_size, items=None):
+    """
+    Decode ``text`` by feeding it in chunks of ``chunk_size``
+    """
+    decoder = JSONStreamDecoder(items)
+    for i in range(0, len(text), chunk_size):
+        decoder.feed(text[i:i + chunk_size])
+    return decoder.close()
+
+
+class JSONStreamDecoderTests(SynchronousTestCase):
+    """
+    Tests for :class:`JSONStreamDecoder`
+    """
+
+    texts = [
+        '{"servers": [{"id": "a\\"b", "n": [1, 2.5e3, {"x": null}]}, 12, -3,'
+        ' true, "\\u00e9"], "links": [], "count": 1234, "o": {"a": [1]}}',
+        ' { "a" :[ ] , "b" :[ 1 ,2 ] }\n',
+        '{}', '{"a": 1, "a": [2]}', '[1, 2, 3]', '12345', '"str"', 'null']
+
+    invalid_texts = [
+        '{"a": [1,]}', '{"a": 1,}', '{"a" 1}', '{"a": 1} x', '{"a": [1 2]}',
+        '{', '{"a": [1', '[1, 2', '{1: 2}']
+
+    def test_same_as_loads(self):
+        """
+        Decoded value is same as the one got from :func:`json.loads`
+        irrespective of how the text is split into chunks
+        """
+        for text in self.texts:
+            for chunk_size in (1, 2, 3, 7, len(text)):
+                self.assertEqual(decode(text, chunk_size), json.loads(text))
+
+    def test_invalid(self):
+        """
+        :meth:`JSONStreamDecoder.close` raises ValueError if the text is not
+        valid JSON irrespective of how it is split into chunks
+        """
+        for text in self.invalid_texts:
+            for chunk_size in (1, 2, len(text)):
+                self.assertRaises(ValueError, decode, text, chunk_size)
+
+    def test_empty(self):
+        """
+        Decoded value is None if no text or only whitespace is fed
+        """
+        self.assertIsNone(decode('', 1))
+        self.assertIsNone(decode(' \n', 1))
+
+    def test_items_decoded_as_received(self):
+        """
+        Array items are decoded as soon as they are received and their text is
+        not kept
+        """
+        got = []
+        decoder = JSONStreamDecoder({'a': lambda i: got.append(i) or i})
+        decoder.feed('{"a": [{"id": 1}, {"id"')
+        self.assertEqual(got, [{'id': 1}])
+        self.assertEqual(decoder._buf[decoder._pos:], '{"id"')
+        decoder.feed(': 2}]}')
+        self.assertEqual(got, [{'id': 1}, {'id': 2}])
+        self.assertEqual(decoder.close(), {'a': [{'id': 1}, {'id': 2}]})
+
+    def test_items_projected(self):
+        """
+        Items of the arrays in the given members are replaced with what the
+        function returns
+        """
+        text = ('{"servers": [{"id": 1, "x": 2}, {"id": 3}], '
+                '"links": [{"id": 4}], "id": {"id": 5}}')
+        self.assertEqual(
+            decode(text, 5, {'servers': lambda s: s['id']}),
+            {'servers': [1, 3], 'links': [{'id': 4}], 'id': {'id': 5}})
+
+    def test_big_value_tried_again_when_doubled(self):
+        """
+        Incompletely received value is not decoded again until the text
+        pending for it doubles
+        """
+        decoder = JSONStreamDecoder()
+        # 20 bytes of the item are received
+        decoder.feed('{"a": [{"b": "' + 'x' * 13)
+        decoder.feed('x' * 19)
+        self.assertEqual(decoder._chunks, ['x' * 19])
+        decoder.feed('x' * 8 + '"}]}')
+        self.assertEqual(decoder._chunks, [])
+        self.assertEqual(decoder.close(), {'a': [{'b': 'x' * 40}]})
+
+    def test_feed_does_not_raise(self):
+        """
+        :meth:`JSONStreamDecoder.feed` does not raise on invalid text and
+        ignores further text. The error is raised by
+        :meth:`JSONStreamDecoder.close`
+        """
+        decoder = JSONStreamDecoder()
+        decoder.feed('{"a": 1 2')
+        decoder.feed('}')
+        self.assertRaises(ValueError, decoder.close)
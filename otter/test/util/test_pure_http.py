@@ -130,6 +130,54 @@ class RequestEffectTests(SynchronousTestCase):
             self.successResultOf(perform(dispatcher, bound_log_eff)),
             (response, "content"))
 
+    def _perform_json(self, code, content):
+        """
+        Perform Request with ``json_items`` getting response of given code and
+        content.
+        """
+        req = ('GET', 'http://google.com/', None, None, None,
+               {'log': default_log})
+        response = StubResponse(code, {})
+        treq = StubTreq(reqs=[(req, response)],
+                        contents=[(response, content)])
+        req = Request(method="get", url="http://google.com/",
+                      json_items={'a': lambda i: i['id']})
+        req.treq = treq
+        dispatcher = get_simple_dispatcher(None)
+        return response, self.successResultOf(
+            perform(dispatcher, Effect(req)))
+
+    def test_json_items(self):
+        """
+        If ``json_items`` is given, the body of 2xx response is decoded while
+        it is received with the items projected.
+        """
+        response, result = self._perform_json(
+            200, '{"a": [{"id": 1, "b": 2}, {"id": 3}], "c": 4}')
+        self.assertEqual(result, (response, {'a': [1, 3], 'c': 4}))
+
+    def test_json_items_error_response(self):
+        """
+        If ``json_items`` is given, the body of non-2xx response is returned
+        as bytes.
+        """
+        response, result = self._perform_json(404, '{"a": []}')
+        self.assertEqual(result, (response, '{"a": []}'))
+
+    def test_json_items_invalid(self):
+        """
+        Invalid JSON body fails the effect with ValueError.
+        """
+        req = ('GET', 'http://google.com/', None, None, None,
+               {'log': default_log})
+        response = StubResponse(200, {})
+        treq = StubTreq(reqs=[(req, response)],
+                        contents=[(response, '{"a": [1, }')])
+        req = Request(method="get", url="http://google.com/", json_items={})
+        req.treq = treq
+        d = perform(get_simple_dispatcher(None), Effect(req))
+        self.failureResultOf(d, ValueError)
+
 
 class AddErrorHandlingTests(SynchronousTestCase):
     """Tests :func:`add_error_handling`."""
@@ -154,6 +202,16 @@ class CheckResponseTests(SynchronousTestCase):
         result = stub_pure_response(None)
         self.assertRaises(APIError, check_response, pred, result)
 
+    def test_error_decoded_content(self):
+        """
+        :func:`check_response` raises :class:`APIError` with JSON-serialized
+        body if the content was decoded while it was received.
+        """
+        result = (stub_pure_response(None)[0], {'a': 'b'})
+        err = self.assertRaises(APIError, check_response,
+                                lambda _response, _content: False, result)
+        self.assertEqual(json.loads(err.body), {'a': 'b'})
+
     def test_success(self):
         """
         :func:`check_response` returns the value passed into it if the
@@ -385,6 +443,15 @@ class AddJsonResponseTests(TestCase):
         self.assertEqual(resolve_stubs(request_('m', 'u')),
                          (response[0], None))
 
+    def test_decoded_json_response(self):
+        """
+        If the body was already decoded while it was received, it is returned
+        as is.
+        """
+        response = (stub_pure_response('', 200)[0], {'a': 'b'})
+        request_ = add_json_response(stub_request(response))
+        self.assertEqual(resolve_stubs(request_('m', 'u')), response)
+
 
 class AddJsonRequestDataTests(TestCase):
     """Tests for :func:`add_json_request_data`."""
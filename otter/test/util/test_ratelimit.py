@@ -0,0 +1,184 @@
+"""
+Tests for :mod:`otter.util.ratelimit`
+"""
+
+from twisted.internet.defer import Deferred, fail, succeed
+from twisted.internet.task import Clock
+from twisted.trial.unittest import SynchronousTestCase
+from twisted.web.http_headers import Headers
+
+from otter.util.http import APIError
+from otter.util.ratelimit import TokenBucket, TokenBuckets
+
+
+class TokenBucketTests(SynchronousTestCase):
+    """
+    Tests for :obj:`TokenBucket`
+    """
+
+    def setUp(self):
+        """
+        Sample bucket allowing a call every 10 seconds to begin with
+        """
+        self.clock = Clock()
+        self.bucket = TokenBucket(self.clock, 0.1, 0.2)
+
+    def test_first_call_immediate(self):
+        """
+        First call happens immediately and its result is returned
+        """
+        d = self.bucket.run(lambda a, b=None: succeed((a, b)), 1, b=2)
+        self.assertEqual(self.successResultOf(d), (1, 2))
+
+    def test_calls_spaced_by_rate(self):
+        """
+        Calls after the allowed burst wait for the rate to allow them
+        """
+        self.bucket.max_rate = 0.1
+        results = [self.bucket.run(lambda i=i: i) for i in range(3)]
+        self.assertEqual(self.successResultOf(results[0]), 0)
+        self.assertNoResult(results[1])
+        self.clock.advance(9.9)
+        self.assertNoResult(results[1])
+        self.clock.advance(0.1)
+        self.assertEqual(self.successResultOf(results[1]), 1)
+        self.assertNoResult(results[2])
+        self.clock.advance(10)
+        self.assertEqual(self.successResultOf(results[2]), 2)
+
+    def test_burst(self):
+        """
+        Up to ``capacity`` calls happen immediately after bucket is idle
+        """
+        bucket = TokenBucket(self.clock, 0.1, 0.1, capacity=3)
+        self.clock.advance(100)
+        results = [bucket.run(lambda: 'r') for _ in range(4)]
+        self.assertEqual(
+            [self.successResultOf(d) for d in results[:3]], ['r'] * 3)
+        self.assertNoResult(results[3])
+
+    def test_success_increases_rate(self):
+        """
+        Successful calls increase the rate by a tenth of base rate up to the
+        max rate
+        """
+        for _ in range(3):
+            self.bucket.run(lambda: None)
+            self.clock.advance(10)
+        self.assertAlmostEqual(self.bucket.rate, 0.13)
+        for _ in range(20):
+            self.bucket.run(lambda: None)
+            self.clock.advance(10)
+        self.assertEqual(self.bucket.rate, 0.2)
+
+    def test_rate_limited_decreases_rate(self):
+        """
+        Calls failing with 413 or 429 halve the rate down to a tenth of base
+        rate and consume all accumulated tokens
+        """
+        self.bucket.capacity = 2
+        d = self.bucket.run(lambda: fail(APIError(429, 'slow down')))
+        self.failureResultOf(d, APIError)
+        self.assertEqual(self.bucket.rate, 0.05)
+        # Next call waits for tokens at the lower rate
+        d = self.bucket.run(lambda: 'r')
+        self.clock.advance(19.9)
+        self.assertNoResult(d)
+        self.clock.advance(0.1)
+        self.successResultOf(d)
+        for _ in range(10):
+            d = self.bucket.run(lambda: fail(APIError(413, 'over limit')))
+            self.clock.advance(1000)
+            self.failureResultOf(d, APIError)
+        self.assertEqual(self.bucket.rate, 0.01)
+
+    def test_other_errors_do_not_change_rate(self):
+        """
+        Calls failing with other errors do not change the rate
+        """
+        d = self.bucket.run(lambda: fail(APIError(500, 'oops')))
+        self.failureResultOf(d, APIError)
+        d = self.bucket.run(lambda: 1 / 0)
+        self.clock.advance(10)
+        self.failureResultOf(d, ZeroDivisionError)
+        self.assertEqual(self.bucket.rate, 0.1)
+
+    def test_retry_after_pauses(self):
+        """
+        Calls are paused for as long as the ``Retry-After`` header of a rate
+        limited response says
+        """
+        headers = Headers({'Retry-After': ['60']})
+        d = self.bucket.run(lambda: fail(APIError(429, 'slow', headers)))
+        self.failureResultOf(d, APIError)
+        d = self.bucket.run(lambda: 'r')
+        self.clock.advance(59)
+        self.assertNoResult(d)
+        self.clock.advance(1)
+        self.assertEqual(self.successResultOf(d), 'r')
+
+    def test_concurrency(self):
+        """
+        With ``concurrency`` given, calls wait for calls in progress to
+        finish even if the rate allows them.
+        """
+        bucket = TokenBucket(self.clock, 10, 10, concurrency=1)
+        first = Deferred()
+        d1 = bucket.run(lambda: first)
+        d2 = bucket.run(lambda: 'second')
+        self.clock.advance(10)
+        self.assertNoResult(d2)
+        first.callback('first')
+        self.assertEqual(self.successResultOf(d1), 'first')
+        self.assertEqual(self.successResultOf(d2), 'second')
+
+    def test_idle_for(self):
+        """
+        Bucket is idle for given seconds if no calls were in progress for
+        that long.
+        """
+        first = Deferred()
+        self.bucket.run(lambda: first)
+        self.clock.advance(20)
+        self.assertFalse(self.bucket.idle_for(10))
+        first.callback(None)
+        self.assertFalse(self.bucket.idle_for(10))
+        self.clock.advance(10)
+        self.assertTrue(self.bucket.idle_for(10))
+
+
+class TokenBucketsTests(SynchronousTestCase):
+    """
+    Tests for :obj:`TokenBuckets`
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        self.buckets = TokenBuckets(self.clock, idle_timeout=100)
+
+    def test_get(self):
+        """
+        The same bucket is returned for a key until its base rate changes.
+        """
+        bucket = self.buckets.get('k', 1, 2, concurrency=1)
+        self.assertEqual((bucket.base_rate, bucket.max_rate), (1, 2))
+        self.assertIs(self.buckets.get('k', 1, 2), bucket)
+        self.assertIsNot(self.buckets.get('k2', 1, 2), bucket)
+        new = self.buckets.get('k', 2, 4)
+        self.assertIsNot(new, bucket)
+        self.assertIs(self.buckets.get('k', 2, 4), new)
+
+    def test_idle_buckets_forgotten(self):
+        """
+        Buckets without calls in progress for ``idle_timeout`` seconds are
+        forgotten, others are kept.
+        """
+        pending = Deferred()
+        busy = self.buckets.get('busy', 1, 2)
+        busy.run(lambda: pending)
+        idle = self.buckets.get('idle', 1, 2)
+        idle.run(lambda: None)
+        self.clock.advance(100)
+        self.assertIs(self.buckets.get('busy', 1, 2), busy)
+        self.assertEqual(len(self.buckets), 1)
+        self.assertIsNot(self.buckets.get('idle', 1, 2), idle)
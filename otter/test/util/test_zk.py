@@ -317,6 +317,52 @@ class GetStatTests(SynchronousTestCase):
         self.assertEqual(result, None)
 
 
+class GetDataTests(SynchronousTestCase):
+    """Tests for :obj:`GetData`."""
+
+    def setUp(self):
+        self.model = ZKCrudModel()
+
+    def _gd(self, path):
+        eff = Effect(zk.GetData(path))
+        dispatcher = get_zk_dispatcher(self.model)
+        return sync_perform(dispatcher, eff)
+
+    def test_get_data(self):
+        """Returns content and ZnodeStat when the node exists."""
+        self.model.create('/foo/bar', value='foo', makepath=True)
+        self.assertEqual(self._gd('/foo/bar'),
+                         ('foo', ZNodeStatStub(version=0)))
+
+    def test_get_data_not_exists(self):
+        """Returns None when no node exists."""
+        self.assertIsNone(self._gd('/foo/bar'))
+
+
+class SetDataTests(SynchronousTestCase):
+    """Tests for :obj:`SetData`."""
+
+    def setUp(self):
+        self.model = ZKCrudModel()
+        self.model.create('/foo', 'initial', makepath=True)
+        self.dispatcher = get_zk_dispatcher(self.model)
+
+    def test_set_data(self):
+        """Sets content if version matches and returns new ZnodeStat."""
+        result = sync_perform(
+            self.dispatcher,
+            Effect(zk.SetData(path='/foo', value='bar', version=0)))
+        self.assertEqual(result, ZNodeStatStub(version=1))
+        self.assertEqual(self.model.nodes, {'/foo': ('bar', 1)})
+
+    def test_bad_version(self):
+        """Fails with BadVersionError if version does not match."""
+        self.assertRaises(
+            BadVersionError, sync_perform, self.dispatcher,
+            Effect(zk.SetData(path='/foo', value='bar', version=1)))
+        self.assertEqual(self.model.nodes, {'/foo': ('initial', 0)})
+
+
 class DeleteTests(SynchronousTestCase):
     """Tests for :obj:`DeleteNode`."""
     def test_delete(self):
@@ -238,6 +238,19 @@ class PartitionerTests(SynchronousTestCase):
         self.assertEqual(self.partitioner.partitioner,
                          self.kz_client.SetPartitioner.return_value)
 
+    def test_partition_func(self):
+        """
+        ``partition_func`` if given is passed to the :obj:`SetPartitioner`.
+        """
+        partitioner = Partitioner(
+            self.kz_client, 10, self.path, self.buckets, self.time_boundary,
+            self.log, self.buckets_received.append, clock=self.clock,
+            partition_func=sorted)
+        partitioner.startService()
+        self.kz_client.SetPartitioner.assert_called_with(
+            self.path, set=self.buckets, time_boundary=self.time_boundary,
+            partition_func=sorted)
+
     def test_health_check_not_running(self):
         """When the service isn't running, the service is unhealthy."""
         self.assertEqual(
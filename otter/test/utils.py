@@ -39,6 +39,7 @@ from zope.interface import directlyProvides, implementer, interface
 from zope.interface.verify import verifyObject
 
 from otter.convergence.model import HeatStack, NovaServer, ServerState
+from otter.convergence.profiling import TimedPhase
 from otter.log.bound import BoundLog, bound_log_kwargs
 from otter.models.interface import (
     GroupState, IScalingGroup, IScalingGroupServersCache, ScalingGroupStatus)
@@ -448,9 +449,20 @@ class StubTreq(object):
         return succeed(alist_get(self.reqs, key))
 
     def content(self, response):
-        """Return a result by looking up the response in the `contents` dict."""
+        """
+        Return a result by looking up the response in the `contents` dict.
+        """
         return succeed(alist_get(self.contents, response))
 
+    def collect(self, response, collector):
+        """
+        Call ``collector`` with the content from the `contents` dict, one byte
+        at a time to exercise incremental collectors.
+        """
+        for byte in alist_get(self.contents, response):
+            collector(byte)
+        return succeed(None)
+
     def json_content(self, response):
         """Return :meth:`content` after json-decoding"""
         return self.content(response).addCallback(json.loads)
@@ -807,6 +819,15 @@ def nested_sequence(seq, get_effect=attrgetter('effect'),
         get_effect)
 
 
+def timed_sequence(phase, seq):
+    """
+    Return an (intent, performer) tuple that expects a
+    :obj:`otter.convergence.profiling.TimedPhase` of given phase whose
+    wrapped effect is performed with the given intent-sequence.
+    """
+    return (TimedPhase(phase, mock.ANY), nested_sequence(seq))
+
+
 def test_dispatcher(disp=None):
     disps = [
         base_dispatcher,
@@ -1,9 +1,57 @@
 """
 Implement a global configuration API.
+
+The configuration is kept in an immutable :obj:`ConfigSnapshot` that memoizes
+lookups, since config is read on hot paths like every outbound request.
+Configuration data must not be modified in place once it is set; use
+:func:`update_config_data` instead, which replaces the snapshot.
 """
 from toolz.dicttoolz import get_in, update_in
 
-_config_data = {}
+
+class ConfigSnapshot(object):
+    """
+    Immutable configuration data with memoized lookups.
+
+    :ivar dict data: The configuration data
+    """
+
+    __slots__ = ('data', '_values')
+
+    def __init__(self, data):
+        self.data = data
+        self._values = {}
+
+    def value(self, name):
+        """
+        :param str name: Name is a . separated path to a configuration value
+            stored in a nested dictionary.
+
+        :returns: The value specificed in the configuration, or None.
+        """
+        try:
+            return self._values[name]
+        except KeyError:
+            value = self._values[name] = get_in(name.split('.'), self.data)
+            return value
+
+
+_snapshot = ConfigSnapshot({})
+
+
+def _set_snapshot(data):
+    """
+    Replace the global snapshot with one of given data
+    """
+    global _snapshot
+    _snapshot = ConfigSnapshot(data)
+
+
+def config_snapshot():
+    """
+    Return current :obj:`ConfigSnapshot`
+    """
+    return _snapshot
 
 
 def set_config_data(data):
@@ -12,11 +60,7 @@ def set_config_data(data):
 
     :param dict data: The configuration data, probably loaded from some JSON.
     """
-    global _config_data
-    if data is None:
-        _config_data = {}
-    else:
-        _config_data = data
+    _set_snapshot({} if data is None else data)
 
 
 def update_config_data(name, value):
@@ -27,8 +71,8 @@ def update_config_data(name, value):
         stored in a nested dictionary.
     :param value: Value to be updated
     """
-    global _config_data
-    _config_data = update_in(_config_data, name.split('.'), lambda _: value)
+    _set_snapshot(
+        update_in(_snapshot.data, name.split('.'), lambda _: value))
 
 
 def config_value(name):
@@ -38,4 +82,4 @@ def config_value(name):
 
     :returns: The value specificed in the configuration file, or None.
     """
-    return get_in(name.split('.'), _config_data)
+    return _snapshot.value(name)
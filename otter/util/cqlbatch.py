@@ -1,6 +1,9 @@
 """ CQL Batch wrapper"""
 
-from silverberg.client import ConsistencyLevel
+from silverberg.client import CQLClient, ConsistencyLevel
+
+from twisted.internet.defer import DeferredList, DeferredSemaphore
+from twisted.internet.error import ConnectError
 
 from otter.util.deferredutils import timeout_deferred
 
@@ -39,8 +42,16 @@ def batch(statements, timestamp=None):
     return Batch(statements, {}, None, timestamp)._generate()
 
 
-# TODO: This should ideally goto silverberg but is here due to `timeout_deferred`
-# implementation. It should be coming out in Twisted itself.
+def counter_batch(statements):
+    """
+    Return counter batch statement wrapping given counter update statements.
+    """
+    return 'BEGIN COUNTER BATCH {} APPLY BATCH;'.format(' '.join(statements))
+
+
+# TODO: This should ideally goto silverberg but is here due to
+# `timeout_deferred` implementation. It should be coming out in Twisted
+# itself.
 # See http://twistedmatrix.com/trac/changeset/42627
 class TimingOutCQLClient(object):
     """
@@ -69,3 +80,142 @@ class TimingOutCQLClient(object):
         See :py:func:`silverberg.client.CQLClient.disconnect`
         """
         return self._client.disconnect()
+
+
+class _HostPool(object):
+    """
+    Connections to one Cassandra host along with its usage stats
+
+    :param str name: Name of the host used in stats
+    :param list clients: CQLClient instances connected to the host
+    :param int max_in_flight: Maximum number of queries executing on a
+        connection at a time. Further queries wait till one of them completes.
+        Unlimited if None
+    """
+
+    def __init__(self, name, clients, max_in_flight):
+        self.name = name
+        self.clients = clients
+        self.in_flight = [0] * len(clients)
+        self.sem = (None if max_in_flight is None else
+                    DeferredSemaphore(max_in_flight * len(clients)))
+        self.completed = 0
+        self.failed = 0
+
+    def execute(self, *args, **kwargs):
+        """
+        Execute query on least busy connection after waiting for a free slot
+        if the host is at its in-flight limit
+        """
+        if self.sem is None:
+            return self._execute(*args, **kwargs)
+        return self.sem.run(self._execute, *args, **kwargs)
+
+    def _execute(self, *args, **kwargs):
+        index = self.in_flight.index(min(self.in_flight))
+        self.in_flight[index] += 1
+
+        def done(result):
+            self.in_flight[index] -= 1
+            self.completed += 1
+            return result
+
+        def failed(failure):
+            self.failed += 1
+            return failure
+
+        d = self.clients[index].execute(*args, **kwargs)
+        return d.addErrback(failed).addBoth(done)
+
+    def stats(self):
+        """
+        Return ``dict`` of current usage of this host's connections
+        """
+        return {
+            'host': self.name,
+            'connections': len(self.clients),
+            'in_flight': sum(self.in_flight),
+            'waiting': 0 if self.sem is None else len(self.sem.waiting),
+            'completed': self.completed,
+            'failed': self.failed
+        }
+
+
+class PooledCassandraCluster(object):
+    """
+    A CQLClient implementation that keeps a pool of connections to each of the
+    given hosts. Hosts are selected in round-robin fashion like
+    :class:`silverberg.cluster.RoundRobinCassandraCluster` and within the host
+    a query is executed on the connection with least queries in flight.
+    Connection failures are retried on next host.
+
+    :param list seed_endpoints: ``(name, IStreamClientEndpoint)`` tuples of
+        hosts to connect to
+    :param str keyspace: The cassandra keyspace to use
+    :param int connections_per_host: Number of connections to keep per host
+    :param int max_in_flight: Maximum number of queries executing on a
+        connection at a time. Unlimited if None
+    :param bool disconnect_on_cancel: Disconnect TCP connection on cancellation
+        of running query?
+    :param client_factory: Callable creating a CQLClient from endpoint,
+        keyspace and `disconnect_on_cancel`
+    """
+
+    def __init__(self, seed_endpoints, keyspace, connections_per_host=1,
+                 max_in_flight=None, disconnect_on_cancel=False,
+                 client_factory=None):
+        if client_factory is None:
+            def client_factory(endpoint, keyspace, disconnect_on_cancel):
+                return CQLClient(endpoint, keyspace,
+                                 disconnect_on_cancel=disconnect_on_cancel)
+        self._hosts = [
+            _HostPool(
+                name,
+                [client_factory(endpoint, keyspace, disconnect_on_cancel)
+                 for _ in range(connections_per_host)],
+                max_in_flight)
+            for name, endpoint in seed_endpoints]
+        self._host_idx = 0
+
+    def execute(self, *args, **kwargs):
+        """
+        See :py:func:`silverberg.client.CQLClient.execute`
+        """
+        num_hosts = len(self._hosts)
+        start_host = (self._host_idx + 1) % num_hosts
+
+        def _host_error(failure, host_i):
+            failure.trap(ConnectError)
+            host_i = (host_i + 1) % num_hosts
+            if host_i == start_host:
+                return failure
+            return _try_execute(host_i)
+
+        def _try_execute(host_i):
+            self._host_idx = host_i
+            d = self._hosts[host_i].execute(*args, **kwargs)
+            return d.addErrback(_host_error, host_i)
+
+        return _try_execute(start_host)
+
+    def stats(self):
+        """
+        Return list of usage stats ``dict`` of each host
+        """
+        return [host.stats() for host in self._hosts]
+
+    def health_check(self):
+        """
+        Return health of the pool as ``(True, details)`` tuple. The pool is
+        always considered healthy and the details contain its usage stats.
+        The interface is same as other health checks of
+        :class:`otter.tap.api.HealthChecker`
+        """
+        return True, {'hosts': self.stats()}
+
+    def disconnect(self):
+        """
+        See :py:func:`silverberg.client.CQLClient.disconnect`
+        """
+        return DeferredList([client.disconnect() for host in self._hosts
+                             for client in host.clients])
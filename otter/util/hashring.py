@@ -0,0 +1,87 @@
+"""
+Consistent hashing of buckets onto nodes.
+
+Buckets are assigned to nodes with a consistent hash ring having a number of
+virtual nodes per node, so that nodes joining or leaving move only about
+``1 / number of nodes`` of the buckets. No node is assigned more than
+``load_factor`` times the average number of buckets per node ("consistent
+hashing with bounded loads"): a bucket that would overload the node it hashes
+to goes to the next node on the ring.
+"""
+
+from bisect import bisect
+from hashlib import sha1
+
+
+def stable_hash(s):
+    """Get a stable hash of a string as an integer."""
+    # :func:`hash` is not stable with different pythons/architectures.
+    return int(sha1(s).hexdigest(), 16)
+
+
+def _ring(members, vnodes):
+    """
+    Return sorted list of (hash, member) points of the ring
+    """
+    return sorted((stable_hash('{}-{}'.format(member, i)), member)
+                  for member in members for i in range(vnodes))
+
+
+def assign_buckets(members, buckets, vnodes=100, load_factor=1.25):
+    """
+    Assign buckets to members.
+
+    The result depends only on the arguments, so every member computes the
+    same assignment given the same members and buckets.
+
+    :param members: Collection of member identifiers (str)
+    :param buckets: Collection of buckets
+    :param int vnodes: Number of points each member has on the ring
+    :param float load_factor: Maximum number of buckets of a member relative
+        to the average number of buckets per member
+
+    :return: dict of member to sorted list of its buckets
+    """
+    members = sorted(set(members))
+    assigned = {member: [] for member in members}
+    if not members:
+        return assigned
+    ring = _ring(members, vnodes)
+    hashes = [h for h, _ in ring]
+    capacity = load_factor * len(buckets) / len(members)
+    ordered = sorted(buckets, key=lambda b: (stable_hash(str(b)), b))
+    for bucket in ordered:
+        start = bisect(hashes, stable_hash(str(bucket)))
+        chosen = None
+        for i in range(len(ring)):
+            member = ring[(start + i) % len(ring)][1]
+            if len(assigned[member]) + 1 <= capacity:
+                chosen = member
+                break
+        if chosen is None:
+            chosen = min(members, key=lambda m: (len(assigned[m]), m))
+        assigned[chosen].append(bucket)
+    for member_buckets in assigned.values():
+        member_buckets.sort()
+    return assigned
+
+
+def ring_partitioner(vnodes=100, load_factor=1.25):
+    """
+    Return a partition function for :obj:`kazoo.recipe.partitioner.
+    SetPartitioner` that assigns buckets with :func:`assign_buckets`.
+
+    Each member computes its buckets on its own, so the assignment may only
+    depend on the members and buckets that the members agree on.
+
+    Members that partition differently, like nodes running the earlier
+    round-robin partitioning of kazoo during a rolling deploy, compute
+    different assignments. SetPartitioner's per-bucket locks still keep a
+    bucket from being owned twice, but members then fail to acquire their
+    partitions and retry, so some buckets may not be converged until every
+    member partitions the same way.
+    """
+    def partition(identifier, members, partitions):
+        return assign_buckets(members, partitions, vnodes,
+                              load_factor)[identifier]
+    return partition
@@ -0,0 +1,267 @@
+"""
+Incremental decoding of JSON as it is received.
+
+Bodies of some responses, like Nova's servers listing or CLB's nodes of a big
+load balancer, can be many megabytes. Joining all of their chunks and decoding
+them in one go holds the text and the decoded objects in memory together and
+blocks the reactor for as long as the whole body takes to decode.
+:class:`JSONStreamDecoder` instead decodes a JSON object as its chunks are
+fed: arrays in the object's members are decoded an item at a time and the
+text of decoded items is dropped, so that decoding is spread over the chunks
+and only the text of the item being received is kept.
+"""
+
+import json
+import re
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+_decoder = json.JSONDecoder()
+
+# Returned by JSONStreamDecoder._value when value is not completely received
+_INCOMPLETE = object()
+
+
+class JSONStreamDecoder(object):
+    """
+    Decode JSON text fed to it in chunks.
+
+    If the text is an object, its members are decoded as they are received
+    and the items of members that are arrays are decoded one by one. Any
+    other JSON is decoded when all of it is received. The decoded value is
+    same as the one got from :func:`json.loads` on the whole text.
+
+    A value that is not completely received is tried again only after the
+    text pending for it doubles, so that decoding a big value (like a huge
+    array item) received in many chunks takes linear time.
+
+    :param dict items: Mapping of object member name to function called with
+        each item of the array in the member as it is decoded. The item is
+        replaced with what it returns. This can be used to keep only the
+        needed parts of the items.
+    """
+
+    def __init__(self, items=None):
+        self._items = items or {}
+        self._state = self._start
+        self._buf = ''
+        self._pos = 0
+        self._chunks = []
+        self._pending = 0
+        self._wanted = 0
+        self._error = None
+        self._result = None
+        self._member = None
+        self._array = None
+        self._project = None
+
+    def feed(self, data):
+        """
+        Decode as much of the JSON as possible with the given data added.
+
+        This never raises so that it can be used as a :func:`treq.collect`
+        collector. Any error is raised by :meth:`close` instead.
+
+        :param str data: Next chunk of the JSON text
+        """
+        if self._error is not None:
+            return
+        self._chunks.append(data)
+        self._pending += len(data)
+        if self._pending < self._wanted:
+            return
+        try:
+            self._run(False)
+        except ValueError as e:
+            self._error = e
+
+    def close(self):
+        """
+        Finish decoding after all the text is fed.
+
+        :return: Decoded JSON or None if the text was empty
+        :raise ValueError: If the text is not valid JSON
+        """
+        if self._error is not None:
+            raise self._error
+        self._run(True)
+        if self._state == self._start:
+            return None
+        if self._state != self._done:
+            raise ValueError('Unterminated JSON')
+        return self._result
+
+    def _run(self, final):
+        """
+        Run the states on the text received so far till one of them needs more
+        text.
+
+        :param bool final: Is all the text received?
+        """
+        self._buf = self._buf[self._pos:] + ''.join(self._chunks)
+        self._pos = 0
+        self._chunks = []
+        self._wanted = 0
+        while self._state(final):
+            pass
+        self._pending = len(self._buf) - self._pos
+
+    def _next_char(self):
+        """
+        Skip whitespace and return the next character or None if there is no
+        more text.
+        """
+        self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+        if self._pos < len(self._buf):
+            return self._buf[self._pos]
+        return None
+
+    def _expect(self, chars, what):
+        """
+        Return next character after checking that it is one of ``chars``.
+        """
+        char = self._next_char()
+        if char is not None and char not in chars:
+            raise ValueError('Expecting {}: char {}'.format(
+                what, self._pos))
+        return char
+
+    def _value(self, final):
+        """
+        Decode the next value or return :obj:`_INCOMPLETE` if it is not
+        completely received.
+        """
+        if self._next_char() is None:
+            return _INCOMPLETE
+        try:
+            value, end = _decoder.raw_decode(self._buf, self._pos)
+        except ValueError:
+            if final:
+                raise
+            self._wanted = 2 * (len(self._buf) - self._pos)
+            return _INCOMPLETE
+        if end == len(self._buf) and not final:
+            # A number may continue in the next chunk
+            self._wanted = len(self._buf) - self._pos + 1
+            return _INCOMPLETE
+        self._pos = end
+        return value
+
+    # Each of the following states returns True if it moved to the next state
+    # and False if it needs more text.
+
+    def _start(self, final):
+        char = self._next_char()
+        if char is None:
+            return False
+        if char == '{':
+            self._pos += 1
+            self._result = {}
+            self._state = self._first_key
+        else:
+            self._state = self._top_value
+        return True
+
+    def _top_value(self, final):
+        value = self._value(final)
+        if value is _INCOMPLETE:
+            return False
+        self._result = value
+        self._state = self._done
+        return True
+
+    def _first_key(self, final):
+        char = self._expect('"}', 'property name')
+        if char is None:
+            return False
+        if char == '}':
+            self._pos += 1
+            self._state = self._done
+        else:
+            self._state = self._key
+        return True
+
+    def _key(self, final):
+        if self._expect('"', 'property name') is None:
+            return False
+        key = self._value(final)
+        if key is _INCOMPLETE:
+            return False
+        self._member = key
+        self._state = self._colon
+        return True
+
+    def _colon(self, final):
+        if self._expect(':', "':' delimiter") is None:
+            return False
+        self._pos += 1
+        self._state = self._member_value
+        return True
+
+    def _member_value(self, final):
+        char = self._next_char()
+        if char is None:
+            return False
+        if char == '[':
+            self._pos += 1
+            self._array = []
+            self._project = self._items.get(self._member)
+            self._state = self._first_item
+            return True
+        value = self._value(final)
+        if value is _INCOMPLETE:
+            return False
+        self._result[self._member] = value
+        self._state = self._member_end
+        return True
+
+    def _first_item(self, final):
+        char = self._next_char()
+        if char is None:
+            return False
+        if char == ']':
+            self._end_array()
+        else:
+            self._state = self._item
+        return True
+
+    def _item(self, final):
+        item = self._value(final)
+        if item is _INCOMPLETE:
+            return False
+        if self._project is not None:
+            item = self._project(item)
+        self._array.append(item)
+        self._state = self._item_end
+        return True
+
+    def _item_end(self, final):
+        char = self._expect(',]', "',' delimiter")
+        if char is None:
+            return False
+        if char == ',':
+            self._pos += 1
+            self._state = self._item
+        else:
+            self._end_array()
+        return True
+
+    def _end_array(self):
+        self._pos += 1
+        self._result[self._member] = self._array
+        self._array = None
+        self._state = self._member_end
+
+    def _member_end(self, final):
+        char = self._expect(',}', "',' delimiter")
+        if char is None:
+            return False
+        self._pos += 1
+        self._state = self._key if char == ',' else self._done
+        return True
+
+    def _done(self, final):
+        if self._next_char() is not None:
+            raise ValueError('Extra data: char {}'.format(self._pos))
+        return False
@@ -10,6 +10,7 @@ import attr
 import treq
 
 from twisted.internet import reactor
+from twisted.web.client import HTTPConnectionPool
 
 from otter.log import log as default_log
 from otter.util.deferredutils import timeout_deferred
@@ -19,6 +20,67 @@ _treq_request_methods = ('get', 'head', 'post', 'put', 'delete',
                          'patch', 'request')
 
 
+class MeteredHTTPConnectionPool(HTTPConnectionPool):
+    """
+    A persistent :class:`HTTPConnectionPool` that records how many requests
+    reused an existing connection and how long new connections took to be
+    established.
+
+    :param reactor: Reactor used to make connections and time them
+    :param int max_persistent_per_host: Maximum number of idle connections
+        kept open per host
+    :param int idle_timeout: Seconds after which an idle connection is closed
+    """
+
+    def __init__(self, reactor, max_persistent_per_host=2, idle_timeout=240):
+        HTTPConnectionPool.__init__(self, reactor, persistent=True)
+        self.maxPersistentPerHost = max_persistent_per_host
+        self.cachedConnectionTimeout = idle_timeout
+        self.requests = 0
+        self.created = 0
+        self.connect_time = 0.0
+
+    def getConnection(self, key, endpoint):
+        """
+        See :meth:`HTTPConnectionPool.getConnection`
+        """
+        self.requests += 1
+        return HTTPConnectionPool.getConnection(self, key, endpoint)
+
+    def _newConnection(self, key, endpoint):
+        self.created += 1
+        start = self._reactor.seconds()
+
+        def connected(protocol):
+            self.connect_time += self._reactor.seconds() - start
+            return protocol
+
+        d = HTTPConnectionPool._newConnection(self, key, endpoint)
+        return d.addCallback(connected)
+
+    def stats(self):
+        """
+        Return ``dict`` of connection usage so far
+        """
+        reused = self.requests - self.created
+        return {
+            'requests': self.requests,
+            'new_connections': self.created,
+            'reuse_rate': (float(reused) / self.requests
+                           if self.requests else 0.0),
+            'mean_connect_time': (self.connect_time / self.created
+                                  if self.created else 0.0),
+            'idle_connections': sum(map(len, self._connections.values()))
+        }
+
+    def health_check(self):
+        """
+        Return ``(True, stats)``. The pool is always healthy; this exposes its
+        stats in the health check
+        """
+        return True, self.stats()
+
+
 @attr.s
 class LoggingTreq(object):
     """
@@ -33,10 +95,13 @@ class LoggingTreq(object):
     :ivar log_response: - a boolean as to whether or not the response bodies
         should be logged as bytes.  Defaults to False, because this can be
         dangerous as it may log secret information such as admin passwords.
+    :ivar pool: - :class:`HTTPConnectionPool` to make requests with. Defaults
+        to treq's global pool if not provided.
     """
     clock = attr.ib(default=reactor)
     log = attr.ib(default=default_log)
     log_response = attr.ib(default=False)
+    pool = attr.ib(default=None)
 
     def __getattr__(self, name):
         """
@@ -97,6 +162,9 @@ class LoggingTreq(object):
             if kwargs['headers'] is None:
                 kwargs['headers'] = {}
 
+            if self.pool is not None:
+                kwargs.setdefault('pool', self.pool)
+
             treq_transaction = str(uuid4())
             kwargs['headers']['x-otter-request-id'] = [treq_transaction]
 
@@ -143,6 +211,15 @@ class LoggingTreq(object):
 _logging_treq = LoggingTreq()
 
 
+def set_pool(pool):
+    """
+    Set the connection pool used by the module-level request functions.
+
+    :param pool: :class:`HTTPConnectionPool` or None to use treq's default
+    """
+    _logging_treq.pool = pool
+
+
 # these methods just wrap logging_treq
 request = _logging_treq.request
 head = _logging_treq.head
@@ -154,6 +231,7 @@ delete = _logging_treq.delete
 
 json_content = treq.json_content
 content = treq.content
+collect = treq.collect
 text_content = treq.text_content
 
 
@@ -20,16 +20,22 @@ from txeffect import deferred_performer
 from otter.log.intents import merge_effectful_fields
 from otter.util import logging_treq
 from otter.util.http import APIError
+from otter.util.jsonstream import JSONStreamDecoder
 
 
-@attributes(['method', 'url', 'headers', 'data', 'params', 'log'],
+@attributes(['method', 'url', 'headers', 'data', 'params', 'log',
+             'json_items'],
             defaults={'headers': None, 'data': None, 'params': None,
-                      'log': None})
+                      'log': None, 'json_items': None})
 class Request(object):
     """
     An effect request for performing HTTP requests.
 
     The effect results in a two-tuple of (response, content).
+
+    If ``json_items`` is not None, the body of a 2xx response is decoded as
+    JSON while it is received by a :obj:`JSONStreamDecoder` given
+    ``json_items`` and the content is the decoded JSON instead of bytes.
     """
 
     treq = logging_treq
@@ -38,7 +44,8 @@ class Request(object):
         """Check that the result looks like (response, content)."""
         return (isinstance(result, tuple)
                 and len(result) == 2
-                and isinstance(result[1], str))
+                and (isinstance(result[1], str)
+                     or self.json_items is not None))
 
 
 @deferred_performer
@@ -47,7 +54,8 @@ def perform_request(dispatcher, intent):
     """
     Perform the request with treq.
 
-    :return: A two-tuple of (HTTP Response, content as bytes)
+    :return: A two-tuple of (HTTP Response, content as bytes or decoded JSON
+        as described in :obj:`Request`)
     """
     log = merge_effectful_fields(dispatcher, intent.log)
     response = yield intent.treq.request(intent.method.upper(), intent.url,
@@ -55,7 +63,12 @@ def perform_request(dispatcher, intent):
                                          data=intent.data,
                                          params=intent.params,
                                          log=log)
-    content = yield intent.treq.content(response)
+    if intent.json_items is not None and 200 <= response.code < 300:
+        decoder = JSONStreamDecoder(intent.json_items)
+        yield intent.treq.collect(response, decoder.feed)
+        content = decoder.close()
+    else:
+        content = yield intent.treq.content(response)
     returnValue((response, content))
 
 
@@ -98,6 +111,9 @@ def check_response(pred, result):
     if pred(response, content):
         return result
     else:
+        if isinstance(content, (dict, list)):
+            # Decoded while it was received
+            content = json.dumps(content)
         raise APIError(response.code, content, response.headers,
                        response.request.method, response.request.absoluteURI)
 
@@ -220,9 +236,17 @@ def add_json_response(request_func):
 
     If the body is empty, will make the body :data`None`, and not attempt to
     parse it with a JSON parser, since that would produce an exception.
+
+    A body that is not bytes was already decoded while it was received (see
+    :obj:`Request`) and is returned as is.
     """
+    def decode(content):
+        if not isinstance(content, str):
+            return content
+        return json.loads(content) if content else None
+
     request = lambda *args, **kwargs: request_func(*args, **kwargs).on(
-        lambda r: (r[0], json.loads(r[1]) if r[1] else None))
+        lambda r: (r[0], decode(r[1])))
     return wraps(request_func)(request)
 
 
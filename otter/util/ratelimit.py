@@ -0,0 +1,216 @@
+"""
+Adaptive rate limiting of calls.
+"""
+
+from collections import deque
+
+from twisted.internet.defer import Deferred, DeferredSemaphore, maybeDeferred
+from twisted.python.failure import Failure
+
+from otter.util.http import APIError
+
+
+# Response codes that mean the API is rate limiting us
+RATE_LIMITED_CODES = (413, 429)
+
+# Allowance for floating point errors when counting tokens
+_EPSILON = 1e-9
+
+
+def _retry_after(failure):
+    """
+    Return seconds given in ``Retry-After`` header of the rate limited
+    response in failure or None if it is not there.
+    """
+    headers = failure.value.headers
+    if headers is None:
+        return None
+    values = headers.getRawHeaders('retry-after') or []
+    try:
+        return float(values[0])
+    except (IndexError, ValueError):
+        return None
+
+
+class TokenBucket(object):
+    """
+    A token bucket that allows calls at some rate with bursts of up to
+    ``capacity`` calls, and adapts the rate to what the API allows.
+
+    The rate starts at ``base_rate``. Every call that succeeds increases it
+    by ``base_rate / 10`` up to ``max_rate``. Every call that fails with
+    :obj:`APIError` having 413 or 429 code halves it down to
+    ``base_rate / 10`` and pauses calls for as long as given in the
+    response's ``Retry-After`` header.
+
+    If ``concurrency`` is given, at most that many calls are in progress at a
+    time; the others wait for them to finish before waiting for a token.
+
+    :ivar float rate: Current number of calls allowed per second
+    """
+
+    def __init__(self, clock, base_rate, max_rate, capacity=1,
+                 concurrency=None):
+        """
+        :param clock: Reactor used to schedule calls
+        :param float base_rate: Number of calls allowed per second to begin
+            with
+        :param float max_rate: Maximum number of calls allowed per second
+        :param int capacity: Maximum number of calls allowed in a burst
+        :param int concurrency: Maximum number of calls in progress at a
+            time. Unlimited if not given
+        """
+        self.clock = clock
+        self.base_rate = float(base_rate)
+        self.max_rate = max_rate
+        self.min_rate = self.base_rate / 10
+        self.capacity = capacity
+        self.rate = self.base_rate
+        self._tokens = float(capacity)
+        self._updated = clock.seconds()
+        self._paused_until = 0
+        self._waiting = deque()
+        self._delayed = None
+        self._semaphore = (DeferredSemaphore(concurrency)
+                           if concurrency is not None else None)
+        self._pending = 0
+        self._last_used = self._updated
+
+    def run(self, f, *args, **kwargs):
+        """
+        Call ``f`` with given arguments when the rate allows.
+
+        :return: Deferred fired with result of ``f``
+        """
+        self._pending += 1
+        self._last_used = self.clock.seconds()
+        if self._semaphore is not None:
+            d = self._semaphore.run(self._run, f, *args, **kwargs)
+        else:
+            d = self._run(f, *args, **kwargs)
+        return d.addBoth(self._done)
+
+    def _done(self, result):
+        """
+        Account for a call that is no longer in progress
+        """
+        self._pending -= 1
+        self._last_used = self.clock.seconds()
+        return result
+
+    def idle_for(self, seconds):
+        """
+        Return True if there have been no calls in progress for given
+        seconds.
+        """
+        return (self._pending == 0 and
+                self.clock.seconds() - self._last_used >= seconds)
+
+    def _run(self, f, *args, **kwargs):
+        """
+        Call ``f`` with given arguments when there is a token for it.
+        """
+        d = Deferred()
+        self._waiting.append(d)
+        self._release()
+        return d.addCallback(
+            lambda _: maybeDeferred(f, *args, **kwargs)).addBoth(self._observe)
+
+    def _refill(self):
+        """
+        Add tokens accumulated since last refill and return current time
+        """
+        now = self.clock.seconds()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return now
+
+    def _release(self):
+        """
+        Release waiting calls for which there are tokens and schedule release
+        of the rest.
+        """
+        now = self._refill()
+        if now >= self._paused_until:
+            while self._waiting and self._tokens >= 1 - _EPSILON:
+                self._tokens -= 1
+                self._waiting.popleft().callback(None)
+        if self._waiting and self._delayed is None:
+            wait = max((1 - self._tokens) / self.rate, _EPSILON,
+                       self._paused_until - now)
+            self._delayed = self.clock.callLater(wait, self._release_delayed)
+
+    def _release_delayed(self):
+        """
+        Release waiting calls when scheduled by :meth:`_release`
+        """
+        self._delayed = None
+        self._release()
+
+    def _observe(self, result):
+        """
+        Adapt the rate to the result of a call
+        """
+        if not isinstance(result, Failure):
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.base_rate / 10)
+        elif (result.check(APIError) and
+                result.value.code in RATE_LIMITED_CODES):
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0
+            retry_after = _retry_after(result)
+            if retry_after is not None:
+                self._paused_until = self.clock.seconds() + retry_after
+        return result
+
+
+class TokenBuckets(object):
+    """
+    :obj:`TokenBucket` objects keyed on what they limit. Buckets that have
+    had no calls in progress for ``idle_timeout`` seconds are forgotten so
+    that buckets of keys no longer used do not accumulate.
+    """
+
+    def __init__(self, clock, idle_timeout=600):
+        """
+        :param clock: Reactor used by the buckets
+        :param float idle_timeout: Seconds after which an idle bucket is
+            forgotten
+        """
+        self.clock = clock
+        self.idle_timeout = idle_timeout
+        self._buckets = {}
+        self._pruned = None
+
+    def get(self, key, base_rate, max_rate, concurrency=None):
+        """
+        Return the bucket of ``key``. A new bucket with given arguments is
+        created if there is none or if existing one has a different
+        ``base_rate``.
+        """
+        self._prune()
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.base_rate != base_rate:
+            bucket = self._buckets[key] = TokenBucket(
+                self.clock, base_rate, max_rate, concurrency=concurrency)
+        return bucket
+
+    def _prune(self):
+        """
+        Forget idle buckets. This is done at most once every
+        ``idle_timeout`` seconds.
+        """
+        now = self.clock.seconds()
+        if self._pruned is None:
+            self._pruned = now
+        if now - self._pruned < self.idle_timeout:
+            return
+        self._pruned = now
+        for key, bucket in list(self._buckets.items()):
+            if bucket.idle_for(self.idle_timeout):
+                del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
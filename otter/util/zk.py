@@ -152,6 +152,39 @@ def perform_get_stat(kz_client, dispatcher, intent):
     return kz_client.exists(intent.path)
 
 
+@attr.s
+class GetData(object):
+    """
+    Get ``(content, ZnodeStat)`` of a ZK node, or None if the node does not
+    exist.
+    """
+    path = attr.ib()
+
+
+@deferred_performer
+def perform_get_data(kz_client, dispatcher, intent):
+    """Perform a :obj:`GetData`."""
+    d = kz_client.get(intent.path)
+    return d.addErrback(catch_failure(NoNodeError, lambda f: None))
+
+
+@attr.s
+class SetData(object):
+    """
+    Set content of a ZK node if its version is ``version``. Any version
+    matches if it is -1. Results in :obj:`ZnodeStat` of the node.
+    """
+    path = attr.ib()
+    value = attr.ib()
+    version = attr.ib(default=-1)
+
+
+@deferred_performer
+def perform_set_data(kz_client, dispatcher, intent):
+    """Perform a :obj:`SetData`."""
+    return kz_client.set(intent.path, intent.value, version=intent.version)
+
+
 @attributes(['path', 'version'])
 class DeleteNode(object):
     """Delete a node."""
@@ -180,8 +213,12 @@ def get_zk_dispatcher(kz_client):
             partial(perform_get_children_with_stats, kz_client),
         GetChildren:
             partial(perform_get_children, kz_client),
+        GetData:
+            partial(perform_get_data, kz_client),
         GetStat:
-            partial(perform_get_stat, kz_client)
+            partial(perform_get_stat, kz_client),
+        SetData:
+            partial(perform_set_data, kz_client)
     })
 
 
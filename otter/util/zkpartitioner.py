@@ -22,7 +22,7 @@ class Partitioner(MultiService, object):
     """
     def __init__(self, kz_client, interval, partitioner_path, buckets,
                  time_boundary, log, got_buckets,
-                 clock=None):
+                 clock=None, partition_func=None):
         """
         :param log: a bound log
         :param kz_client: txKazoo client
@@ -34,6 +34,10 @@ class Partitioner(MultiService, object):
         :param got_buckets: Callable which will be called with a list of
             buckets when buckets have been allocated to this node.
         :param clock: clock to use for checking the buckets on an interval.
+        :param partition_func: Function of (identifier, members, buckets)
+            returning the buckets of member ``identifier``, to be used by
+            :obj:`SetPartitioner` instead of its default partitioning. It is
+            called in a thread.
         """
         MultiService.__init__(self)
         self.kz_client = kz_client
@@ -42,6 +46,7 @@ class Partitioner(MultiService, object):
         self.log = log
         self.got_buckets = got_buckets
         self.time_boundary = time_boundary
+        self.partition_func = partition_func
         ts = TimerService(interval, self.check_partition)
         ts.setServiceParent(self)
         ts.clock = clock
@@ -52,10 +57,13 @@ class Partitioner(MultiService, object):
         return self.partitioner.state
 
     def _new_partitioner(self):
+        kwargs = {}
+        if self.partition_func is not None:
+            kwargs['partition_func'] = self.partition_func
         return self.kz_client.SetPartitioner(
             self.partitioner_path,
             set=self.buckets,
-            time_boundary=self.time_boundary)
+            time_boundary=self.time_boundary, **kwargs)
 
     def startService(self):
         """Start partitioning."""
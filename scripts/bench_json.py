@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+"""
+Measure time, longest reactor stall and memory taken to decode a synthetic
+Nova servers listing received in 64 KiB chunks, by joining the chunks and
+decoding them with json.loads or by decoding them as they are received with
+JSONStreamDecoder. Run each method in a separate process to compare max RSS.
+
+Usage: bench_json.py loads|stream [size of listing in MiB]
+"""
+
+import json
+import resource
+import sys
+import time
+
+from bench_servers import server_json
+
+from otter.util.jsonstream import JSONStreamDecoder
+
+
+CHUNK_SIZE = 65536
+
+
+def listing_chunks(size):
+    body = json.dumps({'servers': [server_json(i) for i in range(size // 950)],
+                       'servers_links': []})
+    return [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+
+
+def loads(chunks):
+    content = []
+    for chunk in chunks:
+        content.append(chunk)
+    start = time.time()
+    result = json.loads(''.join(content))
+    return result, time.time() - start
+
+
+def stream(chunks):
+    decoder = JSONStreamDecoder()
+    longest = 0
+    for chunk in chunks:
+        start = time.time()
+        decoder.feed(chunk)
+        longest = max(longest, time.time() - start)
+    start = time.time()
+    result = decoder.close()
+    return result, max(longest, time.time() - start)
+
+
+def main(method, size):
+    chunks = listing_chunks(size * 1024 * 1024)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    result, longest = method(chunks)
+    took = time.time() - start
+    rss_delta = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+    print('{} KiB, {} servers: {:.3f}s, longest stall {:.3f}s, '
+          'max RSS +{} KiB'.format(
+              sum(map(len, chunks)) // 1024, len(result['servers']), took,
+              longest, rss_delta))
+
+
+if __name__ == '__main__':
+    main({'loads': loads, 'stream': stream}[sys.argv[1]],
+         int(sys.argv[2]) if len(sys.argv) > 2 else 5)
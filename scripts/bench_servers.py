@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+"""
+Measure time and memory taken to convert Nova server details JSON into
+NovaServer objects during convergence gathering and to convert them back for
+the servers cache. Run it on different revisions to compare.
+
+Usage: bench_servers.py [number of servers]
+"""
+
+import resource
+import sys
+import time
+
+from otter.convergence.model import NovaServer, ServerState
+from otter.convergence.service import update_servers_cache
+
+
+def server_json(i):
+    return {
+        'id': 'server-{}'.format(i),
+        'name': 'as-server-{}'.format(i),
+        'status': 'ACTIVE',
+        'created': '2015-10-10T10:00:00Z',
+        'updated': '2015-10-10T10:05:00Z',
+        'image': {'id': 'image', 'links': [{'href': 'i', 'rel': 'self'}]},
+        'flavor': {'id': 'flavor', 'links': [{'href': 'f', 'rel': 'self'}]},
+        'links': [{'href': 'http://nova/servers/{}'.format(i), 'rel': 'self'},
+                  {'href': 'http://nova/b/{}'.format(i), 'rel': 'bookmark'}],
+        'addresses': {
+            'private': [{'addr': '10.0.{}.{}'.format(i // 256, i % 256),
+                         'version': 4}],
+            'public': [{'addr': '2001::{:x}'.format(i), 'version': 6},
+                       {'addr': '166.0.{}.{}'.format(i // 256, i % 256),
+                        'version': 4}]},
+        'metadata': {
+            'rax:auto_scaling_group_id': 'group',
+            'rax:autoscale:group:id': 'group',
+            'rax:autoscale:lb:CloudLoadBalancer:2345': '[{"port": 80}]',
+            'rax:autoscale:lb:RackConnectV3:abcd': '',
+            'build_config': 'core',
+            'owner': 'someone'},
+        'OS-EXT-STS:task_state': None,
+        'OS-EXT-STS:vm_state': 'active',
+        'key_name': None,
+        'hostId': 'abcdef{}'.format(i),
+        'tenant_id': 'tenant',
+        'user_id': 'user',
+        'accessIPv4': '', 'accessIPv6': '',
+    }
+
+
+class _Group(object):
+    tenant_id = 'tenant'
+    uuid = 'group'
+
+
+def main(num):
+    jsons = [server_json(i) for i in range(num)]
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    servers = [NovaServer.from_server_details_json(j) for j in jsons]
+    parsed = time.time()
+    update_servers_cache(_Group(), 0, servers, [], {})
+    cached = time.time()
+    rss_delta = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+    assert all(s.state == ServerState.ACTIVE for s in servers)
+    print('{} servers: parse {:.3f}s, cache {:.3f}s, max RSS +{} KiB'.format(
+        num, parsed - start, cached - parsed, rss_delta))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
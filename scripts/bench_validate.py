@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+
+"""
+Measure throughput of validating create group request bodies with
+:func:`otter.json_schema.validate`, which checks the schema on every call,
+versus with a validator compiled once by
+:func:`otter.json_schema.compile_validator` like ``validate_body`` does.
+
+Usage: bench_validate.py [number of requests]
+"""
+
+import sys
+import time
+
+from otter.json_schema import compile_validator, validate
+from otter.json_schema.group_examples import (
+    config, launch_server_config, policy)
+from otter.json_schema.rest_schemas import create_group_request
+
+
+def rate(num, f):
+    start = time.time()
+    for _ in range(num):
+        f()
+    return num / (time.time() - start)
+
+
+def main(num):
+    body = {'groupConfiguration': config()[0],
+            'launchConfiguration': launch_server_config()[0],
+            'scalingPolicies': policy()[:3]}
+    validator = compile_validator(create_group_request)
+    print('{} requests: validate {:.0f}/s, compiled validator {:.0f}/s'.format(
+        num, rate(num, lambda: validate(body, create_group_request)),
+        rate(num, lambda: validator.validate(body))))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -22,6 +22,7 @@ from twisted.internet.endpoints import clientFromString
 from txeffect import perform
 
 from otter.effect_dispatcher import get_working_cql_dispatcher
+from otter.models import cass
 from otter.models.cass import CassScalingGroupCollection
 from otter.test.resources import CQLGenerator
 from otter.util.cqlbatch import batch
@@ -37,7 +38,7 @@ the_parser.add_argument(
 the_parser.add_argument(
     '--migrate', '-m', type=str,
     choices=['webhook_migrate', 'webhook_index', 'insert_deleting_false',
-             'set_desired'],
+             'set_desired', 'reconcile_all_counts'],
     help='Run a migration job')
 
 the_parser.add_argument(
@@ -216,6 +217,20 @@ def set_desired(reactor, conn, args):
     returnValue(None)
 
 
+@inlineCallbacks
+def reconcile_all_counts(reactor, conn, args):
+    """
+    Reconcile resource counts of all tenants with their rows. Counts of all
+    tenants are used by metrics after this is done once. otter-metrics
+    reconciles them periodically after that.
+    """
+    store = CassScalingGroupCollection(conn, None, 3)
+    groups = yield store.get_scaling_group_rows(
+        props=['"tenantId"', '"groupId"'])
+    yield cass.reconcile_all_counts(
+        conn, set(group['tenantId'] for group in groups))
+
+
 def setup_connection(reactor, args):
     """
     Return Cassandra connection